@@ -1,13 +1,14 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from jose import JWTError
 from sqlalchemy.orm import Session
 from typing import Optional
 
 from core.config import settings
-from core.security import verify_password
+from core.security import decode_access_token
 from database.database import get_db
 from database.models.user import User
+from services.session_service import revocation_list
 from schemas.user import UserRead  # Import UserRead schema
 
 # Define the token URL for obtaining the JWT.  This is used by FastAPI's
@@ -17,7 +18,7 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/login")
 
 
 def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
+    request: Request, db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
 ) -> User:
     """
     Retrieves the current user based on the JWT token provided in the request.
@@ -28,13 +29,20 @@ def get_current_user(
     1.  It retrieves the JWT token from the request using the
         `OAuth2PasswordBearer` scheme.
     2.  It decodes the token using the application's secret key and algorithm.
-    3.  It extracts the user's email from the decoded token.
-    4.  It retrieves the user from the database based on the email.
-    5.  If the token is invalid or the user is not found, it raises an
+    3.  It extracts the user's email and the token ID (`jti`) from the
+        decoded token.
+    4.  It rejects the token if it has been revoked (see
+        `services.session_service.RevocationList`).
+    5.  It retrieves the user from the database based on the email.
+    6.  If the token is invalid or the user is not found, it raises an
         appropriate HTTPException.
-    6.  It returns the user object.
+    7.  It returns the user object.
+
+    Sub-requests of a batch (see `api.routes.batch`) skip these steps and
+    get the user the batch itself was authenticated as.
 
     Args:
+        request (Request): The current request.
         db (Session, optional): The database session.
             Defaults to Depends(get_db).
         token (str, optional): The JWT token.
@@ -44,9 +52,12 @@ def get_current_user(
         User: The authenticated user object.
 
     Raises:
-        HTTPException: 401 Unauthorized if the token is invalid or expired.
+        HTTPException: 401 Unauthorized if the token is invalid, expired or revoked.
         HTTPException: 404 Not Found if the user is not found in the database.
     """
+    batch_user = getattr(request.state, "batch_user", None)
+    if batch_user is not None:
+        return batch_user
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -54,14 +65,15 @@ def get_current_user(
     )
     try:
         #  Payload is a dict containing the data from the token
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        payload = decode_access_token(token)
         email: str = payload.get("sub")  # "sub" is the standard key for the subject (user identifier)
-        if email is None:
+        jti: str = payload.get("jti")  # Tokens without an ID could not be revoked
+        if email is None or jti is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+    if revocation_list.is_revoked(db, jti):
+        raise credentials_exception
     user = db.query(User).filter(User.email == email).first()
     if user is None:
         raise HTTPException(
@@ -96,3 +108,30 @@ def get_current_active_user(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user"
         )
     return current_user
+
+
+
+def get_current_superuser(
+    current_user: User = Depends(get_current_active_user),
+) -> User:
+    """
+    Retrieves the current user, who must be a superuser.
+
+    This function is a dependency for the admin endpoints.  It builds upon
+    `get_current_active_user` by checking the user's `is_superuser` flag.
+
+    Args:
+        current_user (User, optional): The current active user.
+            Defaults to Depends(get_current_active_user).
+
+    Returns:
+        User: The current superuser object.
+
+    Raises:
+        HTTPException: 403 Forbidden if the user is not a superuser.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions"
+        )
+    return current_user
@@ -0,0 +1,20 @@
+from typing import Any, List
+
+from starlette.types import Scope
+
+#  Scope state key listing the middleware `POST /batch` also applies to each
+#  of its sub-requests, outermost first.  Such middleware has a
+#  `handle(app, scope, receive, send)` method doing its work around `app`.
+SUB_REQUEST_MIDDLEWARE = "sub_request_middleware"
+
+
+def register_for_sub_requests(scope: Scope, middleware: Any) -> None:
+    """
+    Records that `middleware` handled this request, so that the batch route
+    runs the request's sub-requests through it as well.
+    """
+    scope.setdefault("state", {}).setdefault(SUB_REQUEST_MIDDLEWARE, []).append(middleware)
+
+
+def sub_request_middleware(scope: Scope) -> List[Any]:
+    return scope.get("state", {}).get(SUB_REQUEST_MIDDLEWARE, [])
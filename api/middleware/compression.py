@@ -0,0 +1,98 @@
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.compression import Codec, available_codecs, is_compressible, negotiate
+from core.config import settings
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that compresses response bodies with the best encoding
+    the client accepts (zstd, br or gzip, see `core.compression`).
+
+    * A response sent in one piece is compressed whole, and only if it is at
+      least `minimum_size` bytes.
+    * A streamed response (`StreamingResponse`, or any body sent with
+      `more_body`) is compressed chunk by chunk and flushed after each one,
+      so clients receive data as it is produced.
+    * Responses that already have a `Content-Encoding` (pre-compressed
+      payloads from `core.response_cache`), non-text content types and
+      HEAD requests are passed through.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: Optional[int] = None,
+        codecs: Optional[Dict[str, Codec]] = None,
+    ):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MINIMUM_SIZE if minimum_size is None else minimum_size
+        self.codecs = codecs if codecs is not None else available_codecs(
+            settings.COMPRESSION_GZIP_LEVEL, settings.COMPRESSION_BROTLI_QUALITY, settings.COMPRESSION_ZSTD_LEVEL
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.codecs)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        codec = self.codecs[encoding]
+
+        start_message: Optional[Message] = None
+        passthrough = False
+        stream = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, passthrough, stream
+            if message["type"] == "http.response.start":
+                #  Held back until the first body chunk shows whether to compress.
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if stream is not None:
+                chunk = stream.compress(body) if body else b""
+                if not more_body:
+                    chunk += stream.finish()
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                return
+
+            start, start_message = start_message, None
+            headers = MutableHeaders(scope=start)
+            if "content-encoding" in headers or not is_compressible(headers.get("content-type")):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body and len(body) < self.minimum_size:
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            headers["Content-Encoding"] = encoding
+            if not more_body:
+                body = codec.compress(body, codec.level)
+                headers["Content-Length"] = str(len(body))
+                await send(start)
+                await send({"type": "http.response.body", "body": body})
+                return
+            #  The compressed length is not known up front.
+            if "content-length" in headers:
+                del headers["Content-Length"]
+            stream = codec.stream(codec.level)
+            await send(start)
+            await send({"type": "http.response.body", "body": stream.compress(body), "more_body": True})
+
+        await self.app(scope, receive, send_compressed)
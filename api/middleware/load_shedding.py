@@ -0,0 +1,96 @@
+import json
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from api.middleware import register_for_sub_requests
+from core.concurrency_limit import PRIORITIES, ConcurrencyLimiter
+from core.config import settings
+from core.metrics import CONCURRENCY_LIMIT, LOAD_SHED
+
+
+class LoadSheddingMiddleware:
+    """
+    ASGI middleware that caps the requests in flight in this worker with an
+    adaptive `ConcurrencyLimiter`.
+
+    Routes are matched against the "METHOD /path" templates in `priorities`
+    to get their priority ("critical", "normal" or "low"); other routes are
+    "normal".  Requests over their priority's share of the limit get a 503
+    with a `Retry-After` header at once, instead of queueing for the thread
+    pool and the database pool until they time out.  Batch sub-requests
+    are admitted separately, with their own routes' priorities.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        priorities: Optional[Dict[str, str]] = None,
+        limiter: Optional[ConcurrencyLimiter] = None,
+        retry_after: Optional[int] = None,
+        exclude_paths=("/metrics",),
+    ):
+        self.app = app
+        self.routes: List[Tuple[str, re.Pattern, str]] = []
+        for key, priority in (settings.CONCURRENCY_LIMIT_PRIORITIES if priorities is None else priorities).items():
+            if priority not in PRIORITIES:
+                raise ValueError(f"Invalid priority {priority!r} for {key!r}; expected one of {PRIORITIES}")
+            method, template = key.split(" ", 1)
+            self.routes.append((method, compile_path(template)[0], priority))
+        self.limiter = limiter if limiter is not None else ConcurrencyLimiter(
+            initial=settings.CONCURRENCY_LIMIT_INITIAL,
+            minimum=settings.CONCURRENCY_LIMIT_MIN,
+            maximum=settings.CONCURRENCY_LIMIT_MAX,
+            tolerance=settings.CONCURRENCY_LIMIT_TOLERANCE,
+            window=settings.CONCURRENCY_LIMIT_WINDOW,
+            shares=settings.CONCURRENCY_LIMIT_SHARES,
+        )
+        retry_after = settings.CONCURRENCY_LIMIT_RETRY_AFTER if retry_after is None else retry_after
+        self.retry_after = str(retry_after).encode()
+        self.exclude_paths = frozenset(exclude_paths)
+        CONCURRENCY_LIMIT.set(int(self.limiter.limit))
+
+    def priority(self, method: str, path: str) -> str:
+        for route_method, regex, priority in self.routes:
+            if route_method == method and regex.match(path):
+                return priority
+        return "normal"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            register_for_sub_requests(scope, self)
+        await self.handle(self.app, scope, receive, send)
+
+    async def handle(self, app: ASGIApp, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Admits or refuses a request handled by `app`.
+        """
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await app(scope, receive, send)
+            return
+
+        priority = self.priority(scope["method"], scope["path"])
+        if self.limiter.try_acquire(priority):
+            start = time.perf_counter()
+            try:
+                await app(scope, receive, send)
+            finally:
+                self.limiter.release(time.perf_counter() - start)
+                CONCURRENCY_LIMIT.set(int(self.limiter.limit))
+            return
+
+        LOAD_SHED.labels(priority).inc()
+        body = json.dumps({"detail": "Server is overloaded"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", self.retry_after),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,138 @@
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from jose import JWTError
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from api.middleware import register_for_sub_requests
+from core.config import settings
+from core.metrics import RATE_LIMITED
+from core.rate_limit import RateLimit, RateLimitStore, load_store, optional_limit, parse_limits
+from core.security import decode_access_token
+
+#  Bucket key of the default limit, shared by all routes without their own.
+DEFAULT_ROUTE = "*"
+
+
+class TokenPrincipalCache:
+    """
+    Bounded LRU of verified access tokens -> subject, so a client sending
+    the same token on every request pays for signature verification once.
+    Tokens that fail verification are cached too (as None), so garbage
+    tokens cannot force a verification per request either.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()
+
+    def subject(self, token: str) -> Optional[str]:
+        now = time.time()
+        entry = self._entries.get(token)
+        if entry is not None:
+            subject, expires_at = entry
+            if expires_at > now:
+                self._entries.move_to_end(token)
+                return subject
+            del self._entries[token]
+        try:
+            payload = decode_access_token(token)
+            subject, expires_at = payload.get("sub"), float(payload.get("exp", now + 60))
+        except JWTError:
+            #  Remembered for a minute.
+            subject, expires_at = None, now + 60
+        self._entries[token] = (subject, expires_at)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return subject
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware that applies token-bucket rate limits per route and per
+    principal.
+
+    The principal is the subject of a valid bearer token (the user), or else
+    the client IP (run uvicorn with `--proxy-headers` behind a proxy so this
+    is the real client).  Routes are matched against the "METHOD /path"
+    templates in `limits`; requests to other routes share one bucket per
+    principal under `default`.  Rejected requests get a 429 with a
+    `Retry-After` header and never reach the application.  The
+    sub-requests of a `POST /batch` are limited like separate requests.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limits: Optional[Dict[str, str]] = None,
+        default: Optional[str] = None,
+        store: Optional[RateLimitStore] = None,
+        exclude_paths=("/metrics",),
+    ):
+        self.app = app
+        parsed = parse_limits(settings.RATE_LIMITS if limits is None else limits)
+        self.routes: List[Tuple[str, re.Pattern, str, RateLimit]] = []
+        for key, limit in parsed.items():
+            method, template = key.split(" ", 1)
+            self.routes.append((method, compile_path(template)[0], key, limit))
+        self.default = optional_limit(settings.RATE_LIMIT_DEFAULT if default is None else default)
+        self.store = store if store is not None else load_store(settings.RATE_LIMIT_STORE)
+        self.exclude_paths = frozenset(exclude_paths)
+        self.tokens = TokenPrincipalCache()
+
+    def match(self, method: str, path: str) -> Tuple[str, Optional[RateLimit]]:
+        for route_method, regex, key, limit in self.routes:
+            if route_method == method and regex.match(path):
+                return key, limit
+        return DEFAULT_ROUTE, self.default
+
+    def principal(self, scope: Scope) -> str:
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer" and token:
+                    subject = self.tokens.subject(token)
+                    if subject is not None:
+                        return "user:" + subject
+                break
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "unknown")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            register_for_sub_requests(scope, self)
+        await self.handle(self.app, scope, receive, send)
+
+    async def handle(self, app: ASGIApp, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Applies the limits to a request handled by `app`.
+        """
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await app(scope, receive, send)
+            return
+        route, limit = self.match(scope["method"], scope["path"])
+        if limit is None:
+            await app(scope, receive, send)
+            return
+
+        decision = await self.store.consume(f"{route}|{self.principal(scope)}", limit)
+        if decision.allowed:
+            await app(scope, receive, send)
+            return
+
+        RATE_LIMITED.labels(route).inc()
+        body = json.dumps({"detail": "Too many requests"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", decision.retry_after_header.encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
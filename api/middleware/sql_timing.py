@@ -0,0 +1,101 @@
+import logging
+import time
+from typing import Dict, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.config import settings
+from database.instrumentation import QueryStats, start_request_stats, stop_request_stats
+
+logger = logging.getLogger("api.sql")
+
+
+def route_key(scope: Scope) -> str:
+    """
+    Returns "METHOD /path/template" for the route that handled a request, or
+    the raw path if no route matched.
+    """
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope["path"]
+    return f"{scope['method']} {path}"
+
+
+class SQLTimingMiddleware:
+    """
+    ASGI middleware that reports the SQL work done by each request.
+
+    For every HTTP request it records the number of queries, the total and
+    slowest query time and the time spent waiting for a pool connection (see
+    `database.instrumentation`), then:
+
+    * adds a `Server-Timing` header to the response,
+    * logs the numbers as structured fields on the "api.sql" logger, and
+    * logs a warning and sets `X-Query-Budget-Exceeded` when the request ran
+      more queries than its route's budget.
+
+    Queries run after the response headers were sent (streaming bodies,
+    background tasks) are logged but not included in the header.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        default_budget: Optional[int] = None,
+        budgets: Optional[Dict[str, int]] = None,
+        server_timing: Optional[bool] = None,
+    ):
+        self.app = app
+        self.default_budget = settings.SQL_QUERY_BUDGET if default_budget is None else default_budget
+        self.budgets = settings.SQL_QUERY_BUDGETS if budgets is None else budgets
+        self.server_timing = settings.SQL_SERVER_TIMING_HEADER if server_timing is None else server_timing
+
+    def budget_for(self, key: str) -> int:
+        return self.budgets.get(key, self.default_budget)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats, token = start_request_stats()
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                if self.server_timing:
+                    headers.append("Server-Timing", stats.server_timing())
+                if stats.count > self.budget_for(route_key(scope)):
+                    headers["X-Query-Budget-Exceeded"] = str(stats.count)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            stop_request_stats(token)
+            self.log(scope, stats, status_code, time.perf_counter() - start)
+
+    def log(self, scope: Scope, stats: QueryStats, status_code: int, elapsed: float) -> None:
+        key = route_key(scope)
+        budget = self.budget_for(key)
+        fields = {
+            "route": key,
+            "status_code": status_code,
+            "duration_ms": round(elapsed * 1000, 2),
+            "db_queries": stats.count,
+            "db_time_ms": round(stats.total_time * 1000, 2),
+            "db_slowest_ms": round(stats.slowest_time * 1000, 2),
+            "db_slowest_statement": stats.slowest_statement,
+            "db_pool_wait_ms": round(stats.pool_wait * 1000, 2),
+            "db_query_budget": budget,
+        }
+        if stats.count > budget:
+            logger.warning(
+                "%s ran %d queries, over its budget of %d", key, stats.count, budget, extra=fields
+            )
+        else:
+            logger.info("%s ran %d queries", key, stats.count, extra=fields)
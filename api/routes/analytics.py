@@ -0,0 +1,147 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from api.dependencies import get_current_superuser
+from core.config import settings
+from core.responses import FastJSONResponse
+from database.database import get_db
+from database.models.user import User
+from schemas.analytics import CategorySales, DailyRevenue, PaymentMethodSales, ProductSales
+from services import analytics_service
+
+router = APIRouter()
+
+
+def date_range(
+    start: Optional[date] = Query(None, description="First day (UTC). Defaults to 29 days before `end`"),
+    end: Optional[date] = Query(None, description="Last day (UTC), inclusive. Defaults to today"),
+) -> Tuple[date, date]:
+    """
+    Resolves the date range of an analytics request.
+
+    Args:
+        start (date, optional): The first day.
+        end (date, optional): The last day.
+
+    Returns:
+        Tuple[date, date]: The first and last day.
+
+    Raises:
+        HTTPException: 400 Bad Request if `start` is after `end`, or the range
+            covers more than `ANALYTICS_MAX_DAYS` days.
+    """
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="start must not be after end"
+        )
+    if (end - start).days + 1 > settings.ANALYTICS_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date range exceeds {settings.ANALYTICS_MAX_DAYS} days",
+        )
+    return start, end
+
+
+@router.get("/revenue", response_model=List[DailyRevenue])
+def read_daily_revenue(
+    days: Tuple[date, date] = Depends(date_range),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_superuser),
+) -> FastJSONResponse:
+    """
+    Returns the orders and revenue of each day in the range, from the
+    daily rollups.  Cancelled orders are not counted.
+
+    Args:
+        days (Tuple[date, date]): The first and last day.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+        current_user (User, optional): The current superuser.
+            Defaults to Depends(get_current_superuser).
+
+    Returns:
+        FastJSONResponse: The days with orders, oldest first.
+
+    Raises:
+        HTTPException: 403 Forbidden if the user is not a superuser.
+    """
+    return FastJSONResponse(analytics_service.daily_revenue(db, *days))
+
+
+@router.get("/categories", response_model=List[CategorySales])
+def read_category_sales(
+    days: Tuple[date, date] = Depends(date_range),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_superuser),
+) -> FastJSONResponse:
+    """
+    Returns the categories with the most revenue in the range.
+
+    Args:
+        days (Tuple[date, date]): The first and last day.
+        limit (int): The maximum number of categories to return.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+        current_user (User, optional): The current superuser.
+            Defaults to Depends(get_current_superuser).
+
+    Returns:
+        FastJSONResponse: The categories, highest revenue first.
+
+    Raises:
+        HTTPException: 403 Forbidden if the user is not a superuser.
+    """
+    return FastJSONResponse(analytics_service.category_sales(db, *days, limit))
+
+
+@router.get("/products", response_model=List[ProductSales])
+def read_product_sales(
+    days: Tuple[date, date] = Depends(date_range),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_superuser),
+) -> FastJSONResponse:
+    """
+    Returns the best selling products in the range, by units sold.
+
+    Args:
+        days (Tuple[date, date]): The first and last day.
+        limit (int): The maximum number of products to return.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+        current_user (User, optional): The current superuser.
+            Defaults to Depends(get_current_superuser).
+
+    Returns:
+        FastJSONResponse: The products, most units sold first.
+
+    Raises:
+        HTTPException: 403 Forbidden if the user is not a superuser.
+    """
+    return FastJSONResponse(analytics_service.product_sales(db, *days, limit))
+
+
+@router.get("/payment-methods", response_model=List[PaymentMethodSales])
+def read_payment_method_sales(
+    days: Tuple[date, date] = Depends(date_range),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_superuser),
+) -> FastJSONResponse:
+    """
+    Returns the orders and revenue of each payment method in the range.
+
+    Args:
+        days (Tuple[date, date]): The first and last day.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+        current_user (User, optional): The current superuser.
+            Defaults to Depends(get_current_superuser).
+
+    Returns:
+        FastJSONResponse: The payment methods, highest revenue first.
+
+    Raises:
+        HTTPException: 403 Forbidden if the user is not a superuser.
+    """
+    return FastJSONResponse(analytics_service.payment_method_sales(db, *days))
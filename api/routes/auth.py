@@ -0,0 +1,109 @@
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.security import OAuth2PasswordRequestForm
+from jose import JWTError
+from sqlalchemy.orm import Session
+
+from core.security import (
+    create_access_token,
+    decode_access_token,
+    verify_and_update_password,
+    verify_dummy_password,
+)
+from database.database import get_db
+from database.models.user import User
+from schemas.token import Token
+from services import session_service
+from api.dependencies import get_current_active_user, oauth2_scheme
+
+router = APIRouter()
+
+
+@router.post("/login", response_model=Token)
+def login(
+    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+) -> Token:
+    """
+    Exchanges an email and password for an access token.
+
+    A password stored with a legacy scheme or outdated argon2 parameters is
+    rehashed with the current ones.
+
+    Args:
+        form_data (OAuth2PasswordRequestForm): The login form; `username` is the email.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        Token: The access token.
+
+    Raises:
+        HTTPException: 401 Unauthorized if the email or password is wrong.
+        HTTPException: 400 Bad Request if the user is inactive.
+    """
+    user = db.query(User).filter(User.email == form_data.username).first()
+    if user is not None:
+        verified, new_hash = verify_and_update_password(form_data.password, user.hashed_password)
+    else:
+        #  Same argon2 work as a wrong password, so timing does not reveal
+        #  whether the email has an account.
+        verified, new_hash = verify_dummy_password(form_data.password), None
+    if not verified:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user"
+        )
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
+    access_token = create_access_token(user.email)
+    session_service.register_session(db, user.id, access_token.jti, access_token.expires_at)
+    return Token(access_token=access_token.token)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+) -> Response:
+    """
+    Revokes the access token used for this request.
+
+    Args:
+        token (str): The access token. Defaults to Depends(oauth2_scheme).
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+        current_user (User, optional): The current active user.
+            Defaults to Depends(get_current_active_user).
+    """
+    try:
+        payload = decode_access_token(token)
+    except JWTError:
+        #  Already validated by get_current_active_user; only expiry can race.
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    expires_at = datetime.fromtimestamp(payload["exp"], timezone.utc)
+    session_service.revoke_token(db, payload["jti"], expires_at)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post("/logout/all", status_code=status.HTTP_204_NO_CONTENT)
+def logout_everywhere(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+) -> Response:
+    """
+    Revokes every access token issued to the current user, including the one
+    used for this request.
+
+    Args:
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+        current_user (User, optional): The current active user.
+            Defaults to Depends(get_current_active_user).
+    """
+    session_service.revoke_user_sessions(db, current_user.id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
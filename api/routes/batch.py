@@ -0,0 +1,191 @@
+import asyncio
+import functools
+import logging
+from typing import Any, Dict
+
+import orjson
+from fastapi import APIRouter, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from starlette.exceptions import HTTPException
+from starlette.types import ASGIApp, Message, Scope
+
+from api.dependencies import get_current_active_user
+from api.middleware import sub_request_middleware
+from core.config import settings
+from core.responses import FastJSONResponse
+from database.database import SessionLocal, get_db
+from database.instrumentation import current_request_stats, start_request_stats, stop_request_stats
+from database.models.user import User
+from schemas.batch import BatchRequest, BatchResponse, BatchSubRequest
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+#  Headers of the batch request that do not apply to its sub-requests.
+#  Dropping Accept-Encoding keeps sub-responses uncompressed, so they can be
+#  embedded in the combined body.
+_DROPPED_HEADERS = {b"accept-encoding", b"content-length", b"content-type", b"transfer-encoding", b"expect"}
+
+#  Embeds JSON sub-responses without parsing them again (orjson >= 3.9).
+_Fragment = getattr(orjson, "Fragment", None)
+
+
+def _begin_read_only(db: Session, user: User) -> User:
+    """
+    Starts a read-only transaction on `db` and returns the user attached to
+    it, copied from the loaded, detached `user` without a query.
+    """
+    db.rollback()
+    db.execute(text("SET TRANSACTION READ ONLY"))
+    return db.merge(user, load=False)
+
+
+def _embed(body: bytes, content_type: str) -> Any:
+    if not body:
+        return None
+    if content_type.startswith("application/json"):
+        return _Fragment(body) if _Fragment is not None else orjson.loads(body)
+    return body.decode("utf-8", "replace")
+
+
+async def _receive() -> Message:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def run_sub_request(app: ASGIApp, parent: Scope, sub_request: BatchSubRequest, state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Runs one GET through the application's router, in process, and returns
+    its status and body.
+
+    The sub-request inherits the batch's headers (so `Authorization` is
+    present) and exception handlers; `state` carries the shared session and
+    user picked up by `get_db` and `get_current_user`.  `app` should already
+    include the middleware that applies to sub-requests (`_sub_request_app`).
+    """
+    path, _, query = sub_request.path.partition("?")
+    path = settings.API_V1_STR + path
+    scope = {
+        key: value for key, value in parent.items()
+        if key not in ("route", "endpoint", "path_params", "state")
+    }
+    scope.update(
+        method="GET",
+        path=path,
+        raw_path=path.encode(),
+        query_string=query.encode(),
+        headers=[(name, value) for name, value in parent["headers"] if name not in _DROPPED_HEADERS],
+        state=state,
+    )
+    status_code = 500
+    content_type = ""
+    chunks = []
+
+    async def send(message: Message) -> None:
+        nonlocal status_code, content_type
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+            for name, value in message.get("headers", []):
+                if name == b"content-type":
+                    content_type = value.decode("latin-1")
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await app(scope, _receive, send)
+    except HTTPException as exc:
+        return {"status": exc.status_code, "body": {"detail": exc.detail}}
+    except Exception:
+        logger.exception("Batch sub-request GET %s failed", sub_request.path)
+        return {"status": 500, "body": {"detail": "Internal Server Error"}}
+    return {"status": status_code, "body": _embed(b"".join(chunks), content_type)}
+
+
+def _sub_request_app(request: Request) -> ASGIApp:
+    """
+    Returns the router wrapped in the middleware that handled the batch and
+    applies to sub-requests too (the rate limiter and load shedding), so
+    that each sub-request is limited like a separate request to its route.
+    """
+    app: ASGIApp = request.app.router
+    for middleware in reversed(sub_request_middleware(request.scope)):
+        app = functools.partial(middleware.handle, app)
+    return app
+
+
+@router.post("/batch", response_model=BatchResponse)
+async def batch(
+    batch_request: BatchRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+) -> FastJSONResponse:
+    """
+    Runs several GET requests in one round trip.
+
+    The token is checked and the user loaded once, for the batch; the
+    sub-requests reuse that user and share read-only database sessions
+    instead of each checking out a pool connection.  Up to
+    `BATCH_MAX_CONCURRENCY` sessions are used: sub-requests are spread over
+    them and run concurrently, each session serving one sub-request at a
+    time (a session is not safe to use from two threads at once).
+
+    A failing sub-request does not fail the batch; its status and error body
+    are returned in its slot.  Sub-requests are rate limited per route like
+    separate requests (a limited one gets a 429 in its slot), but are not
+    counted separately in the request metrics.
+
+    Args:
+        batch_request (BatchRequest): The sub-requests.
+        request (Request): The batch request.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+        current_user (User, optional): The current active user.
+            Defaults to Depends(get_current_active_user).
+
+    Returns:
+        FastJSONResponse: A `BatchResponse`, with responses in request order.
+    """
+    sub_requests = batch_request.requests
+    lanes = max(1, min(settings.BATCH_MAX_CONCURRENCY, len(sub_requests)))
+    #  Detached while loaded, so the rollback that starts each read-only
+    #  transaction does not expire it and every session can attach a copy.
+    await run_in_threadpool(db.expunge, current_user)
+    sessions = [db] + [SessionLocal() for _ in range(lanes - 1)]
+    responses: list = [None] * len(sub_requests)
+    pending = iter(range(len(sub_requests)))
+    base_state = dict(request.scope.get("state", {}))
+    app = _sub_request_app(request)
+    batch_stats = current_request_stats()
+    lane_stats = []
+
+    async def lane(session: Session) -> None:
+        #  Each lane is its own task, so this only affects the lane: lanes
+        #  run concurrently in the thread pool and must not update one
+        #  `QueryStats` together.  They are merged into the batch's below.
+        stats, token = start_request_stats()
+        lane_stats.append(stats)
+        try:
+            user = await run_in_threadpool(_begin_read_only, session, current_user)
+            state = {**base_state, "batch_db": session, "batch_user": user}
+            #  Lanes share the iterator, so each takes the next pending sub-request.
+            for index in pending:
+                responses[index] = await run_sub_request(app, request.scope, sub_requests[index], state)
+        finally:
+            stop_request_stats(token)
+
+    try:
+        #  Every lane is finished before any session is closed, even if one fails.
+        results = await asyncio.gather(*(lane(session) for session in sessions), return_exceptions=True)
+    finally:
+        for session in sessions[1:]:
+            await run_in_threadpool(session.close)
+        await run_in_threadpool(db.rollback)
+        if batch_stats is not None:
+            for stats in lane_stats:
+                batch_stats.merge(stats)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return FastJSONResponse({"responses": responses})
@@ -3,9 +3,9 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from database.database import get_db
 from database.models.user import User
-from database.models.cart import Cart
+from database.models.cart import Cart, CartItem
 from database.models.product import Product
-from schemas.cart import CartRead, CartItemCreate, CartItemRead, CartUpdate
+from schemas.cart import CartRead, CartItemCreate, CartUpdate
 from api.dependencies import get_current_active_user  # Import the dependency
 from typing import Dict
 
@@ -87,7 +87,7 @@ def add_item_to_cart(
         existing_item.quantity = cart_item.quantity  # Update the quantity
     else:
         #  Create a new CartItem and add it to the cart's items collection.
-        new_item = CartItemRead(
+        new_item = CartItem(
             product_id=cart_item.product_id,
             quantity=cart_item.quantity,
         )
@@ -190,7 +190,7 @@ def update_cart(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Invalid quantity for product {item_update.product_id}",
             )
-        new_item = CartItemRead(product_id=item_update.product_id, quantity=item_update.quantity)
+        new_item = CartItem(product_id=item_update.product_id, quantity=item_update.quantity)
         cart.items.append(new_item)
 
     db.commit()
@@ -1,6 +1,137 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List, Optional, Tuple
 
+from api.dependencies import get_current_active_user, get_current_superuser
+from core.responses import FastJSONResponse
+from database.database import get_db
+from database.models.order import OrderStatus
+from database.models.user import User
+from schemas.order import OrderStatusBulkResult, OrderStatusBulkUpdate, OrderStatusRejection, OrderSummaryRead
+from services import order_service
+from utils.fields import sparse_fields
 
-class OrdersRoutes:
-  def __init__(self, app):
-    self.app = app
-    self.register_routes()
\ No newline at end of file
+router = APIRouter()
+
+
+@router.get("/", response_model=List[OrderSummaryRead])
+def list_orders(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    fields: Optional[Tuple[str, ...]] = Depends(sparse_fields(OrderSummaryRead)),
+    placed_after: Optional[datetime] = Query(None, description="Only orders placed at or after this time"),
+    placed_before: Optional[datetime] = Query(None, description="Only orders placed before this time"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+) -> FastJSONResponse:
+    """
+    Lists the current user's orders, newest first.
+
+    Only the columns named in `?fields=` are selected, and items are only
+    loaded when requested, e.g. `?fields=id,status,total_price` for an
+    order history screen.
+
+    Args:
+        skip (int): The number of orders to skip.
+        limit (int): The maximum number of orders to return.
+        fields (Tuple[str, ...], optional): The fields to return.  Defaults to all.
+        placed_after (datetime, optional): Only orders placed at or after this time.
+        placed_before (datetime, optional): Only orders placed before this time.
+            A date range only reads the months it covers, e.g. the last 90
+            days for a "recent orders" screen.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+        current_user (User, optional): The current active user.
+            Defaults to Depends(get_current_active_user).
+
+    Returns:
+        FastJSONResponse: The orders.
+
+    Raises:
+        HTTPException: 400 Bad Request if a requested field does not exist.
+    """
+    return FastJSONResponse(
+        order_service.list_orders_for_user(
+            db,
+            current_user.id,
+            skip=skip,
+            limit=limit,
+            fields=fields,
+            placed_after=placed_after,
+            placed_before=placed_before,
+        )
+    )
+
+
+@router.post("/status", response_model=OrderStatusBulkResult)
+def bulk_update_order_status(
+    status_update: OrderStatusBulkUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_superuser),
+) -> OrderStatusBulkResult:
+    """
+    Moves many orders to one status in a single statement, e.g. marking a
+    warehouse shipment's orders as shipped.  Orders whose current status
+    does not allow the move are left unchanged and reported as rejected;
+    see `order_service.transition_orders`.
+
+    Args:
+        status_update (OrderStatusBulkUpdate): The order IDs and the new status.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+        current_user (User, optional): The current superuser.
+            Defaults to Depends(get_current_superuser).
+
+    Returns:
+        OrderStatusBulkResult: The updated and the rejected orders.
+
+    Raises:
+        HTTPException: 403 Forbidden if the user is not a superuser.
+    """
+    result = order_service.transition_orders(
+        db, status_update.order_ids, OrderStatus(status_update.status.value), status_update.placed_after
+    )
+    return OrderStatusBulkResult(
+        status=status_update.status,
+        updated=result.updated,
+        rejected=[
+            OrderStatusRejection(id=order_id, status=current.value if current is not None else None)
+            for order_id, current in result.rejected.items()
+        ],
+    )
+
+
+@router.get("/{order_id}", response_model=OrderSummaryRead)
+def read_order(
+    order_id: int,
+    fields: Optional[Tuple[str, ...]] = Depends(sparse_fields(OrderSummaryRead)),
+    placed_after: Optional[datetime] = Query(None, description="The order was placed at or after this time"),
+    placed_before: Optional[datetime] = Query(None, description="The order was placed before this time"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+) -> FastJSONResponse:
+    """
+    Retrieves one of the current user's orders.
+
+    Args:
+        order_id (int): The ID of the order.
+        fields (Tuple[str, ...], optional): The fields to return.  Defaults to all.
+        placed_after (datetime, optional): The order was placed at or after this time.
+        placed_before (datetime, optional): The order was placed before this time.
+            Either narrows the lookup to the months it covers.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+        current_user (User, optional): The current active user.
+            Defaults to Depends(get_current_active_user).
+
+    Returns:
+        FastJSONResponse: The order.
+
+    Raises:
+        HTTPException: 404 Not Found if the order does not exist or belongs
+            to another user.
+        HTTPException: 400 Bad Request if a requested field does not exist.
+    """
+    return FastJSONResponse(
+        order_service.get_order_for_user(
+            db, order_id, current_user.id, fields=fields, placed_after=placed_after, placed_before=placed_before
+        )
+    )
@@ -1,17 +1,88 @@
+import hashlib
+import hmac
+from typing import Dict
 
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
 
-class PaymentRoutes:
-    def __init__(self, app):
-        self.app = app
-        self.setup_routes()
+from core.config import settings
+from schemas.payment import PaymentWebhookBatch
+from services.payment_webhook_service import WebhookBufferFull, payment_webhook_buffer
 
-    def setup_routes(self):
-        @self.app.route('/payment', methods=['POST'])
-        def process_payment():
-            # Logic to process payment
-            return "Payment processed", 200
+router = APIRouter()
 
-        @self.app.route('/payment/status', methods=['GET'])
-        def payment_status():
-            # Logic to check payment status
-            return "Payment status", 200
\ No newline at end of file
+
+def verify_webhook_signature(body: bytes, signature: str) -> bool:
+    """
+    Checks the provider's HMAC-SHA256 signature of a webhook body.
+
+    Args:
+        body (bytes): The raw request body.
+        signature (str): The hex digest sent in the `X-Webhook-Signature` header.
+
+    Returns:
+        bool: True if the signature matches.  Never True without a webhook
+            secret; the route refuses deliveries before calling this then.
+    """
+    if not settings.PAYMENT_WEBHOOK_SECRET:
+        return False
+    expected = hmac.new(
+        settings.PAYMENT_WEBHOOK_SECRET.encode("utf-8"), body, hashlib.sha256
+    ).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+@router.post("/webhook", status_code=status.HTTP_202_ACCEPTED)
+async def receive_payment_webhook(request: Request) -> Dict[str, int]:
+    """
+    Receives payment status events from the payment provider.
+
+    The events are only validated and buffered here; they are applied to the
+    database in bulk by the webhook flusher, so the provider gets its
+    acknowledgement without waiting on the database.
+
+    The acknowledgement is sent before the events are committed, so events
+    buffered by a worker that crashes are lost and are not re-delivered;
+    settlement reconciliation (`services.reconciliation_service --apply`)
+    recovers them.  See `PaymentWebhookBuffer`.
+
+    Args:
+        request (Request): The incoming request.  Its body must be a
+            `PaymentWebhookBatch`.
+
+    Returns:
+        Dict[str, int]: The number of events accepted.
+
+    Raises:
+        HTTPException: 503 Service Unavailable if `PAYMENT_WEBHOOK_SECRET` is
+            not configured.  Unsigned deliveries are never accepted.
+        HTTPException: 401 Unauthorized if the signature is invalid.
+        RequestValidationError: 422 Unprocessable Entity if the body is not a valid batch.
+        HTTPException: 503 Service Unavailable if the buffer is full.  The
+            provider should retry the delivery.
+    """
+    if not settings.PAYMENT_WEBHOOK_SECRET:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Payment webhooks are not configured",
+        )
+    body = await request.body()
+    if not verify_webhook_signature(body, request.headers.get("X-Webhook-Signature", "")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid webhook signature"
+        )
+    try:
+        batch = PaymentWebhookBatch.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+    try:
+        accepted = payment_webhook_buffer.submit(batch.events)
+    except WebhookBufferFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Webhook buffer is full",
+            headers={"Retry-After": "1"},
+        )
+    return {"accepted": accepted}
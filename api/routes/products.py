@@ -1,20 +1,107 @@
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple, Union
 
+from core.responses import FastJSONResponse, dumps
+from database.database import get_db
+from database.models.product import Product
+from schemas.product import ProductRead, RelatedProducts
+from services import product_service
+from services.recommendation_service import related_products
+from utils.fields import sparse_fields
 
-class Products:
-    def __init__(self, db):
-        self.db = db
+router = APIRouter()
 
-    def get_all(self):
-        return self.db.get_all_products()
 
-    def get_by_id(self, product_id):
-        return self.db.get_product_by_id(product_id)
+@router.get("/", response_model=List[ProductRead])
+def list_products(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=1000),
+    category_id: Optional[int] = Query(None, gt=0),
+    fields: Optional[Tuple[str, ...]] = Depends(sparse_fields(ProductRead)),
+    db: Session = Depends(get_db),
+) -> Response:
+    """
+    Lists products.
 
-    def create(self, product_data):
-        return self.db.create_product(product_data)
+    The page is selected as plain rows and encoded with orjson, skipping ORM
+    objects and response model validation; `response_model` only documents
+    the shape.  Encoded pages are cached with their compressed variants
+    (`product_service.product_list_cache`), so a hot page is queried,
+    encoded and compressed once rather than on every request.  With
+    `?fields=`, only those columns are selected and returned.
 
-    def update(self, product_id, product_data):
-        return self.db.update_product(product_id, product_data)
+    Args:
+        request (Request): The request, for its `Accept-Encoding`.
+        skip (int): The number of products to skip.
+        limit (int): The maximum number of products to return.
+        category_id (int, optional): Only products in this category.
+        fields (Tuple[str, ...], optional): The fields to return.  Defaults to all.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
 
-    def delete(self, product_id):
-        return self.db.delete_product(product_id)
\ No newline at end of file
+    Returns:
+        Response: The products as JSON, ordered by ID.
+    """
+    cache = product_service.product_list_cache
+    key = (skip, limit, category_id, fields)
+    payload = cache.get(key)
+    if payload is None:
+        generation = cache.generation
+        products = product_service.list_products(
+            db, skip=skip, limit=limit, category_id=category_id, fields=fields
+        )
+        payload = cache.put(key, dumps(products), generation)
+    return cache.respond(payload, request.headers.get("accept-encoding", ""))
+
+
+@router.get("/{product_id}", response_model=ProductRead)
+def read_product(
+    product_id: int,
+    fields: Optional[Tuple[str, ...]] = Depends(sparse_fields(ProductRead)),
+    db: Session = Depends(get_db),
+) -> Union[Product, FastJSONResponse]:
+    """
+    Retrieves a product by ID.
+
+    Args:
+        product_id (int): The ID of the product to retrieve.
+        fields (Tuple[str, ...], optional): The fields to return.  Defaults to all.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        Union[Product, FastJSONResponse]: The product, or only the requested
+            fields of it.
+
+    Raises:
+        HTTPException: 404 Not Found if the product is not found.
+        HTTPException: 400 Bad Request if a requested field does not exist.
+    """
+    if fields:
+        return FastJSONResponse(product_service.get_product_fields(db, product_id, fields))
+    return product_service.get_product(db, product_id)
+
+
+@router.get("/{product_id}/related", response_model=RelatedProducts)
+def read_related_products(
+    product_id: int,
+    limit: int = Query(10, ge=1, le=100),
+) -> FastJSONResponse:
+    """
+    Lists the products most often bought together with a product.
+
+    Served from the memory-mapped arrays of
+    `recommendation_service.related_products`, without a database query;
+    fetch the products' details with `GET /products/{product_id}` (or one
+    `POST /batch`).  Products without enough shared orders, and unknown
+    products, have no related products.
+
+    Args:
+        product_id (int): The ID of the product.
+        limit (int): The maximum number of related products to return.
+            At most `RECOMMENDATIONS_TOP_K` are kept per product.
+
+    Returns:
+        FastJSONResponse: The related products, most often bought together first.
+    """
+    return FastJSONResponse({"product_id": product_id, "related": related_products.related(product_id, limit)})
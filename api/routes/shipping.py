@@ -1,12 +1,55 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List
 
+from database.database import get_db
+from database.models.user import User
+from schemas.shipping import ShippingMethodRead, ShippingQuoteRead
+from services import shipping_service
+from api.dependencies import get_current_active_user  # Import the dependency
 
-class ShippingRoutes:
-    def __init__(self, app):
-        self.app = app
-        self.register_routes()
+router = APIRouter()
 
-    def register_routes(self):
-        @self.app.route('/shipping', methods=['GET'])
-        def get_shipping_info():
-            # Placeholder for actual shipping info retrieval logic
-            return {"shipping_info": "Shipping information goes here."}
\ No newline at end of file
+
+@router.get("/", response_model=List[ShippingMethodRead])
+def list_shipping_methods(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+) -> List[shipping_service.ShippingMethodEntry]:
+    """
+    Lists shipping methods.
+
+    Args:
+        skip (int): The number of shipping methods to skip.
+        limit (int): The maximum number of shipping methods to return.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        List[ShippingMethodEntry]: The shipping methods, ordered by ID.
+    """
+    return shipping_service.get_shipping_methods(db, skip=skip, limit=limit)
+
+
+@router.get("/quote", response_model=List[ShippingQuoteRead])
+def quote_shipping(
+    address_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+) -> List[ShippingQuoteRead]:
+    """
+    Quotes every available shipping method for the current user's cart.
+
+    Args:
+        address_id (int): The ID of one of the user's addresses to ship to.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+        current_user (User, optional): The current active user.
+            Defaults to Depends(get_current_active_user).
+
+    Returns:
+        List[ShippingQuoteRead]: The quotes, cheapest first.
+
+    Raises:
+        HTTPException: 404 Not Found if the address is not found.
+    """
+    return shipping_service.quote_cart_shipping(db, current_user.id, address_id)
@@ -1,12 +1,106 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple
 
+from api.dependencies import get_current_active_user
+from core.responses import FastJSONResponse
+from database.database import get_db
+from database.models.user import User
+from schemas.product import ProductRead
+from schemas.wishlist import WishlistItemsChanged, WishlistItemsUpdate, WishlistMembership
+from services import wishlist_service
+from utils.fields import sparse_fields
 
-class WishlistRoutes:
-    def __init__(self, app, wishlist_controller):
-        self.app = app
-        self.wishlist_controller = wishlist_controller
-        self.setup_routes()
+router = APIRouter()
 
-    def setup_routes(self):
-        self.app.add_url_rule('/api/wishlist', view_func=self.wishlist_controller.get_wishlist, methods=['GET'])
-        self.app.add_url_rule('/api/wishlist', view_func=self.wishlist_controller.add_to_wishlist, methods=['POST'])
-        self.app.add_url_rule('/api/wishlist/<int:item_id>', view_func=self.wishlist_controller.remove_from_wishlist, methods=['DELETE'])
\ No newline at end of file
+
+@router.get("/", response_model=List[ProductRead])
+def read_wishlist(
+    fields: Optional[Tuple[str, ...]] = Depends(sparse_fields(ProductRead)),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+) -> FastJSONResponse:
+    """
+    Lists the products in the current user's wishlist.
+
+    Args:
+        fields (Tuple[str, ...], optional): The fields to return.  Defaults to all.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+        current_user (User, optional): The current active user.
+            Defaults to Depends(get_current_active_user).
+
+    Returns:
+        FastJSONResponse: The products, ordered by ID.
+    """
+    return FastJSONResponse(wishlist_service.list_wishlist_products(db, current_user.id, fields=fields))
+
+
+@router.post("/items", response_model=WishlistItemsChanged)
+def add_wishlist_items(
+    items: WishlistItemsUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+) -> WishlistItemsChanged:
+    """
+    Adds products to the current user's wishlist.
+
+    Args:
+        items (WishlistItemsUpdate): The product IDs to add.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+        current_user (User, optional): The current active user.
+            Defaults to Depends(get_current_active_user).
+
+    Returns:
+        WishlistItemsChanged: The number of products added.
+
+    Raises:
+        HTTPException: 404 Not Found if any of the products does not exist.
+    """
+    return WishlistItemsChanged(changed=wishlist_service.add_products(db, current_user.id, items.product_ids))
+
+
+@router.delete("/items", response_model=WishlistItemsChanged)
+def remove_wishlist_items(
+    items: WishlistItemsUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+) -> WishlistItemsChanged:
+    """
+    Removes products from the current user's wishlist.
+
+    Args:
+        items (WishlistItemsUpdate): The product IDs to remove.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+        current_user (User, optional): The current active user.
+            Defaults to Depends(get_current_active_user).
+
+    Returns:
+        WishlistItemsChanged: The number of products removed.
+    """
+    return WishlistItemsChanged(changed=wishlist_service.remove_products(db, current_user.id, items.product_ids))
+
+
+@router.get("/membership", response_model=WishlistMembership)
+def read_wishlist_membership(
+    product_ids: List[int] = Query(..., description="Product IDs to check, e.g. the IDs on a product page"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+) -> WishlistMembership:
+    """
+    Returns which of the given products are in the current user's wishlist,
+    for "in wishlist" badges on a product page.  Answered from an in-memory
+    bitmap of the user's wishlist; see `wishlist_service.wishlisted_product_ids`.
+
+    Args:
+        product_ids (List[int]): The product IDs to check
+            (`?product_ids=1&product_ids=2`); only the first 1000 are used.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+        current_user (User, optional): The current active user.
+            Defaults to Depends(get_current_active_user).
+
+    Returns:
+        WishlistMembership: The wishlisted subset of `product_ids`.
+    """
+    return WishlistMembership(
+        product_ids=wishlist_service.wishlisted_product_ids(db, current_user.id, product_ids[:1000])
+    )
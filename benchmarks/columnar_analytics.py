@@ -0,0 +1,110 @@
+"""
+Benchmark for the columnar order item snapshots (`services.columnar_analytics`).
+
+Runs against the configured database, loaded by `benchmarks.datagen`
+(`--scale 1` is about 50M order items).  Writes every month's snapshot to a
+temporary directory through the server-side cursor, then answers the same
+three questions (top sellers, basket size distribution, cohort revenue)
+over `--months` months from the snapshots and with equivalent SQL
+aggregates on the tables, and reports the timings.  The ORM is not timed:
+loading 50M order items as objects does not finish in useful time.
+
+Usage:
+    python -m benchmarks.datagen --scale 1 --truncate
+    python -m benchmarks.columnar_analytics --months 12
+"""
+import argparse
+import json
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Tuple
+
+from sqlalchemy import text
+
+from database.database import engine
+from database.partitioning import add_months, list_partitions
+from services import columnar_analytics
+
+_COUNTED = """
+    FROM order_items i
+    JOIN orders o ON o.id = i.order_id AND o.order_date = i.order_date
+    WHERE o.status <> 'CANCELLED'
+      AND i.order_date >= :start_at AND i.order_date < :end_at
+      AND o.order_date >= :start_at AND o.order_date < :end_at
+"""
+SQL = {
+    "top_sellers": f"""
+        SELECT i.product_id, sum(i.quantity) AS units {_COUNTED}
+        GROUP BY i.product_id ORDER BY units DESC LIMIT 10
+    """,
+    "basket_sizes": f"""
+        SELECT units, count(*) FROM (SELECT sum(i.quantity) AS units {_COUNTED} GROUP BY i.order_id) b
+        GROUP BY units
+    """,
+    "cohort_revenue": f"""
+        WITH orders_in_range AS (
+            SELECT o.id, o.user_id, date_trunc('month', o.order_date AT TIME ZONE 'UTC') AS month,
+                   sum(i.quantity * i.price) AS revenue
+            {_COUNTED}
+            GROUP BY o.id, o.user_id, month
+        )
+        SELECT c.cohort, r.month, count(DISTINCT r.user_id), count(*), sum(r.revenue)
+        FROM orders_in_range r
+        JOIN (SELECT user_id, min(month) AS cohort FROM orders_in_range GROUP BY user_id) c USING (user_id)
+        GROUP BY c.cohort, r.month
+    """,
+}
+
+
+def timed(call: Callable[[], object]) -> Tuple[object, float]:
+    started = time.perf_counter()
+    result = call()
+    return result, round(time.perf_counter() - started, 3)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--months", type=int, default=12, help="Most recent months queried")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory, engine.connect() as conn:
+        months = list_partitions(conn, "orders")
+        written, refresh_seconds = timed(lambda: columnar_analytics.refresh(conn, directory, full=True))
+        rows = sum(written.values())
+        start, end = months[-min(args.months, len(months))], months[-1]
+        params = {
+            "start_at": datetime.combine(start, datetime.min.time(), timezone.utc),
+            "end_at": datetime.combine(add_months(end, 1), datetime.min.time(), timezone.utc),
+        }
+
+        items, load_seconds = timed(lambda: columnar_analytics.counted(
+            columnar_analytics.load_columns(start, end, directory)
+        ))
+        numpy_queries: Dict[str, Callable[[], object]] = {
+            "top_sellers": lambda: columnar_analytics.top_sellers(items, 10),
+            "basket_sizes": lambda: columnar_analytics.basket_sizes(items),
+            "cohort_revenue": lambda: columnar_analytics.cohort_revenue(items),
+        }
+        results = {}
+        for name, query in numpy_queries.items():
+            results[name] = {
+                "numpy_seconds": timed(query)[1],
+                "sql_seconds": timed(lambda: conn.execute(text(SQL[name]), params).all())[1],
+            }
+        conn.rollback()
+
+    print(json.dumps({
+        "order_items": rows,
+        "months_snapshotted": len(written),
+        "refresh_seconds": refresh_seconds,
+        "refresh_rows_per_second": round(rows / refresh_seconds) if refresh_seconds else None,
+        "queried_months": f"{start:%Y-%m}..{end:%Y-%m}",
+        "queried_items": len(items.order_id),
+        "load_seconds": load_seconds,
+        "queries": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
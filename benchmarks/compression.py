@@ -0,0 +1,121 @@
+"""
+Benchmark for response compression: bytes on the wire and CPU per request.
+
+Encodes product list pages of each size (as `GET /products/` does) and
+serves them through `CompressionMiddleware` in each available encoding:
+
+* per_request: the whole body compressed by the middleware on every
+  request, at the per-response level;
+* streamed: the body sent in 16 KiB chunks, compressed and flushed chunk by
+  chunk as for a `StreamingResponse`;
+* cached: a cache hit in `CompressedResponseCache`, whose variant was
+  compressed once at the codec's `cached_level`.
+
+"identity" rows are the uncompressed baseline.  CPU is process time, so it
+excludes waiting.
+
+Usage:
+    SECRET_KEY=bench python -m benchmarks.compression --sizes 10 100 1000
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+from benchmarks.serialization import KEYS, make_rows
+
+CHUNK = 16 * 1024
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+def make_app(body: bytes, streamed: bool):
+    async def app(scope, receive, send) -> None:
+        headers = [(b"content-type", b"application/json")]
+        if not streamed:
+            headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        if not streamed:
+            await send({"type": "http.response.body", "body": body})
+            return
+        for offset in range(0, len(body), CHUNK):
+            await send({"type": "http.response.body", "body": body[offset:offset + CHUNK], "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    return app
+
+
+def scope_for(encoding: str) -> Dict:
+    headers = [(b"host", b"testserver")]
+    if encoding != "identity":
+        headers.append((b"accept-encoding", encoding.encode()))
+    return {"type": "http", "method": "GET", "path": "/api/v1/products/", "headers": headers}
+
+
+async def serve(app, scope: Dict, requests: int) -> List[int]:
+    """
+    Runs `requests` requests and returns the body bytes sent for the last.
+    """
+    sent: List[int] = []
+
+    async def send(message) -> None:
+        if message["type"] == "http.response.body":
+            sent.append(len(message.get("body", b"")))
+
+    for _ in range(requests):
+        sent.clear()
+        await app(scope, receive, send)
+    return sent
+
+
+def measure(function, requests: int) -> float:
+    start = time.process_time()
+    function(requests)
+    return (time.process_time() - start) / requests
+
+
+def main() -> None:
+    from api.middleware.compression import CompressionMiddleware
+    from core.compression import available_codecs
+    from core.response_cache import CompressedResponseCache
+    from core.responses import dumps
+
+    parser = argparse.ArgumentParser(description="Benchmark response compression.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per case")
+    args = parser.parse_args()
+
+    codecs = available_codecs()
+    loop = asyncio.new_event_loop()
+    results = {}
+    for size in args.sizes:
+        body = dumps([dict(zip(KEYS, row)) for row in make_rows(size)])
+        cache = CompressedResponseCache("bench", max_entries=1, ttl=3600, minimum_size=0, codecs=codecs)
+        payload = cache.put("page", body, cache.generation)
+        results[size] = {}
+        for encoding in ["identity", *codecs]:
+            scope = scope_for(encoding)
+            header = "" if encoding == "identity" else encoding
+            row = {}
+            for mode, streamed in (("per_request", False), ("streamed", True)):
+                app = CompressionMiddleware(make_app(body, streamed), minimum_size=0, codecs=codecs)
+                wire = sum(loop.run_until_complete(serve(app, scope, 1)))
+                cpu = measure(lambda n: loop.run_until_complete(serve(app, scope, n)), args.requests)
+                row[mode] = {"bytes": wire, "cpu_us": round(cpu * 1e6, 1)}
+
+            def cached(n: int) -> None:
+                for _ in range(n):
+                    cache.respond(cache.get("page"), header)
+
+            wire = len(cache.respond(payload, header).body)
+            row["cached"] = {"bytes": wire, "cpu_us": round(measure(cached, args.requests * 10) * 1e6, 1)}
+            results[size][encoding] = row
+    loop.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,489 @@
+"""
+Synthetic data generator for scale testing.
+
+Fills an empty, migrated database with a production-shaped dataset: users
+with addresses, categories, products, carts, wishlists, and orders with
+their items and payments.  At `--scale 1` that is 1M users, 5M products in
+10k categories and about 50M order items.
+
+* Product popularity is Zipfian (`--zipf`): a few products appear in most
+  carts, wishlists and orders.  Popular products are spread over the ID
+  range rather than being the lowest IDs.
+* Cart, wishlist and order sizes are heavy-tailed (Pareto, `--pareto`),
+  capped at `--max-items`.
+* IDs are assigned by the generator, so every foreign key points at a row
+  loaded in an earlier phase (or earlier in the same chunk).  The output
+  depends only on `--seed` and the sizes, not on the number of workers.
+* Rows are streamed into PostgreSQL `COPY ... FROM STDIN` from generators, by
+  `--workers` processes each loading one chunk of IDs at a time.  Rows of
+  dependent tables produced by a chunk (order items, payments, ...) are
+  spooled to a temporary file and copied right after their parents, so
+  memory stays bounded by one chunk.
+
+Usage:
+    alembic upgrade head
+    python -m benchmarks.datagen --scale 0.01 --truncate
+    python -m benchmarks.datagen --workers 16
+
+Every generated user's password is `DATAGEN_PASSWORD`.
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone
+from itertools import accumulate
+from math import gcd
+from typing import Callable, Dict, IO, Iterator, List, NamedTuple, Optional, Tuple
+
+DATAGEN_PASSWORD = "Datagen-passw0rd!"
+
+#  Columns loaded per table, in COPY order.
+COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "categories": ("id", "name", "description", "created_at", "is_active"),
+    "users": ("id", "email", "hashed_password", "first_name", "last_name", "is_active", "created_at"),
+    "addresses": ("id", "user_id", "street_address", "city", "state", "postal_code", "country", "is_default"),
+    "products": ("id", "name", "description", "price", "stock_quantity", "weight", "category_id", "created_at", "is_active"),
+    "cart": ("id", "user_id"),
+    "cart_items": ("cart_id", "product_id", "quantity"),
+    "wishlists": ("id", "user_id"),
+    "wishlist_products": ("wishlist_id", "product_id"),
+    "orders": ("id", "user_id", "shipping_address_id", "order_date", "total_price", "status", "payment_method"),
+    "order_items": ("order_id", "order_date", "product_id", "quantity", "price"),
+    "payments": ("id", "order_id", "amount", "payment_method", "status", "transaction_id", "created_at"),
+}
+
+#  Tables with an integer `id` sequence to move past the generated IDs.
+SEQUENCE_TABLES = ("categories", "users", "addresses", "products", "cart", "wishlists", "orders", "payments")
+
+COUNTRIES = (("US", 60), ("GB", 10), ("DE", 10), ("FR", 8), ("CA", 7), ("NG", 5))
+PAYMENT_METHODS = (("Credit Card", 70), ("PayPal", 20), ("Bank Transfer", 10))
+#  Order status -> payment status; older orders are mostly delivered.
+ORDER_STATUSES = (
+    ("DELIVERED", "SUCCESSFUL", 70),
+    ("SHIPPED", "SUCCESSFUL", 10),
+    ("PROCESSING", "SUCCESSFUL", 8),
+    ("PENDING", "PENDING", 7),
+    ("CANCELLED", "REFUNDED", 5),
+)
+
+
+class Config(NamedTuple):
+    dsn: str
+    seed: int
+    users: int
+    categories: int
+    products: int
+    orders: int
+    zipf: float
+    pareto: float
+    max_items: int
+    cart_share: float
+    wishlist_share: float
+    password_hash: str
+    epoch: float  # Timestamps fall in the two years before this
+
+
+class ZipfSampler:
+    """
+    Draws product IDs with Zipfian popularity: the product of popularity rank
+    `k` is drawn with probability proportional to `1 / k ** s`.
+
+    Sampling is a binary search in the cumulative weights; ranks are mapped
+    to IDs with a fixed stride coprime to `n`, a permutation of `1..n`.
+    """
+
+    def __init__(self, n: int, s: float):
+        self.n = n
+        self.cumulative = array("d", accumulate(1.0 / rank ** s for rank in range(1, n + 1)))
+        self.total = self.cumulative[-1]
+        stride = max(1, int(n * 0.618))
+        while gcd(stride, n) != 1:
+            stride += 1
+        self.stride = stride
+
+    def __call__(self, rng: random.Random) -> int:
+        rank = bisect_left(self.cumulative, rng.random() * self.total)
+        return (min(rank, self.n - 1) * self.stride) % self.n + 1
+
+    def distinct(self, rng: random.Random, count: int) -> List[int]:
+        """
+        Draws up to `count` distinct IDs.  Fewer are returned if popular IDs
+        keep colliding, which only happens for tiny catalogues.
+        """
+        chosen = {}
+        for _ in range(count * 10):
+            chosen[self(rng)] = None
+            if len(chosen) >= count:
+                break
+        return list(chosen)
+
+
+def _weighted(choices: tuple) -> Tuple[list, list]:
+    """
+    Splits `(value, ..., weight)` tuples into values and weights for
+    `random.choices`.  Values are the tuple minus the weight, or its first
+    item for pairs.
+    """
+    return [choice[:-1] if len(choice) > 2 else choice[0] for choice in choices], [choice[-1] for choice in choices]
+
+
+def price_cents(product_id: int, seed: int) -> int:
+    """
+    The price of a product, derived from its ID so order items can be priced
+    without looking products up.
+    """
+    return 199 + (product_id * 2654435761 + seed * 40503) % 49800
+
+
+def pareto_size(rng: random.Random, alpha: float, cap: int) -> int:
+    return min(cap, int(rng.paretovariate(alpha)))
+
+
+def _timestamp(rng: random.Random, epoch: float) -> str:
+    return datetime.fromtimestamp(epoch - rng.random() * 730 * 86400, timezone.utc).isoformat()
+
+
+def _money(cents: int) -> str:
+    return f"{cents // 100}.{cents % 100:02d}"
+
+
+#  Row generators.  Each yields the rows of its phase's main table for IDs
+#  `start..stop-1` as COPY text lines, and writes rows of dependent tables to
+#  the given side files.
+
+def _category_rows(cfg: Config, rng: random.Random, start: int, stop: int, side: Dict[str, IO]) -> Iterator[str]:
+    for category_id in range(start, stop):
+        yield f"{category_id}\tCategory {category_id}\tGenerated category\t{_timestamp(rng, cfg.epoch)}\tt\n"
+
+
+def _user_rows(cfg: Config, rng: random.Random, start: int, stop: int, side: Dict[str, IO]) -> Iterator[str]:
+    countries, weights = _weighted(COUNTRIES)
+    addresses = side["addresses"]
+    for user_id in range(start, stop):
+        yield (
+            f"{user_id}\tuser{user_id}@example.com\t{cfg.password_hash}\tFirst{user_id}\tLast{user_id}\t"
+            f"t\t{_timestamp(rng, cfg.epoch)}\n"
+        )
+        country = rng.choices(countries, weights)[0]
+        #  One default address per user, with the user's ID.
+        addresses.write(
+            f"{user_id}\t{user_id}\t{rng.randint(1, 9999)} Generated Street\tCity{rng.randint(1, 500)}\t"
+            f"State{rng.randint(1, 50)}\t{rng.randint(10000, 99999)}\t{country}\tt\n"
+        )
+
+
+def _product_rows(cfg: Config, rng: random.Random, start: int, stop: int, side: Dict[str, IO]) -> Iterator[str]:
+    for product_id in range(start, stop):
+        weight = rng.randint(10, 30000)
+        yield (
+            f"{product_id}\tProduct {product_id}\tGenerated product {product_id}\t"
+            f"{_money(price_cents(product_id, cfg.seed))}\t{rng.randint(0, 1000)}\t"
+            f"{weight // 1000}.{weight % 1000:03d}\t{rng.randint(1, cfg.categories)}\t"
+            f"{_timestamp(rng, cfg.epoch)}\tt\n"
+        )
+
+
+def _cart_rows(cfg: Config, rng: random.Random, start: int, stop: int, side: Dict[str, IO]) -> Iterator[str]:
+    sampler = _sampler(cfg)
+    items = side["cart_items"]
+    for user_id in range(start, stop):
+        if rng.random() >= cfg.cart_share:
+            continue
+        #  The cart shares its owner's ID.
+        yield f"{user_id}\t{user_id}\n"
+        for product_id in sampler.distinct(rng, pareto_size(rng, cfg.pareto, cfg.max_items)):
+            items.write(f"{user_id}\t{product_id}\t{pareto_size(rng, 2.5, 10)}\n")
+
+
+def _wishlist_rows(cfg: Config, rng: random.Random, start: int, stop: int, side: Dict[str, IO]) -> Iterator[str]:
+    sampler = _sampler(cfg)
+    items = side["wishlist_products"]
+    for user_id in range(start, stop):
+        if rng.random() >= cfg.wishlist_share:
+            continue
+        yield f"{user_id}\t{user_id}\n"
+        for product_id in sampler.distinct(rng, pareto_size(rng, cfg.pareto, cfg.max_items)):
+            items.write(f"{user_id}\t{product_id}\n")
+
+
+def _order_rows(cfg: Config, rng: random.Random, start: int, stop: int, side: Dict[str, IO]) -> Iterator[str]:
+    sampler = _sampler(cfg)
+    statuses, status_weights = _weighted(ORDER_STATUSES)
+    methods, method_weights = _weighted(PAYMENT_METHODS)
+    items, payments = side["order_items"], side["payments"]
+    for order_id in range(start, stop):
+        user_id = rng.randint(1, cfg.users)
+        order_status, payment_status = rng.choices(statuses, status_weights)[0]
+        method = rng.choices(methods, method_weights)[0]
+        placed_at = _timestamp(rng, cfg.epoch)
+        total = 0
+        for product_id in sampler.distinct(rng, pareto_size(rng, cfg.pareto, cfg.max_items)):
+            quantity = pareto_size(rng, 2.5, 10)
+            price = price_cents(product_id, cfg.seed)
+            total += price * quantity
+            items.write(f"{order_id}\t{placed_at}\t{product_id}\t{quantity}\t{_money(price)}\n")
+        #  One payment per order, with the order's ID.
+        payments.write(
+            f"{order_id}\t{order_id}\t{_money(total)}\t{method}\t{payment_status}\t"
+            f"txn-{order_id:012d}\t{placed_at}\n"
+        )
+        yield f"{order_id}\t{user_id}\t{user_id}\t{placed_at}\t{_money(total)}\t{order_status}\t{method}\n"
+
+
+class Phase(NamedTuple):
+    name: str
+    generate: Callable[[Config, random.Random, int, int, Dict[str, IO]], Iterator[str]]
+    tables: Tuple[str, ...]  # The main table first, then the side tables in load order
+    count: Callable[[Config], int]
+
+
+#  Phases run one after another, so foreign keys always point at rows that
+#  are already loaded.
+PHASES = (
+    Phase("categories", _category_rows, ("categories",), lambda cfg: cfg.categories),
+    Phase("users", _user_rows, ("users", "addresses"), lambda cfg: cfg.users),
+    Phase("products", _product_rows, ("products",), lambda cfg: cfg.products),
+    Phase("carts", _cart_rows, ("cart", "cart_items"), lambda cfg: cfg.users),
+    Phase("wishlists", _wishlist_rows, ("wishlists", "wishlist_products"), lambda cfg: cfg.users),
+    Phase("orders", _order_rows, ("orders", "order_items", "payments"), lambda cfg: cfg.orders),
+)
+PHASES_BY_NAME = {phase.name: phase for phase in PHASES}
+
+
+class LineStream(io.RawIOBase):
+    """
+    A read-only file over an iterator of text lines, for `copy_expert`.
+    Lines are encoded as they are read, so only one buffer is in memory.
+    """
+
+    def __init__(self, lines: Iterator[str]):
+        self._lines = lines
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        parts = [self._pending]
+        length = len(self._pending)
+        for line in self._lines:
+            encoded = line.encode()
+            parts.append(encoded)
+            length += len(encoded)
+            if 0 <= size <= length:
+                break
+        data = b"".join(parts)
+        if size < 0:
+            self._pending = b""
+            return data
+        self._pending = data[size:]
+        return data[:size]
+
+
+#  Per-process state, set by `_init_worker`.
+_config: Optional[Config] = None
+_zipf: Optional[ZipfSampler] = None
+
+
+def _init_worker(cfg: Config) -> None:
+    global _config
+    _config = cfg
+
+
+def _sampler(cfg: Config) -> ZipfSampler:
+    global _zipf
+    if _zipf is None:
+        _zipf = ZipfSampler(cfg.products, cfg.zipf)
+    return _zipf
+
+
+def _copy_sql(table: str) -> str:
+    return f"COPY {table} ({', '.join(COLUMNS[table])}) FROM STDIN"
+
+
+def load_chunk(task: Tuple[str, int, int]) -> Tuple[str, int, int]:
+    """
+    Generates and loads the rows of one phase for IDs `start..stop-1`, in one
+    transaction.  Returns the phase name and the ID range.
+    """
+    import psycopg2
+
+    name, start, stop = task
+    phase = PHASES_BY_NAME[name]
+    cfg = _config
+    #  Seeded per chunk, so the data does not depend on how chunks are spread over workers.
+    rng = random.Random(f"{cfg.seed}:{name}:{start}")
+    side = {table: tempfile.TemporaryFile("w+", encoding="utf-8") for table in phase.tables[1:]}
+    conn = psycopg2.connect(cfg.dsn)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SET synchronous_commit = off")
+            cursor.copy_expert(
+                _copy_sql(phase.tables[0]), LineStream(phase.generate(cfg, rng, start, stop, side))
+            )
+            for table, spool in side.items():
+                spool.seek(0)
+                cursor.copy_expert(_copy_sql(table), spool)
+        conn.commit()
+    finally:
+        conn.close()
+        for spool in side.values():
+            spool.close()
+    return name, start, stop
+
+
+def estimate_orders(order_items: int, alpha: float, cap: int, seed: int) -> int:
+    """
+    The number of orders needed for about `order_items` order items.
+    """
+    rng = random.Random(seed)
+    samples = 100_000
+    mean = sum(pareto_size(rng, alpha, cap) for _ in range(samples)) / samples
+    return max(1, round(order_items / mean))
+
+
+def prepare(dsn: str, truncate: bool, epoch: float) -> None:
+    """
+    Optionally empties the tables, and creates the monthly partitions of
+    `orders` and `order_items` that the generated order dates fall in.
+    """
+    import psycopg2
+    from sqlalchemy import create_engine
+
+    from database.partitioning import ensure_partitions
+
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cursor:
+            if truncate:
+                cursor.execute(f"TRUNCATE {', '.join(COLUMNS)} RESTART IDENTITY CASCADE")
+        conn.commit()
+    finally:
+        conn.close()
+
+    engine = create_engine(dsn)
+    try:
+        with engine.begin() as connection:
+            ensure_partitions(
+                connection,
+                datetime.fromtimestamp(epoch - 730 * 86400, timezone.utc).date(),
+                datetime.fromtimestamp(epoch, timezone.utc).date(),
+            )
+    finally:
+        engine.dispose()
+
+
+def finish(dsn: str) -> None:
+    """
+    Moves ID sequences past the generated IDs and refreshes planner statistics.
+    """
+    import psycopg2
+
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            for table in SEQUENCE_TABLES:
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"COALESCE((SELECT max(id) FROM {table}), 0) + 1, false)"
+                )
+            cursor.execute("ANALYZE")
+    finally:
+        conn.close()
+
+
+def generate(cfg: Config, workers: int, chunk_size: int, phases: List[str]) -> Dict[str, float]:
+    """
+    Runs the given phases in order and returns the seconds each one took.
+    """
+    timings = {}
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(cfg,)) as pool:
+        for phase in PHASES:
+            if phase.name not in phases:
+                continue
+            total = phase.count(cfg)
+            tasks = [(phase.name, start, min(start + chunk_size, total + 1)) for start in range(1, total + 1, chunk_size)]
+            started = time.perf_counter()
+            for done, _ in enumerate(pool.imap_unordered(load_chunk, tasks), 1):
+                print(f"\r{phase.name}: {done}/{len(tasks)} chunks", end="", file=sys.stderr)
+            timings[phase.name] = round(time.perf_counter() - started, 2)
+            print(f"\r{phase.name}: {total} rows in {timings[phase.name]}s", file=sys.stderr)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load a synthetic dataset into the database.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for all default sizes")
+    parser.add_argument("--users", type=int, help="Default: 1M x scale")
+    parser.add_argument("--categories", type=int, help="Default: 10k x scale")
+    parser.add_argument("--products", type=int, help="Default: 5M x scale")
+    parser.add_argument("--order-items", type=int, help="Approximate order items. Default: 50M x scale")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of product popularity")
+    parser.add_argument("--pareto", type=float, default=1.3, help="Pareto shape of cart and order sizes")
+    parser.add_argument("--max-items", type=int, default=100, help="Largest cart, wishlist or order")
+    parser.add_argument("--cart-share", type=float, default=0.3, help="Share of users with a cart")
+    parser.add_argument("--wishlist-share", type=float, default=0.2, help="Share of users with a wishlist")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=50_000, help="IDs per COPY transaction")
+    parser.add_argument("--phases", nargs="+", choices=[phase.name for phase in PHASES], default=[phase.name for phase in PHASES])
+    parser.add_argument("--truncate", action="store_true", help="Empty all generated tables first")
+    parser.add_argument("--database-url", help="Default: the application's database settings")
+    args = parser.parse_args()
+
+    from core.security import get_password_hash
+
+    if args.database_url:
+        dsn = args.database_url
+    else:
+        from core.config import settings
+
+        dsn = settings.SQLALCHEMY_DATABASE_URL
+
+    def scaled(value: Optional[int], default: int) -> int:
+        return value if value is not None else max(1, int(default * args.scale))
+
+    order_items = scaled(args.order_items, 50_000_000)
+    cfg = Config(
+        dsn=dsn,
+        seed=args.seed,
+        users=scaled(args.users, 1_000_000),
+        categories=scaled(args.categories, 10_000),
+        products=scaled(args.products, 5_000_000),
+        orders=estimate_orders(order_items, args.pareto, args.max_items, args.seed),
+        zipf=args.zipf,
+        pareto=args.pareto,
+        max_items=args.max_items,
+        cart_share=args.cart_share,
+        wishlist_share=args.wishlist_share,
+        password_hash=get_password_hash(DATAGEN_PASSWORD),
+        #  Fixed, so reruns with the same seed produce the same rows (password salts aside).
+        epoch=datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp(),
+    )
+
+    prepare(dsn, args.truncate, cfg.epoch)
+    started = time.perf_counter()
+    timings = generate(cfg, args.workers, args.chunk_size, args.phases)
+    finish(dsn)
+    print(json.dumps({
+        "users": cfg.users,
+        "categories": cfg.categories,
+        "products": cfg.products,
+        "orders": cfg.orders,
+        "approximate_order_items": order_items,
+        "seconds": round(time.perf_counter() - started, 2),
+        "phase_seconds": timings,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Benchmark for cross-worker cache invalidation (`core.invalidation`).
+
+Starts `--workers` processes, each running its own `InvalidationBus` with one
+registered cache, like the API's workers do, against the configured
+database.  Then, on a separate benchmark channel:
+
+1. Latency: `--messages` writes, `--interval` ms apart, each publishing a
+   key carrying its commit time; every worker reports how long after the
+   commit the key was evicted.
+2. Burst: `--burst` writes as fast as one connection commits them, all with
+   the same key; reports how many evictions each worker needed.
+3. Recovery: the listeners' connections are terminated with
+   `pg_terminate_backend`; reports how long until every worker has flushed
+   and listens again (connection superuser or same role required).
+
+Usage:
+    python -m benchmarks.invalidation --workers 8
+"""
+import argparse
+import json
+import multiprocessing
+import statistics
+import time
+from typing import Dict, List
+
+from sqlalchemy import text
+
+from core.invalidation import InvalidationBus, listener_connection, publish
+
+CHANNEL = "cache_invalidation_benchmark"
+APPLICATION_NAME = "invalidation-benchmark"
+
+
+def connect():
+    connection = listener_connection()
+    cursor = connection.cursor()
+    cursor.execute(f"SET application_name = '{APPLICATION_NAME}'")
+    cursor.close()
+    connection.commit()
+    return connection
+
+
+def worker(index: int, events: "multiprocessing.Queue", stop: "multiprocessing.Event") -> None:
+    bus = InvalidationBus(channel=CHANNEL, reconnect_delay=0.05, connect=connect)
+
+    def evict(argument):
+        received = time.time()
+        if argument and argument.startswith("t"):
+            events.put(("latency", index, received - float(argument[1:])))
+        else:
+            events.put(("evict", index, argument))
+
+    bus.register("bench", evict, lambda: events.put(("flush", index, time.time())))
+    bus.start()
+    bus.connected.wait(10)
+    events.put(("ready", index, None))
+    stop.wait()
+    bus.stop()
+
+
+def drain(events, kind: str, count: int, timeout: float) -> List[tuple]:
+    """
+    Collects `count` events of `kind` (others are dropped), or as many as
+    arrive within `timeout` seconds.
+    """
+    found = []
+    deadline = time.monotonic() + timeout
+    while len(found) < count and time.monotonic() < deadline:
+        try:
+            event = events.get(timeout=max(deadline - time.monotonic(), 0.001))
+        except Exception:
+            break
+        if event[0] == kind:
+            found.append(event)
+    return found
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    if not values:
+        return {}
+    return {
+        "p50_ms": round(statistics.median(values) * 1000, 3),
+        "p95_ms": round(values[int(len(values) * 0.95)] * 1000, 3),
+        "p99_ms": round(values[int(len(values) * 0.99)] * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3),
+    }
+
+
+def main() -> None:
+    from core.config import settings
+    from database.database import engine
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--interval", type=float, default=5.0, help="Milliseconds between latency writes")
+    parser.add_argument("--burst", type=int, default=1000)
+    args = parser.parse_args()
+
+    settings.INVALIDATION_CHANNEL = CHANNEL
+    events = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    processes = [
+        multiprocessing.Process(target=worker, args=(index, events, stop), daemon=True)
+        for index in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    ready = drain(events, "ready", args.workers, 30)
+    results = {"workers": args.workers, "workers_ready": len(ready)}
+
+    with engine.connect() as conn:
+        for _ in range(args.messages):
+            with conn.begin():
+                publish(conn, f"bench:t{time.time()!r}")
+            time.sleep(args.interval / 1000)
+        latencies = [event[2] for event in drain(events, "latency", args.messages * args.workers, 10)]
+        results["latency"] = {"received": len(latencies), **percentiles(latencies)}
+
+        started = time.perf_counter()
+        for _ in range(args.burst):
+            with conn.begin():
+                publish(conn, "bench:burst")
+        burst_seconds = time.perf_counter() - started
+        evictions = drain(events, "evict", args.burst * args.workers, 2)
+        per_worker = [sum(1 for event in evictions if event[1] == index) for index in range(args.workers)]
+        results["burst"] = {
+            "writes": args.burst,
+            "write_seconds": round(burst_seconds, 3),
+            "evictions_per_worker": per_worker,
+        }
+
+        killed_at = time.time()
+        with conn.begin():
+            killed = conn.execute(text("""
+                SELECT count(pg_terminate_backend(pid)) FROM pg_stat_activity
+                WHERE application_name = :name
+            """), {"name": APPLICATION_NAME}).scalar()
+        #  One flush when the loss is noticed, one after reconnecting.
+        flushes = drain(events, "flush", 2 * killed, 60)
+        results["recovery"] = {
+            "connections_terminated": killed,
+            "flushes": len(flushes),
+            "last_flush_after_ms": round((max(event[2] for event in flushes) - killed_at) * 1000, 1) if flushes else None,
+        }
+        with conn.begin():
+            publish(conn, f"bench:t{time.time()!r}")
+        after = drain(events, "latency", args.workers, 10)
+        results["recovery"]["workers_receiving_after"] = len(after)
+
+    stop.set()
+    for process in processes:
+        process.join(5)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Load test for adaptive concurrency limiting (`api.middleware.load_shedding`).
+
+Boots the API against a disposable PostgreSQL database like
+`benchmarks.load_testing`, then runs the same traffic at every level of
+`--concurrency`, first with the concurrency limit and then without it:
+
+* `--concurrency` catalog browsing clients (low priority), the load that
+  pushes the server past saturation;
+* `--checkout-clients` clients quoting shipping at checkout (critical).
+
+Clients are closed-loop.  A client refused with a 503 waits as long as its
+`Retry-After` header asks (unless `--ignore-retry-after`) and tries again.
+For each class the result reports goodput, the responses per second that
+succeeded within `--slo` milliseconds, next to the requests refused and the
+latency of the rest.  Without the limit, goodput collapses past saturation
+as every request queues; with it, goodput should stay flat and checkout
+should keep its throughput.
+
+Usage:
+    python -m benchmarks.load_shedding --concurrency 8 32 128 512
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List, NamedTuple
+
+import httpx
+
+from benchmarks.load_testing import (
+    BENCH_SECRET_KEY,
+    SCENARIOS,
+    Call,
+    VirtualUser,
+    migrate,
+    percentile,
+    seed,
+    start_server,
+)
+from benchmarks.postgres import database_env, disposable_postgres
+
+CLASSES = {"catalog": SCENARIOS["browse_catalog"], "checkout": SCENARIOS["checkout_quote"]}
+
+
+class Outcome(NamedTuple):
+    latency: float
+    status: int
+
+
+async def client_loop(
+    client: httpx.AsyncClient,
+    scenario: Callable[[VirtualUser, random.Random, int], Call],
+    user: VirtualUser,
+    rng: random.Random,
+    products: int,
+    measure_from: float,
+    stop_at: float,
+    honor_retry_after: bool,
+    outcomes: List[Outcome],
+) -> None:
+    headers = {"Authorization": f"Bearer {user.token}"}
+    while True:
+        call = scenario(user, rng, products)
+        sent = time.perf_counter()
+        if sent >= stop_at:
+            return
+        retry_after = 0.0
+        try:
+            response = await client.request(call.method, call.path, json=call.json, data=call.data, headers=headers)
+            status = response.status_code
+            if status == 503 and honor_retry_after:
+                retry_after = float(response.headers.get("retry-after", 0))
+        except httpx.TransportError:
+            status = 0
+        if sent >= measure_from:
+            outcomes.append(Outcome(time.perf_counter() - sent, status))
+        if retry_after:
+            await asyncio.sleep(min(retry_after, max(0.0, stop_at - time.perf_counter())))
+
+
+async def run_level(
+    base_url: str,
+    users: List[VirtualUser],
+    products: int,
+    clients: Dict[str, int],
+    duration: float,
+    warmup: float,
+    seed_value: int,
+    honor_retry_after: bool,
+) -> Dict[str, List[Outcome]]:
+    start = time.perf_counter()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+    total = sum(clients.values())
+    limits = httpx.Limits(max_connections=total, max_keepalive_connections=total)
+    outcomes: Dict[str, List[Outcome]] = {name: [] for name in clients}
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        loops = []
+        for name, count in clients.items():
+            for index in range(count):
+                loops.append(client_loop(
+                    client, CLASSES[name], users[index % len(users)],
+                    random.Random(f"{seed_value}-{name}-{index}"), products,
+                    measure_from, stop_at, honor_retry_after, outcomes[name],
+                ))
+        await asyncio.gather(*loops)
+    return outcomes
+
+
+def summarize(outcomes: List[Outcome], duration: float, slo: float) -> Dict[str, object]:
+    succeeded = sorted(outcome.latency * 1000 for outcome in outcomes if 200 <= outcome.status < 300)
+    shed = sum(1 for outcome in outcomes if outcome.status == 503)
+    return {
+        "requests": len(outcomes),
+        "goodput_rps": round(sum(1 for latency in succeeded if latency <= slo) / duration, 1),
+        "throughput_rps": round(len(succeeded) / duration, 1),
+        "shed": shed,
+        "errors": len(outcomes) - len(succeeded) - shed,
+        "latency_ms": {
+            "p50": round(percentile(succeeded, 0.50), 2),
+            "p99": round(percentile(succeeded, 0.99), 2),
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32, 128, 512], help="Catalog clients")
+    parser.add_argument("--checkout-clients", type=int, default=8)
+    parser.add_argument("--slo", type=float, default=500.0, help="Latency, in ms, a response must meet to count")
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds per run")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before each run")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--ignore-retry-after", action="store_true", help="Retry refused requests at once")
+    args = parser.parse_args()
+
+    runs = []
+    with disposable_postgres() as url:
+        env = dict(
+            os.environ, **database_env(url),
+            SECRET_KEY=BENCH_SECRET_KEY, ALGORITHM="HS256", RATE_LIMIT_ENABLED="false",
+        )
+        os.environ.update(env)
+        migrate(env)
+        users = seed(args.users, args.products, args.seed)
+        for limited in (True, False):
+            server = start_server(dict(env, CONCURRENCY_LIMIT_ENABLED=str(limited).lower()), args.port, args.workers)
+            try:
+                for concurrency in args.concurrency:
+                    outcomes = asyncio.run(run_level(
+                        f"http://127.0.0.1:{args.port}", users, args.products,
+                        {"catalog": concurrency, "checkout": args.checkout_clients},
+                        args.duration, args.warmup, args.seed, not args.ignore_retry_after,
+                    ))
+                    run = {
+                        "concurrency_limit": limited,
+                        "catalog_clients": concurrency,
+                        **{name: summarize(samples, args.duration, args.slo) for name, samples in outcomes.items()},
+                    }
+                    runs.append(run)
+                    print(
+                        f"limit={'on' if limited else 'off'} @ {concurrency}: goodput "
+                        f"{run['catalog']['goodput_rps']} + {run['checkout']['goodput_rps']} req/s",
+                        file=sys.stderr,
+                    )
+            finally:
+                server.terminate()
+                server.wait()
+
+    print(json.dumps({
+        "workers": args.workers,
+        "checkout_clients": args.checkout_clients,
+        "slo_ms": args.slo,
+        "runs": runs,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,454 @@
+"""
+Reproducible load test for the API.
+
+Boots the application (uvicorn, `--workers` processes) against a disposable
+PostgreSQL database (see `benchmarks.postgres`), migrates it, seeds a small
+deterministic dataset, then runs each scenario at each concurrency level for
+a fixed duration.  For every run it reports throughput, latency percentiles
+and the number of SQL queries per request, read from the `Server-Timing`
+header added by `SQLTimingMiddleware`.
+
+The result is a JSON document tagged with the current git commit, so runs on
+two commits can be compared with `--compare`:
+
+    python -m benchmarks.load_testing --output before.json
+    git checkout my-branch
+    python -m benchmarks.load_testing --compare before.json
+
+Scenarios cover the endpoints that are mounted today (login, catalog
+browsing, current user, cart, shipping methods and the checkout shipping
+quote).  Add an entry to `SCENARIOS` when a new user flow is mounted.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import httpx
+
+from benchmarks.postgres import database_env, disposable_postgres
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API = "/api/v1"
+BENCH_SECRET_KEY = "benchmark-secret-key"
+BENCH_PASSWORD = "Bench-passw0rd!"
+
+_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+class VirtualUser(NamedTuple):
+    id: int
+    email: str
+    address_id: int
+    token: str
+
+
+class Call(NamedTuple):
+    method: str
+    path: str
+    json: Optional[dict] = None
+    data: Optional[dict] = None  # Form fields
+
+
+class Sample(NamedTuple):
+    latency: float
+    status: int
+    queries: Optional[int]
+
+
+def _add_to_cart(user: VirtualUser, rng: random.Random, products: int) -> Call:
+    return Call("POST", f"{API}/cart/items", {"product_id": rng.randint(1, products), "quantity": rng.randint(1, 3)})
+
+
+def _wishlist_badges(user: VirtualUser, rng: random.Random, products: int) -> Call:
+    #  Badges for a 100-product page.
+    start = rng.randrange(1, max(2, products - 100))
+    query = "&".join(f"product_ids={product_id}" for product_id in range(start, start + 100))
+    return Call("GET", f"{API}/wishlist/membership?{query}")
+
+
+#  Each scenario turns (virtual user, random generator, product count) into
+#  the next request that user makes.
+SCENARIOS: Dict[str, Callable[[VirtualUser, random.Random, int], Call]] = {
+    "browse_catalog": lambda user, rng, products: Call(
+        "GET", f"{API}/products/?skip={rng.randrange(0, max(1, products - 100))}&limit=100"
+    ),
+    "current_user": lambda user, rng, products: Call("GET", f"{API}/users/me"),
+    "shipping_methods": lambda user, rng, products: Call("GET", f"{API}/shipping/"),
+    "view_cart": lambda user, rng, products: Call("GET", f"{API}/cart/"),
+    #  One mobile screen: the four reads above in a single `POST /batch`.
+    "batch_screen": lambda user, rng, products: Call("POST", f"{API}/batch", {"requests": [
+        {"path": "/users/me"},
+        {"path": "/cart/"},
+        {"path": "/shipping/"},
+        {"path": f"/products/?skip={rng.randrange(0, max(1, products - 20))}&limit=20"},
+    ]}),
+    "order_history": lambda user, rng, products: Call("GET", f"{API}/orders/?fields=id,status,total_price"),
+    "wishlist_badges": _wishlist_badges,
+    "add_to_cart": _add_to_cart,
+    "checkout_quote": lambda user, rng, products: Call(
+        "GET", f"{API}/shipping/quote?address_id={user.address_id}"
+    ),
+    "login": lambda user, rng, products: Call(
+        "POST", f"{API}/login", data={"username": user.email, "password": BENCH_PASSWORD}
+    ),
+}
+
+
+def mint_token(email: str) -> str:
+    """
+    Signs an access token the way the API expects, so load runs do not
+    depend on (or measure) password hashing.
+    """
+    from core.security import create_access_token
+
+    return create_access_token(email, timedelta(hours=12)).token
+
+
+def migrate(env: Dict[str, str]) -> None:
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=ROOT, env=env, check=True, capture_output=True,
+    )
+
+
+def seed(users: int, products: int, seed_value: int) -> List[VirtualUser]:
+    """
+    Inserts a deterministic dataset through the application's models.  The
+    `DB_*` environment variables must already point at the benchmark
+    database.
+
+    Every user gets a default address, a cart with three items, a wishlist
+    of ten products and five past orders, a week apart, of two items each;
+    all users share one password hash.
+    """
+    from sqlalchemy import insert, text
+
+    from core.security import get_password_hash
+    from database.database import engine
+    from database.partitioning import ensure_partitions
+    from database.models.address import Address
+    from database.models.cart import Cart, CartItem
+    from database.models.category import Category
+    from database.models.order import Order, OrderStatus
+    from database.models.order_item import OrderItem
+    from database.models.product import Product
+    from database.models.shipping_method import ShippingMethod
+    from database.models.shipping_rate import ShippingRate
+    from database.models.user import User
+    from database.models.wishlist_item import Wishlist, wishlist_products
+
+    rng = random.Random(seed_value)
+    password_hash = get_password_hash(BENCH_PASSWORD)
+    categories = 10
+    with engine.begin() as conn:
+        conn.execute(insert(Category), [
+            {"id": i, "name": f"Category {i}", "is_active": True} for i in range(1, categories + 1)
+        ])
+        conn.execute(insert(Product), [
+            {
+                "id": i,
+                "name": f"Product {i}",
+                "description": f"Description of product {i}",
+                "price": Decimal(rng.randint(100, 50000)) / 100,
+                "stock_quantity": rng.randint(0, 500),
+                "weight": Decimal(rng.randint(50, 20000)) / 1000,
+                "category_id": rng.randint(1, categories),
+                "is_active": True,
+            }
+            for i in range(1, products + 1)
+        ])
+        conn.execute(insert(User), [
+            {
+                "id": i,
+                "email": f"user{i}@bench.example",
+                "hashed_password": password_hash,
+                "first_name": "Bench",
+                "last_name": f"User{i}",
+                "is_active": True,
+            }
+            for i in range(1, users + 1)
+        ])
+        conn.execute(insert(Address), [
+            {
+                "id": i,
+                "user_id": i,
+                "street_address": f"{i} Bench Street",
+                "city": "Springfield",
+                "state": "IL",
+                "postal_code": f"{rng.randint(10000, 99999)}",
+                "country": "US",
+                "is_default": True,
+            }
+            for i in range(1, users + 1)
+        ])
+        conn.execute(insert(Cart), [{"id": i, "user_id": i} for i in range(1, users + 1)])
+        conn.execute(insert(CartItem), [
+            {"cart_id": i, "product_id": product_id, "quantity": rng.randint(1, 3)}
+            for i in range(1, users + 1)
+            for product_id in rng.sample(range(1, products + 1), 3)
+        ])
+        conn.execute(insert(Wishlist), [{"id": i, "user_id": i} for i in range(1, users + 1)])
+        conn.execute(insert(wishlist_products), [
+            {"wishlist_id": i, "product_id": product_id}
+            for i in range(1, users + 1)
+            for product_id in rng.sample(range(1, products + 1), 10)
+        ])
+        orders_per_user = 5
+        #  One order a week, so order history spans two months' partitions.
+        now = datetime.now(timezone.utc)
+        placed_at = {
+            order_id: now - timedelta(weeks=(order_id - 1) % orders_per_user)
+            for order_id in range(1, users * orders_per_user + 1)
+        }
+        ensure_partitions(conn, now - timedelta(weeks=orders_per_user), now)
+        order_items = [
+            {"order_id": order_id, "order_date": placed_at[order_id], "product_id": product_id, "quantity": rng.randint(1, 3), "price": Decimal(rng.randint(100, 50000)) / 100}
+            for order_id in range(1, users * orders_per_user + 1)
+            for product_id in rng.sample(range(1, products + 1), 2)
+        ]
+        totals: Dict[int, Decimal] = {}
+        for item in order_items:
+            totals[item["order_id"]] = totals.get(item["order_id"], Decimal(0)) + item["price"] * item["quantity"]
+        conn.execute(insert(Order), [
+            {
+                "id": order_id,
+                "user_id": (order_id - 1) // orders_per_user + 1,
+                "shipping_address_id": (order_id - 1) // orders_per_user + 1,
+                "order_date": placed_at[order_id],
+                "total_price": totals[order_id],
+                "status": OrderStatus.DELIVERED,
+                "payment_method": "Credit Card",
+            }
+            for order_id in range(1, users * orders_per_user + 1)
+        ])
+        conn.execute(insert(OrderItem), order_items)
+        conn.execute(insert(ShippingMethod), [
+            {"id": 1, "name": "Standard", "cost": Decimal("4.99"), "is_active": True},
+            {"id": 2, "name": "Express", "cost": Decimal("14.99"), "is_active": True},
+            {"id": 3, "name": "Freight", "cost": Decimal("49.00"), "is_active": True},
+        ])
+        conn.execute(insert(ShippingRate), [
+            {"shipping_method_id": 1, "country": "US", "postal_prefix": "", "base_cost": Decimal("4.99"), "cost_per_kg": Decimal("0.50"), "max_weight": Decimal("30")},
+            {"shipping_method_id": 2, "country": "US", "postal_prefix": "", "base_cost": Decimal("14.99"), "cost_per_kg": Decimal("1.25"), "max_weight": Decimal("30")},
+            {"shipping_method_id": 2, "country": "US", "postal_prefix": "9", "base_cost": Decimal("19.99"), "cost_per_kg": Decimal("1.50"), "max_weight": Decimal("30")},
+            {"shipping_method_id": 3, "country": "US", "postal_prefix": "", "base_cost": Decimal("49.00"), "cost_per_kg": Decimal("0.10"), "max_weight": None},
+        ])
+        #  Rows were inserted with explicit IDs; move the sequences past them.
+        for table in ("categories", "products", "users", "addresses", "cart", "wishlists", "orders", "shipping_methods"):
+            conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"))
+    engine.dispose()
+
+    return [
+        VirtualUser(i, f"user{i}@bench.example", i, mint_token(f"user{i}@bench.example"))
+        for i in range(1, users + 1)
+    ]
+
+
+def start_server(env: Dict[str, str], port: int, workers: int, timeout: float = 60.0) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT, env=env,
+    )
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                return process
+        except httpx.TransportError:
+            pass
+        time.sleep(0.05)
+    process.terminate()
+    raise TimeoutError(f"Server did not start within {timeout}s")
+
+
+async def run_scenario(
+    base_url: str,
+    scenario: Callable[[VirtualUser, random.Random, int], Call],
+    users: List[VirtualUser],
+    products: int,
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed_value: int,
+) -> List[Sample]:
+    """
+    Runs one scenario with `concurrency` closed-loop clients for `warmup +
+    duration` seconds and returns the samples taken after the warm-up.
+    """
+    samples: List[Sample] = []
+    start = time.perf_counter()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async def client_loop(index: int, client: httpx.AsyncClient) -> None:
+        rng = random.Random(seed_value * 1000 + index)
+        user = users[index % len(users)]
+        headers = {"Authorization": f"Bearer {user.token}"}
+        while True:
+            call = scenario(user, rng, products)
+            sent = time.perf_counter()
+            if sent >= stop_at:
+                return
+            try:
+                response = await client.request(
+                    call.method, call.path, json=call.json, data=call.data, headers=headers
+                )
+                status = response.status_code
+                match = _QUERIES.search(response.headers.get("server-timing", ""))
+                queries = int(match.group(1)) if match else None
+            except httpx.TransportError:
+                status, queries = 0, None
+            if sent >= measure_from:
+                samples.append(Sample(time.perf_counter() - sent, status, queries))
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        await asyncio.gather(*(client_loop(index, client) for index in range(concurrency)))
+    return samples
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples: List[Sample], duration: float) -> Dict[str, object]:
+    latencies = sorted(sample.latency * 1000 for sample in samples)
+    queries = [sample.queries for sample in samples if sample.queries is not None]
+    errors = sum(1 for sample in samples if not 200 <= sample.status < 400)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "throughput_rps": round(len(samples) / duration, 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50), 2),
+            "p95": round(percentile(latencies, 0.95), 2),
+            "p99": round(percentile(latencies, 0.99), 2),
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+        },
+        "queries_per_request": {
+            "mean": round(sum(queries) / len(queries), 2) if queries else None,
+            "max": max(queries) if queries else None,
+        },
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: Dict[str, object], current: Dict[str, object], tolerance: float) -> List[str]:
+    """
+    Lists the runs whose p95 latency grew, or whose queries per request
+    changed, by more than `tolerance` (a fraction) against the baseline.
+    """
+    before = {(run["scenario"], run["concurrency"]): run for run in baseline["runs"]}
+    regressions = []
+    for run in current["runs"]:
+        old = before.get((run["scenario"], run["concurrency"]))
+        if old is None:
+            continue
+        label = f"{run['scenario']} @ {run['concurrency']}"
+        old_p95, new_p95 = old["latency_ms"]["p95"], run["latency_ms"]["p95"]
+        if old_p95 and new_p95 > old_p95 * (1 + tolerance):
+            regressions.append(f"{label}: p95 {old_p95}ms -> {new_p95}ms")
+        old_queries, new_queries = old["queries_per_request"]["mean"], run["queries_per_request"]["mean"]
+        if old_queries is not None and new_queries is not None and new_queries > old_queries * (1 + tolerance):
+            regressions.append(f"{label}: queries/request {old_queries} -> {new_queries}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the API against a disposable database.")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--duration", type=float, default=15.0, help="Measured seconds per run")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds before each run")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="Write the JSON result here instead of stdout")
+    parser.add_argument("--compare", help="Baseline JSON result to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed regression, as a fraction")
+    args = parser.parse_args()
+
+    with disposable_postgres() as url:
+        #  Rate limits and load shedding would turn a load test into a test of
+        #  the limiters; `benchmarks.load_shedding` tests the latter.
+        env = dict(
+            os.environ, **database_env(url),
+            SECRET_KEY=BENCH_SECRET_KEY, ALGORITHM="HS256", RATE_LIMIT_ENABLED="false",
+            CONCURRENCY_LIMIT_ENABLED="false",
+        )
+        #  The seeding below imports the application's settings in this process.
+        os.environ.update(env)
+        migrate(env)
+        users = seed(args.users, args.products, args.seed)
+        server = start_server(env, args.port, args.workers)
+        try:
+            runs = []
+            for name in args.scenarios:
+                for concurrency in args.concurrency:
+                    samples = asyncio.run(run_scenario(
+                        f"http://127.0.0.1:{args.port}", SCENARIOS[name], users, args.products,
+                        concurrency, args.duration, args.warmup, args.seed,
+                    ))
+                    runs.append({"scenario": name, "concurrency": concurrency, **summarize(samples, args.duration)})
+                    print(f"{name} @ {concurrency}: {runs[-1]['throughput_rps']} req/s", file=sys.stderr)
+        finally:
+            server.terminate()
+            server.wait()
+
+    result = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "workers": args.workers,
+        },
+        "dataset": {"users": args.users, "products": args.products, "seed": args.seed},
+        "runs": runs,
+    }
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), result, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Micro-benchmarks for hot helpers, run with pytest-benchmark:
+
+    pytest benchmarks/micro_benchmarks.py --benchmark-json=micro.json
+    pytest benchmarks/micro_benchmarks.py --benchmark-compare=micro.json
+
+The file is not named `test_*.py`, so the regular test run does not pick it
+up.
+"""
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from schemas.cart import CartRead
+from utils.bitmap import RoaringBitmap
+from utils.paginaion import Page
+
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _cart_payload(items: int) -> dict:
+    return {
+        "id": 1,
+        "user_id": 1,
+        "items": [
+            {
+                "product_id": i,
+                "quantity": 2,
+                "product": {
+                    "id": i,
+                    "name": f"Product {i}",
+                    "description": "A product",
+                    "price": Decimal("19.99"),
+                    "stock_quantity": 10,
+                    "weight": Decimal("0.500"),
+                    "category_id": 1,
+                    "is_active": True,
+                    "created_at": NOW,
+                    "updated_at": None,
+                },
+            }
+            for i in range(1, items + 1)
+        ],
+    }
+
+
+def test_page_create(benchmark):
+    items = list(range(100))
+    page = benchmark(Page.create, items=items, page=3, size=100, total=10_000)
+    assert page.pages == 100 and page.has_next
+
+
+def test_cart_read_validation(benchmark):
+    payload = _cart_payload(20)
+    cart = benchmark(CartRead.model_validate, payload)
+    assert len(cart.items) == 20
+
+
+def test_password_hash(benchmark):
+    from core.security import get_password_hash
+
+    #  Each hash takes tens of milliseconds; a few rounds are enough.
+    hashed = benchmark.pedantic(get_password_hash, args=("Bench-passw0rd!",), rounds=5, iterations=1)
+    assert hashed.startswith("$argon2")
+
+
+def test_password_verify(benchmark):
+    from core.security import get_password_hash, verify_password
+
+    hashed = get_password_hash("Bench-passw0rd!")
+    assert benchmark.pedantic(verify_password, args=("Bench-passw0rd!", hashed), rounds=5, iterations=1)
+
+
+def test_wishlist_page_membership(benchmark):
+    #  A 200-item wishlist against a 100-product page, as for wishlist badges.
+    wishlist = RoaringBitmap(range(7, 200 * 37, 37))
+    page = list(range(1000, 1100))
+    members = benchmark(lambda: list(wishlist & RoaringBitmap(page)))
+    assert members == [product_id for product_id in page if (product_id - 7) % 37 == 0]
@@ -0,0 +1,149 @@
+"""
+Benchmark for order queries on the monthly partitioned `orders` and
+`order_items` tables (see `database.partitioning`).
+
+Runs against the configured database, loaded by `benchmarks.datagen`
+(`--scale 2` is about 100M order items over two years of months).  Each
+scenario calls the `order_service` function the API uses, for `--samples`
+sampled users or orders, with and without a date range, and reports latency
+percentiles together with the number of partitions its statements read
+(from `EXPLAIN` of the statements the call executed).  "Recent" is relative
+to the newest order in the database, as generated order dates end at
+datagen's epoch.
+
+Usage:
+    python -m benchmarks.datagen --scale 2 --truncate
+    python -m benchmarks.order_partitions --samples 200
+"""
+import argparse
+import json
+import random
+import re
+import statistics
+import time
+from datetime import timedelta
+from typing import Callable, Dict, List, Set
+
+from sqlalchemy import event, text
+
+from database.database import SessionLocal, engine
+from services import order_service
+
+_PARTITION = re.compile(r"^(orders|order_items)_\d{4}_\d{2}$")
+HISTORY_FIELDS = ("id", "order_date", "status", "total_price")
+
+
+def _relations(plan: Dict) -> Set[str]:
+    found = set()
+    if "Relation Name" in plan:
+        found.add(plan["Relation Name"])
+    for child in plan.get("Plans", ()):
+        found |= _relations(child)
+    return found
+
+
+def partitions_read(call: Callable[[], object]) -> int:
+    """
+    Runs `call`, then explains every statement it executed and counts the
+    distinct order partitions in the plans (after pruning at plan time).
+    """
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        call()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    partitions = set()
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            if not statement.lstrip().upper().startswith("SELECT"):
+                continue
+            cursor = conn.connection.cursor()
+            cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+            plan = cursor.fetchone()[0][0]["Plan"]
+            partitions |= {name for name in _relations(plan) if _PARTITION.match(name)}
+            cursor.close()
+    return len(partitions)
+
+
+def measure(calls: List[Callable[[], object]]) -> Dict[str, float]:
+    timings = []
+    for call in calls:
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[int(len(timings) * 0.95)], 2),
+        "max_ms": round(timings[-1], 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--samples", type=int, default=200, help="Users or orders per scenario")
+    parser.add_argument("--recent-days", type=int, default=90, help="Date range of the bounded scenarios")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    db = SessionLocal()
+    try:
+        latest = db.execute(text("SELECT max(order_date) FROM orders")).scalar()
+        since = latest - timedelta(days=args.recent_days)
+        totals = dict(db.execute(text("""
+            SELECT 'orders', count(*) FROM orders UNION ALL SELECT 'order_items', count(*) FROM order_items
+        """)).all())
+        months = db.execute(text("SELECT count(*) FROM pg_inherits WHERE inhparent = 'orders'::regclass")).scalar()
+        recent = db.execute(text("""
+            SELECT id, user_id, order_date FROM orders TABLESAMPLE SYSTEM (1) WHERE order_date >= :since LIMIT :limit
+        """), {"since": since, "limit": args.samples * 10}).all()
+        recent = rng.sample(recent, min(args.samples, len(recent)))
+        users = [user_id for _, user_id, _ in recent]
+
+        def history(user_id: int, bounded: bool, items: bool = False) -> Callable[[], object]:
+            fields = (*HISTORY_FIELDS, "items") if items else HISTORY_FIELDS
+            return lambda: order_service.list_orders_for_user(
+                db, user_id, limit=20, fields=fields, placed_after=since if bounded else None
+            )
+
+        def detail(order_id: int, user_id: int, placed_at, bounded: bool) -> Callable[[], object]:
+            return lambda: order_service.get_order_for_user(
+                db,
+                order_id,
+                user_id,
+                placed_after=placed_at - timedelta(days=1) if bounded else None,
+                placed_before=placed_at + timedelta(days=1) if bounded else None,
+            )
+
+        scenarios = {
+            "history": [history(user_id, False) for user_id in users],
+            f"history_last_{args.recent_days}_days": [history(user_id, True) for user_id in users],
+            "history_with_items": [history(user_id, False, items=True) for user_id in users],
+            f"history_with_items_last_{args.recent_days}_days": [history(user_id, True, items=True) for user_id in users],
+            "order_detail": [detail(order_id, user_id, placed_at, False) for order_id, user_id, placed_at in recent],
+            "order_detail_date_known": [detail(order_id, user_id, placed_at, True) for order_id, user_id, placed_at in recent],
+        }
+        results = {}
+        for name, calls in scenarios.items():
+            results[name] = {"partitions_read": partitions_read(calls[0]), **measure(calls)}
+            db.rollback()
+    finally:
+        db.close()
+
+    print(json.dumps({
+        "orders": totals.get("orders"),
+        "order_items": totals.get("order_items"),
+        "monthly_partitions": months,
+        "samples": len(recent),
+        "scenarios": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Benchmark for payment webhook ingestion.
+
+A stand-in provider sends signed webhook deliveries at a fixed event rate to
+`POST /api/v1/payments/webhook`, open loop: a delivery goes out on schedule
+whether or not the earlier ones were acknowledged.  It reports how fast the
+route acknowledges them (signature check, JSON parsing, buffering and the
+202), measured from when each delivery was due, and how the buffer keeps up.
+
+By default the provider calls the app in process through httpx's ASGI
+transport, with the rate limiter and load shedding off, and batches are
+applied by a stub that sleeps for `--apply-latency` milliseconds per batch;
+with `--database` they go through `apply_payment_status_updates` against the
+configured database, after seeding one order and payment per transaction ID.
+With `--url`, deliveries go to a running server instead (sign them with its
+`PAYMENT_WEBHOOK_SECRET`), and only acknowledgements are reported.
+
+Usage:
+    python -m benchmarks.payment_webhooks --rate 10000 --duration 10
+    python -m benchmarks.payment_webhooks --rate 10000 --duration 10 --database
+    python -m benchmarks.payment_webhooks --rate 10000 --url http://127.0.0.1:8000 --secret ...
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import random
+import statistics
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+import httpx
+
+from database.models.payment import PaymentStatus
+from services.payment_webhook_service import apply_batch_in_new_session
+
+TRANSACTION_PREFIX = "bench-txn-"
+WEBHOOK_PATH = "/api/v1/payments/webhook"
+BENCH_WEBHOOK_SECRET = "bench-webhook-secret"
+
+
+def seed_payments(transactions: int) -> None:
+    """
+    Creates one user, and one order plus pending payment per transaction ID.
+    """
+    from sqlalchemy import delete, insert, select
+
+    from database.database import SessionLocal
+    from database.models.order import Order
+    from database.models.payment import Payment
+    from database.models.user import User
+
+    db = SessionLocal()
+    try:
+        db.execute(delete(Payment).where(Payment.transaction_id.like(f"{TRANSACTION_PREFIX}%")))
+        user_id = db.execute(
+            select(User.id).where(User.email == "webhook-bench@example.com")
+        ).scalar()
+        if user_id is None:
+            user_id = db.execute(
+                insert(User)
+                .values(
+                    email="webhook-bench@example.com",
+                    hashed_password="!",
+                    first_name="Webhook",
+                    last_name="Bench",
+                )
+                .returning(User.id)
+            ).scalar_one()
+        order_ids = db.execute(
+            insert(Order).returning(Order.id),
+            [
+                {"user_id": user_id, "total_price": 10, "payment_method": "Credit Card"}
+                for _ in range(transactions)
+            ],
+        ).scalars().all()
+        db.execute(
+            insert(Payment),
+            [
+                {
+                    "order_id": order_id,
+                    "amount": 10,
+                    "payment_method": "Credit Card",
+                    "transaction_id": f"{TRANSACTION_PREFIX}{i}",
+                }
+                for i, order_id in enumerate(order_ids)
+            ],
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+class StandInProvider:
+    """
+    Sends signed webhook deliveries at a fixed event rate, like a provider
+    settling a day's payments.
+    """
+
+    def __init__(self, client, secret, rate, duration, transactions, events_per_delivery, seed=0):
+        self.client = client
+        self.secret = secret.encode("utf-8")
+        self.rate = rate
+        self.duration = duration
+        self.transactions = transactions
+        self.events_per_delivery = events_per_delivery
+        self.random = random.Random(seed)
+        self.sent = 0
+        self.accepted = 0
+        self.statuses: Counter = Counter()
+        self.ack_latencies: List[float] = []
+
+    def _delivery(self, now: datetime) -> bytes:
+        statuses = (PaymentStatus.SUCCESSFUL, PaymentStatus.SUCCESSFUL, PaymentStatus.FAILED)
+        return json.dumps({"events": [
+            {
+                "transaction_id": f"{TRANSACTION_PREFIX}{self.random.randrange(self.transactions)}",
+                "status": self.random.choice(statuses).value,
+                "occurred_at": (now + timedelta(microseconds=i)).isoformat(),
+            }
+            for i in range(self.events_per_delivery)
+        ]}).encode()
+
+    async def _send(self, body: bytes, due: float) -> None:
+        signature = hmac.new(self.secret, body, hashlib.sha256).hexdigest()
+        try:
+            response = await self.client.post(
+                WEBHOOK_PATH,
+                content=body,
+                headers={"content-type": "application/json", "x-webhook-signature": signature},
+            )
+            status = response.status_code
+        except httpx.TransportError:
+            status = 0
+        self.ack_latencies.append(time.perf_counter() - due)
+        self.statuses[status] += 1
+        if status == 202:
+            self.accepted += self.events_per_delivery
+
+    async def run(self) -> None:
+        interval = self.events_per_delivery / self.rate
+        start = time.perf_counter()
+        deadline = start + self.duration
+        due = start
+        sends = []
+        while due < deadline:
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            sends.append(asyncio.create_task(self._send(self._delivery(datetime.now(timezone.utc)), due)))
+            self.sent += self.events_per_delivery
+            due += interval
+        self.elapsed = time.perf_counter() - start
+        await asyncio.gather(*sends)
+
+
+def percentile_us(latencies: List[float], fraction: float) -> float:
+    return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1e6, 1) if latencies else 0
+
+
+async def send_deliveries(args, base_url: str, secret: str, transport=None) -> StandInProvider:
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    async with httpx.AsyncClient(base_url=base_url, transport=transport, limits=limits, timeout=30.0) as client:
+        provider = StandInProvider(
+            client, secret, args.rate, args.duration, args.transactions, args.events_per_delivery
+        )
+        await provider.run()
+    return provider
+
+
+def acknowledgements(provider: StandInProvider, rate: int) -> Dict[str, object]:
+    latencies = sorted(provider.ack_latencies)
+    return {
+        "target_rate": rate,
+        "achieved_rate": round(provider.sent / provider.elapsed, 1),
+        "events_sent": provider.sent,
+        "events_accepted": provider.accepted,
+        "responses": {str(status): count for status, count in sorted(provider.statuses.items())},
+        "ack_p50_us": percentile_us(latencies, 0.50),
+        "ack_p99_us": percentile_us(latencies, 0.99),
+        "ack_max_us": percentile_us(latencies, 1.0),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rate", type=int, default=10000, help="Events per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to send for")
+    parser.add_argument("--transactions", type=int, default=50000, help="Distinct transaction IDs")
+    parser.add_argument("--events-per-delivery", type=int, default=100)
+    parser.add_argument("--connections", type=int, default=100, help="Concurrent deliveries with --url")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--flush-interval", type=float, default=0.25)
+    parser.add_argument("--apply-latency", type=float, default=20.0,
+                        help="Simulated milliseconds per batch when not using --database")
+    parser.add_argument("--database", action="store_true",
+                        help="Apply batches against the configured database")
+    parser.add_argument("--url", help="Send to a running server instead, e.g. http://127.0.0.1:8000")
+    parser.add_argument("--secret", default=os.environ.get("PAYMENT_WEBHOOK_SECRET"),
+                        help="The server's PAYMENT_WEBHOOK_SECRET, with --url")
+    args = parser.parse_args()
+
+    if args.database:
+        seed_payments(args.transactions)
+    if args.url:
+        if not args.secret:
+            parser.error("--url needs --secret or PAYMENT_WEBHOOK_SECRET")
+        provider = asyncio.run(send_deliveries(args, args.url, args.secret))
+        print(json.dumps(acknowledgements(provider, args.rate), indent=2))
+        return
+
+    batch_times: List[float] = []
+    batch_sizes: List[int] = []
+
+    if args.database:
+        apply = apply_batch_in_new_session
+    else:
+        def apply(updates: Dict[str, PaymentStatus]) -> int:
+            time.sleep(args.apply_latency / 1000)
+            return len(updates)
+
+    def timed_apply(updates: Dict[str, PaymentStatus]) -> int:
+        before = time.perf_counter()
+        try:
+            return apply(updates)
+        finally:
+            batch_times.append(time.perf_counter() - before)
+            batch_sizes.append(len(updates))
+
+    from core.config import settings
+
+    #  Read when `main` builds the app: the provider is one client sending
+    #  far more than a client's rate limit.
+    settings.PAYMENT_WEBHOOK_SECRET = BENCH_WEBHOOK_SECRET
+    settings.RATE_LIMIT_ENABLED = False
+    settings.CONCURRENCY_LIMIT_ENABLED = False
+    from main import app
+    from services.payment_webhook_service import payment_webhook_buffer as buffer
+
+    buffer.apply_batch = timed_apply
+    buffer.batch_size = args.batch_size
+    buffer.flush_interval = args.flush_interval
+    buffer.max_pending = 10 * args.transactions
+    #  The ASGI transport does not run the app's lifespan, which starts it.
+    buffer.start()
+    provider = asyncio.run(send_deliveries(
+        args, "http://bench", BENCH_WEBHOOK_SECRET, httpx.ASGITransport(app=app)
+    ))
+    drain_start = time.perf_counter()
+    buffer.stop(timeout=None)
+    drain_time = time.perf_counter() - drain_start
+
+    result = acknowledgements(provider, args.rate)
+    result.update({
+        "events_coalesced": buffer.events_coalesced,
+        "batches": len(batch_sizes),
+        "mean_batch_size": round(statistics.mean(batch_sizes), 1) if batch_sizes else 0,
+        "payments_updated": buffer.payments_updated,
+        "failed_batches": buffer.failed_batches,
+        "events_dropped": buffer.events_dropped,
+        "apply_p50_ms": round(statistics.median(batch_times) * 1000, 2) if batch_times else 0,
+        "apply_max_ms": round(max(batch_times) * 1000, 2) if batch_times else 0,
+        "drain_seconds": round(drain_time, 3),
+    })
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
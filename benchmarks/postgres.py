@@ -0,0 +1,88 @@
+"""
+Disposable PostgreSQL server for benchmarks.
+
+Creates a throwaway cluster with `initdb` in a temporary directory, starts it
+on a free port with durability turned off (benchmarks measure the
+application, not fsync), and removes it afterwards.  The PostgreSQL server
+binaries (`initdb`, `pg_ctl`) must be on PATH, or set `PG_BIN`.
+
+If `BENCH_DATABASE_URL` is set, that database is used instead and nothing is
+started or removed.
+"""
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, Iterator
+from urllib.parse import urlparse
+
+
+def _pg_binary(name: str) -> str:
+    directory = os.environ.get("PG_BIN")
+    path = os.path.join(directory, name) if directory else shutil.which(name)
+    if not path or not os.path.exists(path):
+        raise RuntimeError(f"{name} not found; install PostgreSQL, set PG_BIN or BENCH_DATABASE_URL")
+    return path
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def database_env(url: str) -> Dict[str, str]:
+    """
+    Converts a database URL into the `DB_*` settings the application reads.
+    """
+    parsed = urlparse(url)
+    env = {
+        "DB_HOST": parsed.hostname or "localhost",
+        "DB_PORT": str(parsed.port or 5432),
+        "DB_USER": parsed.username or "postgres",
+        "DB_NAME": parsed.path.lstrip("/"),
+    }
+    if parsed.password:
+        env["DB_PASS"] = parsed.password
+    return env
+
+
+@contextmanager
+def disposable_postgres(database: str = "ecommerce_bench") -> Iterator[str]:
+    """
+    Yields the URL of an empty database that exists for the duration of the
+    `with` block.
+    """
+    if os.environ.get("BENCH_DATABASE_URL"):
+        yield os.environ["BENCH_DATABASE_URL"]
+        return
+
+    directory = tempfile.mkdtemp(prefix="ecommerce-bench-pg-")
+    data = os.path.join(directory, "data")
+    port = _free_port()
+    user = "bench"
+    subprocess.run(
+        [_pg_binary("initdb"), "-D", data, "-U", user, "--auth=trust", "--no-sync"],
+        check=True, capture_output=True,
+    )
+    options = (
+        f"-p {port} -k {directory} -c listen_addresses=127.0.0.1 "
+        "-c fsync=off -c synchronous_commit=off -c full_page_writes=off -c max_connections=300"
+    )
+    subprocess.run(
+        [_pg_binary("pg_ctl"), "-D", data, "-o", options, "-l", os.path.join(directory, "log"), "-w", "start"],
+        check=True, capture_output=True,
+    )
+    try:
+        subprocess.run(
+            [_pg_binary("createdb"), "-h", "127.0.0.1", "-p", str(port), "-U", user, database],
+            check=True, capture_output=True,
+        )
+        yield f"postgresql://{user}@127.0.0.1:{port}/{database}"
+    finally:
+        subprocess.run(
+            [_pg_binary("pg_ctl"), "-D", data, "-m", "immediate", "-w", "stop"], capture_output=True
+        )
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,132 @@
+"""
+Benchmark for the wishlist price drop pipeline (`services.price_drop_service`).
+
+Runs against the configured database, loaded by `benchmarks.datagen`.  The
+`--changes` most wishlisted products are repriced 10% lower in batches of
+`--reprice-batch`, the queued drops are fanned out to alerts, and the digests
+are collected and handed to a stand-in sender that waits `--send-latency`
+milliseconds per email.  Prices are restored afterwards and the pipeline's
+tables emptied, so the benchmark can be rerun on the same data.
+
+For about 10M wishlist rows (the request's target; Zipfian popularity makes
+the most wishlisted 100k products cover most of them):
+
+    python -m benchmarks.datagen --users 2000000 --products 500000 \\
+        --wishlist-share 1 --phases categories users products wishlists --truncate
+    python -m benchmarks.price_drops --changes 100000
+"""
+import argparse
+import asyncio
+import json
+import time
+from decimal import Decimal
+from typing import Dict, List
+
+from sqlalchemy import text
+
+from core.config import settings
+from database.database import SessionLocal
+from services.price_drop_service import (
+    PriceDropDigest,
+    process_price_changes,
+    reprice_products,
+    send_due_digests,
+)
+
+_PIPELINE_TABLES = "product_price_changes, price_drop_alerts, price_drop_digest_log"
+
+
+def most_wishlisted(db, limit: int) -> Dict[int, Decimal]:
+    """
+    Returns the current prices of the `limit` most wishlisted products.
+    """
+    rows = db.execute(text("""
+        SELECT p.id, p.price FROM products p
+        JOIN (
+            SELECT product_id, count(*) AS wishlisted FROM wishlist_products
+            GROUP BY product_id ORDER BY wishlisted DESC LIMIT :limit
+        ) w ON w.product_id = p.id
+    """), {"limit": limit})
+    return {product_id: price for product_id, price in rows}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--changes", type=int, default=100_000, help="Products repriced")
+    parser.add_argument("--reprice-batch", type=int, default=10_000, help="Products per reprice statement")
+    parser.add_argument("--batch-size", type=int, default=settings.PRICE_DROP_BATCH_SIZE,
+                        help="Price changes per fan-out transaction")
+    parser.add_argument("--digest-batch", type=int, default=settings.PRICE_DROP_DIGEST_BATCH_SIZE,
+                        help="Users per digest batch")
+    parser.add_argument("--send-latency", type=float, default=0.0, help="Simulated milliseconds per email")
+    args = parser.parse_args()
+
+    emails = 0
+
+    async def sender(digests: List[PriceDropDigest]) -> List[int]:
+        nonlocal emails
+        semaphore = asyncio.Semaphore(settings.PRICE_DROP_EMAIL_CONCURRENCY)
+
+        async def send_one(digest: PriceDropDigest) -> int:
+            async with semaphore:
+                if args.send_latency:
+                    await asyncio.sleep(args.send_latency / 1000)
+                return digest.user_id
+
+        sent = await asyncio.gather(*(send_one(digest) for digest in digests))
+        emails += len(sent)
+        return sent
+
+    original: Dict[int, Decimal] = {}
+    ids: List[int] = []
+    db = SessionLocal()
+    try:
+        db.execute(text(f"TRUNCATE {_PIPELINE_TABLES}"))
+        db.commit()
+        original = most_wishlisted(db, args.changes)
+        wishlist_rows = db.execute(text("SELECT count(*) FROM wishlist_products")).scalar()
+        ids = sorted(original)
+
+        started = time.perf_counter()
+        queued = 0
+        for start in range(0, len(ids), args.reprice_batch):
+            chunk = ids[start:start + args.reprice_batch]
+            queued += reprice_products(db, {i: (original[i] * Decimal("0.9")).quantize(Decimal("0.01")) for i in chunk})[1]
+        reprice_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        fanned_out = process_price_changes(db, batch_size=args.batch_size)
+        fan_out_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        digests = send_due_digests(db, sender, batch_size=args.digest_batch)
+        digest_seconds = time.perf_counter() - started
+    finally:
+        #  Price rises queue nothing, so restoring leaves the queue empty.
+        db.rollback()
+        for start in range(0, len(ids), args.reprice_batch):
+            reprice_products(db, {i: original[i] for i in ids[start:start + args.reprice_batch]})
+        db.execute(text(f"TRUNCATE {_PIPELINE_TABLES}"))
+        db.commit()
+        db.close()
+
+    print(json.dumps({
+        "products_repriced": len(ids),
+        "wishlist_rows_total": wishlist_rows,
+        "drops_queued": queued,
+        "reprice_seconds": round(reprice_seconds, 2),
+        "reprice_per_second": round(len(ids) / reprice_seconds) if reprice_seconds else None,
+        "alerts": fanned_out["alerts"],
+        "fan_out_seconds": round(fan_out_seconds, 2),
+        "fan_out_changes_per_second": round(fanned_out["changes"] / fan_out_seconds) if fan_out_seconds else None,
+        "fan_out_alerts_per_second": round(fanned_out["alerts"] / fan_out_seconds) if fan_out_seconds else None,
+        "digests_sent": digests["sent"],
+        "emails": emails,
+        "alerts_cleared": digests["cleared"],
+        "digest_seconds": round(digest_seconds, 2),
+        "digests_per_second": round(digests["sent"] / digest_seconds) if digest_seconds else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
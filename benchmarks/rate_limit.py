@@ -0,0 +1,94 @@
+"""
+Benchmark for the rate limiter's per-request overhead.
+
+Drives `RateLimitMiddleware` around a no-op ASGI app with synthetic
+requests and subtracts the cost of calling the no-op app directly.  Cases:
+
+* anonymous: principal from the client IP, default limit;
+* authenticated: principal from a bearer token (verified once, then cached);
+* route_limit: a route with its own limit;
+* rejected: a principal that is over its limit (429 path);
+* shared: the anonymous case against `InMemorySharedStore`.
+
+The target is under 20µs per request for every case.
+
+Usage:
+    SECRET_KEY=bench python -m benchmarks.rate_limit --requests 200000
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+from core.rate_limit import InMemorySharedStore, MemoryStore
+from core.security import create_access_token
+
+LIMITS = {"POST /api/v1/users/": "5/minute", "GET /api/v1/products/": "1000000/second"}
+HUGE = "1000000000/second"
+
+
+async def noop_app(scope, receive, send) -> None:
+    return None
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message) -> None:
+    return None
+
+
+def scope_for(method: str, path: str, client: str, token: str = None) -> Dict:
+    headers = [(b"host", b"testserver"), (b"accept", b"application/json")]
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    return {"type": "http", "method": method, "path": path, "headers": headers, "client": (client, 50000)}
+
+
+async def time_calls(app, scopes: List[Dict]) -> float:
+    start = time.perf_counter()
+    for scope in scopes:
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / len(scopes)
+
+
+def main() -> None:
+    from api.middleware.rate_limit import RateLimitMiddleware
+
+    parser = argparse.ArgumentParser(description="Benchmark rate limiter overhead.")
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--clients", type=int, default=10_000, help="Distinct IPs and users")
+    args = parser.parse_args()
+
+    tokens = [create_access_token(f"user{i}@example.com").token for i in range(min(args.clients, 1000))]
+    cases = {
+        "anonymous": [scope_for("GET", "/api/v1/cart/", f"10.0.{i // 256 % 256}.{i % 256}") for i in range(args.requests)],
+        "authenticated": [scope_for("GET", "/api/v1/cart/", "10.0.0.1", tokens[i % len(tokens)]) for i in range(args.requests)],
+        "route_limit": [scope_for("GET", "/api/v1/products/", f"10.1.{i // 256 % 256}.{i % 256}") for i in range(args.requests)],
+        "rejected": [scope_for("POST", "/api/v1/users/", "10.2.0.1") for _ in range(args.requests)],
+    }
+
+    async def run() -> Dict[str, float]:
+        baseline = await time_calls(noop_app, cases["anonymous"])
+        results = {}
+        for name, scopes in cases.items():
+            middleware = RateLimitMiddleware(noop_app, limits=LIMITS, default=HUGE, store=MemoryStore())
+            await time_calls(middleware, scopes[: len(scopes) // 10])  # Warm the caches and buckets
+            results[name] = await time_calls(middleware, scopes)
+        shared = RateLimitMiddleware(noop_app, limits=LIMITS, default=HUGE, store=InMemorySharedStore())
+        await time_calls(shared, cases["anonymous"][: args.requests // 10])
+        results["shared"] = await time_calls(shared, cases["anonymous"])
+        return {name: round((seconds - baseline) * 1e6, 2) for name, seconds in results.items()}
+
+    overhead = asyncio.run(run())
+    print(json.dumps({
+        "requests": args.requests,
+        "overhead_us_per_request": overhead,
+        "under_20us": all(value < 20 for value in overhead.values()),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
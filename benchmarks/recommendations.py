@@ -0,0 +1,72 @@
+"""
+Benchmark for the "frequently bought together" recommender
+(`services.recommendation_service`).
+
+Runs against the configured database, loaded by `benchmarks.datagen`.
+Builds the co-occurrence counts and top-K arrays from every order into a
+temporary directory, runs an incremental update (which finds no new
+orders, so it measures the fixed cost of loading the counts and
+publishing a version), then times `--lookups` related-product lookups for
+products sampled by popularity (one random order item each), as the API
+serves them.
+
+Usage:
+    python -m benchmarks.datagen --scale 0.1 --truncate
+    python -m benchmarks.recommendations --lookups 100000
+"""
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import text
+
+from database.database import engine
+from services.recommendation_service import RelatedProductIndex, update
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=10, help="Related products per lookup")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        with engine.connect() as conn:
+            started = time.perf_counter()
+            built = update(conn, directory, full=True)
+            build_seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            update(conn, directory)
+            update_seconds = time.perf_counter() - started
+            products = conn.execute(text("""
+                SELECT product_id FROM order_items TABLESAMPLE SYSTEM (1) LIMIT :limit
+            """), {"limit": args.lookups}).scalars().all()
+
+        index = RelatedProductIndex(directory)
+        index.related(0, 1)  # Maps the arrays
+        timings = np.empty(len(products))
+        found = 0
+        for n, product_id in enumerate(products):
+            started = time.perf_counter()
+            related = index.related(product_id, args.limit)
+            timings[n] = time.perf_counter() - started
+            found += bool(related)
+        indptr = np.load(f"{directory}/topk_{index.version}/indptr.npy", mmap_mode="r")
+
+    print(json.dumps({
+        "order_items": built["order_items"],
+        "products_with_neighbors": int(np.count_nonzero(np.diff(indptr))),
+        "neighbors_stored": int(indptr[-1]),
+        "full_build_seconds": round(build_seconds, 2),
+        "empty_update_seconds": round(update_seconds, 2),
+        "lookups": len(products),
+        "lookups_with_results": found,
+        "lookup_p50_us": round(float(np.percentile(timings, 50)) * 1e6, 2) if len(products) else None,
+        "lookup_p99_us": round(float(np.percentile(timings, 99)) * 1e6, 2) if len(products) else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark for settlement reconciliation on synthetic payments.
+
+The payments side is a generator shaped like `scan_payments` output, so the
+benchmark measures the sort and merge-join rather than the database.  A
+small fraction of settlement rows is perturbed (wrong amount, wrong status,
+missing on either side) so the report path is exercised too.
+
+With `--file`, the settlement side is first written to a CSV file in
+block-shuffled order and read back through `read_settlement_file` and the
+external sort, as the reconciliation command does.
+
+Usage:
+    python -m benchmarks.reconciliation --payments 10000000
+    python -m benchmarks.reconciliation --payments 10000000 --file --run-size 1000000
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import resource
+import tempfile
+import time
+from decimal import Decimal
+from typing import Dict, Iterator
+
+from database.models.payment import PaymentStatus
+from services.reconciliation_service import (
+    PaymentRow,
+    SettlementRow,
+    read_settlement_file,
+    reconcile,
+    sort_settlement_rows,
+    write_report,
+)
+
+
+def _transaction_id(i: int) -> str:
+    return f"txn-{i:010d}"
+
+
+def synthetic_payments(count: int, seed: int = 1) -> Iterator[PaymentRow]:
+    rng = random.Random(seed)
+    for i in range(count):
+        yield PaymentRow(
+            _transaction_id(i), i + 1, Decimal(rng.randrange(100, 100000)) / 100, PaymentStatus.SUCCESSFUL
+        )
+
+
+def synthetic_settlement(count: int, error_rate: float, seed: int = 1) -> Iterator[SettlementRow]:
+    #  Same seed as the payments so amounts line up unless perturbed.
+    rng = random.Random(seed)
+    errors = random.Random(seed + 1)
+    for i in range(count):
+        amount = Decimal(rng.randrange(100, 100000)) / 100
+        status = "successful"
+        if errors.random() < error_rate:
+            kind = errors.randrange(3)
+            if kind == 0:
+                amount += Decimal("0.01")
+            elif kind == 1:
+                status = "refunded"
+            else:
+                continue  # Missing from the settlement file
+        yield SettlementRow(_transaction_id(i), str(amount), status)
+    #  A few transactions the provider knows about and we don't.
+    for i in range(int(count * error_rate / 3)):
+        yield SettlementRow(_transaction_id(count + i), "1.00", "successful")
+
+
+def write_block_shuffled_csv(rows: Iterator[SettlementRow], path: str, block: int = 100000) -> None:
+    rng = random.Random(0)
+    with open(path, "w", newline="") as settlement_file:
+        writer = csv.writer(settlement_file)
+        writer.writerow(["transaction_id", "amount", "status"])
+        pending = []
+        for row in rows:
+            pending.append(row)
+            if len(pending) >= block:
+                rng.shuffle(pending)
+                writer.writerows(row[:3] for row in pending)
+                pending = []
+        rng.shuffle(pending)
+        writer.writerows(row[:3] for row in pending)
+
+
+class _NullWriter(io.TextIOBase):
+    def write(self, text: str) -> int:
+        return len(text)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark settlement reconciliation.")
+    parser.add_argument("--payments", type=int, default=10_000_000)
+    parser.add_argument("--error-rate", type=float, default=0.001)
+    parser.add_argument("--file", action="store_true", help="Go through a shuffled CSV and the external sort")
+    parser.add_argument("--run-size", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    result: Dict[str, object] = {"payments": args.payments, "error_rate": args.error_rate}
+    with tempfile.TemporaryDirectory() as directory:
+        settlement = synthetic_settlement(args.payments, args.error_rate)
+        if args.file:
+            path = os.path.join(directory, "settlement.csv")
+            start = time.perf_counter()
+            write_block_shuffled_csv(settlement, path)
+            result["write_seconds"] = round(time.perf_counter() - start, 2)
+            result["file_bytes"] = os.path.getsize(path)
+            settlement_file = open(path, newline="")
+            settlement = sort_settlement_rows(
+                read_settlement_file(settlement_file), run_size=args.run_size, directory=directory
+            )
+        start = time.perf_counter()
+        counts = write_report(reconcile(settlement, synthetic_payments(args.payments)), _NullWriter())
+        elapsed = time.perf_counter() - start
+        if args.file:
+            settlement_file.close()
+
+    result.update(
+        {
+            "reconcile_seconds": round(elapsed, 2),
+            "payments_per_second": round(args.payments / elapsed),
+            "mismatches": counts,
+            #  ru_maxrss is in KiB on Linux.
+            "peak_rss_mib": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
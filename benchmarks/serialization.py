@@ -0,0 +1,92 @@
+"""
+Micro-benchmark for product list serialization.
+
+Compares the per-item cost of turning a page of products into a JSON body:
+
+* orm_pydantic: ORM `Product` objects validated into `List[ProductRead]`
+  (`from_attributes`), dumped in JSON mode and encoded by `JSONResponse`,
+  which is what FastAPI does for a `response_model` route;
+* orm_jsonable_encoder: the same objects through `jsonable_encoder`;
+* rows_orjson: Core result tuples zipped into dicts and encoded by
+  `FastJSONResponse`, the path `GET /products/` uses.
+
+Database time is not included; rows are built in memory.
+
+Usage:
+    SECRET_KEY=bench python -m benchmarks.serialization --sizes 10 100 1000
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Callable, Dict, List
+
+KEYS = ("id", "name", "description", "price", "stock_quantity", "weight", "category_id",
+        "is_active", "created_at", "updated_at")
+
+
+def make_rows(count: int) -> List[tuple]:
+    created = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+    return [
+        (i, f"Product {i}", f"Description of product {i}", Decimal("19.99") + i, 100 + i,
+         Decimal("0.750"), 1 + i % 50, True, created, None)
+        for i in range(1, count + 1)
+    ]
+
+
+def cases(rows: List[tuple]) -> Dict[str, Callable[[], bytes]]:
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+
+    from core.responses import FastJSONResponse
+    from database.models.product import Product
+    from schemas.product import ProductRead
+
+    adapter = TypeAdapter(List[ProductRead])
+    objects = [Product(**dict(zip(KEYS, row))) for row in rows]
+
+    def orm_pydantic() -> bytes:
+        validated = adapter.validate_python(objects, from_attributes=True)
+        return JSONResponse(adapter.dump_python(validated, mode="json")).body
+
+    def orm_jsonable_encoder() -> bytes:
+        validated = adapter.validate_python(objects, from_attributes=True)
+        return JSONResponse(jsonable_encoder(validated)).body
+
+    def rows_orjson() -> bytes:
+        return FastJSONResponse([dict(zip(KEYS, row)) for row in rows]).body
+
+    return {
+        "orm_pydantic": orm_pydantic,
+        "orm_jsonable_encoder": orm_jsonable_encoder,
+        "rows_orjson": rows_orjson,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark product list serialization.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        page = cases(make_rows(size))
+        #  Both paths must produce the same document.
+        reference = json.loads(page["orm_pydantic"]())
+        assert json.loads(page["rows_orjson"]()) == reference, "rows_orjson output differs"
+        results[size] = {}
+        for name, function in page.items():
+            timer = timeit.Timer(function)
+            number, _ = timer.autorange()
+            best = min(timer.repeat(repeat=5, number=number)) / number
+            results[size][name] = {
+                "us_per_item": round(best / size * 1e6, 3),
+                "bytes": len(function()),
+            }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark for shipping quotes served from the in-memory shipping registry.
+
+Builds a `ShippingSnapshot` from synthetic methods and zone rules (no
+database involved) and measures how many cart quotes per second it serves
+for random destinations and weights.
+
+Usage:
+    python -m benchmarks.shipping_quotes --methods 8 --rules-per-method 2000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from services.shipping_service import ShippingMethodEntry, ShippingRateRule, ShippingSnapshot
+
+COUNTRIES = ["US", "GB", "DE", "FR", "NG", "CA"]
+
+
+def build_snapshot(methods: int, rules_per_method: int, seed: int = 0) -> ShippingSnapshot:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    entries = [
+        ShippingMethodEntry(
+            id=i + 1,
+            name=f"Method {i + 1}",
+            description=None,
+            cost=Decimal(rng.randrange(300, 3000)) / 100,
+            is_active=True,
+            created_at=now,
+            updated_at=None,
+        )
+        for i in range(methods)
+    ]
+    rules = []
+    #  Half the methods are zoned, half are flat-rate.
+    for entry in entries[: methods // 2]:
+        for country in COUNTRIES:
+            rules.append(ShippingRateRule(entry.id, country, "", Decimal("9.99"), Decimal("1.50"), None))
+        for _ in range(rules_per_method):
+            prefix = "".join(rng.choice("0123456789") for _ in range(rng.randint(1, 3)))
+            rules.append(
+                ShippingRateRule(
+                    entry.id,
+                    rng.choice(COUNTRIES),
+                    prefix,
+                    Decimal(rng.randrange(300, 2000)) / 100,
+                    Decimal(rng.randrange(0, 300)) / 100,
+                    Decimal(rng.choice([5, 20, 30])),
+                )
+            )
+    return ShippingSnapshot(entries, rules)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark shipping quotes.")
+    parser.add_argument("--methods", type=int, default=8)
+    parser.add_argument("--rules-per-method", type=int, default=2000)
+    parser.add_argument("--quotes", type=int, default=200000)
+    args = parser.parse_args()
+
+    snapshot = build_snapshot(args.methods, args.rules_per_method)
+    rng = random.Random(1)
+    destinations = [
+        (
+            Decimal(rng.randrange(0, 4000)) / 100,
+            rng.choice(COUNTRIES),
+            "".join(rng.choice("0123456789") for _ in range(5)),
+        )
+        for _ in range(10000)
+    ]
+
+    start = time.perf_counter()
+    returned = 0
+    for i in range(args.quotes):
+        weight, country, postal_code = destinations[i % len(destinations)]
+        returned += len(snapshot.quote(weight, country, postal_code))
+    elapsed = time.perf_counter() - start
+
+    print(
+        json.dumps(
+            {
+                "methods": args.methods,
+                "rules": (args.methods // 2) * (args.rules_per_method + len(COUNTRIES)),
+                "quotes_per_second": round(args.quotes / elapsed),
+                "us_per_quote": round(elapsed / args.quotes * 1e6, 2),
+                "mean_methods_per_quote": round(returned / args.quotes, 2),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark for worker startup.
+
+Reports, for each of `--workers` fresh processes:
+
+* cold import time of `main` (a new interpreter per sample), and
+* time-to-first-request: from spawning a uvicorn worker until it answers
+  `--path` with a 2xx.  Workers are started together, as gunicorn does, so
+  contention on the database during warm-up shows up in the numbers.
+
+Usage:
+    python -m benchmarks.startup --workers 4
+    python -m benchmarks.startup --workers 4 --path /api/v1/shipping/ --importtime
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_PROBE = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+
+def cold_import_time() -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE], cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def slowest_imports(limit: int = 15) -> List[Dict[str, object]]:
+    """
+    Returns the modules with the largest cumulative import time, from
+    `python -X importtime`.
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, check=True, capture_output=True, text=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        #  "import time:   self_us |   cumulative_us | module", plus a header line.
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        rows.append({"module": fields[2].strip(), "cumulative_ms": int(fields[1]) / 1000})
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:limit]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def responds(url: str) -> bool:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return 200 <= response.status < 300
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        return False
+
+
+def time_to_first_request(workers: int, path: str, timeout: float) -> List[float]:
+    ports = [free_port() for _ in range(workers)]
+    started: Dict[int, float] = {}
+    ready: Dict[int, float] = {}
+    processes = []
+    try:
+        for port in ports:
+            started[port] = time.perf_counter()
+            processes.append(
+                subprocess.Popen(
+                    [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+                     "--port", str(port), "--log-level", "warning"],
+                    cwd=ROOT,
+                )
+            )
+        deadline = time.perf_counter() + timeout
+        #  Poll every worker that has not answered yet, so a worker that is
+        #  ready early is not kept waiting behind a slower one.
+        while len(ready) < workers:
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"{workers - len(ready)} workers did not answer {path} in {timeout}s")
+            for port in ports:
+                if port not in ready and responds(f"http://127.0.0.1:{port}{path}"):
+                    ready[port] = time.perf_counter()
+            time.sleep(0.005)
+        return [ready[port] - started[port] for port in ports]
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "samples_ms": [round(sample * 1000, 1) for sample in samples],
+        "median_ms": round(statistics.median(samples) * 1000, 1),
+        "max_ms": round(max(samples) * 1000, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark worker startup.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--path", default="/", help="Path of the first request")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--importtime", action="store_true", help="Also list the slowest imports")
+    args = parser.parse_args()
+
+    result: Dict[str, object] = {
+        "cold_import": summarize([cold_import_time() for _ in range(args.workers)]),
+        "time_to_first_request": summarize(time_to_first_request(args.workers, args.path, args.timeout)),
+    }
+    if args.importtime:
+        result["slowest_imports"] = slowest_imports()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
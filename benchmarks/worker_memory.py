@@ -0,0 +1,130 @@
+"""
+Benchmark for worker memory under the production server (`serve.py`).
+
+Starts `python serve.py` with `--workers` workers in each configuration:
+
+* no_preload: every worker imports the app itself (the old setup, like
+  `uvicorn --workers`);
+* preload: the master imports the app and the workers share it;
+* preload_gc_freeze: as preload, with the collector kept off the shared
+  heap (`SERVER_GC_FREEZE`).
+
+Once every worker answers, `--requests` requests are sent to each of
+`--path` so the workers allocate and collect as they do in service, then
+the memory of the master and of every worker is read from /proc.  PSS
+divides each shared page among the processes sharing it, so the PSS total
+is what the server really occupies; USS is what each extra worker costs.
+
+Usage:
+    python -m benchmarks.worker_memory --workers 8
+    python -m benchmarks.worker_memory --workers 8 --path / --path /api/v1/products/
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, List
+
+from benchmarks.startup import ROOT, free_port, responds
+from core.metrics import process_memory
+
+CONFIGURATIONS = {
+    "no_preload": {"SERVER_PRELOAD": "false", "SERVER_GC_FREEZE": "false"},
+    "preload": {"SERVER_PRELOAD": "true", "SERVER_GC_FREEZE": "false"},
+    "preload_gc_freeze": {"SERVER_PRELOAD": "true", "SERVER_GC_FREEZE": "true"},
+}
+
+
+def children(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as file:
+            return [int(child) for child in file.read().split()]
+    except OSError:
+        pass
+    #  Kernels without CONFIG_PROC_CHILDREN: scan every process's parent.
+    found = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as file:
+                    #  "pid (comm) state ppid ...", where comm may contain spaces.
+                    if int(file.read().rsplit(")", 1)[1].split()[1]) == pid:
+                        found.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    return found
+
+
+def mib(size: float) -> float:
+    return round(size / 2 ** 20, 1)
+
+
+def measure(environment: Dict[str, str], workers: int, paths: List[str], requests: int, timeout: float) -> Dict[str, object]:
+    port = free_port()
+    env = {
+        **os.environ,
+        **environment,
+        "SERVER_HOST": "127.0.0.1",
+        "SERVER_PORT": str(port),
+        "SERVER_WORKERS": str(workers),
+    }
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "serve.py"], cwd=ROOT, env=env)
+    try:
+        deadline = started + timeout
+        while len(children(server.pid)) < workers or not responds(f"http://127.0.0.1:{port}/"):
+            if time.perf_counter() > deadline or server.poll() is not None:
+                raise TimeoutError(f"The server did not start {workers} workers in {timeout}s")
+            time.sleep(0.05)
+        ready_seconds = time.perf_counter() - started
+        for path in paths:
+            for _ in range(requests):
+                try:
+                    urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=10).read()
+                except Exception:
+                    pass
+        #  Lets the workers finish their startup (pool warm-up, listeners).
+        time.sleep(2)
+        per_worker = [process_memory(pid) for pid in children(server.pid)]
+        master = process_memory(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+
+    def mean(name: str) -> float:
+        return mib(statistics.mean(memory.get(name, 0) for memory in per_worker))
+
+    return {
+        "ready_seconds": round(ready_seconds, 2),
+        "master_rss_mib": mib(master.get("rss", 0)),
+        "worker_rss_mib": mean("rss"),
+        "worker_pss_mib": mean("pss"),
+        "worker_uss_mib": mean("uss"),
+        "worker_shared_mib": mean("shared"),
+        "total_pss_mib": mib(master.get("pss", 0) + sum(memory.get("pss", 0) for memory in per_worker)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--path", action="append", help="Path requested after startup (repeatable)")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per path")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--only", choices=sorted(CONFIGURATIONS), action="append")
+    args = parser.parse_args()
+
+    paths = args.path or ["/"]
+    results = {
+        name: measure(CONFIGURATIONS[name], args.workers, paths, args.requests, args.timeout)
+        for name in (args.only or CONFIGURATIONS)
+    }
+    print(json.dumps({"workers": args.workers, "paths": paths, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
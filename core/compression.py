@@ -0,0 +1,144 @@
+"""
+Response body codecs and `Accept-Encoding` negotiation.
+
+gzip is always available.  brotli ("br") and zstd are used when the
+`brotli` and `zstandard` packages are installed; without them clients that
+ask for those encodings get gzip.
+"""
+import gzip
+import zlib
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # Optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency
+    zstandard = None
+
+#  Content types worth compressing; images, archives and the like are
+#  already compressed.
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/problem+json",
+    "image/svg+xml",
+)
+
+
+class _GzipStream:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        #  Sync flush, so every chunk of a streamed response reaches the client.
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdStream:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class Codec(NamedTuple):
+    """
+    A content encoding.  `level` is used per response; `cached_level`, for
+    payloads compressed once and served many times, trades more CPU for
+    fewer bytes.
+    """
+    name: str
+    compress: Callable[[bytes, int], bytes]
+    stream: Callable[[int], object]
+    level: int
+    cached_level: int
+
+
+def available_codecs(gzip_level: int = 6, brotli_quality: int = 4, zstd_level: int = 3) -> Dict[str, Codec]:
+    """
+    The installed codecs, in order of preference (smaller output first),
+    with the given per-response levels.
+    """
+    codecs = {}
+    if zstandard is not None:
+        codecs["zstd"] = Codec(
+            "zstd", lambda data, level: zstandard.ZstdCompressor(level=level).compress(data),
+            _ZstdStream, zstd_level, 12,
+        )
+    if brotli is not None:
+        codecs["br"] = Codec(
+            "br", lambda data, level: brotli.compress(data, quality=level),
+            _BrotliStream, brotli_quality, 9,
+        )
+    codecs["gzip"] = Codec(
+        "gzip", lambda data, level: gzip.compress(data, compresslevel=level, mtime=0),
+        _GzipStream, gzip_level, 9,
+    )
+    return codecs
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """
+    Parses an `Accept-Encoding` header into {encoding: q-value}.
+    """
+    accepted = {}
+    for part in header.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+def negotiate(header: str, codecs: Dict[str, Codec]) -> Optional[str]:
+    """
+    Picks the encoding to use for a request: the highest q-value among the
+    available codecs, ties going to the earlier (preferred) codec.  Returns
+    None when the client accepts none of them.
+    """
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    best: Tuple[float, Optional[str]] = (0.0, None)
+    for name in codecs:
+        quality = accepted.get(name, wildcard)
+        if quality > best[0]:
+            best = (quality, name)
+    return best[1]
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.lower().startswith(COMPRESSIBLE_TYPES)
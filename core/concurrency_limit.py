@@ -0,0 +1,121 @@
+"""
+Adaptive concurrency limiting.
+
+Past saturation, more requests in flight only make every request slower:
+they wait for the thread pool and for a database connection until they
+time out, and throughput collapses.  `ConcurrencyLimiter` caps the requests
+in flight in this process and lets requests over the cap fail at once, so
+the ones admitted still finish in time.
+
+The cap is not configured but measured, with the gradient algorithm of
+Netflix's concurrency-limits library.  Latency is averaged over windows of
+at least `window` seconds and `min_samples` requests, and compared with a
+slow moving average of the window averages (the baseline), which is held
+while requests are being refused:
+
+* While latency stays within `tolerance` times the baseline, the limit
+  grows by a fraction of its square root per window, probing for capacity.
+* Once latency grows past that, the limit shrinks in proportion to the
+  excess, since the extra requests are only queueing.
+* A limit that was not used (fewer than half its requests in flight) is
+  left alone, so a quiet period does not inflate it.
+
+Requests have a priority, and each priority may only fill its share of the
+limit.  Low priority requests are refused first, leaving the rest of the
+limit to higher priorities however many low priority requests arrive.
+"""
+import math
+import time
+from typing import Dict, Optional
+
+#  Windows over which the baseline latency moves towards the current one.
+BASELINE_WINDOWS = 60
+PRIORITIES = ("critical", "normal", "low")
+
+
+class ConcurrencyLimiter:
+    """
+    Limit on requests in flight, adapted to their latency.
+
+    The limiter is only used from the event loop thread, and neither
+    `try_acquire` nor `release` awaits, so no locks are needed.
+    """
+
+    def __init__(
+        self,
+        initial: int = 20,
+        minimum: int = 4,
+        maximum: int = 200,
+        tolerance: float = 1.5,
+        window: float = 0.25,
+        min_samples: int = 10,
+        smoothing: float = 0.2,
+        shares: Optional[Dict[str, float]] = None,
+        clock=time.monotonic,
+    ):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.tolerance = tolerance
+        self.window = window
+        self.min_samples = min_samples
+        self.smoothing = smoothing
+        self.shares = shares or {"critical": 1.0, "normal": 0.9, "low": 0.6}
+        self.clock = clock
+        self.in_flight = 0
+        self.baseline: Optional[float] = None
+        self._window_start = clock()
+        self._window_total = 0.0
+        self._window_count = 0
+        self._window_peak = 0
+        self._window_shed = False
+
+    def try_acquire(self, priority: str = "normal") -> bool:
+        """
+        Admits a request if its priority's share of the limit has room.
+        Every admitted request must be released.
+        """
+        if self.in_flight >= max(1, int(self.limit * self.shares.get(priority, 1.0))):
+            self._window_shed = True
+            return False
+        self.in_flight += 1
+        if self.in_flight > self._window_peak:
+            self._window_peak = self.in_flight
+        return True
+
+    def release(self, latency: float) -> None:
+        """
+        Records an admitted request's latency, in seconds, and updates the
+        limit when a window is complete.
+        """
+        self.in_flight -= 1
+        self._window_total += latency
+        self._window_count += 1
+        now = self.clock()
+        if self._window_count < self.min_samples or now - self._window_start < self.window:
+            return
+        self._update(self._window_total / self._window_count, self._window_peak, self._window_shed)
+        self._window_start = now
+        self._window_total = 0.0
+        self._window_count = 0
+        self._window_peak = self.in_flight
+        self._window_shed = False
+
+    def _update(self, latency: float, peak: int, shed: bool) -> None:
+        if self.baseline is None:
+            self.baseline = latency
+        elif not shed:
+            #  Held while requests are refused: under sustained overload the
+            #  baseline would otherwise rise with the queueing it is there to
+            #  detect, and the limit with it.
+            self.baseline += (latency - self.baseline) / BASELINE_WINDOWS
+        if self.baseline > 2 * latency:
+            #  Latency dropped for good (a slow dependency recovered); catch
+            #  up faster than the moving average would.
+            self.baseline *= 0.95
+        if peak < self.limit / 2:
+            return
+        gradient = max(0.5, min(1.0, self.tolerance * self.baseline / latency)) if latency > 0 else 1.0
+        target = self.limit * gradient + math.sqrt(self.limit)
+        limit = self.limit * (1 - self.smoothing) + target * self.smoothing
+        self.limit = float(min(self.maximum, max(self.minimum, limit)))
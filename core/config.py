@@ -1,6 +1,6 @@
 from pydantic import HttpUrl, root_validator
 from pydantic_settings import BaseSettings
-from typing import List, Union, Optional
+from typing import Dict, List, Union, Optional
 
 
 class Settings(BaseSettings):
@@ -19,6 +19,12 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"  # Default JWT algorithm
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30  # Default access token expiration time (in minutes)
 
+    #  Argon2 parameters for new password hashes; `python -m core.password_calibration`
+    #  measures candidates on the host.  Changing them rehashes passwords on login.
+    PASSWORD_ARGON2_TIME_COST: int = 4  # Passes over memory
+    PASSWORD_ARGON2_MEMORY_COST: int = 102400  # KiB per hash
+    PASSWORD_ARGON2_PARALLELISM: int = 4  # Lanes (threads) per hash
+
     # Database settings
     DB_HOST: str = "localhost"  # Default database host
     DB_PORT: Union[str, int] = 5432  # Default database port, can be a string or int
@@ -26,6 +32,27 @@ class Settings(BaseSettings):
     DB_PASS: Optional[str] = None  # Default database password (optional, can be None)
     DB_NAME: str = "ecommerce"  # Default database name
 
+    # Connection pool settings (per worker process)
+    DB_POOL_SIZE: int = 5  # Connections kept open in the pool
+    DB_MAX_OVERFLOW: int = 10  # Extra connections allowed under load
+    DB_POOL_TIMEOUT: float = 30  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True  # Check connections before handing them out
+    DB_POOL_WARMUP: int = 2  # Connections opened at startup, before the first request
+    DB_CONNECT_TIMEOUT: int = 5  # Seconds to wait for the server when connecting
+
+    # Per-request SQL instrumentation
+    SQL_INSTRUMENTATION_ENABLED: bool = True  # Count and time queries per request
+    SQL_SERVER_TIMING_HEADER: bool = True  # Expose the numbers in a Server-Timing header
+    SQL_QUERY_BUDGET: int = 20  # Queries per request before a request is flagged
+    #  Per-route overrides of SQL_QUERY_BUDGET, keyed by "METHOD /path/template",
+    #  e.g. {"GET /api/v1/cart/": 3}.
+    SQL_QUERY_BUDGETS: Dict[str, int] = {}
+
+    # Prometheus metrics, served at /metrics.  For several worker processes,
+    # also set the PROMETHEUS_MULTIPROC_DIR environment variable.
+    METRICS_ENABLED: bool = True
+
     #  The database URL is constructed from the other DB settings.
     SQLALCHEMY_DATABASE_URL: str
     #  The @root_validator decorator is used to validate the entire model
@@ -89,6 +116,125 @@ class Settings(BaseSettings):
     #  in email templates, etc.
     BASE_URL: HttpUrl = "http://localhost:8000"
 
+    #  Payment webhook ingestion.  Events are acknowledged immediately and
+    #  applied to the database in batches by a background flusher.
+    PAYMENT_WEBHOOK_SECRET: Optional[str] = None  # HMAC-SHA256 key; the webhook answers 503 until it is set
+    PAYMENT_WEBHOOK_BATCH_SIZE: int = 1000  # Max distinct transactions per bulk UPDATE
+    PAYMENT_WEBHOOK_FLUSH_INTERVAL: float = 0.25  # Seconds between flushes of a partial batch
+    PAYMENT_WEBHOOK_MAX_PENDING: int = 100000  # Deliveries are rejected with 503 beyond this
+    PAYMENT_WEBHOOK_MAX_ATTEMPTS: int = 10  # Failures of a transaction's update, alone, before it is dropped and logged
+
+    #  Rate limiting (token buckets) per route and per principal: the user of
+    #  a valid bearer token, else the client IP.  Limits are "N/period" with
+    #  period second, minute, hour or day; N is also the burst size.
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_DEFAULT: Optional[str] = "600/minute"  # Shared by routes not in RATE_LIMITS; None disables
+    #  Per-route limits, keyed by "METHOD /path/template" like SQL_QUERY_BUDGETS.
+    RATE_LIMITS: Dict[str, str] = {
+        "POST /api/v1/users/": "5/minute",  # Each signup runs an argon2 hash
+        "POST /api/v1/login": "10/minute",
+        "GET /api/v1/products/": "120/minute",
+    }
+    RATE_LIMIT_STORE: str = "memory"  # "memory", "shared-memory" or "package.module:factory"
+
+    #  Adaptive concurrency limit per worker; see core/concurrency_limit.py.
+    #  Requests over the limit get a 503 instead of queueing.
+    CONCURRENCY_LIMIT_ENABLED: bool = True
+    CONCURRENCY_LIMIT_INITIAL: int = 20  # Requests in flight allowed before the limit has adapted
+    CONCURRENCY_LIMIT_MIN: int = 4
+    CONCURRENCY_LIMIT_MAX: int = 200
+    CONCURRENCY_LIMIT_TOLERANCE: float = 1.5  # Latency over the baseline tolerated before the limit shrinks
+    CONCURRENCY_LIMIT_WINDOW: float = 0.25  # Seconds of latency samples per limit update
+    CONCURRENCY_LIMIT_RETRY_AFTER: int = 1  # Retry-After seconds of refused requests
+    #  Share of the limit requests of each priority may fill; lower priorities are refused first.
+    CONCURRENCY_LIMIT_SHARES: Dict[str, float] = {"critical": 1.0, "normal": 0.9, "low": 0.6}
+    #  Route priorities, keyed by "METHOD /path/template" like RATE_LIMITS; other routes are "normal".
+    CONCURRENCY_LIMIT_PRIORITIES: Dict[str, str] = {
+        #  Not the payment webhook: its signature is checked only once it is admitted, so
+        #  forged calls would compete as critical.  Providers retry refused deliveries.
+        "GET /api/v1/shipping/quote": "critical",  # Checkout
+        "GET /api/v1/products/": "low",
+        "GET /api/v1/products/{product_id}": "low",
+        "GET /api/v1/products/{product_id}/related": "low",
+        "GET /api/v1/wishlist/membership": "low",
+    }
+
+    #  Response compression.  zstd and br are offered when the zstandard and
+    #  brotli packages are installed; gzip always is.
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # Bytes; smaller bodies are sent uncompressed
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    #  Product list pages are cached per worker with their compressed
+    #  variants, and dropped on any product write in that worker.
+    PRODUCT_LIST_CACHE_SIZE: int = 1024  # Pages
+    PRODUCT_LIST_CACHE_TTL: float = 30.0  # Seconds; bounds staleness after writes in other workers
+
+    #  Each user's wishlisted product IDs are cached per worker as a bitmap
+    #  for "in wishlist" badges, and dropped on wishlist writes in that worker.
+    WISHLIST_CACHE_SIZE: int = 50000  # Users
+    WISHLIST_CACHE_TTL: float = 60.0  # Seconds; bounds staleness after writes in other workers
+
+    #  Wishlist price drop notifications; see services/price_drop_service.py.
+    PRICE_DROP_BATCH_SIZE: int = 1000  # Queued price changes fanned out per transaction
+    PRICE_DROP_DIGEST_WINDOW: float = 86400.0  # Seconds; at most one digest email per user per window
+    PRICE_DROP_DIGEST_BATCH_SIZE: int = 500  # Users per digest batch
+    PRICE_DROP_EMAIL_CONCURRENCY: int = 10  # Digest emails sent at once
+
+    #  `POST /batch`: several GETs in one request, authenticated once.
+    BATCH_MAX_REQUESTS: int = 20  # Sub-requests per batch
+    BATCH_MAX_CONCURRENCY: int = 2  # Database sessions (pool connections) per batch; 1 runs sub-requests in order
+
+    #  `POST /orders/status`: admin bulk order status transitions.
+    ORDER_STATUS_BULK_MAX_ORDERS: int = 10000  # Orders per request; applied in one UPDATE
+
+    #  Monthly partitions of orders and order_items; see database/partitioning.py.
+    ORDER_PARTITION_PRECREATE_MONTHS: int = 3  # Months created ahead by `maintain`
+    ORDER_PARTITION_RETENTION_MONTHS: Optional[int] = 24  # Older months are archived by `maintain`; None keeps all
+    ORDER_ARCHIVE_SCHEMA: str = "order_archive"  # Schema archived partitions are moved to
+    ORDER_ARCHIVE_TABLESPACE: Optional[str] = None  # e.g. a tablespace on cheaper storage; None keeps the current one
+
+    #  Daily sales rollups behind `/admin/analytics`; see services/analytics_service.py.
+    ANALYTICS_ROLLUP_BATCH_SIZE: int = 10000  # Order events applied per transaction
+    ANALYTICS_ROLLUP_LOOKBACK: int = 1000  # Events re-read behind the watermark, for ones that committed late
+    ANALYTICS_MAX_DAYS: int = 366  # Longest date range an analytics request may cover
+
+    #  Columnar order item snapshots for ad-hoc analytics; see services/columnar_analytics.py.
+    ANALYTICS_SNAPSHOT_DIR: str = "var/analytics"  # One directory of .npy column files per month
+    ANALYTICS_SNAPSHOT_FETCH_SIZE: int = 100000  # Rows fetched from the server-side cursor at a time
+
+    #  "Frequently bought together" recommendations; see services/recommendation_service.py.
+    RECOMMENDATIONS_DIR: str = "var/recommendations"  # Co-occurrence counts and the top-K arrays workers map
+    RECOMMENDATIONS_TOP_K: int = 20  # Neighbors kept per product
+    RECOMMENDATIONS_MIN_ORDERS: int = 2  # Orders two products must share to be related
+    RECOMMENDATIONS_FETCH_SIZE: int = 1000000  # Order items per chunk while building
+    RECOMMENDATIONS_SETTLE_SECONDS: float = 300.0  # Younger orders wait for the next update; must exceed the longest checkout transaction
+    RECOMMENDATIONS_RELOAD_INTERVAL: float = 60.0  # Seconds between each worker's checks for a new version
+
+    #  Cross-worker cache invalidation over LISTEN/NOTIFY; see core/invalidation.py.
+    INVALIDATION_ENABLED: bool = True  # Publish on writes and run a listener per worker
+    INVALIDATION_CHANNEL: str = "cache_invalidation"
+    INVALIDATION_COALESCE_WINDOW: float = 0.005  # Seconds a burst of notifications is gathered before evicting
+    INVALIDATION_PING_INTERVAL: float = 5.0  # Seconds of silence before the listener checks its connection
+    INVALIDATION_RECONNECT_DELAY: float = 0.5  # Seconds before the first reconnect attempt; doubles up to 30
+
+    #  Production server (`python serve.py`); see serve.py.
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0  # Worker processes; 0 runs one per CPU core available to the server
+    SERVER_PRELOAD: bool = True  # Import the app once in the master so workers share its memory
+    SERVER_GC_FREEZE: bool = True  # With preload, keep the collector off the shared heap (gc.freeze)
+    SERVER_GRACEFUL_TIMEOUT: int = 30  # Seconds workers get to finish requests on shutdown
+
+    #  Token revocation.  Each worker mirrors the revocation list into a bloom
+    #  filter; a token revoked on another worker is rejected everywhere within
+    #  TOKEN_REVOCATION_REFRESH_INTERVAL seconds.
+    TOKEN_REVOCATION_REFRESH_INTERVAL: float = 1.0  # Seconds between incremental refreshes
+    TOKEN_REVOCATION_REBUILD_INTERVAL: float = 600.0  # Seconds between full rebuilds (drops expired tokens)
+    TOKEN_REVOCATION_BLOOM_CAPACITY: int = 100000  # Revoked, unexpired tokens before the filter grows
+    TOKEN_REVOCATION_BLOOM_ERROR_RATE: float = 0.001  # Share of valid tokens that need an exact lookup
+
     class Config:
         """
         Configuration class for Pydantic settings.
@@ -102,6 +248,8 @@ class Settings(BaseSettings):
 
 
 # Create a global settings instance.  This is what you import and use.
+# Reading it at import is unavoidable: `main` chooses its middleware from
+# the settings when the app is built, so importing the app needs them.
 settings = Settings()
 
 if __name__ == "__main__":
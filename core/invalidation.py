@@ -0,0 +1,240 @@
+"""
+Cross-worker cache invalidation over PostgreSQL LISTEN/NOTIFY.
+
+Per-process caches (`product_service.product_list_cache`,
+`wishlist_service.wishlist_cache`, `shipping_service.shipping_registry`,
+`session_service.revocation_list`) are invalidated directly by writes in
+the same worker.  Other workers used to find out only when entries
+expired.  With the bus:
+
+* Writers call `publish(db, key, ...)` before committing.  The keys are
+  sent with `pg_notify` inside the write's transaction, so they are
+  delivered on commit and never for a rolled back write.  A key is a cache
+  name, optionally with an argument: "products", "wishlist:42".
+* Every worker runs `invalidation_bus`, a thread holding one dedicated
+  connection that LISTENs on `INVALIDATION_CHANNEL`.  Notifications that
+  arrive within `INVALIDATION_COALESCE_WINDOW` of each other are
+  deduplicated and applied together, so a burst of writes evicts each
+  entry once.
+* If the listener loses its connection, notifications sent meanwhile are
+  lost.  Every cache is flushed when the loss is noticed and again once
+  the listener is back, so nothing cached during the outage outlives it.
+  An idle connection is checked every `INVALIDATION_PING_INTERVAL` seconds.
+
+Caches register with `invalidation_bus.register(name, evict, flush)`.
+"""
+import logging
+import select
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+#  PostgreSQL rejects payloads of 8000 bytes or more.
+_MAX_PAYLOAD = 7900
+_MAX_RECONNECT_DELAY = 30.0
+
+Evict = Callable[[Optional[str]], None]
+
+
+def _payloads(keys: Iterable[str]) -> List[str]:
+    payloads, current, size = [], [], 0
+    for key in dict.fromkeys(keys):
+        if current and size + len(key) + 1 > _MAX_PAYLOAD:
+            payloads.append(",".join(current))
+            current, size = [], 0
+        current.append(key)
+        size += len(key) + 1
+    if current:
+        payloads.append(",".join(current))
+    return payloads
+
+
+def publish(db, *keys: str) -> None:
+    """
+    Queues invalidation keys for every worker, delivered when the current
+    transaction commits.  Keys must not contain commas.
+
+    Args:
+        db: The session or connection making the write.
+        keys: The keys to invalidate, e.g. "products" or "wishlist:42".
+    """
+    if not settings.INVALIDATION_ENABLED:
+        return
+    for payload in _payloads(keys):
+        db.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": settings.INVALIDATION_CHANNEL, "payload": payload},
+        )
+
+
+class InvalidationBus:
+    """
+    Per-process listener that applies published invalidation keys to the
+    registered caches.
+    """
+
+    def __init__(
+        self,
+        channel: Optional[str] = None,
+        coalesce_window: float = settings.INVALIDATION_COALESCE_WINDOW,
+        ping_interval: float = settings.INVALIDATION_PING_INTERVAL,
+        reconnect_delay: float = settings.INVALIDATION_RECONNECT_DELAY,
+        connect: Optional[Callable[[], object]] = None,
+    ):
+        self.channel = channel or settings.INVALIDATION_CHANNEL
+        self.coalesce_window = coalesce_window
+        self.ping_interval = ping_interval
+        self.reconnect_delay = reconnect_delay
+        self.connect = connect or listener_connection
+        self._caches: Dict[str, Tuple[Evict, Callable[[], None]]] = {}
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.connected = threading.Event()
+        #  Counters, read by the benchmark and by monitoring.
+        self.notifications = 0
+        self.evictions = 0
+        self.flushes = 0
+
+    def register(self, name: str, evict: Evict, flush: Optional[Callable[[], None]] = None) -> None:
+        """
+        Registers a cache under `name`.
+
+        Args:
+            name: The key prefix, e.g. "wishlist".
+            evict: Called with the key's argument ("42" for "wishlist:42"),
+                or None for a bare "wishlist".
+            flush: Drops everything.  Defaults to `evict(None)`.
+        """
+        self._caches[name] = (evict, flush or (lambda: evict(None)))
+
+    def apply(self, keys: Set[str]) -> None:
+        """
+        Evicts the entries named by `keys`.  Unknown names are ignored.
+        """
+        for key in keys:
+            name, _, argument = key.partition(":")
+            cache = self._caches.get(name)
+            if cache is None:
+                continue
+            try:
+                cache[0](argument or None)
+                self.evictions += 1
+            except Exception:
+                logger.exception("Invalidating %r failed", key)
+
+    def flush_all(self) -> None:
+        for name, (_, flush) in self._caches.items():
+            try:
+                flush()
+            except Exception:
+                logger.exception("Flushing %r failed", name)
+        self.flushes += 1
+
+    def _listen(self):
+        connection = self.connect()
+        connection.autocommit = True
+        cursor = connection.cursor()
+        cursor.execute(f'LISTEN "{self.channel}"')
+        cursor.close()
+        return connection
+
+    def _drain(self, connection, keys: Set[str]) -> None:
+        connection.poll()
+        while connection.notifies:
+            notification = connection.notifies.pop(0)
+            self.notifications += 1
+            keys.update(notification.payload.split(","))
+
+    def _serve(self, connection) -> None:
+        idle_since = time.monotonic()
+        while not self._stopping.is_set():
+            readable, _, _ = select.select([connection], [], [], min(self.ping_interval, 1.0))
+            if not readable:
+                if time.monotonic() - idle_since >= self.ping_interval:
+                    cursor = connection.cursor()
+                    cursor.execute("SELECT 1")
+                    cursor.close()
+                    idle_since = time.monotonic()
+                continue
+            keys: Set[str] = set()
+            self._drain(connection, keys)
+            #  Gather the rest of a burst before evicting.
+            deadline = time.monotonic() + self.coalesce_window
+            while keys and (remaining := deadline - time.monotonic()) > 0:
+                if select.select([connection], [], [], remaining)[0]:
+                    self._drain(connection, keys)
+            if keys:
+                self.apply(keys)
+            idle_since = time.monotonic()
+
+    def _run(self) -> None:
+        delay = self.reconnect_delay
+        first = True
+        while not self._stopping.is_set():
+            connection = None
+            try:
+                connection = self._listen()
+                if not first:
+                    #  Drops what was cached while nothing was listening.
+                    self.flush_all()
+                    logger.info("Cache invalidation listener reconnected")
+                first = False
+                delay = self.reconnect_delay
+                self.connected.set()
+                self._serve(connection)
+            except Exception:
+                if self._stopping.is_set():
+                    break
+                logger.warning("Cache invalidation listener lost its connection", exc_info=True)
+                if self.connected.is_set():
+                    self.connected.clear()
+                    self.flush_all()
+                first = False
+                self._stopping.wait(delay)
+                delay = min(delay * 2, _MAX_RECONNECT_DELAY)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+        self.connected.clear()
+
+    def start(self) -> None:
+        """
+        Starts the listener thread.  Calling it twice is a no-op.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-invalidation", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+
+def listener_connection():
+    """
+    Opens a DBAPI connection with the application's settings, outside the
+    pool: the listener holds it for the life of the worker.
+    """
+    from database.database import engine
+
+    cargs, cparams = engine.dialect.create_connect_args(engine.url)
+    cparams.setdefault("connect_timeout", settings.DB_CONNECT_TIMEOUT)
+    return engine.dialect.connect(*cargs, **cparams)
+
+
+#  The bus of this worker.  Started and stopped with the app.
+invalidation_bus = InvalidationBus()
@@ -0,0 +1,199 @@
+"""
+Prometheus metrics.
+
+Metrics are plain `prometheus_client` objects.  With several worker
+processes (gunicorn, `uvicorn --workers`), set the `PROMETHEUS_MULTIPROC_DIR`
+environment variable to an empty directory before the workers start: each
+worker then writes its values to its own memory-mapped files in that
+directory, and `/metrics` on any worker aggregates the files of all workers.
+Without it, `/metrics` reports the answering process only.
+
+Gauges that describe a process's current state use the "livesum" or
+"livemax" multiprocess mode, so workers that exited stop counting.
+"""
+import os
+from typing import Dict, Union
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+#  Request latency buckets, in seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests handled", ["method", "route", "status"]
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests being handled", multiprocess_mode="livesum"
+)
+
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections", "Open database connections", multiprocess_mode="livesum"
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Database connections in use", multiprocess_mode="livesum"
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a database connection",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+
+PASSWORD_HASHES_IN_FLIGHT = Gauge(
+    "password_hash_in_flight",
+    "Password hash or verify operations running; compare with the thread pool size",
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "Password hash and verify latency",
+    ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+PASSWORD_VERIFICATIONS = Counter(
+    "password_verifications_total",
+    "Password verifications by stored hash scheme and whether its parameters are current; "
+    "outdated hashes are replaced on successful login",
+    ["scheme", "state"],
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "In-process cache lookups", ["cache", "result"]
+)
+
+RATE_LIMITED = Counter(
+    "rate_limited_requests_total", "Requests rejected by the rate limiter", ["route"]
+)
+
+LOAD_SHED = Counter(
+    "load_shed_requests_total",
+    "Requests refused by the adaptive concurrency limit, by route priority",
+    ["priority"],
+)
+CONCURRENCY_LIMIT = Gauge(
+    "concurrency_limit",
+    "Adaptive limit on requests in flight, summed over workers",
+    multiprocess_mode="livesum",
+)
+
+TOKEN_REVOCATION_CHECKS = Counter(
+    "token_revocation_checks_total",
+    "Access token revocation checks, by outcome: bloom_negative (no query), "
+    "false_positive or revoked (both needed an exact lookup)",
+    ["result"],
+)
+
+PAYMENT_WEBHOOK_PENDING = Gauge(
+    "payment_webhook_pending",
+    "Payment webhook transactions acknowledged but not yet applied",
+    multiprocess_mode="livesum",
+)
+PAYMENT_WEBHOOK_LAG = Gauge(
+    "payment_webhook_lag_seconds",
+    "Age of the oldest acknowledged but unapplied payment webhook event",
+    multiprocess_mode="livemax",
+)
+PAYMENT_WEBHOOK_DROPPED = Counter(
+    "payment_webhook_dropped_total",
+    "Payment webhook events dropped after failing to apply alone too many times",
+)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """
+    Counts a lookup in an in-process cache.  Hit ratio is
+    `hit / (hit + miss)` per cache.
+    """
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def instrument_pool(engine: Engine) -> None:
+    """
+    Tracks open and checked-out connections of an engine's pool.
+    """
+    event.listen(engine, "connect", lambda *args: DB_POOL_CONNECTIONS.inc())
+    event.listen(engine, "close", lambda *args: DB_POOL_CONNECTIONS.dec())
+    event.listen(engine, "checkout", lambda *args: DB_POOL_CHECKED_OUT.inc())
+    event.listen(engine, "checkin", lambda *args: DB_POOL_CHECKED_OUT.dec())
+
+
+def render_metrics() -> bytes:
+    """
+    Renders all metrics in the Prometheus text format, aggregated across
+    worker processes when `PROMETHEUS_MULTIPROC_DIR` is set.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead(pid: int) -> None:
+    """
+    Drops the live gauges of a worker that exited.  Call from the process
+    manager (gunicorn's `child_exit` hook).
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid)
+
+
+def process_memory(pid: Union[int, str] = "self") -> Dict[str, int]:
+    """
+    Returns a process's memory use in bytes, from /proc (Linux only):
+
+    * rss: resident pages, counting pages shared with other processes in full.
+    * pss: resident pages, with each shared page divided among its sharers.
+      Summed over the workers and the master, this is their real footprint.
+    * uss: pages private to the process, freed if it exits.
+    * shared: resident pages shared with at least one other process.
+
+    Args:
+        pid: The process ID; defaults to the calling process.
+
+    Returns:
+        The four sizes, or an empty dict if /proc is not available.
+    """
+    fields: Dict[str, int] = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as rollup:
+            for line in rollup:
+                name, _, value = line.partition(":")
+                if value.strip().endswith("kB"):
+                    fields[name] = int(value.split()[0]) * 1024
+    except OSError:
+        return {}
+    private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": private,
+        "shared": fields.get("Rss", 0) - private,
+    }
+
+
+def format_memory(memory: Dict[str, int]) -> str:
+    """
+    Formats `process_memory` output for logs, in MiB.
+    """
+    return " ".join(f"{name}={size / 2 ** 20:.1f}MiB" for name, size in memory.items()) or "unavailable"
+
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
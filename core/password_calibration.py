@@ -0,0 +1,150 @@
+"""
+Argon2 cost calibration.
+
+Measures argon2 hashing on this host for candidate parameters and picks the
+strongest ones that fit a latency and memory budget: the most memory per
+hash within `--max-memory-mib`, then the most passes (time cost) that keep
+the median hash under `--target-ms`.  Memory is preferred over passes
+because it is what makes GPU and ASIC attacks expensive.
+
+`--concurrency` hashes are run at once for the final check, as a loaded
+worker would (the thread pool runs several logins at a time), so the
+reported latency and peak memory include contention.
+
+Usage:
+    python -m core.password_calibration --target-ms 250 --max-memory-mib 64
+    python -m core.password_calibration --report   # hash schemes stored today
+
+The chosen parameters are printed as settings to put in the environment.
+Existing hashes are upgraded on each user's next login.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from passlib.hash import argon2
+
+SAMPLE_PASSWORD = "Calibration-passw0rd!"
+
+
+def measure(time_cost: int, memory_kib: int, parallelism: int, samples: int, concurrency: int = 1) -> float:
+    """
+    Returns the median seconds per hash, with `concurrency` hashes running
+    at once.
+    """
+    handler = argon2.using(time_cost=time_cost, memory_cost=memory_kib, parallelism=parallelism)
+
+    def one_hash(_) -> float:
+        start = time.perf_counter()
+        handler.hash(SAMPLE_PASSWORD)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        durations = list(pool.map(one_hash, range(samples * concurrency)))
+    return statistics.median(durations)
+
+
+def calibrate(
+    target: float,
+    max_memory_mib: int,
+    parallelism: int,
+    samples: int,
+    concurrency: int,
+    max_time_cost: int = 20,
+) -> Dict[str, object]:
+    """
+    Picks argon2 parameters for a target latency (seconds) and memory
+    budget, and returns them with the measurements that led there.
+    """
+    trials: List[Dict[str, object]] = []
+
+    def trial(time_cost: int, memory_kib: int) -> float:
+        seconds = measure(time_cost, memory_kib, parallelism, samples)
+        trials.append({"time_cost": time_cost, "memory_mib": memory_kib // 1024, "ms": round(seconds * 1000, 1)})
+        return seconds
+
+    #  Largest memory (halving from the budget, down to 8 MiB) where a
+    #  single pass fits the target.
+    memory_kib: Optional[int] = None
+    candidate = max_memory_mib * 1024
+    while candidate >= 8 * 1024:
+        if trial(1, candidate) <= target:
+            memory_kib = candidate
+            break
+        candidate //= 2
+    if memory_kib is None:
+        raise SystemExit("Even 8 MiB with one pass is slower than the target; raise --target-ms")
+
+    #  Then as many passes as still fit.
+    time_cost = 1
+    while time_cost < max_time_cost and trial(time_cost + 1, memory_kib) <= target:
+        time_cost += 1
+
+    loaded = measure(time_cost, memory_kib, parallelism, samples, concurrency)
+    return {
+        "settings": {
+            "PASSWORD_ARGON2_TIME_COST": time_cost,
+            "PASSWORD_ARGON2_MEMORY_COST": memory_kib,
+            "PASSWORD_ARGON2_PARALLELISM": parallelism,
+        },
+        "single_hash_ms": next(
+            t["ms"] for t in reversed(trials) if t["time_cost"] == time_cost and t["memory_mib"] == memory_kib // 1024
+        ),
+        "concurrency": concurrency,
+        "concurrent_hash_ms": round(loaded * 1000, 1),
+        "peak_memory_mib": concurrency * memory_kib // 1024,
+        "trials": trials,
+    }
+
+
+def scheme_report() -> Dict[str, int]:
+    """
+    Counts stored password hashes by scheme and by whether they use the
+    current parameters.
+    """
+    from collections import Counter
+
+    from sqlalchemy import select
+
+    from core.security import pwd_context
+    from database.database import SessionLocal
+    from database.models.user import User
+
+    counts: Counter = Counter()
+    db = SessionLocal()
+    try:
+        rows = db.execute(select(User.hashed_password).execution_options(yield_per=10000))
+        for hashed in rows.scalars():
+            scheme = pwd_context.identify(hashed) or "unknown"
+            if scheme == "unknown":
+                counts[scheme] += 1
+            else:
+                counts[f"{scheme} ({'outdated' if pwd_context.needs_update(hashed) else 'current'})"] += 1
+    finally:
+        db.close()
+    return dict(counts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pick argon2 parameters for this host.")
+    parser.add_argument("--target-ms", type=float, default=250, help="Median hash latency to aim for")
+    parser.add_argument("--max-memory-mib", type=int, default=64, help="Memory budget per hash")
+    parser.add_argument("--parallelism", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--samples", type=int, default=5, help="Hashes per measurement")
+    parser.add_argument("--concurrency", type=int, default=4, help="Hashes at once for the final check")
+    parser.add_argument("--report", action="store_true", help="Only count stored hashes by scheme")
+    args = parser.parse_args()
+
+    if args.report:
+        print(json.dumps(scheme_report(), indent=2))
+    else:
+        result = calibrate(
+            args.target_ms / 1000, args.max_memory_mib, args.parallelism, args.samples, args.concurrency
+        )
+        print(json.dumps(result, indent=2))
+        for name, value in result["settings"].items():
+            print(f"{name}={value}")
@@ -0,0 +1,194 @@
+"""
+Token-bucket rate limiting.
+
+A limit such as "10/minute" is a bucket that holds up to 10 tokens and
+refills at 10 tokens per minute; every request takes one token and is
+rejected while the bucket is empty.  Buckets are kept in a `RateLimitStore`:
+
+* `MemoryStore` keeps them in this process.  Use it with a single node (any
+  number of requests, one process, or per-process limits).
+* `SharedStore` is the base for stores shared by all nodes, such as Redis
+  running the bucket update as a script.  `InMemorySharedStore` is a stand-in
+  with the same interface, for tests and benchmarks.
+
+`RATE_LIMIT_STORE` selects the store: "memory", "shared-memory", or
+"package.module:factory" for a custom store.
+"""
+import asyncio
+import importlib
+import threading
+import time
+from math import ceil
+from typing import Dict, List, NamedTuple, Optional
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class RateLimit(NamedTuple):
+    """A bucket of `burst` tokens refilled at `rate` tokens per second."""
+    rate: float
+    burst: int
+
+    @classmethod
+    def parse(cls, value: str) -> "RateLimit":
+        """
+        Parses "N/period", where period is second, minute, hour or day.
+
+        Raises:
+            ValueError: If the value is malformed.
+        """
+        try:
+            count, period = value.strip().split("/")
+            count = int(count)
+            seconds = PERIODS[period.strip().rstrip("s")]
+        except (ValueError, KeyError):
+            raise ValueError(f"Invalid rate limit {value!r}; expected e.g. '10/minute'")
+        if count <= 0:
+            raise ValueError(f"Invalid rate limit {value!r}; the count must be positive")
+        return cls(count / seconds, count)
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    remaining: int
+    retry_after: float  # Seconds until a token is available; 0 when allowed
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, ceil(self.retry_after)))
+
+
+def _take(tokens: float, updated_at: float, now: float, limit: RateLimit, cost: int):
+    """
+    The token-bucket step shared by all stores.  Returns the new token count
+    and the decision.
+    """
+    tokens = min(limit.burst, tokens + (now - updated_at) * limit.rate)
+    if tokens >= cost:
+        tokens -= cost
+        return tokens, Decision(True, int(tokens), 0.0)
+    return tokens, Decision(False, 0, (cost - tokens) / limit.rate)
+
+
+class RateLimitStore:
+    """
+    Where buckets live.  `consume` takes `cost` tokens from the bucket `key`
+    if it has them.
+    """
+
+    async def consume(self, key: str, limit: RateLimit, cost: int = 1) -> Decision:
+        raise NotImplementedError
+
+
+class MemoryStore(RateLimitStore):
+    """
+    Buckets in process memory, spread over `shards` dicts.
+
+    The store is only used from the event loop thread, and `consume` does
+    not await, so no locks are needed.  A shard that grows past
+    `max_keys_per_shard` drops its idle buckets (those that have refilled,
+    and so are equivalent to a new bucket), then its oldest ones, so memory
+    stays bounded however many clients there are.
+    """
+
+    def __init__(self, shards: int = 64, max_keys_per_shard: int = 16384, clock=time.monotonic):
+        self._shards: List[Dict[str, list]] = [{} for _ in range(shards)]
+        self.max_keys_per_shard = max_keys_per_shard
+        self.clock = clock
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    async def consume(self, key: str, limit: RateLimit, cost: int = 1) -> Decision:
+        return self.consume_now(key, limit, cost)
+
+    def consume_now(self, key: str, limit: RateLimit, cost: int = 1) -> Decision:
+        now = self.clock()
+        shard = self._shards[hash(key) % len(self._shards)]
+        state = shard.get(key)
+        if state is None:
+            if len(shard) >= self.max_keys_per_shard:
+                self._evict(shard, now)
+            state = shard[key] = [float(limit.burst), now, limit]
+        state[0], decision = _take(state[0], state[1], now, limit, cost)
+        state[1] = now
+        return decision
+
+    def _evict(self, shard: Dict[str, list], now: float) -> None:
+        for key in [key for key, (tokens, updated_at, limit) in shard.items()
+                    if tokens + (now - updated_at) * limit.rate >= limit.burst]:
+            del shard[key]
+        if len(shard) >= self.max_keys_per_shard:
+            #  Still full: drop the oldest quarter (dicts keep insertion order).
+            for key in list(shard)[: self.max_keys_per_shard // 4]:
+                del shard[key]
+
+
+class SharedStore(RateLimitStore):
+    """
+    Base class for stores shared by several nodes.
+
+    Subclasses implement `_consume` as one atomic operation on the shared
+    backend (for Redis, a script that reads the bucket, applies the
+    token-bucket step, writes it back with a TTL and returns the decision).
+    Buckets expire `ttl` seconds after they would have refilled.
+    """
+
+    def __init__(self, prefix: str = "ratelimit:", clock=time.time):
+        self.prefix = prefix
+        self.clock = clock
+
+    async def consume(self, key: str, limit: RateLimit, cost: int = 1) -> Decision:
+        ttl = limit.burst / limit.rate
+        return await self._consume(self.prefix + key, limit, cost, self.clock(), ttl)
+
+    async def _consume(self, key: str, limit: RateLimit, cost: int, now: float, ttl: float) -> Decision:
+        raise NotImplementedError
+
+
+class InMemorySharedStore(SharedStore):
+    """
+    Stand-in for a shared store: one dict behind a lock, optionally with a
+    simulated round-trip `latency` in seconds.  Several app instances in one
+    process (tests, benchmarks) can share one instance to behave like nodes
+    sharing a backend.
+    """
+
+    def __init__(self, latency: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self._buckets: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    async def _consume(self, key: str, limit: RateLimit, cost: int, now: float, ttl: float) -> Decision:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        with self._lock:
+            tokens, updated_at, expires_at = self._buckets.get(key, (limit.burst, now, now + ttl))
+            if expires_at < now:
+                tokens, updated_at = limit.burst, now
+            tokens, decision = _take(tokens, updated_at, now, limit, cost)
+            self._buckets[key] = (tokens, now, now + ttl)
+        return decision
+
+
+def load_store(name: str) -> RateLimitStore:
+    """
+    Creates the store named by `RATE_LIMIT_STORE`.
+    """
+    if name == "memory":
+        return MemoryStore()
+    if name == "shared-memory":
+        return InMemorySharedStore()
+    module_name, _, factory = name.partition(":")
+    if not factory:
+        raise ValueError(f"Unknown rate limit store {name!r}")
+    return getattr(importlib.import_module(module_name), factory)()
+
+
+def parse_limits(limits: Dict[str, str]) -> Dict[str, RateLimit]:
+    return {key: RateLimit.parse(value) for key, value in limits.items()}
+
+
+def optional_limit(value: Optional[str]) -> Optional[RateLimit]:
+    return RateLimit.parse(value) if value else None
@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+from fastapi import Response
+
+from core.compression import Codec, available_codecs, negotiate
+from core.metrics import record_cache_lookup
+
+
+class CachedPayload:
+    """
+    An encoded response body and its compressed variants.  Each variant is
+    compressed the first time a client asks for that encoding and reused
+    for every later request, at the codec's `cached_level`.
+    """
+
+    __slots__ = ("body", "media_type", "expires_at", "_variants")
+
+    def __init__(self, body: bytes, media_type: str, expires_at: float):
+        self.body = body
+        self.media_type = media_type
+        self.expires_at = expires_at
+        self._variants: Dict[str, bytes] = {}
+
+    def variant(self, codec: Codec) -> bytes:
+        compressed = self._variants.get(codec.name)
+        if compressed is None:
+            #  Two threads may compress the same variant at once; both
+            #  results are identical, so the race only costs CPU.
+            compressed = codec.compress(self.body, codec.cached_level)
+            self._variants[codec.name] = compressed
+        return compressed
+
+
+class CompressedResponseCache:
+    """
+    In-process LRU cache of response bodies, with pre-compressed variants.
+
+    Entries expire after `ttl` seconds and are all dropped by `invalidate`,
+    which writers call after committing.  `generation` guards against a
+    reader that loaded its data before an invalidation storing it after:
+    take the generation before querying and pass it to `put`, which ignores
+    the body if the cache was invalidated in between.
+
+    Responses built by `respond` carry `Content-Encoding`, so the
+    compression middleware passes them through untouched.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int,
+        ttl: float,
+        minimum_size: int = 1024,
+        codecs: Optional[Dict[str, Codec]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.minimum_size = minimum_size
+        self.codecs = available_codecs() if codecs is None else codecs
+        self.clock = clock
+        self.generation = 0
+        self._entries: "OrderedDict[Hashable, CachedPayload]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[CachedPayload]:
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                if payload.expires_at <= self.clock():
+                    del self._entries[key]
+                    payload = None
+                else:
+                    self._entries.move_to_end(key)
+        record_cache_lookup(self.name, payload is not None)
+        return payload
+
+    def put(self, key: Hashable, body: bytes, generation: int, media_type: str = "application/json") -> CachedPayload:
+        """
+        Stores a body loaded while the cache was at `generation`, and
+        returns it wrapped for `respond` either way.
+        """
+        payload = CachedPayload(body, media_type, self.clock() + self.ttl)
+        with self._lock:
+            if generation == self.generation:
+                self._entries[key] = payload
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return payload
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def respond(self, payload: CachedPayload, accept_encoding: str) -> Response:
+        """
+        Builds the response for a cached payload, in the best encoding the
+        client accepts.  Small bodies are sent as they are.
+        """
+        headers = {"Vary": "Accept-Encoding"}
+        encoding = negotiate(accept_encoding, self.codecs) if len(payload.body) >= self.minimum_size else None
+        if encoding is None:
+            return Response(payload.body, media_type=payload.media_type, headers=headers)
+        headers["Content-Encoding"] = encoding
+        return Response(payload.variant(self.codecs[encoding]), media_type=payload.media_type, headers=headers)
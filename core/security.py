@@ -1,13 +1,25 @@
 from passlib.context import CryptContext
+from jose import jwt
 import re
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, NamedTuple, Optional, Tuple
 
+from core.config import settings
+from core.metrics import PASSWORD_HASH_DURATION, PASSWORD_HASHES_IN_FLIGHT, PASSWORD_VERIFICATIONS
 
-# Create a password hashing context
+
+# Create a password hashing context.  New hashes use argon2 with the
+# parameters from settings (pick them with `python -m core.password_calibration`).
+# Legacy bcrypt hashes still verify; they, and argon2 hashes made with other
+# parameters, are reported by `needs_update` and replaced on the next login.
 pwd_context = CryptContext(
-    schemes=["argon2"],
-    argon2__rounds=4,
-    argon2__memory_cost=102400, 
-    argon2__parallelism=4,
+    schemes=["argon2", "bcrypt"],
+    argon2__time_cost=settings.PASSWORD_ARGON2_TIME_COST,
+    argon2__memory_cost=settings.PASSWORD_ARGON2_MEMORY_COST,
+    argon2__parallelism=settings.PASSWORD_ARGON2_PARALLELISM,
     argon2__salt_len=32,
     argon2__hash_len=32,
     deprecated="auto",
@@ -24,7 +36,11 @@ def get_password_hash(password: str) -> str:
     Returns:
         str: The hashed password.
     """
-    return pwd_context.hash(password)
+    start = time.perf_counter()
+    with PASSWORD_HASHES_IN_FLIGHT.track_inprogress():
+        hashed = pwd_context.hash(password)
+    PASSWORD_HASH_DURATION.labels("hash").observe(time.perf_counter() - start)
+    return hashed
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -39,7 +55,109 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         bool: True if the plain text password matches the hashed password,
               False otherwise.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    start = time.perf_counter()
+    with PASSWORD_HASHES_IN_FLIGHT.track_inprogress():
+        verified = pwd_context.verify(plain_password, hashed_password)
+    PASSWORD_HASH_DURATION.labels("verify").observe(time.perf_counter() - start)
+    return verified
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies a password and, if it matches a hash made with a legacy scheme
+    or outdated parameters, rehashes it with the current ones.
+
+    Args:
+        plain_password (str): The plain text password to verify.
+        hashed_password (str): The stored hash, argon2 or bcrypt.
+
+    Returns:
+        tuple: Whether the password matched, and the replacement hash to
+               store, or None if the stored hash is current (or the password
+               did not match).
+    """
+    scheme = pwd_context.identify(hashed_password) or "unknown"
+    state = "outdated" if pwd_context.needs_update(hashed_password) else "current"
+    PASSWORD_VERIFICATIONS.labels(scheme, state).inc()
+    start = time.perf_counter()
+    with PASSWORD_HASHES_IN_FLIGHT.track_inprogress():
+        verified, new_hash = pwd_context.verify_and_update(plain_password, hashed_password)
+    PASSWORD_HASH_DURATION.labels("verify_and_update" if new_hash else "verify").observe(
+        time.perf_counter() - start
+    )
+    return verified, new_hash
+
+
+@lru_cache()
+def _dummy_hash() -> str:
+    #  Made with the current parameters, so verifying against it costs as
+    #  much as verifying against a real, current hash.
+    return pwd_context.hash(uuid.uuid4().hex)
+
+
+def verify_dummy_password(plain_password: str) -> bool:
+    """
+    Does the work of a password verification for a user that does not
+    exist, so that a failed login takes as long for an unknown email as for
+    a wrong password, and response times do not reveal which emails have
+    accounts.
+
+    Args:
+        plain_password (str): The submitted password.
+
+    Returns:
+        bool: Always False.
+    """
+    verify_password(plain_password, _dummy_hash())
+    return False
+
+
+class AccessToken(NamedTuple):
+    token: str
+    jti: str
+    expires_at: datetime
+
+
+def create_access_token(subject: str, expires_delta: Optional[timedelta] = None) -> AccessToken:
+    """
+    Creates a signed JWT access token.
+
+    Every token carries a unique `jti` claim, which is what token revocation
+    refers to.
+
+    Args:
+        subject (str): The user identifier stored in the `sub` claim (the email).
+        expires_delta (timedelta, optional): The token lifetime.  Defaults to
+            ACCESS_TOKEN_EXPIRE_MINUTES.
+
+    Returns:
+        AccessToken: The encoded token, its `jti` and its expiry time.
+    """
+    issued_at = datetime.now(timezone.utc)
+    expires_at = issued_at + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
+    jti = uuid.uuid4().hex
+    token = jwt.encode(
+        {"sub": subject, "jti": jti, "iat": issued_at, "exp": expires_at},
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+    )
+    return AccessToken(token, jti, expires_at)
+
+
+def decode_access_token(token: str) -> Dict[str, Any]:
+    """
+    Verifies a JWT access token and returns its claims.
+
+    Args:
+        token (str): The encoded token.
+
+    Returns:
+        dict: The token claims.
+
+    Raises:
+        JWTError: If the signature is invalid or the token has expired.
+    """
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
 
 
 
@@ -1,14 +1,31 @@
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from typing import Optional, Generator
 from core.config import settings  # Import the settings instance
+from core.metrics import instrument_pool
+from database.instrumentation import TimedQueuePool, instrument_engine
 
 #  Get the database URL from the settings
 SQLALCHEMY_DATABASE_URL: str = settings.SQLALCHEMY_DATABASE_URL
 
-#  Use create_engine, passing the URL
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+#  Use create_engine, passing the URL.  This does not connect; the first
+#  connections are opened by `warm_up_pool` at startup or on first use.
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args={"connect_timeout": settings.DB_CONNECT_TIMEOUT},
+    poolclass=TimedQueuePool,
+)
+if settings.SQL_INSTRUMENTATION_ENABLED:
+    instrument_engine(engine)
+if settings.METRICS_ENABLED:
+    instrument_pool(engine)
 
 #  Create a SessionLocal class.  Instances of this class will be
 #  database sessions.
@@ -20,19 +37,58 @@ Base = declarative_base()
 
 #  Dependency to get a database session.  This is used in FastAPI
 #  route handlers.
-def get_db() -> Generator[Session, None, None]:
+def get_db(request: Request = None) -> Generator[Session, None, None]:
     """
     Dependency to get a database session.
 
+    Sub-requests of a batch (see `api.routes.batch`) get the batch's shared,
+    read-only session instead, which the batch closes itself.
+
+    Args:
+        request: The current request, if called as a dependency.
+
     Yields:
         Session: A SQLAlchemy database session.
     """
+    shared = getattr(request.state, "batch_db", None) if request is not None else None
+    if shared is not None:
+        yield shared
+        return
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+
+def warm_up_pool(connections: Optional[int] = None) -> int:
+    """
+    Opens pool connections ahead of the first request.
+
+    The connections are checked with `SELECT 1` and returned to the pool, so
+    the first requests of a fresh worker do not pay for connection setup.
+
+    Args:
+        connections: The number of connections to open.  Defaults to
+            `DB_POOL_WARMUP`, capped at `DB_POOL_SIZE`.
+
+    Returns:
+        The number of connections opened.
+    """
+    if connections is None:
+        connections = settings.DB_POOL_WARMUP
+    connections = min(connections, settings.DB_POOL_SIZE)
+    opened = []
+    try:
+        for _ in range(connections):
+            connection = engine.connect()
+            opened.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in opened:
+            connection.close()
+    return len(opened)
+
 if __name__ == "__main__":
     #  This code is only executed if you run this file directly
     #  (e.g., `python database/database.py`).  It's useful for
@@ -42,7 +98,7 @@ if __name__ == "__main__":
         db = SessionLocal()
         #  Perform a simple query to test the connection.
         #  If the connection is successful, this should not raise an exception.
-        db.execute("SELECT 1")
+        db.execute(text("SELECT 1"))
         print("Database connection successful!")
     except Exception as e:
         print("Error connecting to database:", e)
@@ -0,0 +1,133 @@
+"""
+Per-request SQL statistics.
+
+SQLAlchemy event hooks on the engine record every statement's duration into
+the `QueryStats` of the current request, found through a context variable.
+FastAPI runs sync endpoints and dependencies in a thread pool with a copy of
+the request's context, so statements executed there are counted too.
+Statements executed outside a request (background threads, scripts) are not
+recorded.
+"""
+import time
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from core.metrics import DB_POOL_WAIT
+
+#  Longest statement text kept as `slowest_statement`.
+MAX_STATEMENT_LENGTH = 500
+
+
+@dataclass
+class QueryStats:
+    """
+    SQL statistics for one request.  Times are in seconds.
+    """
+    count: int = 0
+    total_time: float = 0.0
+    slowest_time: float = 0.0
+    slowest_statement: Optional[str] = None
+    pool_wait: float = 0.0
+
+    def record_query(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement[:MAX_STATEMENT_LENGTH]
+
+    def merge(self, other: "QueryStats") -> None:
+        """
+        Adds the statistics of `other`, collected separately for part of the
+        same request (a batch sub-request), to these.
+        """
+        self.count += other.count
+        self.total_time += other.total_time
+        self.pool_wait += other.pool_wait
+        if other.slowest_time > self.slowest_time:
+            self.slowest_time = other.slowest_time
+            self.slowest_statement = other.slowest_statement
+
+    def server_timing(self) -> str:
+        """
+        Formats the statistics as a `Server-Timing` header value.  Statement
+        text is deliberately left out.
+        """
+        return (
+            f'db;dur={self.total_time * 1000:.2f};desc="{self.count} queries", '
+            f"db-slowest;dur={self.slowest_time * 1000:.2f}, "
+            f"db-pool;dur={self.pool_wait * 1000:.2f}"
+        )
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("sql_query_stats", default=None)
+
+
+def start_request_stats() -> Tuple[QueryStats, Token]:
+    """
+    Starts collecting statistics for the current request.
+
+    Returns:
+        The statistics object and the token to pass to `stop_request_stats`.
+    """
+    stats = QueryStats()
+    return stats, _current_stats.set(stats)
+
+
+def stop_request_stats(token: Token) -> None:
+    """
+    Stops collecting statistics for the current request.
+    """
+    _current_stats.reset(token)
+
+
+def current_request_stats() -> Optional[QueryStats]:
+    """
+    Returns the statistics of the current request, if any.
+    """
+    return _current_stats.get()
+
+
+class TimedQueuePool(QueuePool):
+    """
+    `QueuePool` that records how long callers wait to check a connection out
+    of the pool, including time spent opening a new one, both in the
+    `db_pool_wait_seconds` metric and in the current request's statistics.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            elapsed = time.perf_counter() - start
+            DB_POOL_WAIT.observe(elapsed)
+            stats = _current_stats.get()
+            if stats is not None:
+                stats.pool_wait += elapsed
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info["sql_query_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    start = conn.info.pop("sql_query_start", None)
+    if stats is not None and start is not None:
+        stats.record_query(statement, time.perf_counter() - start)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Installs the statement timing hooks on an engine.  Pool wait time is only
+    recorded if the engine was created with `poolclass=TimedQueuePool`.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,21 @@
+#  Relationships name their targets as strings, which SQLAlchemy resolves
+#  when the first query configures the mappers; importing every model here
+#  makes sure all of them are registered by then, whichever one the caller
+#  imported.
+from database.models import (  # noqa: F401
+    address,
+    cart,
+    category,
+    order,
+    order_event,
+    order_item,
+    payment,
+    price_drop,
+    product,
+    sales_rollup,
+    session,
+    shipping_method,
+    shipping_rate,
+    user,
+    wishlist_item,
+)
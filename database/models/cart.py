@@ -19,7 +19,7 @@ class Cart(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
     # items: List["CartItem"] = relationship("CartItem", back_populates="cart")  # Use the string name
-    items = relationship("CartItem", back_populates="cart")
+    items = relationship("CartItem", back_populates="cart", cascade="all, delete-orphan")
 
     def __repr__(self):
         return f"<Cart(user_id={self.user_id}, items={len(self.items)})>"
@@ -40,7 +40,7 @@ class CartItem(Base):
     quantity = Column(Integer, nullable=False)
 
     cart = relationship("Cart", back_populates="items")
-    product = relationship("Product")  #  Relationship with the Product model
+    product = relationship("Product", back_populates="cart_items")  #  Relationship with the Product model
 
     def __repr__(self):
         return f"<CartItem(cart_id={self.cart_id}, product_id={self.product_id}, quantity={self.quantity})>"
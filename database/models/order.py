@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Numeric, DateTime, ForeignKey, func, String, Enum
+from sqlalchemy import Column, Integer, Numeric, DateTime, ForeignKey, Index, func, String, Enum
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from database.database import Base  # Import Base
 from typing import List, Optional
@@ -20,13 +20,21 @@ class OrderStatus(enum.Enum):
 class Order(Base):
     """
     SQLAlchemy model for the orders table.
+
+    The table is partitioned by month of `order_date` (see
+    `database.partitioning`), so the primary key is (id, order_date); `id`
+    alone is still unique, as it comes from one sequence.
     """
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_user_id_order_date", "user_id", "order_date"),
+        {"postgresql_partition_by": "RANGE (order_date)"},
+    )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
     shipping_address_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("addresses.id"), nullable=True)
-    order_date: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    order_date: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True, server_default=func.now())
     total_price: Mapped[Numeric] = mapped_column(Numeric(10, 2), nullable=False)
     status: Mapped[OrderStatus] = mapped_column(Enum(OrderStatus), nullable=False, default=OrderStatus.PENDING)
     payment_method: Mapped[str] = mapped_column(String, nullable=False)  # e.g., "Credit Card", "PayPal"
@@ -34,6 +42,11 @@ class Order(Base):
     user = relationship("User", back_populates="orders")
     shipping_address = relationship("Address")
     items: Mapped[List["OrderItem"]] = relationship("OrderItem", back_populates="order")
+    #  payments.order_id has no foreign key: one cannot reference `id` alone
+    #  on a partitioned table.
+    payment = relationship(
+        "Payment", primaryjoin="Order.id == foreign(Payment.order_id)", back_populates="order", uselist=False
+    )
 
     def __repr__(self):
         return f"<Order(id={self.id}, user_id={self.user_id}, order_date='{self.order_date}', status='{self.status}')>"
@@ -0,0 +1,25 @@
+from sqlalchemy import BigInteger, DateTime, Enum, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+from database.database import Base  # Import Base
+from database.models.order import OrderStatus
+from datetime import datetime
+
+
+class OrderEvent(Base):
+    """
+    SQLAlchemy model for the order_events table.
+
+    Append-only log of order changes, written in the same transaction as the
+    change (an outbox), for consumers that need to react to them in order of
+    `id`.
+    """
+    __tablename__ = "order_events"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    order_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)  # orders.id; no foreign key, orders is partitioned
+    event_type: Mapped[str] = mapped_column(String(32), nullable=False)  # e.g., "status_changed"
+    status: Mapped[OrderStatus] = mapped_column(Enum(OrderStatus), nullable=False)  # The order's status after the event
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<OrderEvent(id={self.id}, order_id={self.order_id}, event_type='{self.event_type}', status='{self.status}')>"
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, Numeric, ForeignKey
+from sqlalchemy import Column, DateTime, Integer, Numeric, ForeignKey, ForeignKeyConstraint
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from database.database import Base  # Import Base from database.py
+from datetime import datetime
 
 
 class OrderItem(Base):
@@ -9,10 +10,20 @@ class OrderItem(Base):
 
     Represents an item within an order.  This is an association table
     between Order and Product.
+
+    Partitioned by month like `orders`: each item carries its order's
+    `order_date`, so it lives in the same month's partition.
     """
     __tablename__ = "order_items"
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["order_id", "order_date"], ["orders.id", "orders.order_date"], name="fk_order_items_order"
+        ),
+        {"postgresql_partition_by": "RANGE (order_date)"},
+    )
 
-    order_id: Mapped[int] = mapped_column(Integer, ForeignKey("orders.id"), primary_key=True)
+    order_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    order_date: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)  # The order's
     product_id: Mapped[int] = mapped_column(Integer, ForeignKey("products.id"), primary_key=True)
     quantity: Mapped[int] = mapped_column(Integer, nullable=False)
     price: Mapped[Numeric] = mapped_column(Numeric(10, 2), nullable=False)  # Price at the time of order
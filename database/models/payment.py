@@ -22,15 +22,15 @@ class Payment(Base):
     __tablename__ = "payments"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    order_id: Mapped[int] = mapped_column(Integer, ForeignKey("orders.id"), nullable=False)
+    order_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)  # orders.id; see Order.payment
     amount: Mapped[Numeric] = mapped_column(Numeric(10, 2), nullable=False)
     payment_method: Mapped[str] = mapped_column(String, nullable=False)  # e.g., "Credit Card", "PayPal"
     status: Mapped[PaymentStatus] = mapped_column(
         Enum(PaymentStatus), nullable=False, default=PaymentStatus.PENDING
     )
     transaction_id: Mapped[Optional[str]] = mapped_column(
-        String, nullable=True
-    )  # Provider's transaction ID
+        String, nullable=True, index=True
+    )  # Provider's transaction ID, used to match webhook events
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
@@ -38,7 +38,9 @@ class Payment(Base):
         DateTime(timezone=True), onupdate=func.now()
     )
 
-    order = relationship("Order", back_populates="payment")  #  Backref to Order
+    order = relationship(
+        "Order", primaryjoin="foreign(Payment.order_id) == Order.id", back_populates="payment"
+    )  #  Backref to Order
 
     def __repr__(self):
         return f"<Payment(order_id={self.order_id}, amount={self.amount}, status='{self.status}')>"
@@ -0,0 +1,67 @@
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Integer, Numeric, func
+from sqlalchemy.orm import Mapped, mapped_column
+from database.database import Base  # Import Base
+from datetime import datetime
+from decimal import Decimal
+
+
+class ProductPriceChange(Base):
+    """
+    SQLAlchemy model for the product_price_changes table.
+
+    Queue of price drops, written in the same transaction as the price
+    update and consumed (deleted) in batches by
+    `services.price_drop_service.process_price_changes`.
+    """
+    __tablename__ = "product_price_changes"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    product_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False
+    )
+    old_price: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+    new_price: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+    changed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<ProductPriceChange(product_id={self.product_id}, old_price={self.old_price}, new_price={self.new_price})>"
+
+
+class PriceDropAlert(Base):
+    """
+    SQLAlchemy model for the price_drop_alerts table.
+
+    One pending alert per user and wishlisted product whose price dropped,
+    waiting for the user's next digest email.  Further drops of the same
+    product update `new_price` and keep the original `old_price`.
+    """
+    __tablename__ = "price_drop_alerts"
+
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    product_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True
+    )
+    old_price: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+    new_price: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<PriceDropAlert(user_id={self.user_id}, product_id={self.product_id})>"
+
+
+class PriceDropDigestLog(Base):
+    """
+    SQLAlchemy model for the price_drop_digest_log table: when each user was
+    last sent a price drop digest, which limits digests to one per window.
+    """
+    __tablename__ = "price_drop_digest_log"
+
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    last_sent_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<PriceDropDigestLog(user_id={self.user_id}, last_sent_at='{self.last_sent_at}')>"
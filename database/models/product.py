@@ -19,6 +19,7 @@ class Product(Base):
     description: Mapped[str] = mapped_column(String, nullable=False)
     price: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)  # Use Numeric for currency
     stock_quantity: Mapped[int] = mapped_column(Integer, nullable=False)
+    weight: Mapped[Optional[Decimal]] = mapped_column(Numeric(10, 3), nullable=True)  # In kg, used for shipping quotes
     category_id: Mapped[int] = mapped_column(Integer, ForeignKey("categories.id"), nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), onupdate=func.now())
@@ -30,5 +31,10 @@ class Product(Base):
     #  Define the relationship to CartItem
     cart_items: Mapped[List["CartItem"]] = relationship("CartItem", back_populates="product")
 
+    #  Wishlists containing this product (see `wishlist_item.wishlist_products`)
+    wishlists: Mapped[List["Wishlist"]] = relationship(
+        "Wishlist", secondary="wishlist_products", back_populates="products"
+    )
+
     def __repr__(self):
         return f"<Product(name='{self.name}', price={self.price})>"
@@ -0,0 +1,93 @@
+from sqlalchemy import BigInteger, Boolean, Date, DateTime, Integer, Numeric, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+from database.database import Base  # Import Base
+from datetime import date, datetime
+from decimal import Decimal
+
+
+class SalesDailyCategory(Base):
+    """
+    SQLAlchemy model for the sales_daily_category table: per day (UTC) and
+    product category, the orders containing the category, the units sold
+    and the revenue from its order items.  Cancelled orders are not counted.
+
+    Maintained by `services.analytics_service`.
+    """
+    __tablename__ = "sales_daily_category"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    category_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    orders: Mapped[int] = mapped_column(Integer, nullable=False)
+    units: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    revenue: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False)
+
+    def __repr__(self):
+        return f"<SalesDailyCategory(day='{self.day}', category_id={self.category_id}, revenue={self.revenue})>"
+
+
+class SalesDailyProduct(Base):
+    """
+    SQLAlchemy model for the sales_daily_product table: per day (UTC) and
+    product, the orders, units sold and revenue.  Cancelled orders are not
+    counted.
+    """
+    __tablename__ = "sales_daily_product"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    product_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    orders: Mapped[int] = mapped_column(Integer, nullable=False)
+    units: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    revenue: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False)
+
+    def __repr__(self):
+        return f"<SalesDailyProduct(day='{self.day}', product_id={self.product_id}, units={self.units})>"
+
+
+class SalesDailyPaymentMethod(Base):
+    """
+    SQLAlchemy model for the sales_daily_payment_method table: per day (UTC)
+    and payment method, the orders and their total price.  Cancelled orders
+    are not counted.
+    """
+    __tablename__ = "sales_daily_payment_method"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    payment_method: Mapped[str] = mapped_column(String, primary_key=True)
+    orders: Mapped[int] = mapped_column(Integer, nullable=False)
+    revenue: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False)
+
+    def __repr__(self):
+        return f"<SalesDailyPaymentMethod(day='{self.day}', payment_method='{self.payment_method}', revenue={self.revenue})>"
+
+
+class SalesRollupOrder(Base):
+    """
+    SQLAlchemy model for the sales_rollup_orders table: whether each order
+    is currently counted in the sales rollups.  An order is added to or
+    subtracted from the rollups only when this flips, so replaying its
+    events never counts it twice.
+    """
+    __tablename__ = "sales_rollup_orders"
+
+    order_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    counted: Mapped[bool] = mapped_column(Boolean, nullable=False)
+
+    def __repr__(self):
+        return f"<SalesRollupOrder(order_id={self.order_id}, counted={self.counted})>"
+
+
+class RollupWatermark(Base):
+    """
+    SQLAlchemy model for the rollup_watermarks table: the last
+    `order_events.id` each rollup job has processed.
+    """
+    __tablename__ = "rollup_watermarks"
+
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    last_event_id: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    def __repr__(self):
+        return f"<RollupWatermark(name='{self.name}', last_event_id={self.last_event_id})>"
@@ -0,0 +1,45 @@
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+from database.database import Base  # Import Base
+from datetime import datetime
+from typing import Optional
+
+
+class UserSession(Base):
+    """
+    SQLAlchemy model for the user_sessions table.
+
+    One row per access token issued at login, keyed by the token's `jti`
+    claim, so all tokens of a user can be found and revoked.
+    """
+    __tablename__ = "user_sessions"
+
+    jti: Mapped[str] = mapped_column(String, primary_key=True)
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    issued_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    revoked_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<UserSession(jti='{self.jti}', user_id={self.user_id})>"
+
+
+class RevokedToken(Base):
+    """
+    SQLAlchemy model for the revoked_tokens table.
+
+    Append-only list of revoked token IDs.  Rows are only ever inserted (and
+    deleted once the token has expired), so the increasing `id` lets every
+    process pick up new revocations with an `id > watermark` query.
+    """
+    __tablename__ = "revoked_tokens"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    jti: Mapped[str] = mapped_column(String, nullable=False, unique=True, index=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<RevokedToken(jti='{self.jti}')>"
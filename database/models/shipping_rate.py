@@ -0,0 +1,32 @@
+from sqlalchemy import Integer, String, Numeric, ForeignKey
+from sqlalchemy.orm import relationship, Mapped, mapped_column
+from database.database import Base  # Import Base
+from decimal import Decimal
+from typing import Optional
+
+
+class ShippingRate(Base):
+    """
+    SQLAlchemy model for the shipping_rates table.
+
+    A zone rule for a shipping method.  A rule applies to addresses in
+    `country` whose postal code starts with `postal_prefix`; an empty prefix
+    covers the whole country.  When several rules match, the longest prefix
+    wins.  Shipping methods without any rules are flat-rate everywhere.
+    """
+    __tablename__ = "shipping_rates"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    shipping_method_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("shipping_methods.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    country: Mapped[str] = mapped_column(String, nullable=False)
+    postal_prefix: Mapped[str] = mapped_column(String, nullable=False, default="")
+    base_cost: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+    cost_per_kg: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False, default=0)
+    max_weight: Mapped[Optional[Decimal]] = mapped_column(Numeric(10, 3), nullable=True)  # In kg; no limit if null
+
+    shipping_method = relationship("ShippingMethod")
+
+    def __repr__(self):
+        return f"<ShippingRate(shipping_method_id={self.shipping_method_id}, country='{self.country}', postal_prefix='{self.postal_prefix}')>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, func
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, false, func
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from typing import List
@@ -11,7 +11,8 @@ class User(Base):
 
     This class defines the structure of the User table in the database.
     It includes columns for user ID, email, hashed password, first name,
-    last name, is_active status, and timestamps for creation and last update.
+    last name, is_active and is_superuser status, and timestamps for
+    creation and last update.
     """
     __tablename__ = "users"
 
@@ -21,9 +22,14 @@ class User(Base):
     first_name = Column(String, nullable=False)
     last_name = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
+    is_superuser = Column(Boolean, default=False, server_default=false(), nullable=False)  # Grants the admin endpoints
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    addresses = relationship("Address", back_populates="user")
+    orders = relationship("Order", back_populates="user")
+    wishlist = relationship("Wishlist", back_populates="user", uselist=False)
+
     def __repr__(self):
         """
         Returns a string representation of the User object.
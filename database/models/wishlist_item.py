@@ -8,7 +8,7 @@ wishlist_products = Table(
     "wishlist_products",
     Base.metadata,
     Column("wishlist_id", Integer, ForeignKey("wishlists.id"), primary_key=True),
-    Column("product_id", Integer, ForeignKey("products.id"), primary_key=True),
+    Column("product_id", Integer, ForeignKey("products.id"), primary_key=True, index=True),
 )
 
 
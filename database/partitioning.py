@@ -0,0 +1,236 @@
+"""
+Monthly range partitions of `orders` and `order_items`.
+
+Both tables are partitioned by `order_date`, one partition per calendar month
+(UTC), named `<table>_YYYY_MM`.  Order items carry their order's
+`order_date`, so an order and its items always live in the same month's
+partitions, and a query that bounds `order_date` only reads those months
+(partition pruning) instead of every month's indexes.
+
+`maintain`, run daily (e.g. from cron), keeps the tables in shape:
+
+* It creates the partitions of the next `ORDER_PARTITION_PRECREATE_MONTHS`
+  months ahead of time.  Inserting an order dated in a month without a
+  partition fails, and creating a partition briefly locks the parent table,
+  which is better done before the month is busy.  Every worker also does
+  this at startup (`ensure_upcoming_partitions`), so orders keep working
+  if the cron job stops, as long as workers are restarted within
+  `ORDER_PARTITION_PRECREATE_MONTHS` months.
+* It archives months older than `ORDER_PARTITION_RETENTION_MONTHS`: their
+  partitions are detached and moved to the `ORDER_ARCHIVE_SCHEMA` schema (and
+  to `ORDER_ARCHIVE_TABLESPACE`, if set).  Archived orders drop out of every
+  query on `orders`, but stay queryable as plain tables, e.g.
+  `order_archive.orders_2023_01`.  Archived tables keep no foreign keys.
+
+Usage:
+    python -m database.partitioning maintain
+    python -m database.partitioning create --from 2023-01 --to 2024-12
+    python -m database.partitioning list
+"""
+import argparse
+from datetime import date, datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from core.config import settings
+
+#  Parents first.  Partitions are created in this order and detached in the
+#  reverse one, because order items reference their month's orders.
+PARTITIONED_TABLES = ("orders", "order_items")
+#  Advisory lock held while partitions are created, so workers starting
+#  together and `maintain` do not race to create the same ones.
+PARTITION_LOCK_KEY = 0x6F72646572730001
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def months_between(start: date, end: date) -> Iterator[date]:
+    """
+    Yields the first day of every month from `start`'s to `end`'s, inclusive.
+    """
+    month, last = month_start(start), month_start(end)
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+
+def _bound(month: date) -> str:
+    return f"{month.isoformat()} 00:00:00+00"
+
+
+def list_partitions(conn: Connection, table: str) -> List[date]:
+    """
+    Returns the months that have a partition of `table` attached, in order.
+    Partitions not named like `partition_name` are ignored.
+    """
+    rows = conn.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        WHERE parent.oid = to_regclass(:table)
+    """), {"table": table}).scalars()
+    months = []
+    prefix = f"{table}_"
+    for name in rows:
+        try:
+            months.append(datetime.strptime(name[len(prefix):], "%Y_%m").date())
+        except ValueError:
+            continue
+    return sorted(months)
+
+
+def _exists(conn: Connection, qualified_name: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": qualified_name}).scalar()
+
+
+def ensure_partitions(conn: Connection, start: date, end: date) -> List[str]:
+    """
+    Creates the missing partitions of both tables for the months from
+    `start`'s to `end`'s.  Months that were archived are not recreated.
+
+    Args:
+        conn: A connection; the caller commits.
+        start: A date in the first month.
+        end: A date in the last month.
+
+    Returns:
+        The names of the partitions created.
+    """
+    created = []
+    for month in months_between(start, end):
+        if _exists(conn, f'"{settings.ORDER_ARCHIVE_SCHEMA}".{partition_name("orders", month)}'):
+            continue
+        for table in PARTITIONED_TABLES:
+            name = partition_name(table, month)
+            if _exists(conn, name):
+                continue
+            conn.execute(text(
+                f"CREATE TABLE {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{_bound(month)}') TO ('{_bound(add_months(month, 1))}')"
+            ))
+            created.append(name)
+    return created
+
+
+def ensure_upcoming_partitions(conn: Connection, today: Optional[date] = None) -> List[str]:
+    """
+    Creates the missing partitions of the current month and of the next
+    `ORDER_PARTITION_PRECREATE_MONTHS` months.
+
+    Args:
+        conn: A connection; the caller commits, which releases the lock
+            taken here.
+        today: Defaults to the current UTC date.
+
+    Returns:
+        The names of the partitions created.
+    """
+    conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+    this_month = month_start(today or datetime.now(timezone.utc).date())
+    return ensure_partitions(
+        conn, this_month, add_months(this_month, settings.ORDER_PARTITION_PRECREATE_MONTHS)
+    )
+
+
+def archive_partitions(conn: Connection, before: date) -> List[str]:
+    """
+    Detaches the partitions of the months before `before`'s and moves them
+    to the archive schema.
+
+    Args:
+        conn: A connection; the caller commits.
+        before: A date in the first month to keep.
+
+    Returns:
+        The names of the partitions archived.
+    """
+    schema = f'"{settings.ORDER_ARCHIVE_SCHEMA}"'
+    months = [month for month in list_partitions(conn, "orders") if month < month_start(before)]
+    if not months:
+        return []
+    conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema}"))
+    archived = []
+    for month in months:
+        for table in reversed(PARTITIONED_TABLES):
+            name = partition_name(table, month)
+            if not _exists(conn, name):
+                continue
+            conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            #  A detached partition keeps its foreign keys; the items' key to
+            #  `orders` would stop the month's orders from being detached.
+            constraints = conn.execute(text("""
+                SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:name) AND contype = 'f'
+            """), {"name": name}).scalars().all()
+            for constraint in constraints:
+                conn.execute(text(f'ALTER TABLE {name} DROP CONSTRAINT "{constraint}"'))
+            conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {schema}"))
+            if settings.ORDER_ARCHIVE_TABLESPACE:
+                conn.execute(text(
+                    f'ALTER TABLE {schema}.{name} SET TABLESPACE "{settings.ORDER_ARCHIVE_TABLESPACE}"'
+                ))
+            archived.append(name)
+    return archived
+
+
+def maintain(conn: Connection, today: Optional[date] = None) -> Dict[str, List[str]]:
+    """
+    Creates the partitions of the coming months and archives the expired
+    ones, per the `ORDER_PARTITION_*` settings.
+
+    Args:
+        conn: A connection; the caller commits.
+        today: Defaults to the current UTC date.
+
+    Returns:
+        The partitions created and archived.
+    """
+    this_month = month_start(today or datetime.now(timezone.utc).date())
+    created = ensure_upcoming_partitions(conn, this_month)
+    archived = []
+    if settings.ORDER_PARTITION_RETENTION_MONTHS is not None:
+        archived = archive_partitions(
+            conn, add_months(this_month, -settings.ORDER_PARTITION_RETENTION_MONTHS)
+        )
+    return {"created": created, "archived": archived}
+
+
+def _month(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+if __name__ == "__main__":
+    from database.database import engine
+
+    parser = argparse.ArgumentParser(description="Maintain the monthly partitions of orders and order_items.")
+    parser.add_argument("command", choices=["maintain", "create", "list"])
+    parser.add_argument("--from", dest="start", type=_month, help="First month to create (YYYY-MM)")
+    parser.add_argument("--to", dest="end", type=_month, help="Last month to create (YYYY-MM)")
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        if args.command == "maintain":
+            result = maintain(conn)
+            print(f"Created {len(result['created'])} partitions: {', '.join(result['created']) or '-'}")
+            print(f"Archived {len(result['archived'])} partitions: {', '.join(result['archived']) or '-'}")
+        elif args.command == "create":
+            if args.start is None or args.end is None:
+                parser.error("create needs --from and --to")
+            created = ensure_partitions(conn, args.start, args.end)
+            print(f"Created {len(created)} partitions: {', '.join(created) or '-'}")
+        else:
+            for month in list_partitions(conn, "orders"):
+                print(partition_name("orders", month))
@@ -1,37 +1,144 @@
-from fastapi import FastAPI
+import importlib
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import List
+
+from fastapi import FastAPI, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
+from api.middleware.compression import CompressionMiddleware
+from api.middleware.load_shedding import LoadSheddingMiddleware
+from api.middleware.metrics import MetricsMiddleware
+from api.middleware.rate_limit import RateLimitMiddleware
+from api.middleware.sql_timing import SQLTimingMiddleware
+from core.config import settings
+from core.metrics import METRICS_CONTENT_TYPE, format_memory, process_memory, render_metrics
 
-from api.routes import (
-    products,
-    categories,
-    users,
-    orders,
-    cart,
-    checkout,
-    payment,
-    shipping,
-    wishlist,
-)
+logger = logging.getLogger(__name__)
 
+#  The schema is managed by Alembic migrations (`alembic upgrade head`), run
+#  once per deploy rather than by every worker at import time.
+
+# API routers to include, as (module, prefix under API_V1_STR).  Modules are
+# imported by `include_routers`, so routers that are not listed here (the
+# unfinished categories and checkout modules) are never imported.
+ROUTERS = [
+    ("api.routes.auth", ""),
+    ("api.routes.batch", ""),
+    ("api.routes.users", "/users"),
+    ("api.routes.payment", "/payments"),
+    ("api.routes.shipping", "/shipping"),
+    ("api.routes.cart", "/cart"),
+    ("api.routes.products", "/products"),
+    ("api.routes.orders", "/orders"),
+    ("api.routes.wishlist", "/wishlist"),
+    ("api.routes.analytics", "/admin/analytics"),
+]
+
+
+def include_routers(app: FastAPI) -> None:
+    """
+    Imports the modules listed in `ROUTERS` and mounts their routers.
+    """
+    for module_name, prefix in ROUTERS:
+        module = importlib.import_module(module_name)
+        app.include_router(module.router, prefix=settings.API_V1_STR + prefix)
+
+
+def ensure_order_partitions() -> List[str]:
+    """
+    Creates any missing partitions of the coming months, in case the
+    `database.partitioning maintain` cron job has stopped running.
+    """
+    from database.database import engine
+    from database.partitioning import ensure_upcoming_partitions
+
+    with engine.begin() as conn:
+        return ensure_upcoming_partitions(conn)
 
-from core.config import settings
-from database.database import engine
-from database.database import Base
 
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Per-worker startup and shutdown.
 
+    Startup opens a few pool connections so the first requests do not pay for
+    connection setup, creates the order partitions of the coming months if
+    they are missing, then starts the background workers and the cache
+    invalidation listener, and logs the worker's memory use.  A database that
+    is slow or down at this point is logged, not fatal: the worker starts and
+    connects on demand once the database is back.
+    """
+    from core.invalidation import invalidation_bus
+    from database.database import engine, warm_up_pool
+    from services.payment_webhook_service import payment_webhook_buffer
 
+    try:
+        opened = await run_in_threadpool(warm_up_pool)
+        logger.info("Warmed up %d database connections", opened)
+    except Exception:
+        logger.warning("Database pool warm-up failed", exc_info=True)
+    try:
+        created = await run_in_threadpool(ensure_order_partitions)
+        if created:
+            logger.warning("Created missing order partitions: %s", ", ".join(created))
+    except Exception:
+        logger.warning("Creating order partitions failed", exc_info=True)
+    payment_webhook_buffer.start()
+    if settings.INVALIDATION_ENABLED:
+        invalidation_bus.start()
+    logger.info("Worker %d started: %s", os.getpid(), format_memory(process_memory()))
+    yield
+    invalidation_bus.stop()
+    #  Flushes whatever the provider has already been told we accepted.
+    await run_in_threadpool(payment_webhook_buffer.stop)
+    engine.dispose()
 
-app = FastAPI(title=settings.PROJECT_NAME, openapi_url=f"{settings.API_V1_STR}/openapi.json")
 
-# CORS configuration (adjust as needed for your frontend)
+app = FastAPI(
+    title=settings.PROJECT_NAME,
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
+)
+
+# Per-request query counts and timings (Server-Timing header and logs).
+if settings.SQL_INSTRUMENTATION_ENABLED:
+    app.add_middleware(SQLTimingMiddleware)
+
+# zstd/br/gzip response compression.  Inside the rate limiter and metrics
+# middleware, so compression time is included in request latency.
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# Adaptive concurrency limit with per-route priorities: requests over it get
+# a 503 at once.  Inside the rate limiter, so rate limited requests do not
+# take up the limit, and outside everything else, so their latency is what
+# the limit adapts to.
+if settings.CONCURRENCY_LIMIT_ENABLED:
+    app.add_middleware(LoadSheddingMiddleware)
+
+# Token-bucket rate limits per route and per user or client IP.  Added after
+# the SQL timing middleware so rejected requests skip it, and before the
+# metrics middleware so they are still counted.
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
+# Request counts, latency histograms and in-flight requests per route.
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# CORS configuration (adjust as needed for your frontend).  Added last, so it
+# is the outermost middleware and the 429s and 503s of the limiters carry
+# the CORS headers too; browsers would hide them from the page otherwise.
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://127.0.0.1:5500/"],  # Replace with your frontend origins in production
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
 
@@ -39,13 +146,14 @@ app.add_middleware(
 def test_api():
   return {"Hello":"World"}
 
+
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    """
+    Serves Prometheus metrics, aggregated across workers when
+    `PROMETHEUS_MULTIPROC_DIR` is set.
+    """
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 # Include API routers
-# app.include_router(products.router, prefix=settings.API_V1_STR)
-# app.include_router(categories.router, prefix=settings.API_V1_STR)
-app.include_router(users.router, prefix=settings.API_V1_STR + "/users")
-# app.include_router(orders.router, prefix=settings.API_V1_STR)
-# app.include_router(cart.router, prefix=settings.API_V1_STR)
-# app.include_router(checkout.router, prefix=settings.API_V1_STR)
-# app.include_router(payment.router, prefix=settings.API_V1_STR)
-# app.include_router(shipping.router, prefix=settings.API_V1_STR)
-# app.include_router(wishlist.router, prefix=settings.API_V1_STR)
\ No newline at end of file
+include_routers(app)
@@ -0,0 +1,70 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import engine_from_config, pool
+
+from core.config import settings
+from database.database import Base
+
+#  Import every model so its table is registered on Base.metadata, which
+#  `alembic revision --autogenerate` compares against the database.
+from database.models import (  # noqa: F401
+    address,
+    cart,
+    category,
+    order,
+    order_event,
+    order_item,
+    payment,
+    price_drop,
+    product,
+    sales_rollup,
+    session,
+    shipping_method,
+    shipping_rate,
+    user,
+    wishlist_item,
+)
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+config.set_main_option("sqlalchemy.url", settings.SQLALCHEMY_DATABASE_URL)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    """
+    Emits the migration SQL to stdout instead of running it
+    (`alembic upgrade head --sql`).
+    """
+    context.configure(
+        url=settings.SQLALCHEMY_DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """
+    Runs the migrations against the configured database.
+    """
+    connectable = engine_from_config(
+        config.get_section(config.config_ini_section, {}),
+        prefix="sqlalchemy.",
+        poolclass=pool.NullPool,
+    )
+    with connectable.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,195 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+
+Creates the tables that `Base.metadata.create_all` used to create when the
+application started.  Databases created that way lack `products.weight`,
+`shipping_rates` and `ix_payments_transaction_id`; add those by hand and run
+`alembic stamp 0001` instead of upgrading.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+ORDER_STATUS = sa.Enum(
+    "PENDING", "PROCESSING", "SHIPPED", "DELIVERED", "CANCELLED", name="orderstatus"
+)
+PAYMENT_STATUS = sa.Enum("PENDING", "SUCCESSFUL", "FAILED", "REFUNDED", name="paymentstatus")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("first_name", sa.String(), nullable=False),
+        sa.Column("last_name", sa.String(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "categories",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+    )
+    op.create_index("ix_categories_id", "categories", ["id"])
+    op.create_index("ix_categories_name", "categories", ["name"], unique=True)
+
+    op.create_table(
+        "products",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.String(), nullable=False),
+        sa.Column("price", sa.Numeric(10, 2), nullable=False),
+        sa.Column("stock_quantity", sa.Integer(), nullable=False),
+        sa.Column("weight", sa.Numeric(10, 3), nullable=True),
+        sa.Column("category_id", sa.Integer(), sa.ForeignKey("categories.id"), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+    )
+    op.create_index("ix_products_id", "products", ["id"])
+    op.create_index("ix_products_name", "products", ["name"])
+
+    op.create_table(
+        "addresses",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("street_address", sa.String(), nullable=False),
+        sa.Column("city", sa.String(), nullable=False),
+        sa.Column("state", sa.String(), nullable=False),
+        sa.Column("postal_code", sa.String(), nullable=False),
+        sa.Column("country", sa.String(), nullable=False),
+        sa.Column("is_default", sa.Boolean(), nullable=True),
+    )
+    op.create_index("ix_addresses_id", "addresses", ["id"])
+
+    op.create_table(
+        "cart",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False, unique=True),
+    )
+    op.create_index("ix_cart_id", "cart", ["id"])
+
+    op.create_table(
+        "cart_items",
+        sa.Column("cart_id", sa.Integer(), sa.ForeignKey("cart.id"), primary_key=True),
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id"), primary_key=True),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+    )
+
+    op.create_table(
+        "orders",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("shipping_address_id", sa.Integer(), sa.ForeignKey("addresses.id"), nullable=True),
+        sa.Column("order_date", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("total_price", sa.Numeric(10, 2), nullable=False),
+        sa.Column("status", ORDER_STATUS, nullable=False),
+        sa.Column("payment_method", sa.String(), nullable=False),
+    )
+    op.create_index("ix_orders_id", "orders", ["id"])
+
+    op.create_table(
+        "order_items",
+        sa.Column("order_id", sa.Integer(), sa.ForeignKey("orders.id"), primary_key=True),
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id"), primary_key=True),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("price", sa.Numeric(10, 2), nullable=False),
+    )
+
+    op.create_table(
+        "payments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("order_id", sa.Integer(), sa.ForeignKey("orders.id"), nullable=False),
+        sa.Column("amount", sa.Numeric(10, 2), nullable=False),
+        sa.Column("payment_method", sa.String(), nullable=False),
+        sa.Column("status", PAYMENT_STATUS, nullable=False),
+        sa.Column("transaction_id", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_payments_id", "payments", ["id"])
+    op.create_index("ix_payments_transaction_id", "payments", ["transaction_id"])
+
+    op.create_table(
+        "shipping_methods",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("cost", sa.Numeric(10, 2), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_shipping_methods_id", "shipping_methods", ["id"])
+    op.create_index("ix_shipping_methods_name", "shipping_methods", ["name"], unique=True)
+
+    op.create_table(
+        "shipping_rates",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "shipping_method_id",
+            sa.Integer(),
+            sa.ForeignKey("shipping_methods.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("country", sa.String(), nullable=False),
+        sa.Column("postal_prefix", sa.String(), nullable=False),
+        sa.Column("base_cost", sa.Numeric(10, 2), nullable=False),
+        sa.Column("cost_per_kg", sa.Numeric(10, 2), nullable=False),
+        sa.Column("max_weight", sa.Numeric(10, 3), nullable=True),
+    )
+    op.create_index("ix_shipping_rates_id", "shipping_rates", ["id"])
+    op.create_index("ix_shipping_rates_shipping_method_id", "shipping_rates", ["shipping_method_id"])
+
+    op.create_table(
+        "wishlists",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False, unique=True),
+    )
+    op.create_index("ix_wishlists_id", "wishlists", ["id"])
+
+    op.create_table(
+        "wishlist_products",
+        sa.Column("wishlist_id", sa.Integer(), sa.ForeignKey("wishlists.id"), primary_key=True),
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id"), primary_key=True),
+    )
+
+
+def downgrade() -> None:
+    for table in (
+        "wishlist_products",
+        "wishlists",
+        "shipping_rates",
+        "shipping_methods",
+        "payments",
+        "order_items",
+        "orders",
+        "cart_items",
+        "cart",
+        "addresses",
+        "products",
+        "categories",
+        "users",
+    ):
+        op.drop_table(table)
+    PAYMENT_STATUS.drop(op.get_bind(), checkfirst=True)
+    ORDER_STATUS.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,54 @@
+"""price drop alerts
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+
+Adds the price drop pipeline tables (`product_price_changes`,
+`price_drop_alerts`, `price_drop_digest_log`) and an index on
+`wishlist_products.product_id`, so the users who wishlisted a product can be
+found without scanning the table.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_wishlist_products_product_id", "wishlist_products", ["product_id"])
+
+    op.create_table(
+        "product_price_changes",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("old_price", sa.Numeric(10, 2), nullable=False),
+        sa.Column("new_price", sa.Numeric(10, 2), nullable=False),
+        sa.Column("changed_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+    op.create_table(
+        "price_drop_alerts",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("old_price", sa.Numeric(10, 2), nullable=False),
+        sa.Column("new_price", sa.Numeric(10, 2), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+    op.create_table(
+        "price_drop_digest_log",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("last_sent_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("price_drop_digest_log")
+    op.drop_table("price_drop_alerts")
+    op.drop_table("product_price_changes")
+    op.drop_index("ix_wishlist_products_product_id", table_name="wishlist_products")
@@ -0,0 +1,48 @@
+"""order events and superusers
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+
+Adds `order_events`, the log of order status changes written by
+`order_service.transition_orders`, and `users.is_superuser`, which gates the
+admin endpoints such as bulk order status updates.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+#  Created by 0001.
+ORDER_STATUS = postgresql.ENUM(
+    "PENDING", "PROCESSING", "SHIPPED", "DELIVERED", "CANCELLED", name="orderstatus", create_type=False
+)
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column("is_superuser", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+
+    op.create_table(
+        "order_events",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("order_id", sa.Integer(), sa.ForeignKey("orders.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("event_type", sa.String(32), nullable=False),
+        sa.Column("status", ORDER_STATUS, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_order_events_order_id", "order_events", ["order_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_order_events_order_id", table_name="order_events")
+    op.drop_table("order_events")
+    op.drop_column("users", "is_superuser")
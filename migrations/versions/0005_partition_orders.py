@@ -0,0 +1,173 @@
+"""partition orders by month
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+
+Recreates `orders` and `order_items` as tables partitioned by month of
+`order_date` (see `database.partitioning`), copies the rows over, and creates
+partitions from the month of the oldest order to `PRECREATE_MONTHS` months
+ahead.  The migration has its own copy of the partition DDL and month
+arithmetic, so later changes to `database.partitioning` or to the settings
+do not change what it does.
+
+* `orders` gets the primary key (id, order_date), as a partitioned table's
+  keys must include the partition column; ids still come from
+  `orders_id_seq`.  Orders without an `order_date` get the migration's time.
+* `order_items` gets the order's `order_date`, and a foreign key on
+  (order_id, order_date).
+* `payments.order_id` and `order_events.order_id` lose their foreign keys,
+  which cannot reference `orders.id` alone any more; `payments.order_id`
+  gets an index instead.
+
+The copy rewrites both tables under an exclusive lock; on a large database,
+run it in a maintenance window.
+"""
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+#  Months of partitions created ahead of the current one.
+PRECREATE_MONTHS = 3
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def create_partitions(start: date, end: date) -> None:
+    """
+    Creates the partitions of both tables for the months from `start` to
+    `end`, inclusive.
+    """
+    month = start
+    while month <= end:
+        following = add_months(month, 1)
+        for table in ("orders", "order_items"):
+            op.execute(
+                f"CREATE TABLE {table}_{month:%Y_%m} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{following.isoformat()} 00:00:00+00')"
+            )
+        month = following
+
+
+def upgrade() -> None:
+    op.drop_constraint("payments_order_id_fkey", "payments", type_="foreignkey")
+    op.drop_constraint("order_events_order_id_fkey", "order_events", type_="foreignkey")
+    op.create_index("ix_payments_order_id", "payments", ["order_id"])
+
+    #  Constraint and index names are unique per schema, so the old tables'
+    #  are renamed out of the way.
+    op.rename_table("order_items", "order_items_unpartitioned")
+    op.execute("ALTER INDEX order_items_pkey RENAME TO order_items_unpartitioned_pkey")
+    op.rename_table("orders", "orders_unpartitioned")
+    op.execute("ALTER INDEX orders_pkey RENAME TO orders_unpartitioned_pkey")
+    op.execute("ALTER INDEX ix_orders_id RENAME TO ix_orders_unpartitioned_id")
+
+    op.execute("""
+        CREATE TABLE orders (
+            id INTEGER NOT NULL DEFAULT nextval('orders_id_seq'),
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            shipping_address_id INTEGER REFERENCES addresses (id),
+            order_date TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            total_price NUMERIC(10, 2) NOT NULL,
+            status orderstatus NOT NULL,
+            payment_method VARCHAR NOT NULL,
+            CONSTRAINT orders_pkey PRIMARY KEY (id, order_date)
+        ) PARTITION BY RANGE (order_date)
+    """)
+    #  Otherwise dropping the old table would drop the sequence with it.
+    op.execute("ALTER SEQUENCE orders_id_seq OWNED BY orders.id")
+    op.create_index("ix_orders_id", "orders", ["id"])
+    op.create_index("ix_orders_user_id_order_date", "orders", ["user_id", "order_date"])
+
+    op.execute("""
+        CREATE TABLE order_items (
+            order_id INTEGER NOT NULL,
+            order_date TIMESTAMP WITH TIME ZONE NOT NULL,
+            product_id INTEGER NOT NULL REFERENCES products (id),
+            quantity INTEGER NOT NULL,
+            price NUMERIC(10, 2) NOT NULL,
+            CONSTRAINT order_items_pkey PRIMARY KEY (order_id, order_date, product_id),
+            CONSTRAINT fk_order_items_order FOREIGN KEY (order_id, order_date)
+                REFERENCES orders (id, order_date)
+        ) PARTITION BY RANGE (order_date)
+    """)
+
+    bind = op.get_bind()
+    now = datetime.now(timezone.utc)
+    oldest = bind.execute(sa.text("SELECT min(order_date) FROM orders_unpartitioned")).scalar()
+    this_month = month_start(now)
+    create_partitions(
+        min(month_start(oldest.astimezone(timezone.utc)), this_month) if oldest else this_month,
+        add_months(this_month, PRECREATE_MONTHS),
+    )
+
+    op.execute("""
+        INSERT INTO orders (id, user_id, shipping_address_id, order_date, total_price, status, payment_method)
+        SELECT id, user_id, shipping_address_id, COALESCE(order_date, now()), total_price, status, payment_method
+        FROM orders_unpartitioned
+    """)
+    op.execute("""
+        INSERT INTO order_items (order_id, order_date, product_id, quantity, price)
+        SELECT i.order_id, COALESCE(o.order_date, now()), i.product_id, i.quantity, i.price
+        FROM order_items_unpartitioned i
+        JOIN orders_unpartitioned o ON o.id = i.order_id
+    """)
+    op.drop_table("order_items_unpartitioned")
+    op.drop_table("orders_unpartitioned")
+
+
+def downgrade() -> None:
+    #  Archived partitions (see `database.partitioning`) are not brought back.
+    op.rename_table("order_items", "order_items_partitioned")
+    op.execute("ALTER INDEX order_items_pkey RENAME TO order_items_partitioned_pkey")
+    op.rename_table("orders", "orders_partitioned")
+    op.execute("ALTER INDEX orders_pkey RENAME TO orders_partitioned_pkey")
+    op.execute("ALTER INDEX ix_orders_id RENAME TO ix_orders_partitioned_id")
+    op.execute("ALTER INDEX ix_orders_user_id_order_date RENAME TO ix_orders_partitioned_user_id_order_date")
+
+    op.execute("""
+        CREATE TABLE orders (
+            id INTEGER NOT NULL DEFAULT nextval('orders_id_seq') PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            shipping_address_id INTEGER REFERENCES addresses (id),
+            order_date TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            total_price NUMERIC(10, 2) NOT NULL,
+            status orderstatus NOT NULL,
+            payment_method VARCHAR NOT NULL
+        )
+    """)
+    op.execute("ALTER SEQUENCE orders_id_seq OWNED BY orders.id")
+    op.create_index("ix_orders_id", "orders", ["id"])
+    op.execute("""
+        CREATE TABLE order_items (
+            order_id INTEGER NOT NULL REFERENCES orders (id),
+            product_id INTEGER NOT NULL REFERENCES products (id),
+            quantity INTEGER NOT NULL,
+            price NUMERIC(10, 2) NOT NULL,
+            PRIMARY KEY (order_id, product_id)
+        )
+    """)
+    op.execute("INSERT INTO orders SELECT id, user_id, shipping_address_id, order_date, total_price, status, payment_method FROM orders_partitioned")
+    op.execute("INSERT INTO order_items SELECT order_id, product_id, quantity, price FROM order_items_partitioned")
+    op.drop_table("order_items_partitioned")
+    op.drop_table("orders_partitioned")
+
+    op.drop_index("ix_payments_order_id", table_name="payments")
+    op.create_foreign_key("payments_order_id_fkey", "payments", "orders", ["order_id"], ["id"])
+    op.create_foreign_key(
+        "order_events_order_id_fkey", "order_events", "orders", ["order_id"], ["id"], ondelete="CASCADE"
+    )
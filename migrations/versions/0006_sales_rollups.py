@@ -0,0 +1,64 @@
+"""sales rollups
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+
+Adds the daily sales rollup tables maintained by `services.analytics_service`,
+the ledger of orders counted in them and the job watermark.  Existing orders
+are not rolled up here; run `python -m services.analytics_service rebuild`
+for the days that have orders.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sales_daily_category",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("category_id", sa.Integer(), primary_key=True),
+        sa.Column("orders", sa.Integer(), nullable=False),
+        sa.Column("units", sa.BigInteger(), nullable=False),
+        sa.Column("revenue", sa.Numeric(14, 2), nullable=False),
+    )
+    op.create_table(
+        "sales_daily_product",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("product_id", sa.Integer(), primary_key=True),
+        sa.Column("orders", sa.Integer(), nullable=False),
+        sa.Column("units", sa.BigInteger(), nullable=False),
+        sa.Column("revenue", sa.Numeric(14, 2), nullable=False),
+    )
+    op.create_table(
+        "sales_daily_payment_method",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("payment_method", sa.String(), primary_key=True),
+        sa.Column("orders", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.Numeric(14, 2), nullable=False),
+    )
+    op.create_table(
+        "sales_rollup_orders",
+        sa.Column("order_id", sa.Integer(), primary_key=True),
+        sa.Column("counted", sa.Boolean(), nullable=False),
+    )
+    op.create_table(
+        "rollup_watermarks",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("last_event_id", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("rollup_watermarks")
+    op.drop_table("sales_rollup_orders")
+    op.drop_table("sales_daily_payment_method")
+    op.drop_table("sales_daily_product")
+    op.drop_table("sales_daily_category")
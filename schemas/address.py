@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+
+
+class AddressRead(BaseModel):
+    """Schema for reading a shipping address"""
+    id: int
+    user_id: int
+    street_address: str
+    city: str
+    state: str
+    postal_code: str
+    country: str
+    is_default: bool = False
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,50 @@
+from datetime import date
+from decimal import Decimal
+
+from pydantic import BaseModel
+
+
+class DailyRevenue(BaseModel):
+    """
+    Schema for one day's orders that were not cancelled, and their total
+    price.
+    """
+    day: date
+    orders: int
+    revenue: Decimal
+
+
+
+class CategorySales(BaseModel):
+    """
+    Schema for a category's sales over a date range: the orders that
+    contain its products, the units sold and their revenue.
+    """
+    category_id: int
+    name: str
+    orders: int
+    units: int
+    revenue: Decimal
+
+
+
+class ProductSales(BaseModel):
+    """
+    Schema for a product's sales over a date range.
+    """
+    product_id: int
+    name: str
+    orders: int
+    units: int
+    revenue: Decimal
+
+
+
+class PaymentMethodSales(BaseModel):
+    """
+    Schema for a payment method's orders over a date range, and their total
+    price.
+    """
+    payment_method: str
+    orders: int
+    revenue: Decimal
@@ -0,0 +1,51 @@
+from typing import Any, List, Literal
+
+from pydantic import BaseModel, Field, field_validator
+
+from core.config import settings
+
+
+class BatchSubRequest(BaseModel):
+    """
+    Schema for one request in a batch.  Only reads can be batched.  `path`
+    is relative to the API prefix and may include a query string, e.g.
+    "/products/?limit=20".
+    """
+    method: Literal["GET"] = "GET"
+    path: str = Field(..., min_length=1, max_length=2048)
+
+    @field_validator("path")
+    @classmethod
+    def check_path(cls, path: str) -> str:
+        if not path.startswith("/"):
+            raise ValueError("path must start with '/'")
+        if path.split("?", 1)[0].rstrip("/") == "/batch":
+            raise ValueError("batches cannot be nested")
+        return path
+
+
+
+class BatchRequest(BaseModel):
+    """
+    Schema for a batch of read requests, run with one authentication check
+    and shared database sessions.
+    """
+    requests: List[BatchSubRequest] = Field(..., min_length=1, max_length=settings.BATCH_MAX_REQUESTS)
+
+
+
+class BatchResponseItem(BaseModel):
+    """
+    Schema for the outcome of one sub-request: its status code and its JSON
+    body (text for non-JSON responses, None for empty ones).
+    """
+    status: int
+    body: Any = None
+
+
+
+class BatchResponse(BaseModel):
+    """
+    Schema for a batch response.  `responses` are in request order.
+    """
+    responses: List[BatchResponseItem]
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, conint, validator, ConfigDict
 from typing import List, Optional
-from database.models.product import Product  # Import Product model
+from schemas.product import ProductRead
 
 
 class CartItemCreate(BaseModel):
@@ -24,17 +24,19 @@ class CartItemRead(BaseModel):
     """
     Schema for reading a cart item.  This schema includes the product details.
     """
-    model_config = ConfigDict(arbitrary_types_allowed=True)
-    
+    model_config = ConfigDict(from_attributes=True)
+
     product_id: int
     quantity: int
-    product: Optional[Product] = None  # Include product details, make it optional
+    product: Optional[ProductRead] = None  # Include product details, make it optional
 
 
 class CartRead(BaseModel):
     """
     Schema for reading the entire cart.
     """
+    model_config = ConfigDict(from_attributes=True)
+
     id: Optional[int] = None
     user_id: int
     items: List[CartItemRead] = []  # Use CartItemRead
@@ -49,7 +51,7 @@ class CartRead(BaseModel):
         if values.get("items"):  # Check if items list exists
             for item in values["items"]:
                 if item.product:  # Make sure product is loaded
-                    total += item.product.price * item.quantity
+                    total += float(item.product.price) * item.quantity
         return total
 
 
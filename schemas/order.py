@@ -1,8 +1,9 @@
 from typing import List, Optional
-from pydantic import BaseModel,  Field
+from pydantic import BaseModel,  Field, conint
 from datetime import datetime
 from enum import Enum
 from decimal import Decimal
+from core.config import settings
 from schemas.address import AddressRead  # Import AddressRead
 #from schemas.order_item import OrderItemRead # circular import
 from schemas.user import UserRead # Import UserRead
@@ -76,3 +77,55 @@ class OrderRead(OrderBase):
     class Config:
         orm_mode = True
 
+
+
+class OrderSummaryRead(BaseModel):
+    """
+    Schema for an order in a user's order history: the order's own columns
+    and its items, without the nested user and address.  Fields can be
+    trimmed with `?fields=` (see `utils.fields`).
+    """
+    id: int
+    user_id: int
+    shipping_address_id: Optional[int]
+    order_date: datetime
+    total_price: Decimal
+    status: OrderStatus
+    payment_method: str
+    items: List[OrderItemRead]
+
+    class Config:
+        from_attributes = True
+
+
+
+class OrderStatusBulkUpdate(BaseModel):
+    """
+    Schema for moving many orders to one status, e.g. marking a warehouse
+    shipment's orders as shipped.
+    """
+    order_ids: List[conint(gt=0)] = Field(..., min_length=1, max_length=settings.ORDER_STATUS_BULK_MAX_ORDERS)
+    status: OrderStatus
+    placed_after: Optional[datetime] = None  # If set, orders placed earlier are not looked at (and rejected)
+
+
+
+class OrderStatusRejection(BaseModel):
+    """
+    Schema for an order a bulk status update did not change, with its
+    current status (None if the order does not exist).
+    """
+    id: int
+    status: Optional[OrderStatus]
+
+
+
+class OrderStatusBulkResult(BaseModel):
+    """
+    Schema for the result of a bulk status update: the orders moved to
+    `status`, and those rejected because the transition is not allowed from
+    their current status or because they do not exist.
+    """
+    status: OrderStatus
+    updated: List[int]
+    rejected: List[OrderStatusRejection]
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel,  Field
 from datetime import datetime
 from enum import Enum
@@ -61,3 +61,22 @@ class PaymentUpdate(BaseModel):
     transaction_id: Optional[str] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
+
+
+
+class PaymentWebhookEvent(BaseModel):
+    """
+    Schema for a single payment status event pushed by the payment provider.
+    """
+    transaction_id: str = Field(..., min_length=1)
+    status: PaymentStatus
+    occurred_at: Optional[datetime] = None  # Provider timestamp, used to order events
+
+
+
+class PaymentWebhookBatch(BaseModel):
+    """
+    Schema for a webhook delivery.  Providers batch several events per delivery
+    during settlement.
+    """
+    events: List[PaymentWebhookEvent] = Field(..., min_length=1)
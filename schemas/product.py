@@ -1,6 +1,7 @@
 from typing import Optional, List
 from pydantic import BaseModel,  Field
-from pydantic import conint,  Decimal
+from pydantic import conint
+from decimal import Decimal
 from datetime import datetime
 
 
@@ -13,6 +14,7 @@ class ProductBase(BaseModel):
     description: str = Field(..., min_length=1)
     price: Decimal = Field(..., ge=0)
     stock_quantity: int = Field(..., ge=0)
+    weight: Optional[Decimal] = Field(None, ge=0)  # In kg
     category_id: int = Field(..., gt=0)
     is_active: bool = True
     created_at: datetime
@@ -29,6 +31,7 @@ class ProductCreate(ProductBase):
     description: str = Field(..., min_length=1)
     price: Decimal = Field(..., ge=0)
     stock_quantity: int = Field(..., ge=0)
+    weight: Optional[Decimal] = Field(None, ge=0)
     category_id: int = Field(..., gt=0)
     is_active: bool = True
 
@@ -43,6 +46,7 @@ class ProductUpdate(BaseModel):
     description: Optional[str] = None
     price: Optional[Decimal] = Field(None, ge=0)
     stock_quantity: Optional[int] = Field(None, ge=0)
+    weight: Optional[Decimal] = Field(None, ge=0)
     category_id: Optional[int] = Field(None, gt=0)
     is_active: Optional[bool] = None
     created_at: Optional[datetime] = None
@@ -57,3 +61,21 @@ class ProductRead(ProductBase):
 
     class Config:
         orm_mode = True
+
+
+class RelatedProduct(BaseModel):
+    """
+    Schema for a product bought together with another: the share of the
+    other product's orders that also contain it.
+    """
+    product_id: int
+    score: float
+
+
+class RelatedProducts(BaseModel):
+    """
+    Schema for the products most often bought together with a product,
+    most frequent first.
+    """
+    product_id: int
+    related: List[RelatedProduct]
@@ -49,3 +49,50 @@ class ShippingMethodUpdate(BaseModel):
     is_active: Optional[bool] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
+
+
+
+class ShippingQuoteRead(BaseModel):
+    """
+    Schema for the cost of shipping a cart with one shipping method.
+    """
+    shipping_method_id: int
+    name: str
+    cost: Decimal
+
+
+
+class ShippingRateCreate(BaseModel):
+    """
+    Schema for creating a zone rule of a shipping method.  An empty
+    `postal_prefix` covers the whole country.
+    """
+    shipping_method_id: int
+    country: str = Field(..., min_length=1)  # Matched like addresses' country, case-insensitively
+    postal_prefix: str = Field("", max_length=20)
+    base_cost: Decimal = Field(..., ge=0)
+    cost_per_kg: Decimal = Field(Decimal(0), ge=0)
+    max_weight: Optional[Decimal] = Field(None, gt=0)  # In kg; no limit if None
+
+
+
+class ShippingRateRead(ShippingRateCreate):
+    """
+    Schema for reading a shipping rate.
+    """
+    id: int
+
+    class Config:
+        orm_mode = True
+
+
+
+class ShippingRateUpdate(BaseModel):
+    """
+    Schema for updating a shipping rate. All fields are optional.
+    """
+    country: Optional[str] = Field(None, min_length=1)
+    postal_prefix: Optional[str] = Field(None, max_length=20)
+    base_cost: Optional[Decimal] = Field(None, ge=0)
+    cost_per_kg: Optional[Decimal] = Field(None, ge=0)
+    max_weight: Optional[Decimal] = Field(None, gt=0)
@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+
+
+class Token(BaseModel):
+    """Schema for an access token returned by the login endpoint"""
+    access_token: str
+    token_type: str = "bearer"
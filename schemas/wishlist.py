@@ -0,0 +1,30 @@
+from typing import List
+
+from pydantic import BaseModel, Field, conint
+
+
+class WishlistItemsUpdate(BaseModel):
+    """
+    Schema for adding products to, or removing them from, the wishlist in
+    one request.
+    """
+    product_ids: List[conint(gt=0)] = Field(..., min_length=1, max_length=1000)
+
+
+
+class WishlistItemsChanged(BaseModel):
+    """
+    Schema for the result of a bulk wishlist update: how many products were
+    actually added or removed (products already in, or not in, the wishlist
+    are skipped).
+    """
+    changed: int
+
+
+
+class WishlistMembership(BaseModel):
+    """
+    Schema for the subset of the given product IDs that are in the user's
+    wishlist, in ascending order.
+    """
+    product_ids: List[int]
@@ -0,0 +1,134 @@
+"""
+Production server: gunicorn managing uvicorn workers.
+
+    python serve.py
+
+`uvicorn main:app --reload` (README section 2.4) is for development.  This
+entry point runs `SERVER_WORKERS` worker processes, one per available CPU
+core by default, behind one listening socket, and restarts any that die.
+
+With `SERVER_PRELOAD` the app is imported once, in the master, before the
+workers are forked.  Workers then share the imported modules' memory
+copy-on-write instead of each importing their own copy, and start faster.
+Two things make that safe and effective:
+
+* The database engine is created at import, so the master's engine is
+  inherited by every worker.  `post_fork` gives each worker a fresh pool,
+  so no connection the master may have opened is ever used by two
+  processes.  Everything else that holds connections or threads (the
+  invalidation listener, the webhook flusher) starts in each worker's
+  lifespan, after the fork.
+* CPython's cyclic garbage collector writes to every object it examines,
+  which copies the shared pages into each worker as soon as it runs.  With
+  `SERVER_GC_FREEZE` the collector is disabled in the master, which
+  allocates little once the app is imported, and the imported objects are
+  moved out of its reach (`gc.freeze`) before each fork.  Workers re-enable
+  it and collect only their own garbage.
+
+Each worker logs its memory (RSS, PSS, USS) once it has started and again
+when it exits; `python -m benchmarks.worker_memory` compares the settings.
+"""
+import gc
+import logging
+import os
+import sys
+from typing import Any, Dict
+
+from gunicorn.app.base import BaseApplication
+
+from core.config import settings
+from core.metrics import format_memory, mark_process_dead, process_memory
+
+logger = logging.getLogger("gunicorn.error")
+
+
+def worker_count() -> int:
+    """
+    Returns `SERVER_WORKERS`, or the number of CPU cores this process may
+    run on (which respects CPU affinity and cpusets, unlike `os.cpu_count`).
+    """
+    if settings.SERVER_WORKERS > 0:
+        return settings.SERVER_WORKERS
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _freezes_gc() -> bool:
+    return settings.SERVER_PRELOAD and settings.SERVER_GC_FREEZE
+
+
+def pre_fork(server, worker) -> None:
+    if _freezes_gc():
+        #  Also covers what the master allocated since the previous fork.
+        gc.freeze()
+
+
+def post_fork(server, worker) -> None:
+    if _freezes_gc():
+        gc.enable()
+    #  Without preload the worker imports the app itself, after this hook.
+    database = sys.modules.get("database.database")
+    if database is not None:
+        #  Replaces the pool without closing the master's connections, which
+        #  would close them for the master too.
+        database.engine.dispose(close=False)
+
+
+def worker_exit(server, worker) -> None:
+    logger.info("Worker %d exiting: %s", worker.pid, format_memory(process_memory()))
+
+
+def child_exit(server, worker) -> None:
+    mark_process_dead(worker.pid)
+
+
+class Server(BaseApplication):
+    """
+    Gunicorn application serving `main.app`, configured from the settings
+    rather than a gunicorn config file.
+    """
+
+    def __init__(self, options: Dict[str, Any]):
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for name, value in self.options.items():
+            self.cfg.set(name, value)
+
+    def load(self):
+        from main import app
+
+        return app
+
+
+def options() -> Dict[str, Any]:
+    """
+    Returns the gunicorn settings.  Command line arguments are not parsed;
+    use the `SERVER_*` environment variables.
+    """
+    return {
+        "bind": f"{settings.SERVER_HOST}:{settings.SERVER_PORT}",
+        "workers": worker_count(),
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": settings.SERVER_PRELOAD,
+        "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT,
+        "pre_fork": pre_fork,
+        "post_fork": post_fork,
+        "worker_exit": worker_exit,
+        "child_exit": child_exit,
+    }
+
+
+def main() -> None:
+    if _freezes_gc():
+        #  Collections during the import would leave freed holes in the
+        #  pages the workers are about to share.
+        gc.disable()
+    Server(options()).run()
+
+
+if __name__ == "__main__":
+    main()
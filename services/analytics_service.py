@@ -0,0 +1,419 @@
+"""
+Daily sales rollups for the admin analytics endpoints.
+
+Three tables hold per-day (UTC) totals of the orders that are not
+cancelled, so dashboards read a few hundred rows instead of scanning
+`orders` and `order_items`:
+
+* `sales_daily_category`: orders, units and item revenue per category.
+* `sales_daily_product`: orders, units and item revenue per product.
+* `sales_daily_payment_method`: orders and order totals per payment method.
+
+`run_rollups` keeps them up to date from `order_events`, which records every
+order creation and status change.  It reads the events after the job's
+watermark in batches, and for each batch applies one statement that adds
+the orders that became counted (new, not cancelled) and subtracts those
+that stopped being counted (cancelled).  `sales_rollup_orders` records
+which orders are counted, so reading an event twice changes nothing; each
+run starts `ANALYTICS_ROLLUP_LOOKBACK` events behind the watermark to pick
+up events that committed after later ones.
+
+`verify` recomputes days from the raw rows and reports every difference,
+and `rebuild` replaces days with the recomputed values, e.g. after a
+product moved to another category, or for orders placed before the rollups
+existed.
+
+Usage:
+    python -m services.analytics_service run
+    python -m services.analytics_service rebuild --from 2026-01-01 --to 2026-01-31
+    python -m services.analytics_service verify --from 2026-01-01 --to 2026-01-31
+"""
+import argparse
+import logging
+import sys
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, func, select, text, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.types import Integer
+
+from core.config import settings
+from database.models.category import Category
+from database.models.order_event import OrderEvent
+from database.models.product import Product
+from database.models.sales_rollup import (
+    RollupWatermark,
+    SalesDailyCategory,
+    SalesDailyPaymentMethod,
+    SalesDailyProduct,
+)
+
+logger = logging.getLogger(__name__)
+
+WATERMARK = "sales_daily"
+
+#  Applies the orders whose counted state no longer matches their status.
+#  All CTEs see the same snapshot, and each rollup gets one row per key, so
+#  the upserts never touch a row twice.  An order's items are joined on
+#  (order_id, order_date), which reads only its month's partition.
+_APPLY = text("""
+    WITH flips AS (
+        SELECT o.id, o.order_date, (o.order_date AT TIME ZONE 'UTC')::date AS day,
+               o.payment_method, o.total_price,
+               CASE WHEN o.status <> 'CANCELLED' THEN 1 ELSE -1 END AS sign
+        FROM orders o
+        LEFT JOIN sales_rollup_orders r ON r.order_id = o.id
+        WHERE o.id = ANY(:order_ids)
+          AND (o.status <> 'CANCELLED') <> COALESCE(r.counted, false)
+    ), items AS (
+        SELECT f.day, f.id AS order_id, f.sign, i.product_id, p.category_id,
+               f.sign * i.quantity AS units, f.sign * i.quantity * i.price AS revenue
+        FROM flips f
+        JOIN order_items i ON i.order_id = f.id AND i.order_date = f.order_date
+        JOIN products p ON p.id = i.product_id
+    ), by_product AS (
+        INSERT INTO sales_daily_product AS s (day, product_id, orders, units, revenue)
+        SELECT day, product_id, sum(sign), sum(units), sum(revenue)
+        FROM items GROUP BY day, product_id
+        ON CONFLICT (day, product_id) DO UPDATE SET
+            orders = s.orders + EXCLUDED.orders,
+            units = s.units + EXCLUDED.units,
+            revenue = s.revenue + EXCLUDED.revenue
+    ), by_category AS (
+        INSERT INTO sales_daily_category AS s (day, category_id, orders, units, revenue)
+        SELECT day, category_id, sum(sign), sum(units), sum(revenue)
+        FROM (
+            SELECT day, category_id, min(sign) AS sign, sum(units) AS units, sum(revenue) AS revenue
+            FROM items GROUP BY day, category_id, order_id
+        ) per_order
+        GROUP BY day, category_id
+        ON CONFLICT (day, category_id) DO UPDATE SET
+            orders = s.orders + EXCLUDED.orders,
+            units = s.units + EXCLUDED.units,
+            revenue = s.revenue + EXCLUDED.revenue
+    ), by_payment_method AS (
+        INSERT INTO sales_daily_payment_method AS s (day, payment_method, orders, revenue)
+        SELECT day, payment_method, sum(sign), sum(sign * total_price)
+        FROM flips GROUP BY day, payment_method
+        ON CONFLICT (day, payment_method) DO UPDATE SET
+            orders = s.orders + EXCLUDED.orders,
+            revenue = s.revenue + EXCLUDED.revenue
+    ), ledger AS (
+        INSERT INTO sales_rollup_orders (order_id, counted)
+        SELECT id, sign > 0 FROM flips
+        ON CONFLICT (order_id) DO UPDATE SET counted = EXCLUDED.counted
+    )
+    SELECT count(*) FROM flips
+""").bindparams(bindparam("order_ids", type_=ARRAY(Integer)))
+
+#  The rollups recomputed from the raw rows of the orders placed in
+#  [:start_at, :end_at), by table: (key column, measure columns, query).
+_COUNTED_ITEMS = """
+    FROM orders o
+    JOIN order_items i ON i.order_id = o.id AND i.order_date = o.order_date
+    JOIN products p ON p.id = i.product_id
+    WHERE o.status <> 'CANCELLED' AND o.order_date >= :start_at AND o.order_date < :end_at
+"""
+_RAW = {
+    "sales_daily_category": ("category_id", ("orders", "units", "revenue"), f"""
+        SELECT day, category_id, count(*) AS orders, sum(units) AS units, sum(revenue) AS revenue
+        FROM (
+            SELECT (o.order_date AT TIME ZONE 'UTC')::date AS day, p.category_id,
+                   sum(i.quantity) AS units, sum(i.quantity * i.price) AS revenue
+            {_COUNTED_ITEMS}
+            GROUP BY 1, 2, o.id
+        ) per_order
+        GROUP BY day, category_id
+    """),
+    "sales_daily_product": ("product_id", ("orders", "units", "revenue"), f"""
+        SELECT (o.order_date AT TIME ZONE 'UTC')::date AS day, i.product_id,
+               count(*) AS orders, sum(i.quantity) AS units, sum(i.quantity * i.price) AS revenue
+        {_COUNTED_ITEMS}
+        GROUP BY 1, 2
+    """),
+    "sales_daily_payment_method": ("payment_method", ("orders", "revenue"), """
+        SELECT (o.order_date AT TIME ZONE 'UTC')::date AS day, o.payment_method,
+               count(*) AS orders, sum(o.total_price) AS revenue
+        FROM orders o
+        WHERE o.status <> 'CANCELLED' AND o.order_date >= :start_at AND o.order_date < :end_at
+        GROUP BY 1, 2
+    """),
+}
+
+
+def _bounds(start: date, end: date) -> Dict[str, object]:
+    """
+    The query parameters for the days from `start` to `end`, inclusive.
+    """
+    return {
+        "start": start,
+        "end": end,
+        "start_at": datetime.combine(start, time(), timezone.utc),
+        "end_at": datetime.combine(end + timedelta(days=1), time(), timezone.utc),
+    }
+
+
+def _lock_watermark(db: Session) -> int:
+    """
+    Locks the job's watermark row, creating it if needed, and returns the
+    last event ID processed.  Rollup writers hold it until they commit.
+    """
+    db.execute(
+        insert(RollupWatermark)
+        .values(name=WATERMARK, last_event_id=0)
+        .on_conflict_do_nothing(index_elements=["name"])
+    )
+    return db.execute(
+        select(RollupWatermark.last_event_id)
+        .where(RollupWatermark.name == WATERMARK)
+        .with_for_update()
+    ).scalar_one()
+
+
+def run_rollups(db: Session, batch_size: Optional[int] = None, max_batches: Optional[int] = None) -> Dict[str, int]:
+    """
+    Applies the order events recorded since the last run to the rollups,
+    one batch per transaction, until there are none left.
+
+    Args:
+        db: The database session.
+        batch_size: Events per batch.  Defaults to `ANALYTICS_ROLLUP_BATCH_SIZE`.
+        max_batches: Stop after this many batches.  Defaults to no limit.
+
+    Returns:
+        The numbers of events read and of orders added to or removed from
+        the rollups.
+    """
+    batch_size = batch_size or settings.ANALYTICS_ROLLUP_BATCH_SIZE
+    totals = {"events": 0, "orders": 0}
+    after = None
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        watermark = _lock_watermark(db)
+        if after is None:
+            after = max(watermark - settings.ANALYTICS_ROLLUP_LOOKBACK, 0)
+        events = db.execute(
+            select(OrderEvent.id, OrderEvent.order_id)
+            .where(OrderEvent.id > after)
+            .order_by(OrderEvent.id)
+            .limit(batch_size)
+        ).all()
+        if not events:
+            db.commit()
+            break
+        order_ids = sorted({order_id for _, order_id in events})
+        flipped = db.execute(_APPLY, {"order_ids": order_ids}).scalar()
+        after = events[-1][0]
+        db.execute(
+            update(RollupWatermark)
+            .where(RollupWatermark.name == WATERMARK)
+            .values(last_event_id=func.greatest(RollupWatermark.last_event_id, after))
+        )
+        db.commit()
+        batches += 1
+        totals["events"] += len(events)
+        totals["orders"] += flipped
+    return totals
+
+
+def rebuild(db: Session, start: date, end: date) -> Dict[str, int]:
+    """
+    Replaces the rollups of the days from `start` to `end` (inclusive) with
+    values recomputed from the raw rows, in one transaction.
+
+    Args:
+        db: The database session.
+        start: The first day.
+        end: The last day.
+
+    Returns:
+        The number of rollup rows written, by table.
+    """
+    params = _bounds(start, end)
+    _lock_watermark(db)
+    written = {}
+    for table, (key, measures, raw) in _RAW.items():
+        db.execute(text(f"DELETE FROM {table} WHERE day BETWEEN :start AND :end"), params)
+        columns = ", ".join(("day", key, *measures))
+        written[table] = db.execute(
+            text(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM ({raw}) raw"), params
+        ).rowcount
+    db.execute(text("""
+        INSERT INTO sales_rollup_orders (order_id, counted)
+        SELECT id, status <> 'CANCELLED' FROM orders
+        WHERE order_date >= :start_at AND order_date < :end_at
+        ON CONFLICT (order_id) DO UPDATE SET counted = EXCLUDED.counted
+    """), params)
+    db.commit()
+    return written
+
+
+def verify(db: Session, start: date, end: date) -> List[Dict[str, object]]:
+    """
+    Recomputes the days from `start` to `end` (inclusive) from the raw rows
+    and compares them with the rollups.
+
+    Args:
+        db: The database session.
+        start: The first day.
+        end: The last day.
+
+    Returns:
+        One entry per differing rollup row: the table, day and key, and the
+        raw (`expected`) and rolled up (`actual`) measures.  Empty if the
+        rollups match.
+    """
+    params = _bounds(start, end)
+    drift = []
+    for table, (key, measures, raw) in _RAW.items():
+        columns = ", ".join(
+            f"COALESCE(raw.{m}, 0) AS expected_{m}, COALESCE(rolled.{m}, 0) AS actual_{m}" for m in measures
+        )
+        differs = " OR ".join(f"COALESCE(raw.{m}, 0) <> COALESCE(rolled.{m}, 0)" for m in measures)
+        rows = db.execute(text(f"""
+            SELECT day, {key}, {columns}
+            FROM ({raw}) raw
+            FULL JOIN (SELECT * FROM {table} WHERE day BETWEEN :start AND :end) rolled USING (day, {key})
+            WHERE {differs}
+            ORDER BY day, {key}
+        """), params)
+        for row in rows:
+            values = tuple(row)
+            drift.append({
+                "table": table,
+                "day": values[0],
+                "key": values[1],
+                "expected": {m: values[2 + 2 * n] for n, m in enumerate(measures)},
+                "actual": {m: values[3 + 2 * n] for n, m in enumerate(measures)},
+            })
+    return drift
+
+
+def daily_revenue(db: Session, start: date, end: date) -> List[Dict[str, object]]:
+    """
+    Returns the orders and revenue (order totals) of each day from `start`
+    to `end` that had any, oldest first.
+    """
+    result = db.execute(
+        select(
+            SalesDailyPaymentMethod.day,
+            func.sum(SalesDailyPaymentMethod.orders).label("orders"),
+            func.sum(SalesDailyPaymentMethod.revenue).label("revenue"),
+        )
+        .where(SalesDailyPaymentMethod.day.between(start, end))
+        .group_by(SalesDailyPaymentMethod.day)
+        .having(func.sum(SalesDailyPaymentMethod.orders) > 0)
+        .order_by(SalesDailyPaymentMethod.day)
+    )
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+def category_sales(db: Session, start: date, end: date, limit: int) -> List[Dict[str, object]]:
+    """
+    Returns the `limit` categories with the most item revenue from `start`
+    to `end`, with their orders and units sold.
+    """
+    totals = (
+        select(
+            SalesDailyCategory.category_id,
+            func.sum(SalesDailyCategory.orders).label("orders"),
+            func.sum(SalesDailyCategory.units).label("units"),
+            func.sum(SalesDailyCategory.revenue).label("revenue"),
+        )
+        .where(SalesDailyCategory.day.between(start, end))
+        .group_by(SalesDailyCategory.category_id)
+        .having(func.sum(SalesDailyCategory.orders) > 0)
+        .subquery()
+    )
+    result = db.execute(
+        select(totals.c.category_id, Category.name, totals.c.orders, totals.c.units, totals.c.revenue)
+        .join(Category, Category.id == totals.c.category_id)
+        .order_by(totals.c.revenue.desc(), totals.c.category_id)
+        .limit(limit)
+    )
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+def product_sales(db: Session, start: date, end: date, limit: int) -> List[Dict[str, object]]:
+    """
+    Returns the `limit` products with the most units sold from `start` to
+    `end`, with their orders and item revenue.
+    """
+    totals = (
+        select(
+            SalesDailyProduct.product_id,
+            func.sum(SalesDailyProduct.orders).label("orders"),
+            func.sum(SalesDailyProduct.units).label("units"),
+            func.sum(SalesDailyProduct.revenue).label("revenue"),
+        )
+        .where(SalesDailyProduct.day.between(start, end))
+        .group_by(SalesDailyProduct.product_id)
+        .having(func.sum(SalesDailyProduct.orders) > 0)
+        .order_by(func.sum(SalesDailyProduct.units).desc(), SalesDailyProduct.product_id)
+        .limit(limit)
+        .subquery()
+    )
+    result = db.execute(
+        select(totals.c.product_id, Product.name, totals.c.orders, totals.c.units, totals.c.revenue)
+        .join(Product, Product.id == totals.c.product_id)
+        .order_by(totals.c.units.desc(), totals.c.product_id)
+    )
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+def payment_method_sales(db: Session, start: date, end: date) -> List[Dict[str, object]]:
+    """
+    Returns the orders and revenue (order totals) of each payment method
+    from `start` to `end`, highest revenue first.
+    """
+    result = db.execute(
+        select(
+            SalesDailyPaymentMethod.payment_method,
+            func.sum(SalesDailyPaymentMethod.orders).label("orders"),
+            func.sum(SalesDailyPaymentMethod.revenue).label("revenue"),
+        )
+        .where(SalesDailyPaymentMethod.day.between(start, end))
+        .group_by(SalesDailyPaymentMethod.payment_method)
+        .having(func.sum(SalesDailyPaymentMethod.orders) > 0)
+        .order_by(func.sum(SalesDailyPaymentMethod.revenue).desc())
+    )
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+def _day(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+if __name__ == "__main__":
+    from database.database import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Maintain and check the daily sales rollups.")
+    parser.add_argument("command", choices=["run", "rebuild", "verify"])
+    parser.add_argument("--from", dest="start", type=_day, help="First day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", type=_day, help="Last day (YYYY-MM-DD)")
+    args = parser.parse_args()
+    if args.command != "run" and (args.start is None or args.end is None):
+        parser.error(f"{args.command} needs --from and --to")
+
+    db = SessionLocal()
+    try:
+        if args.command == "run":
+            logger.info("Rollups: %s", run_rollups(db))
+        elif args.command == "rebuild":
+            logger.info("Rebuilt: %s", rebuild(db, args.start, args.end))
+        else:
+            drift = verify(db, args.start, args.end)
+            for entry in drift:
+                logger.warning("Drift: %s", entry)
+            logger.info("%d rollup rows differ from the raw rows", len(drift))
+            if drift:
+                sys.exit(1)
+    finally:
+        db.close()
@@ -0,0 +1,387 @@
+"""
+Columnar snapshots of `order_items` for ad-hoc analytics.
+
+Questions like "top sellers this quarter", "how big are baskets" or "what do
+the January customers spend in later months" touch every order item in a
+date range.  Instead of loading them through the ORM, `refresh` streams
+them from a server-side cursor into one NumPy array per column and saves
+the arrays as `.npy` files, one directory per month of `order_date`:
+
+    <ANALYTICS_SNAPSHOT_DIR>/order_items_2026_01/order_id.npy
+                                                 product_id.npy
+                                                 ...
+
+`load_columns` memory-maps the months of a range, so several processes
+share the page cache and nothing is parsed, and the aggregates below are
+computed with vectorized NumPy operations over the whole range at once.
+
+Snapshots are refreshed per month.  A month is (re)written when it has no
+snapshot yet or when one of its orders has an `order_events` entry since
+the last refresh (e.g. a cancellation), so a daily refresh usually
+rewrites only the current month.  Months archived by
+`database.partitioning` keep their last snapshot.
+
+Every row carries its order's status; the aggregates count only orders
+that are not cancelled.
+
+Usage:
+    python -m services.columnar_analytics refresh [--full]
+    python -m services.columnar_analytics top-sellers --from 2026-01 --to 2026-03 --by revenue
+    python -m services.columnar_analytics basket-sizes --from 2026-01 --to 2026-03
+    python -m services.columnar_analytics cohorts --from 2025-01 --to 2026-03
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from core.config import settings
+from database.models.order import OrderStatus
+from database.partitioning import add_months, list_partitions, month_start, months_between, partition_name
+
+#  Column name and dtype, in the order `_MONTH_ROWS` selects them.
+COLUMNS = (
+    ("order_id", np.int32),
+    ("user_id", np.int32),
+    ("product_id", np.int32),
+    ("category_id", np.int32),
+    ("quantity", np.int32),
+    ("price_cents", np.int64),  # Unit price at the time of order
+    ("order_date", np.int64),  # Seconds since the epoch
+    ("status", np.int8),  # Index into STATUSES
+)
+STATUSES = list(OrderStatus)
+CANCELLED = STATUSES.index(OrderStatus.CANCELLED)
+
+_STATUS_CODE = "CASE o.status {} END".format(
+    " ".join(f"WHEN '{status.name}' THEN {code}" for code, status in enumerate(STATUSES))
+)
+#  One month's order items.  The date bounds on both tables limit the scan
+#  to the month's partitions.
+_MONTH_ROWS = text(f"""
+    SELECT i.order_id, o.user_id, i.product_id, p.category_id, i.quantity,
+           (i.price * 100)::bigint, extract(epoch FROM i.order_date)::bigint, {_STATUS_CODE}
+    FROM order_items i
+    JOIN orders o ON o.id = i.order_id AND o.order_date = i.order_date
+    JOIN products p ON p.id = i.product_id
+    WHERE i.order_date >= :start_at AND i.order_date < :end_at
+      AND o.order_date >= :start_at AND o.order_date < :end_at
+""")
+
+#  The months of the orders with events in (:after, :last].
+_CHANGED_MONTHS = text("""
+    SELECT DISTINCT date_trunc('month', o.order_date AT TIME ZONE 'UTC')::date
+    FROM order_events e
+    JOIN orders o ON o.id = e.order_id
+    WHERE e.id > :after AND e.id <= :last
+""")
+
+_META = "snapshot.json"
+
+
+class OrderItemColumns(NamedTuple):
+    """
+    The order items of a range of months, one array per column, sorted by
+    month and then by order ID, so each order's items are contiguous.
+    `month` indexes `months`.
+    """
+    months: List[date]
+    month: np.ndarray
+    order_id: np.ndarray
+    user_id: np.ndarray
+    product_id: np.ndarray
+    category_id: np.ndarray
+    quantity: np.ndarray
+    price_cents: np.ndarray
+    order_date: np.ndarray
+    status: np.ndarray
+
+
+def _directory(directory: Optional[str]) -> Path:
+    return Path(directory or settings.ANALYTICS_SNAPSHOT_DIR)
+
+
+def _read_meta(root: Path) -> Dict[str, object]:
+    try:
+        return json.loads((root / _META).read_text())
+    except FileNotFoundError:
+        return {"last_event_id": 0, "months": {}}
+
+
+def _write_meta(root: Path, meta: Dict[str, object]) -> None:
+    temporary = root / f"{_META}.tmp"
+    temporary.write_text(json.dumps(meta, indent=2, sort_keys=True))
+    os.replace(temporary, root / _META)
+
+
+def _bound(month: date) -> datetime:
+    return datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+
+
+def write_month(conn: Connection, root: Path, month: date, fetch_size: Optional[int] = None) -> int:
+    """
+    Streams a month's order items into a new snapshot of the month, which
+    replaces the old one once complete.  Readers that have the old one
+    mapped keep reading it.
+
+    Args:
+        conn: A connection.
+        root: The snapshot directory.
+        month: The first day of the month.
+        fetch_size: Rows fetched from the cursor at a time.  Defaults to
+            `ANALYTICS_SNAPSHOT_FETCH_SIZE`.
+
+    Returns:
+        The number of rows written.
+    """
+    fetch_size = fetch_size or settings.ANALYTICS_SNAPSHOT_FETCH_SIZE
+    result = conn.execute(
+        _MONTH_ROWS.execution_options(yield_per=fetch_size),
+        {"start_at": _bound(month), "end_at": _bound(add_months(month, 1))},
+    )
+    chunks = [np.array(rows, dtype=np.int64) for rows in result.partitions()]
+    block = np.concatenate(chunks) if chunks else np.empty((0, len(COLUMNS)), dtype=np.int64)
+    block = block[np.argsort(block[:, 0], kind="stable")]
+
+    name = partition_name("order_items", month)
+    target, staging, old = root / name, root / f"{name}.tmp", root / f"{name}.old"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    for index, (column, dtype) in enumerate(COLUMNS):
+        np.save(staging / f"{column}.npy", np.ascontiguousarray(block[:, index], dtype=dtype))
+    if target.exists():
+        os.replace(target, old)
+    os.replace(staging, target)
+    shutil.rmtree(old, ignore_errors=True)
+    return len(block)
+
+
+def refresh(conn: Connection, directory: Optional[str] = None, full: bool = False) -> Dict[str, int]:
+    """
+    Brings the snapshots up to date: writes the months that have no
+    snapshot, and rewrites those with order events since the last refresh.
+
+    Args:
+        conn: A connection.
+        directory: The snapshot directory.  Defaults to `ANALYTICS_SNAPSHOT_DIR`.
+        full: Rewrite every month that has a partition.
+
+    Returns:
+        The number of rows written per month rewritten, by month ("YYYY-MM").
+    """
+    root = _directory(directory)
+    root.mkdir(parents=True, exist_ok=True)
+    meta = _read_meta(root)
+    #  Read before the months, so changes made meanwhile are picked up by the
+    #  next refresh; events that commit late are re-read thanks to the
+    #  lookback.
+    last = conn.execute(text("SELECT COALESCE(max(id), 0) FROM order_events")).scalar()
+    months = set(list_partitions(conn, "orders"))
+    if full:
+        stale = months
+    else:
+        stale = {month for month in months if not (root / partition_name("order_items", month)).exists()}
+        after = max(meta["last_event_id"] - settings.ANALYTICS_ROLLUP_LOOKBACK, 0)
+        stale |= months & set(conn.execute(_CHANGED_MONTHS, {"after": after, "last": last}).scalars())
+
+    written = {}
+    for month in sorted(stale):
+        written[f"{month:%Y-%m}"] = meta["months"][f"{month:%Y-%m}"] = write_month(conn, root, month)
+    meta["last_event_id"] = last
+    meta["refreshed_at"] = datetime.now(timezone.utc).isoformat()
+    _write_meta(root, meta)
+    return written
+
+
+def load_columns(start: date, end: date, directory: Optional[str] = None) -> OrderItemColumns:
+    """
+    Loads the snapshots of the months from `start`'s to `end`'s.  Months
+    without a snapshot are skipped.  A single month is memory-mapped as is;
+    several are concatenated.
+
+    Args:
+        start: A date in the first month.
+        end: A date in the last month.
+        directory: The snapshot directory.  Defaults to `ANALYTICS_SNAPSHOT_DIR`.
+
+    Returns:
+        The order items' columns.
+    """
+    root = _directory(directory)
+    months, parts = [], []
+    for month in months_between(start, end):
+        path = root / partition_name("order_items", month)
+        if path.exists():
+            months.append(month)
+            parts.append({column: np.load(path / f"{column}.npy", mmap_mode="r") for column, _ in COLUMNS})
+    columns = {}
+    for column, dtype in COLUMNS:
+        arrays = [part[column] for part in parts]
+        columns[column] = arrays[0] if len(arrays) == 1 else np.concatenate(arrays) if arrays else np.empty(0, dtype)
+    lengths = [len(part["order_id"]) for part in parts]
+    month_index = np.repeat(np.arange(len(months), dtype=np.int16), lengths)
+    return OrderItemColumns(months=months, month=month_index, **columns)
+
+
+def counted(columns: OrderItemColumns) -> OrderItemColumns:
+    """
+    Returns the columns without the items of cancelled orders.
+    """
+    keep = columns.status != CANCELLED
+    return OrderItemColumns(columns.months, *(array[keep] for array in columns[1:]))
+
+
+def _order_starts(columns: OrderItemColumns) -> np.ndarray:
+    """
+    The index of the first item of each order.
+    """
+    order_id = columns.order_id
+    if not len(order_id):
+        return np.empty(0, dtype=np.intp)
+    return np.concatenate(([0], np.flatnonzero(order_id[1:] != order_id[:-1]) + 1))
+
+
+def top_sellers(columns: OrderItemColumns, limit: int = 10, by: str = "units") -> List[Dict[str, object]]:
+    """
+    Returns the `limit` products with the most units sold or revenue.
+
+    Args:
+        columns: The order items, e.g. `counted(load_columns(...))`.
+        limit: The number of products.
+        by: "units" or "revenue".
+
+    Returns:
+        The products' IDs, units, revenue and orders, best first.
+    """
+    if not len(columns.product_id):
+        return []
+    product_id = columns.product_id
+    units = np.bincount(product_id, weights=columns.quantity)
+    revenue = np.bincount(product_id, weights=columns.quantity * columns.price_cents)
+    orders = np.bincount(product_id)
+    ranking = units if by == "units" else revenue
+    limit = min(limit, np.count_nonzero(orders))
+    best = np.argpartition(-ranking, limit - 1)[:limit]
+    best = best[np.lexsort((best, -ranking[best]))]
+    return [
+        {
+            "product_id": int(product),
+            "units": int(units[product]),
+            "revenue": round(revenue[product] / 100, 2),
+            "orders": int(orders[product]),
+        }
+        for product in best
+    ]
+
+
+def basket_sizes(columns: OrderItemColumns, percentiles=(50, 90, 99)) -> Dict[str, object]:
+    """
+    Describes the distribution of units per order.
+
+    Args:
+        columns: The order items, e.g. `counted(load_columns(...))`.
+        percentiles: The percentiles to report.
+
+    Returns:
+        The number of orders, the mean units and distinct products per
+        order, the percentiles of units per order, and the number of orders
+        by units.
+    """
+    starts = _order_starts(columns)
+    if not len(starts):
+        return {"orders": 0}
+    units = np.add.reduceat(columns.quantity, starts)
+    products = np.diff(np.append(starts, len(columns.order_id)))
+    histogram = np.bincount(units)
+    return {
+        "orders": len(starts),
+        "mean_units": round(float(units.mean()), 3),
+        "mean_products": round(float(products.mean()), 3),
+        "percentiles": {f"p{p}": int(value) for p, value in zip(percentiles, np.percentile(units, percentiles))},
+        "histogram": {int(size): int(count) for size, count in zip(np.flatnonzero(histogram), histogram[histogram > 0])},
+    }
+
+
+def cohort_revenue(columns: OrderItemColumns) -> List[Dict[str, object]]:
+    """
+    Returns the revenue of each monthly customer cohort in each month.  A
+    customer's cohort is the month of their first order in `columns`, so
+    load the whole history for true first orders.
+
+    Args:
+        columns: The order items, e.g. `counted(load_columns(...))`.
+
+    Returns:
+        One entry per cohort and month with orders: the cohort's size, and
+        the month's customers, orders and revenue.
+    """
+    starts = _order_starts(columns)
+    if not len(starts):
+        return []
+    n_months = len(columns.months)
+    user = columns.user_id[starts]
+    month = columns.month[starts].astype(np.int64)
+    revenue = np.add.reduceat(columns.quantity * columns.price_cents, starts)
+    #  Orders are in month order, so a user's first order is their first
+    #  occurrence.
+    users, first, inverse = np.unique(user, return_index=True, return_inverse=True)
+    cohort = month[first][inverse]
+    cell = cohort * n_months + month
+    cells = n_months * n_months
+    orders = np.bincount(cell, minlength=cells)
+    totals = np.bincount(cell, weights=revenue, minlength=cells)
+    customers = np.bincount(np.unique(inverse.astype(np.int64) * cells + cell) % cells, minlength=cells)
+    sizes = np.bincount(month[first], minlength=n_months)
+    return [
+        {
+            "cohort": f"{columns.months[index // n_months]:%Y-%m}",
+            "month": f"{columns.months[index % n_months]:%Y-%m}",
+            "cohort_size": int(sizes[index // n_months]),
+            "customers": int(customers[index]),
+            "orders": int(orders[index]),
+            "revenue": round(totals[index] / 100, 2),
+        }
+        for index in np.flatnonzero(orders)
+    ]
+
+
+def _month(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+if __name__ == "__main__":
+    from database.database import engine
+
+    parser = argparse.ArgumentParser(description="Refresh and query the columnar order item snapshots.")
+    parser.add_argument("command", choices=["refresh", "top-sellers", "basket-sizes", "cohorts"])
+    parser.add_argument("--full", action="store_true", help="refresh: rewrite every month")
+    parser.add_argument("--from", dest="start", type=_month, help="First month (YYYY-MM)")
+    parser.add_argument("--to", dest="end", type=_month, help="Last month (YYYY-MM)")
+    parser.add_argument("--limit", type=int, default=10, help="top-sellers: number of products")
+    parser.add_argument("--by", choices=["units", "revenue"], default="units", help="top-sellers: ranking")
+    parser.add_argument("--directory", help="Default: ANALYTICS_SNAPSHOT_DIR")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.command == "refresh":
+        with engine.connect() as conn:
+            output = {"months": refresh(conn, args.directory, full=args.full)}
+    else:
+        this_month = month_start(datetime.now(timezone.utc).date())
+        items = counted(load_columns(args.start or this_month, args.end or this_month, args.directory))
+        if args.command == "top-sellers":
+            output = {"products": top_sellers(items, args.limit, args.by)}
+        elif args.command == "basket-sizes":
+            output = basket_sizes(items)
+        else:
+            output = {"cohorts": cohort_revenue(items)}
+    output["seconds"] = round(time.perf_counter() - started, 3)
+    print(json.dumps(output, indent=2))
@@ -1,11 +1,57 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from sqlalchemy import Integer, String, any_, bindparam, cast, insert, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session, load_only, selectinload
 from sqlalchemy.exc import SQLAlchemyError
-from database.models.order import Order, OrderItem
+from database.models.order import Order, OrderStatus
+from database.models.order_event import OrderEvent
+from database.models.order_item import OrderItem
 from database.models.product import Product
-from database.schemas.order import OrderCreate, OrderRead, OrderItemCreate, OrderItemRead
+from schemas.order import OrderCreate, OrderRead, OrderItemCreate, OrderItemRead
 from fastapi import HTTPException, status
 from decimal import Decimal
+from datetime import datetime, timezone
+
+
+#  Columns of an `OrderSummaryRead`, by field name.  Its "items" field is
+#  loaded by a second query, only when requested.
+ORDER_SUMMARY_COLUMNS = {
+    column.key: column
+    for column in (
+        Order.id,
+        Order.user_id,
+        Order.shipping_address_id,
+        Order.order_date,
+        Order.total_price,
+        Order.status,
+        Order.payment_method,
+    )
+}
+ORDER_SUMMARY_FIELDS = (*ORDER_SUMMARY_COLUMNS, "items")
+ORDER_ITEM_COLUMNS = (OrderItem.product_id, OrderItem.quantity, OrderItem.price)
+
+#  The order status state machine: the statuses an order may move to from
+#  each status.  Delivered and cancelled orders are final.  Payment webhooks
+#  (`payment_service.PAYMENT_ORDER_STATUS_PROPAGATION`) follow the same rules.
+ORDER_STATUS_TRANSITIONS: Dict[OrderStatus, FrozenSet[OrderStatus]] = {
+    OrderStatus.PENDING: frozenset({OrderStatus.PROCESSING, OrderStatus.CANCELLED}),
+    OrderStatus.PROCESSING: frozenset({OrderStatus.SHIPPED, OrderStatus.CANCELLED}),
+    OrderStatus.SHIPPED: frozenset({OrderStatus.DELIVERED}),
+    OrderStatus.DELIVERED: frozenset(),
+    OrderStatus.CANCELLED: frozenset(),
+}
+
+
+def allowed_from(new_status: OrderStatus) -> Tuple[OrderStatus, ...]:
+    """
+    Returns the statuses an order may move to `new_status` from.
+    """
+    return tuple(source for source in OrderStatus if new_status in ORDER_STATUS_TRANSITIONS[source])
+
+
+class OrderTransitionResult(NamedTuple):
+    updated: List[int]  # IDs of the orders moved, ascending
+    rejected: Dict[int, Optional[OrderStatus]]  # Current status by order ID; None if not found
 
 
 def create_order(db: Session, order_create: OrderCreate, user_id: int) -> OrderRead:
@@ -58,12 +104,15 @@ def create_order(db: Session, order_create: OrderCreate, user_id: int) -> OrderR
         # Create the order
         order = Order(
             user_id=user_id,
+            order_date=datetime.now(timezone.utc),  # Part of the key; also copied to the items
             shipping_address_id=order_create.shipping_address_id,
             payment_method=order_create.payment_method,
             total_price=total_price,
             items=order_items,
         )
         db.add(order)
+        db.flush()  # Assigns the order's ID
+        add_order_events(db, [order.id], "created", OrderStatus.PENDING)
         db.commit()  # Commit the entire transaction
         db.refresh(order)
 
@@ -125,38 +174,270 @@ def get_orders_by_user(db: Session, user_id: int) -> List[OrderRead]:
 
 
 
-def update_order_status(db: Session, order_id: int, status: str) -> OrderRead:
+def _placed_between(placed_after: Optional[datetime], placed_before: Optional[datetime]) -> List[Any]:
     """
-    Updates the status of an order.
+    Returns the `order_date` conditions for a date range.  Constant bounds
+    let PostgreSQL skip the partitions outside the range when planning.
+    """
+    conditions = []
+    if placed_after is not None:
+        conditions.append(Order.order_date >= placed_after)
+    if placed_before is not None:
+        conditions.append(Order.order_date < placed_before)
+    return conditions
+
+
+
+def _attach_items(db: Session, orders: List[Dict[str, Any]]) -> None:
+    """
+    Loads the items of a page of orders in one query and adds them to each
+    order dict under "items".  The orders must include "order_date": the
+    query is bounded by the page's dates, so it only reads the partitions of
+    the months the page spans.
+    """
+    by_id = {}
+    for order in orders:
+        order["items"] = []
+        by_id[order["id"]] = order
+    dates = [order["order_date"] for order in orders]
+    rows = db.execute(
+        select(OrderItem.order_id, *ORDER_ITEM_COLUMNS)
+        .where(OrderItem.order_id.in_(by_id))
+        .where(OrderItem.order_date.between(min(dates), max(dates)))
+        .order_by(OrderItem.order_id, OrderItem.product_id)
+    )
+    for order_id, product_id, quantity, price in rows:
+        by_id[order_id]["items"].append({"product_id": product_id, "quantity": quantity, "price": price})
+
+
+
+def list_orders_for_user(
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 20,
+    fields: Optional[Sequence[str]] = None,
+    placed_after: Optional[datetime] = None,
+    placed_before: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Retrieves a page of a user's order history as plain dicts with the
+    fields of `OrderSummaryRead`, newest first.
+
+    Only the requested columns are selected, and the items are only loaded
+    (in one extra query for the page) if "items" is requested.  A date range
+    restricts both queries to the partitions of its months; see
+    `database.partitioning`.
 
     Args:
         db: The database session.
-        order_id: The ID of the order to update.
-        status: The new status of the order.
+        user_id: The ID of the user.
+        skip: The number of orders to skip.
+        limit: The maximum number of orders to retrieve.
+        fields: The fields to return, from `utils.fields.parse_fields`.
+            Defaults to all fields.
+        placed_after: Only orders placed at or after this time.
+        placed_before: Only orders placed before this time.
 
     Returns:
-        The updated order.
+        A list of order dicts.
+    """
+    fields = fields or ORDER_SUMMARY_FIELDS
+    columns = [ORDER_SUMMARY_COLUMNS[name] for name in fields if name in ORDER_SUMMARY_COLUMNS]
+    with_items = "items" in fields
+    if with_items and "order_date" not in fields:
+        columns.append(Order.order_date)
+    query = (
+        select(*columns)
+        .where(Order.user_id == user_id, *_placed_between(placed_after, placed_before))
+        .order_by(Order.order_date.desc(), Order.id.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    result = db.execute(query)
+    keys = tuple(result.keys())
+    orders = [dict(zip(keys, row)) for row in result]
+    if with_items and orders:
+        _attach_items(db, orders)
+        if "order_date" not in fields:
+            for order in orders:
+                del order["order_date"]
+    return orders
+
+
+
+def get_order_for_user(
+    db: Session,
+    order_id: int,
+    user_id: int,
+    fields: Optional[Sequence[str]] = None,
+    placed_after: Optional[datetime] = None,
+    placed_before: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    Retrieves one of a user's orders as a dict with the fields of
+    `OrderSummaryRead`.  Columns that were not requested are not loaded
+    (`load_only`), nor are the items unless requested.
+
+    Without a date range the order is looked up in every month's partition;
+    with one, only in the months it covers.  The items are loaded by
+    (order_id, order_date), from the order's month only.
+
+    Args:
+        db: The database session.
+        order_id: The ID of the order.
+        user_id: The ID of the user who must own the order.
+        fields: The fields to return, from `utils.fields.parse_fields`.
+            Defaults to all fields.
+        placed_after: The order was placed at or after this time.
+        placed_before: The order was placed before this time.
+
+    Returns:
+        The order dict.
 
     Raises:
-        HTTPException: If the order is not found or if an invalid status is provided.
+        HTTPException: If the order is not found or belongs to another user.
     """
-    order = db.query(Order).filter(Order.id == order_id).first()
+    fields = fields or ORDER_SUMMARY_FIELDS
+    columns = [ORDER_SUMMARY_COLUMNS[name] for name in fields if name in ORDER_SUMMARY_COLUMNS]
+    query = db.query(Order).options(load_only(*columns))
+    if "items" in fields:
+        query = query.options(selectinload(Order.items).load_only(*ORDER_ITEM_COLUMNS))
+    order = query.filter(
+        Order.id == order_id, Order.user_id == user_id, *_placed_between(placed_after, placed_before)
+    ).first()
     if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Order not found"
         )
+    result = {name: getattr(order, name) for name in fields if name in ORDER_SUMMARY_COLUMNS}
+    if "items" in fields:
+        result["items"] = [
+            {"product_id": item.product_id, "quantity": item.quantity, "price": item.price}
+            for item in order.items
+        ]
+    return result
+
+
+
+def add_order_events(db: Session, order_ids: Sequence[int], event_type: str, new_status: OrderStatus) -> None:
+    """
+    Records one `OrderEvent` per order in the current transaction, in a
+    single batched INSERT.  Every change to an order's status must be
+    recorded, as `analytics_service` maintains its rollups from the events.
+
+    Args:
+        db: The database session.  The caller commits.
+        order_ids: The IDs of the orders.
+        event_type: "created" or "status_changed".
+        new_status: The orders' status after the change.
+    """
+    if order_ids:
+        db.execute(
+            insert(OrderEvent),
+            [{"order_id": order_id, "event_type": event_type, "status": new_status} for order_id in order_ids],
+        )
+
+
+
+def transition_orders(
+    db: Session, order_ids: Iterable[int], new_status: OrderStatus, placed_after: Optional[datetime] = None
+) -> OrderTransitionResult:
+    """
+    Moves many orders to a new status at once, in one transaction.
+
+    The transition is checked by the database rather than order by order:
+    a single `UPDATE orders ... WHERE id = ANY(:ids) AND status =
+    ANY(:allowed_from) RETURNING id` changes exactly the orders whose
+    current status allows the move (see `ORDER_STATUS_TRANSITIONS`), so two
+    concurrent calls cannot both move the same order.  One "status_changed"
+    `OrderEvent` per updated order is inserted in the same transaction, in a
+    single batched INSERT.  Orders that were not updated are looked up (one
+    query) to report their current status.
+
+    Args:
+        db: The database session.
+        order_ids: The IDs of the orders to move.
+        new_status: The status to move them to.
+        placed_after: If known, a time before all of the orders were
+            placed.  The UPDATE then only reads the partitions from that
+            month on.  Orders placed earlier are rejected.
 
+    Returns:
+        The updated order IDs and the rejected ones.
+
+    Raises:
+        HTTPException: If a database error occurs.
+    """
+    ids = sorted(set(order_ids))
+    if not ids:
+        return OrderTransitionResult([], {})
+    status_type = Order.__table__.c.status.type
+    sources = bindparam("allowed_from", [source.name for source in allowed_from(new_status)], type_=ARRAY(String))
+    try:
+        updated = sorted(db.execute(
+            update(Order)
+            .where(Order.id == any_(bindparam("ids", ids, type_=ARRAY(Integer))))
+            .where(Order.status == any_(cast(sources, ARRAY(status_type))))
+            .where(*_placed_between(placed_after, None))
+            .values(status=new_status)
+            .returning(Order.id)
+            .execution_options(synchronize_session=False)
+        ).scalars())
+        add_order_events(db, updated, "status_changed", new_status)
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database error: {str(e)}",
+        )
+
+    rejected: Dict[int, Optional[OrderStatus]] = dict.fromkeys(sorted(set(ids).difference(updated)))
+    if rejected:
+        rows = db.execute(select(Order.id, Order.status).where(Order.id.in_(list(rejected))))
+        for order_id, current in rows:
+            rejected[order_id] = current
+    return OrderTransitionResult(updated, rejected)
+
+
+
+def update_order_status(db: Session, order_id: int, new_status: OrderStatus) -> OrderRead:
+    """
+    Updates the status of an order, if `ORDER_STATUS_TRANSITIONS` allows
+    the move from its current status.  See `transition_orders`.
+
+    Args:
+        db: The database session.
+        order_id: The ID of the order to update.
+        new_status: The new status of the order.
+
+    Returns:
+        The updated order.
+
+    Raises:
+        HTTPException: If the order is not found, if an invalid status is
+            provided, or if the order cannot move to it from its current status.
+    """
     #  Validate the status.  The enum class handles this,
     #  but we can provide a more helpful error message.
     try:
-        OrderStatus(status)  # Check if the status is a valid enum value.
+        new_status = OrderStatus(new_status)  # Check if the status is a valid enum value.
     except ValueError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid order status: {status}",
+            detail=f"Invalid order status: {new_status}",
         )
 
-    order.status = status
-    db.commit()
-    db.refresh(order)
-    return order
+    result = transition_orders(db, [order_id], new_status)
+    if order_id in result.rejected:
+        current = result.rejected[order_id]
+        if current is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Order not found"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Cannot change order status from {current.value} to {new_status.value}",
+        )
+    return get_order(db, order_id)
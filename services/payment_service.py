@@ -1,11 +1,26 @@
+from sqlalchemy import String, cast, column, update, values
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from database.models.payment import Payment, PaymentStatus
-from database.models.order import Order
-from database.schemas.payment import PaymentCreate, PaymentRead, PaymentUpdate
+from database.models.order import Order, OrderStatus
+from services.order_service import add_order_events
+from schemas.payment import PaymentCreate, PaymentRead, PaymentUpdate
 from fastapi import HTTPException, status
 from decimal import Decimal
-from typing import Optional
+from typing import Dict, List, Optional
+
+
+#  Order status an order moves to once its payment reaches a given state,
+#  together with the order states the move is allowed from.  Orders in any
+#  other state are left alone, so a late or replayed webhook can never move
+#  a shipped order backwards.
+PAYMENT_ORDER_STATUS_PROPAGATION = {
+    PaymentStatus.SUCCESSFUL: (OrderStatus.PROCESSING, (OrderStatus.PENDING,)),
+    PaymentStatus.REFUNDED: (
+        OrderStatus.CANCELLED,
+        (OrderStatus.PENDING, OrderStatus.PROCESSING),
+    ),
+}
 
 
 def create_payment(db: Session, payment_create: PaymentCreate) -> PaymentRead:
@@ -128,3 +143,79 @@ def update_payment_status(
     db.commit()
     db.refresh(payment)
     return payment
+
+
+
+
+def apply_payment_status_updates(
+    db: Session, updates: Dict[str, PaymentStatus]
+) -> int:
+    """
+    Applies a batch of payment status changes in bulk.
+
+    This is the batched counterpart of `update_payment_status`, used by the
+    webhook ingestion path.  All payments are updated with a single
+    `UPDATE ... FROM (VALUES ...)` statement joined on `transaction_id`, and
+    the resulting status changes are propagated to the owning orders with one
+    `UPDATE` per target order status, each recorded in `order_events`.
+    Everything happens in one transaction.
+
+    Args:
+        db: The database session.
+        updates: The new payment status keyed by provider transaction ID.
+
+    Returns:
+        The number of payments whose status actually changed.
+
+    Raises:
+        SQLAlchemyError: If the batch could not be applied.  The transaction is
+                         rolled back so the caller can retry the whole batch.
+    """
+    if not updates:
+        return 0
+
+    status_type = Payment.__table__.c.status.type
+    payment_updates = values(
+        column("transaction_id", String),
+        column("status", String),
+        name="payment_updates",
+    ).data(
+        [(transaction_id, payment_status.name) for transaction_id, payment_status in updates.items()]
+    )
+    new_status = cast(payment_updates.c.status, status_type)
+
+    try:
+        changed = db.execute(
+            update(Payment)
+            .where(Payment.transaction_id == payment_updates.c.transaction_id)
+            .where(Payment.status.is_distinct_from(new_status))
+            .values(status=new_status)
+            .returning(Payment.order_id, Payment.status)
+            .execution_options(synchronize_session=False)
+        ).all()
+
+        #  Group the affected orders by the payment status they now have.
+        order_ids: Dict[PaymentStatus, List[int]] = {}
+        for order_id, payment_status in changed:
+            order_ids.setdefault(payment_status, []).append(order_id)
+
+        for payment_status, ids in order_ids.items():
+            propagation = PAYMENT_ORDER_STATUS_PROPAGATION.get(payment_status)
+            if propagation is None:
+                continue
+            order_status, allowed_from = propagation
+            moved = db.execute(
+                update(Order)
+                .where(Order.id.in_(ids))
+                .where(Order.status.in_(allowed_from))
+                .values(status=order_status)
+                .returning(Order.id)
+                .execution_options(synchronize_session=False)
+            ).scalars().all()
+            add_order_events(db, moved, "status_changed", order_status)
+
+        db.commit()
+        return len(changed)
+    except SQLAlchemyError:
+        db.rollback()
+        raise
@@ -0,0 +1,281 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from core.config import settings
+from core.metrics import PAYMENT_WEBHOOK_DROPPED, PAYMENT_WEBHOOK_LAG, PAYMENT_WEBHOOK_PENDING
+from database.database import SessionLocal
+from database.models.payment import PaymentStatus
+from schemas.payment import PaymentWebhookEvent
+from services.payment_service import apply_payment_status_updates
+
+logger = logging.getLogger(__name__)
+
+#  Longest wait, in seconds, before a failed transaction is retried.
+_MAX_RETRY_DELAY = 60.0
+
+
+class WebhookBufferFull(Exception):
+    """
+    Raised when the webhook buffer cannot accept more events.  The provider is
+    expected to retry the delivery later.
+    """
+
+
+class _PendingUpdate(NamedTuple):
+    status: PaymentStatus
+    occurred_at: Optional[datetime]
+    received_at: float
+    #  Failed applies so far, and when the next one may be tried.
+    attempts: int = 0
+    retry_at: float = 0.0
+
+
+def _is_newer(candidate: _PendingUpdate, current: _PendingUpdate) -> bool:
+    """
+    Decides whether `candidate` supersedes `current` for the same transaction.
+
+    Provider timestamps win when both events carry one; otherwise the event
+    that arrived last wins.
+    """
+    if candidate.occurred_at is not None and current.occurred_at is not None:
+        return candidate.occurred_at >= current.occurred_at
+    return candidate.received_at >= current.received_at
+
+
+def apply_batch_in_new_session(updates: Dict[str, PaymentStatus]) -> int:
+    """
+    Applies a batch of payment status updates using a fresh database session.
+
+    Args:
+        updates: The new payment status keyed by provider transaction ID.
+
+    Returns:
+        The number of payments whose status changed.
+    """
+    db = SessionLocal()
+    try:
+        return apply_payment_status_updates(db, updates)
+    finally:
+        db.close()
+
+
+class PaymentWebhookBuffer:
+    """
+    In-memory buffer between the webhook endpoint and the database.
+
+    Events are coalesced by `transaction_id` as they arrive, so a burst of
+    "pending -> successful -> refunded" events for one payment costs a single
+    row in the next bulk update.  A background thread flushes the buffer
+    whenever a full batch is available or `flush_interval` has elapsed.
+
+    The buffer lives in process memory and deliveries are acknowledged
+    before anything is committed: events still buffered when a worker
+    crashes or is killed are lost, and the provider will not resend them.
+    Settlement reconciliation is the recovery path for those events: run
+    `python -m services.reconciliation_service <settlement file> --apply`
+    (see services/reconciliation_service.py) over the period of the crash,
+    and it applies the settled status of every payment that disagrees.  A
+    short `flush_interval` keeps the window small; `stop` flushes on a
+    graceful shutdown.
+
+    A batch that fails is retried in halves, with exponential backoff, so a
+    transaction that always fails (a bad row) ends up alone and does not
+    hold back the rest.  Once it has failed `max_attempts` times, the last
+    time alone, its event is dropped and logged, for reconciliation to
+    repair.
+    """
+
+    def __init__(
+        self,
+        apply_batch: Callable[[Dict[str, PaymentStatus]], int] = apply_batch_in_new_session,
+        batch_size: int = settings.PAYMENT_WEBHOOK_BATCH_SIZE,
+        flush_interval: float = settings.PAYMENT_WEBHOOK_FLUSH_INTERVAL,
+        max_pending: int = settings.PAYMENT_WEBHOOK_MAX_PENDING,
+        max_attempts: int = settings.PAYMENT_WEBHOOK_MAX_ATTEMPTS,
+    ):
+        self.apply_batch = apply_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self._pending: Dict[str, _PendingUpdate] = {}
+        self._pending_since: Optional[float] = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        #  Counters, read by the benchmark and by monitoring.
+        self.events_received = 0
+        self.events_coalesced = 0
+        self.payments_updated = 0
+        self.failed_batches = 0
+        self.events_dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def submit(self, events: Iterable[PaymentWebhookEvent]) -> int:
+        """
+        Adds events to the buffer, coalescing them by transaction ID.
+
+        Args:
+            events: The events of one webhook delivery.
+
+        Returns:
+            The number of events accepted.
+
+        Raises:
+            WebhookBufferFull: If the delivery could take the buffer past
+                               `max_pending` transactions.  No event of the
+                               delivery is kept.
+        """
+        events = list(events)
+        received_at = time.monotonic()
+        accepted = 0
+        with self._lock:
+            #  Counts every event as a new transaction, so that one large
+            #  delivery cannot overshoot the cap.
+            if len(self._pending) + len(events) > self.max_pending:
+                raise WebhookBufferFull()
+            if self._pending_since is None:
+                self._pending_since = received_at
+            for event in events:
+                accepted += 1
+                update = _PendingUpdate(event.status, event.occurred_at, received_at)
+                current = self._pending.get(event.transaction_id)
+                if current is not None:
+                    self.events_coalesced += 1
+                    if not _is_newer(update, current):
+                        continue
+                self._pending[event.transaction_id] = update
+            self.events_received += accepted
+            pending = len(self._pending)
+        if pending >= self.batch_size:
+            self._wakeup.set()
+        return accepted
+
+    def flush(self) -> int:
+        """
+        Applies everything currently buffered, in batches of `batch_size`.
+
+        A batch that fails is merged back into the buffer (unless a newer
+        event for the same transaction arrived meanwhile).  Its transactions
+        are retried after a backoff, in batches half the size of the one
+        that failed, down to one transaction per batch.
+
+        Returns:
+            The number of payments whose status changed.
+        """
+        now = time.monotonic()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            #  Transactions still backing off stay buffered.
+            for transaction_id, update in list(pending.items()):
+                if update.retry_at > now:
+                    self._pending[transaction_id] = pending.pop(transaction_id)
+            self._pending_since = min(
+                (update.received_at for update in self._pending.values()), default=None
+            )
+        if not pending:
+            return 0
+
+        #  Batches sized by how often their transactions have failed.
+        by_attempts: Dict[int, List[tuple]] = {}
+        for item in pending.items():
+            by_attempts.setdefault(item[1].attempts, []).append(item)
+        updated = 0
+        for attempts, items in sorted(by_attempts.items()):
+            size = max(1, self.batch_size >> attempts)
+            for start in range(0, len(items), size):
+                chunk = items[start:start + size]
+                try:
+                    updated += self.apply_batch(
+                        {transaction_id: update.status for transaction_id, update in chunk}
+                    )
+                except Exception:
+                    logger.exception("Failed to apply %d payment webhook events", len(chunk))
+                    self.failed_batches += 1
+                    self._retry_later(chunk)
+        self.payments_updated += updated
+        return updated
+
+    def lag(self) -> float:
+        """
+        Returns how long the oldest buffered event has been waiting, in seconds.
+        """
+        pending_since = self._pending_since
+        return 0.0 if pending_since is None else time.monotonic() - pending_since
+
+    def _retry_later(self, chunk: List[tuple]) -> None:
+        """
+        Requeues a failed batch, or drops its transaction if it failed alone
+        too many times.
+        """
+        if len(chunk) == 1 and chunk[0][1].attempts + 1 >= self.max_attempts:
+            transaction_id, update = chunk[0]
+            logger.error(
+                "Dropping the %s payment webhook event of transaction %s after %d failed attempts; "
+                "reconcile it from the settlement file",
+                update.status.value, transaction_id, update.attempts + 1,
+            )
+            self.events_dropped += 1
+            PAYMENT_WEBHOOK_DROPPED.inc()
+            return
+        now = time.monotonic()
+        with self._lock:
+            oldest = min(update.received_at for _, update in chunk)
+            if self._pending_since is None or oldest < self._pending_since:
+                self._pending_since = oldest
+            for transaction_id, update in chunk:
+                attempts = update.attempts + 1
+                retry = update._replace(
+                    attempts=attempts,
+                    retry_at=now + min(self.flush_interval * 2 ** attempts, _MAX_RETRY_DELAY),
+                )
+                current = self._pending.get(transaction_id)
+                if current is None or _is_newer(retry, current):
+                    self._pending[transaction_id] = retry
+
+    def report_metrics(self) -> None:
+        PAYMENT_WEBHOOK_PENDING.set(len(self._pending))
+        PAYMENT_WEBHOOK_LAG.set(self.lag())
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            #  Reported before flushing, when the backlog is at its largest.
+            self.report_metrics()
+            self.flush()
+        self.flush()
+        self.report_metrics()
+
+    def start(self) -> None:
+        """
+        Starts the background flusher thread.  Calling it twice is a no-op.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="payment-webhook-flusher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 10.0) -> None:
+        """
+        Stops the flusher thread after a final flush of the buffer.
+        """
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+
+#  The buffer shared by the webhook route.  Started and stopped with the app.
+payment_webhook_buffer = PaymentWebhookBuffer()
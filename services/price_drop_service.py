@@ -0,0 +1,313 @@
+"""
+Wishlist price drop notifications.
+
+The pipeline has three stages, each set-based so that bulk repricing does not
+turn into a query per product or per user:
+
+1. Capture: `product_service.update_product` and `reprice_products` queue a
+   `product_price_changes` row for every price drop, in the same transaction
+   as the price update.
+2. Fan-out: `process_price_changes` consumes the queue in batches.  One
+   statement per batch takes the next changes (`FOR UPDATE SKIP LOCKED`, so
+   several processors can run), folds repeated changes of a product into
+   one, joins them against `wishlist_products` and upserts one
+   `price_drop_alerts` row per user and product.
+3. Digest: `send_due_digests` walks the users with pending alerts in
+   batches, skips those emailed within `PRICE_DROP_DIGEST_WINDOW`, and
+   sends each remaining user one email listing the products that are still
+   cheaper than when the alert was raised.
+
+Usage:
+    python -m services.price_drop_service run          # fan-out, then digests
+    python -m services.price_drop_service process      # fan-out only
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Awaitable, Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, func, select, text, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.types import Integer, Numeric
+
+from core.config import settings
+from core.invalidation import publish
+from database.models.price_drop import PriceDropAlert, PriceDropDigestLog
+from database.models.product import Product
+from database.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+#  Updates the given prices and queues the drops, in one statement.  All CTEs
+#  see the same snapshot, so `old` has the prices from before the update.
+_REPRICE = text("""
+    WITH new_prices AS (
+        SELECT * FROM unnest(:ids, :prices) AS t(id, price)
+    ), old AS (
+        SELECT p.id, p.price FROM products p JOIN new_prices n ON n.id = p.id
+        FOR UPDATE OF p
+    ), updated AS (
+        UPDATE products p SET price = n.price, updated_at = now()
+        FROM new_prices n
+        WHERE p.id = n.id AND p.price <> n.price
+        RETURNING p.id, p.price
+    ), queued AS (
+        INSERT INTO product_price_changes (product_id, old_price, new_price)
+        SELECT u.id, o.price, u.price FROM updated u JOIN old o ON o.id = u.id
+        WHERE u.price < o.price
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM updated), (SELECT count(*) FROM queued)
+""").bindparams(
+    bindparam("ids", type_=ARRAY(Integer)),
+    bindparam("prices", type_=ARRAY(Numeric(10, 2))),
+)
+
+#  Takes a batch of queued changes and turns them into alerts.  A product
+#  changed several times in the batch counts once, from its first old price
+#  to its last new price.  An existing alert keeps its old price.
+_FAN_OUT = text("""
+    WITH batch AS (
+        DELETE FROM product_price_changes
+        WHERE id IN (
+            SELECT id FROM product_price_changes ORDER BY id LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, product_id, old_price, new_price
+    ), drops AS (
+        SELECT product_id,
+               (array_agg(old_price ORDER BY id))[1] AS old_price,
+               (array_agg(new_price ORDER BY id DESC))[1] AS new_price
+        FROM batch
+        GROUP BY product_id
+    ), alerts AS (
+        INSERT INTO price_drop_alerts (user_id, product_id, old_price, new_price)
+        SELECT w.user_id, d.product_id, d.old_price, d.new_price
+        FROM drops d
+        JOIN wishlist_products wp ON wp.product_id = d.product_id
+        JOIN wishlists w ON w.id = wp.wishlist_id
+        WHERE d.new_price < d.old_price
+        ON CONFLICT (user_id, product_id) DO UPDATE SET new_price = EXCLUDED.new_price
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM batch), (SELECT count(*) FROM alerts)
+""")
+
+
+class PriceDropItem(NamedTuple):
+    product_id: int
+    name: str
+    old_price: Decimal
+    price: Decimal
+
+
+class PriceDropDigest(NamedTuple):
+    user_id: int
+    email: str
+    first_name: str
+    items: List[PriceDropItem]
+
+
+#  Sends a batch of digests and returns the IDs of the users that were sent
+#  theirs; the others keep their alerts for the next run.
+DigestSender = Callable[[List[PriceDropDigest]], Awaitable[List[int]]]
+
+
+def reprice_products(db: Session, prices: Mapping[int, Decimal]) -> Tuple[int, int]:
+    """
+    Sets the prices of many products in one statement and queues the drops
+    for notification.
+
+    Args:
+        db: The database session.
+        prices: New price by product ID.
+
+    Returns:
+        The number of products whose price changed, and how many of those
+        were drops.
+    """
+    from services.product_service import product_list_cache
+
+    if not prices:
+        return 0, 0
+    ids = list(prices)
+    updated, queued = db.execute(_REPRICE, {"ids": ids, "prices": [prices[i] for i in ids]}).one()
+    if updated:
+        publish(db, "products")
+    db.commit()
+    if updated:
+        product_list_cache.invalidate()
+    return updated, queued
+
+
+def process_price_changes(db: Session, batch_size: Optional[int] = None, max_batches: Optional[int] = None) -> Dict[str, int]:
+    """
+    Turns queued price changes into per-user alerts, one batch per
+    transaction, until the queue is empty.
+
+    Args:
+        db: The database session.
+        batch_size: Changes per batch.  Defaults to `PRICE_DROP_BATCH_SIZE`.
+        max_batches: Stop after this many batches.  Defaults to no limit.
+
+    Returns:
+        The numbers of changes consumed and alerts written.
+    """
+    batch_size = batch_size or settings.PRICE_DROP_BATCH_SIZE
+    totals = {"changes": 0, "alerts": 0}
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        changes, alerts = db.execute(_FAN_OUT, {"batch_size": batch_size}).one()
+        db.commit()
+        if not changes:
+            break
+        batches += 1
+        totals["changes"] += changes
+        totals["alerts"] += alerts
+    return totals
+
+
+def _load_digests(db: Session, user_ids: List[int], cutoff: datetime) -> Tuple[List[PriceDropDigest], List[Tuple[int, int]]]:
+    """
+    Locks and loads the pending alerts of those of `user_ids` that are due a
+    digest.  Returns the digests (with only the items still cheaper than
+    their old price) and the (user ID, product ID) of every alert loaded.
+    """
+    rows = db.execute(
+        select(
+            PriceDropAlert.user_id,
+            PriceDropAlert.product_id,
+            PriceDropAlert.old_price,
+            Product.price,
+            Product.name,
+            User.email,
+            User.first_name,
+            User.is_active,
+        )
+        .join(Product, Product.id == PriceDropAlert.product_id)
+        .join(User, User.id == PriceDropAlert.user_id)
+        .outerjoin(PriceDropDigestLog, PriceDropDigestLog.user_id == PriceDropAlert.user_id)
+        .where(
+            PriceDropAlert.user_id.in_(user_ids),
+            (PriceDropDigestLog.last_sent_at.is_(None)) | (PriceDropDigestLog.last_sent_at < cutoff),
+        )
+        .order_by(PriceDropAlert.user_id, PriceDropAlert.product_id)
+        .with_for_update(of=PriceDropAlert, skip_locked=True)
+    )
+    digests: Dict[int, PriceDropDigest] = {}
+    loaded = []
+    for user_id, product_id, old_price, price, name, email, first_name, is_active in rows:
+        loaded.append((user_id, product_id))
+        if not is_active or price >= old_price:
+            continue
+        digest = digests.get(user_id)
+        if digest is None:
+            digest = digests[user_id] = PriceDropDigest(user_id, email, first_name, [])
+        digest.items.append(PriceDropItem(product_id, name, old_price, price))
+    return list(digests.values()), loaded
+
+
+def send_due_digests(db: Session, sender: DigestSender, batch_size: Optional[int] = None) -> Dict[str, int]:
+    """
+    Sends a digest to every user with pending alerts who was not sent one
+    within `PRICE_DROP_DIGEST_WINDOW`.
+
+    Users are taken in ID order, `batch_size` at a time.  A batch's alerts
+    stay locked while its emails are sent; alerts of users whose email
+    failed are kept for the next run, the others are deleted.
+
+    Args:
+        db: The database session.
+        sender: Sends a batch of digests (see `send_digest_emails`).
+        batch_size: Users per batch.  Defaults to `PRICE_DROP_DIGEST_BATCH_SIZE`.
+
+    Returns:
+        The numbers of users emailed, alerts cleared and emails failed.
+    """
+    batch_size = batch_size or settings.PRICE_DROP_DIGEST_BATCH_SIZE
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.PRICE_DROP_DIGEST_WINDOW)
+    totals = {"sent": 0, "cleared": 0, "failed": 0}
+    after = 0
+    while True:
+        user_ids = list(db.execute(
+            select(PriceDropAlert.user_id)
+            .distinct()
+            .where(PriceDropAlert.user_id > after)
+            .order_by(PriceDropAlert.user_id)
+            .limit(batch_size)
+        ).scalars())
+        if not user_ids:
+            break
+        after = user_ids[-1]
+        digests, loaded = _load_digests(db, user_ids, cutoff)
+        sent = set(asyncio.run(sender(digests))) if digests else set()
+        failed = {digest.user_id for digest in digests} - sent
+        cleared = [pair for pair in loaded if pair[0] not in failed]
+        if cleared:
+            db.execute(delete(PriceDropAlert).where(
+                tuple_(PriceDropAlert.user_id, PriceDropAlert.product_id).in_(cleared)
+            ))
+        if sent:
+            statement = insert(PriceDropDigestLog).values(
+                [{"user_id": user_id, "last_sent_at": func.now()} for user_id in sorted(sent)]
+            )
+            db.execute(statement.on_conflict_do_update(
+                index_elements=["user_id"], set_={"last_sent_at": statement.excluded.last_sent_at}
+            ))
+        db.commit()
+        totals["sent"] += len(sent)
+        totals["cleared"] += len(cleared)
+        totals["failed"] += len(failed)
+    return totals
+
+
+async def send_digest_emails(digests: List[PriceDropDigest]) -> List[int]:
+    """
+    Sends digests with `utils.email.send_email`, at most
+    `PRICE_DROP_EMAIL_CONCURRENCY` at a time.  Failures are logged.
+    """
+    from utils.email import send_email
+
+    semaphore = asyncio.Semaphore(settings.PRICE_DROP_EMAIL_CONCURRENCY)
+
+    async def send_one(digest: PriceDropDigest) -> Optional[int]:
+        async with semaphore:
+            try:
+                await send_email(
+                    subject="Prices dropped on your wishlist",
+                    to=[digest.email],
+                    template_name="price_drop_digest.html",
+                    template_context={
+                        "first_name": digest.first_name,
+                        "items": [item._asdict() for item in digest.items],
+                        "base_url": str(settings.BASE_URL),
+                    },
+                )
+                return digest.user_id
+            except Exception:
+                logger.exception("Price drop digest to user %s failed", digest.user_id)
+                return None
+
+    results = await asyncio.gather(*(send_one(digest) for digest in digests))
+    return [user_id for user_id in results if user_id is not None]
+
+
+if __name__ == "__main__":
+    from database.database import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Run the wishlist price drop pipeline.")
+    parser.add_argument("command", choices=["run", "process"])
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        logger.info("Fan-out: %s", process_price_changes(db))
+        if args.command == "run":
+            logger.info("Digests: %s", send_due_digests(db, send_digest_emails))
+    finally:
+        db.close()
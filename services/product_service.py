@@ -1,11 +1,43 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Sequence
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
+from database.models.price_drop import ProductPriceChange
 from database.models.product import Product
-from database.schemas.product import ProductCreate, ProductRead, ProductUpdate
+from schemas.product import ProductCreate, ProductRead, ProductUpdate
 from fastapi import HTTPException, status
+from core.config import settings
+from core.invalidation import invalidation_bus, publish
+from core.response_cache import CompressedResponseCache
 
 
+#  Columns of a `ProductRead`, selected directly by the list endpoint, and
+#  by field name for sparse fieldsets (`?fields=`).
+PRODUCT_READ_COLUMNS = (
+    Product.id,
+    Product.name,
+    Product.description,
+    Product.price,
+    Product.stock_quantity,
+    Product.weight,
+    Product.category_id,
+    Product.is_active,
+    Product.created_at,
+    Product.updated_at,
+)
+PRODUCT_READ_FIELDS = {column.key: column for column in PRODUCT_READ_COLUMNS}
+
+#  Encoded `GET /products/` pages with their compressed variants, keyed by
+#  (skip, limit, category_id, fields).  Every product write below invalidates it.
+product_list_cache = CompressedResponseCache(
+    "product_list",
+    max_entries=settings.PRODUCT_LIST_CACHE_SIZE,
+    ttl=settings.PRODUCT_LIST_CACHE_TTL,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+)
+#  Writes in other workers, published on the "products" key.
+invalidation_bus.register("products", lambda _: product_list_cache.invalidate())
+
 
 def get_product(db: Session, product_id: int) -> ProductRead:
     """
@@ -30,6 +62,32 @@ def get_product(db: Session, product_id: int) -> ProductRead:
 
 
 
+def get_product_fields(db: Session, product_id: int, fields: Sequence[str]) -> Dict[str, Any]:
+    """
+    Retrieves the given fields of a product, selecting only those columns.
+
+    Args:
+        db: The database session.
+        product_id: The ID of the product to retrieve.
+        fields: Field names of `ProductRead`, from `utils.fields.parse_fields`.
+
+    Returns:
+        The product as a dict of the requested fields.
+
+    Raises:
+        HTTPException: If the product is not found.
+    """
+    query = select(*(PRODUCT_READ_FIELDS[name] for name in fields)).where(Product.id == product_id)
+    result = db.execute(query)
+    row = result.first()
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
+        )
+    return dict(zip(result.keys(), row))
+
+
+
 def get_products(db: Session, skip: int = 0, limit: int = 10) -> List[ProductRead]:
     """
     Retrieves a list of products.
@@ -47,6 +105,42 @@ def get_products(db: Session, skip: int = 0, limit: int = 10) -> List[ProductRea
 
 
 
+def list_products(
+    db: Session,
+    skip: int = 0,
+    limit: int = 10,
+    category_id: Optional[int] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Retrieves a page of products as plain dicts with the fields of
+    `ProductRead`, without loading ORM objects.
+
+    Rows come straight from a Core select of the needed columns, so a page
+    costs one query and one dict per product; encode the result with
+    `core.responses.dumps` (or return a `FastJSONResponse`).
+
+    Args:
+        db: The database session.
+        skip: The number of products to skip.
+        limit: The maximum number of products to retrieve.
+        category_id: Only products in this category, if given.
+        fields: Only these fields of `ProductRead` (see
+            `utils.fields.parse_fields`).  Defaults to all fields.
+
+    Returns:
+        A list of product dicts, ordered by ID.
+    """
+    columns = [PRODUCT_READ_FIELDS[name] for name in fields] if fields else PRODUCT_READ_COLUMNS
+    query = select(*columns).order_by(Product.id).offset(skip).limit(limit)
+    if category_id is not None:
+        query = query.where(Product.category_id == category_id)
+    result = db.execute(query)
+    keys = tuple(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+
 def create_product(db: Session, product_create: ProductCreate) -> ProductRead:
     """
     Creates a new product.
@@ -64,7 +158,9 @@ def create_product(db: Session, product_create: ProductCreate) -> ProductRead:
     try:
         db_product = Product(**product_create.dict())
         db.add(db_product)
+        publish(db, "products")
         db.commit()
+        product_list_cache.invalidate()
         db.refresh(db_product)
         return db_product
     except SQLAlchemyError as e:
@@ -107,9 +203,16 @@ def update_product(
             )
 
         # Update the product attributes
+        old_price = product.price
         for key, value in product_update.dict(exclude_unset=True).items():
             setattr(product, key, value)
+        # Queue a price drop for wishlist notifications, in the same
+        # transaction; see services.price_drop_service.
+        if product.price < old_price:
+            db.add(ProductPriceChange(product_id=product.id, old_price=old_price, new_price=product.price))
+        publish(db, "products")
         db.commit()
+        product_list_cache.invalidate()
         db.refresh(product)
         return product
     except SQLAlchemyError as e:
@@ -148,7 +251,9 @@ def delete_product(db: Session, product_id: int) -> bool:
                 status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
             )
         db.delete(product)
+        publish(db, "products")
         db.commit()
+        product_list_cache.invalidate()
         return True
     except SQLAlchemyError as e:
         db.rollback()
@@ -0,0 +1,339 @@
+"""
+"Frequently bought together" recommendations from order co-occurrence.
+
+`update` maintains a sparse product x product matrix counting the orders
+(not cancelled) that contain both products; its diagonal counts the orders
+of each product.  From it, every product keeps its top
+`RECOMMENDATIONS_TOP_K` active neighbors, scored by the share of its orders
+that also contain the neighbor, in three flat arrays (CSR layout):
+
+    indptr[p]:indptr[p + 1]    the slice of product p's neighbors
+    neighbors[...]             their IDs, most bought together first
+    scores[...]                their scores
+
+The arrays are saved as `.npy` files under `RECOMMENDATIONS_DIR`, in a new
+`topk_<version>` directory per update.  API workers memory-map the current
+version (`related_products`), so they share one copy through the page
+cache, and answer `GET /products/{id}/related` with two array reads and no
+database query.  Workers pick up a new version within
+`RECOMMENDATIONS_RELOAD_INTERVAL` seconds.
+
+The matrix is built with SciPy from the order items streamed through a
+server-side cursor, `RECOMMENDATIONS_FETCH_SIZE` at a time: each chunk's
+orders become a sparse order x product incidence matrix B, and B.T @ B is
+added to the counts.  An update only reads the orders placed since the
+previous one, and only recomputes the neighbors of the products in them (a
+product's scores depend only on its own row).  Orders are taken once they
+are `RECOMMENDATIONS_SETTLE_SECONDS` old: each update reads the orders
+placed between the previous update's cut-off and its own, so an order
+committed after an update ran, but placed before its cut-off, would be
+missed.  The settle time must exceed the longest checkout transaction.
+Later cancellations and product deactivations are applied by the next
+`--full` rebuild, e.g. weekly.
+
+Usage:
+    python -m services.recommendation_service update [--full]
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from core.config import settings
+
+_STATE = "state.json"
+_COUNTS = "counts.npz"
+_ARRAYS = ("indptr", "neighbors", "scores")
+_ROW_BLOCK = 100_000  # Products whose neighbors are ranked at once
+
+_ORDER_ITEMS = """
+    SELECT i.order_id, i.product_id
+    FROM order_items i
+    JOIN orders o ON o.id = i.order_id AND o.order_date = i.order_date
+    WHERE o.order_date < :settled AND i.order_date < :settled AND o.status <> 'CANCELLED'
+"""
+
+
+def _directory(directory: Optional[str]) -> Path:
+    return Path(directory or settings.RECOMMENDATIONS_DIR)
+
+
+def _read_state(root: Path) -> Optional[Dict[str, object]]:
+    try:
+        return json.loads((root / _STATE).read_text())
+    except FileNotFoundError:
+        return None
+
+
+class RelatedProductIndex:
+    """
+    Per-process, read-only view of the current top-K arrays.
+
+    The arrays are memory-mapped, so lookups touch only the pages of the
+    requested product and every worker shares the same physical memory.
+    The state file is checked for a new version at most every
+    `reload_interval` seconds; a lookup in between costs two array reads.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        reload_interval: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.directory = directory
+        self.reload_interval = (
+            settings.RECOMMENDATIONS_RELOAD_INTERVAL if reload_interval is None else reload_interval
+        )
+        self.clock = clock
+        self.version = None
+        self._arrays: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def _maybe_reload(self) -> None:
+        now = self.clock()
+        if now < self._checked_at + self.reload_interval:
+            return
+        with self._lock:
+            if now < self._checked_at + self.reload_interval:
+                return
+            self._checked_at = now
+            root = _directory(self.directory)
+            state = _read_state(root)
+            if state is None or state["version"] == self.version:
+                return
+            path = root / f"topk_{state['version']}"
+            self._arrays = tuple(np.load(path / f"{name}.npy", mmap_mode="r") for name in _ARRAYS)
+            self.version = state["version"]
+
+    def related(self, product_id: int, limit: int) -> List[Dict[str, object]]:
+        """
+        Returns up to `limit` products most often bought together with
+        `product_id`, with their scores.  Unknown products have none.
+        """
+        self._maybe_reload()
+        arrays = self._arrays
+        if arrays is None:
+            return []
+        indptr, neighbors, scores = arrays
+        if not 0 <= product_id < len(indptr) - 1:
+            return []
+        start, end = int(indptr[product_id]), int(indptr[product_id + 1])
+        end = min(end, start + limit)
+        return [
+            {"product_id": neighbor, "score": round(score, 4)}
+            for neighbor, score in zip(neighbors[start:end].tolist(), scores[start:end].tolist())
+        ]
+
+
+related_products = RelatedProductIndex()
+
+
+def _order_item_blocks(
+    conn: Connection, since: Optional[datetime], settled: datetime, fetch_size: int
+) -> Iterator[np.ndarray]:
+    """
+    Streams the (order ID, product ID) pairs of the orders placed in
+    [`since`, `settled`), in blocks of whole orders.
+    """
+    #  Both tables are bounded so each scans only the partitions in range.
+    bounded = " AND o.order_date >= :since AND i.order_date >= :since" if since is not None else ""
+    query = _ORDER_ITEMS + bounded + " ORDER BY i.order_id"
+    result = conn.execute(
+        text(query).execution_options(yield_per=fetch_size),
+        {"since": since, "settled": settled},
+    )
+    carry = None
+    for rows in result.partitions():
+        block = np.array(rows, dtype=np.int64)
+        if carry is not None:
+            block = np.concatenate((carry, block))
+        #  The last order may continue in the next chunk.
+        tail = block[:, 0] == block[-1, 0]
+        carry = block[tail]
+        if not tail.all():
+            yield block[~tail]
+    if carry is not None:
+        yield carry
+
+
+def _cooccurrence(block: np.ndarray, n_products: int):
+    """
+    The product x product co-occurrence counts of a block of whole orders.
+    """
+    from scipy import sparse
+
+    _, order_index = np.unique(block[:, 0], return_inverse=True)
+    incidence = sparse.csr_matrix(
+        (np.ones(len(block), dtype=np.int32), (order_index, block[:, 1])),
+        shape=(order_index.max() + 1, n_products),
+    )
+    return (incidence.T @ incidence).tocsr()
+
+
+def _top_k(counts, orders: np.ndarray, rows: np.ndarray, active: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Ranks the neighbors of `rows`, all at once.
+
+    Returns:
+        The number of neighbors kept per row, and their IDs and scores,
+        row by row.
+    """
+    k, min_orders = settings.RECOMMENDATIONS_TOP_K, settings.RECOMMENDATIONS_MIN_ORDERS
+    sub = counts[rows]
+    row = np.repeat(np.arange(len(rows)), np.diff(sub.indptr))
+    neighbor, together = sub.indices, sub.data
+    keep = (neighbor != rows[row]) & (together >= min_orders) & active[neighbor]
+    row, neighbor, together = row[keep], neighbor[keep], together[keep]
+    #  By row, then most orders together, then lowest ID.
+    ranked = np.lexsort((neighbor, -together, row))
+    row, neighbor, together = row[ranked], neighbor[ranked], together[ranked]
+    keep = np.arange(len(row)) - np.searchsorted(row, row) < k
+    row, neighbor, together = row[keep], neighbor[keep], together[keep]
+    scores = together / orders[rows[row]]
+    return np.bincount(row, minlength=len(rows)), neighbor.astype(np.int32), scores.astype(np.float32)
+
+
+def _merge(
+    old: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    rows: np.ndarray,
+    lengths: np.ndarray,
+    neighbors: np.ndarray,
+    scores: np.ndarray,
+    n_products: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Replaces the neighbors of `rows` in the old arrays.
+    """
+    old_indptr, old_neighbors, old_scores = old
+    old_lengths = np.diff(old_indptr)
+    merged_lengths = np.zeros(n_products, dtype=np.int64)
+    merged_lengths[:len(old_lengths)] = old_lengths
+    merged_lengths[rows] = lengths
+    indptr = np.concatenate(([0], np.cumsum(merged_lengths)))
+    merged_neighbors = np.empty(indptr[-1], dtype=np.int32)
+    merged_scores = np.empty(indptr[-1], dtype=np.float32)
+
+    replaced = np.zeros(n_products, dtype=bool)
+    replaced[rows] = True
+    old_row = np.repeat(np.arange(len(old_lengths)), old_lengths)
+    kept = np.flatnonzero(~replaced[old_row])
+    destination = indptr[old_row[kept]] + kept - old_indptr[old_row[kept]]
+    merged_neighbors[destination] = old_neighbors[kept]
+    merged_scores[destination] = old_scores[kept]
+
+    new_row = np.repeat(np.arange(len(rows)), lengths)
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    destination = indptr[rows[new_row]] + np.arange(len(new_row)) - offsets[new_row]
+    merged_neighbors[destination] = neighbors
+    merged_scores[destination] = scores
+    return indptr, merged_neighbors, merged_scores
+
+
+def update(conn: Connection, directory: Optional[str] = None, full: bool = False) -> Dict[str, object]:
+    """
+    Adds the orders placed since the last update to the co-occurrence
+    counts and publishes a new version of the top-K arrays.
+
+    Args:
+        conn: A connection.
+        directory: Defaults to `RECOMMENDATIONS_DIR`.
+        full: Rebuild the counts from every order.  Also done when there
+            is no previous build.
+
+    Returns:
+        The new version, and the numbers of order items read and products
+        whose neighbors were recomputed.
+    """
+    from scipy import sparse
+
+    root = _directory(directory)
+    root.mkdir(parents=True, exist_ok=True)
+    state = _read_state(root)
+    full = full or state is None
+    n_products = conn.execute(text("SELECT COALESCE(max(id), 0) + 1 FROM products")).scalar()
+    settled = datetime.now(timezone.utc) - timedelta(seconds=settings.RECOMMENDATIONS_SETTLE_SECONDS)
+
+    if full:
+        counts = sparse.csr_matrix((n_products, n_products), dtype=np.int32)
+        old = (np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32))
+        since = None
+    else:
+        counts = sparse.load_npz(root / _COUNTS).tocsr()
+        n_products = max(n_products, counts.shape[0])
+        counts.resize((n_products, n_products))
+        path = root / f"topk_{state['version']}"
+        old = tuple(np.load(path / f"{name}.npy", mmap_mode="r") for name in _ARRAYS)
+        #  Resumed by time, not by order ID: IDs are assigned before commit,
+        #  so a lower ID can become visible after a higher one was read.
+        since = datetime.fromisoformat(state["settled_before"])
+
+    items = 0
+    touched = []
+    for block in _order_item_blocks(conn, since, settled, settings.RECOMMENDATIONS_FETCH_SIZE):
+        counts = counts + _cooccurrence(block, n_products)
+        touched.append(np.unique(block[:, 1]))
+        items += len(block)
+    if full:
+        rows = np.arange(n_products)
+    else:
+        rows = np.unique(np.concatenate(touched)) if touched else np.empty(0, dtype=np.int64)
+
+    active = np.zeros(n_products, dtype=bool)
+    active[conn.execute(text("SELECT id FROM products WHERE is_active")).scalars().all()] = True
+    orders = counts.diagonal()
+    ranked = [_top_k(counts, orders, rows[start:start + _ROW_BLOCK], active) for start in range(0, len(rows), _ROW_BLOCK)]
+    if ranked:
+        lengths, neighbors, scores = (np.concatenate(parts) for parts in zip(*ranked))
+    else:
+        lengths, neighbors, scores = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+    arrays = _merge(old, rows, lengths, neighbors, scores, n_products)
+
+    version = (state["version"] + 1) if state else 1
+    staging = root / f"topk_{version}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir()
+    for name, array in zip(_ARRAYS, arrays):
+        np.save(staging / f"{name}.npy", array)
+    os.replace(staging, root / f"topk_{version}")
+    sparse.save_npz(root / "counts.tmp.npz", counts, compressed=False)
+    os.replace(root / "counts.tmp.npz", root / _COUNTS)
+    temporary = root / f"{_STATE}.tmp"
+    temporary.write_text(json.dumps({
+        "version": version,
+        "settled_before": settled.isoformat(),
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }, indent=2))
+    os.replace(temporary, root / _STATE)
+    #  Workers may still be switching from the previous version.
+    for path in root.glob("topk_*"):
+        if path.name not in (f"topk_{version}", f"topk_{version - 1}"):
+            shutil.rmtree(path, ignore_errors=True)
+
+    return {"version": version, "order_items": items, "products_ranked": len(rows)}
+
+
+if __name__ == "__main__":
+    from database.database import engine
+
+    parser = argparse.ArgumentParser(description="Update the frequently-bought-together recommendations.")
+    parser.add_argument("command", choices=["update"])
+    parser.add_argument("--full", action="store_true", help="Rebuild from every order")
+    parser.add_argument("--directory", help="Default: RECOMMENDATIONS_DIR")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        result = update(conn, args.directory, full=args.full)
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,517 @@
+"""
+Reconciliation of the `payments` table against provider settlement files.
+
+The settlement file is streamed and, unless it is already ordered by
+transaction ID, sorted externally in bounded-size runs.  It is then
+merge-joined against a server-side cursor scan of `payments` ordered by
+`transaction_id`, so memory use does not depend on the size of either side.
+
+A transaction may have several settlement rows (a charge, then a refund or
+an adjustment).  They are compared as one: the amount of the first row, the
+original charge, and the status of the last, its current state.  With
+`--since`/`--until` only the payments created in the window are scanned;
+settlement rows matching none of them are looked up again and reported as
+`out_of_window` when the payment exists outside the window.
+
+With `--apply` this is also the recovery path for payment webhook events
+that were acknowledged but lost before they were committed (a worker
+crashed with them in `PaymentWebhookBuffer`): run it over the period of
+the crash and the settled statuses are applied.
+
+Usage:
+    python -m services.reconciliation_service settlement.csv --report mismatches.csv
+    python -m services.reconciliation_service settlement.csv --since 2026-10-18 --until 2026-10-19 --apply
+"""
+import argparse
+import csv
+import heapq
+import logging
+import os
+import tempfile
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database.database import SessionLocal
+from database.models.payment import Payment, PaymentStatus
+from services.payment_service import apply_payment_status_updates
+
+logger = logging.getLogger(__name__)
+
+#  Mismatch kinds written to the report.
+MISSING_IN_DB = "missing_in_db"
+MISSING_IN_SETTLEMENT = "missing_in_settlement"
+OUT_OF_WINDOW = "out_of_window"
+AMOUNT_MISMATCH = "amount"
+STATUS_MISMATCH = "status"
+INVALID_ROW = "invalid_row"
+
+REPORT_COLUMNS = [
+    "kind",
+    "transaction_id",
+    "payment_id",
+    "settlement_amount",
+    "db_amount",
+    "settlement_status",
+    "db_status",
+]
+
+
+class SettlementRow(NamedTuple):
+    transaction_id: str
+    amount: str
+    status: str
+    line: int = 0  # Position in the settlement file, to keep a transaction's rows in order
+
+
+def _sort_key(row: SettlementRow) -> Tuple[str, int]:
+    return row.transaction_id, row.line
+
+
+class PaymentRow(NamedTuple):
+    transaction_id: str
+    payment_id: int
+    amount: Decimal
+    status: PaymentStatus
+
+
+class Mismatch(NamedTuple):
+    kind: str
+    transaction_id: str
+    payment_id: Optional[int] = None
+    settlement_amount: Optional[str] = None
+    db_amount: Optional[Decimal] = None
+    settlement_status: Optional[str] = None
+    db_status: Optional[PaymentStatus] = None
+
+
+def read_settlement_file(
+    stream: TextIO,
+    transaction_column: str = "transaction_id",
+    amount_column: str = "amount",
+    status_column: str = "status",
+) -> Iterator[SettlementRow]:
+    """
+    Streams rows from a settlement CSV file.
+
+    Args:
+        stream: The open settlement file.
+        transaction_column: Header of the provider transaction ID column.
+        amount_column: Header of the settled amount column.
+        status_column: Header of the settlement status column.
+
+    Yields:
+        One `SettlementRow` per line, with values left as strings.
+    """
+    for line, record in enumerate(csv.DictReader(stream)):
+        yield SettlementRow(
+            record[transaction_column].strip(),
+            record[amount_column].strip(),
+            record[status_column].strip().lower(),
+            line,
+        )
+
+
+def _write_run(rows: List[SettlementRow], directory: str) -> str:
+    rows.sort(key=_sort_key)
+    fd, path = tempfile.mkstemp(prefix="settlement-run-", suffix=".csv", dir=directory)
+    with os.fdopen(fd, "w", newline="") as run:
+        csv.writer(run).writerows(rows)
+    return path
+
+
+def _read_run(path: str) -> Iterator[SettlementRow]:
+    with open(path, newline="") as run:
+        for transaction_id, amount, status, line in csv.reader(run):
+            yield SettlementRow(transaction_id, amount, status, int(line))
+
+
+def sort_settlement_rows(
+    rows: Iterable[SettlementRow], run_size: int = 1_000_000, directory: Optional[str] = None
+) -> Iterator[SettlementRow]:
+    """
+    Sorts settlement rows by transaction ID using an external merge sort.
+    Rows of the same transaction keep their order in the file.
+
+    Rows are sorted in memory `run_size` at a time, spilled to temporary
+    files, and the runs are merged lazily.  Input that fits in one run never
+    touches the disk.
+
+    Args:
+        rows: The unsorted settlement rows.
+        run_size: The number of rows held in memory at once.
+        directory: Where to put the temporary run files.
+
+    Yields:
+        The rows ordered by transaction ID.
+    """
+    runs: List[str] = []
+    buffer: List[SettlementRow] = []
+    try:
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= run_size:
+                runs.append(_write_run(buffer, directory))
+                buffer = []
+        if not runs:
+            buffer.sort(key=_sort_key)
+            yield from buffer
+            return
+        if buffer:
+            runs.append(_write_run(buffer, directory))
+            buffer = []
+        yield from heapq.merge(*(_read_run(path) for path in runs), key=_sort_key)
+    finally:
+        for path in runs:
+            os.unlink(path)
+
+
+def scan_payments(
+    db: Session,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    fetch_size: int = 10000,
+) -> Iterator[PaymentRow]:
+    """
+    Streams payments that have a provider transaction ID, ordered by it.
+
+    The query runs on a server-side cursor and is ordered with the "C"
+    collation so the database order matches Python's string order used for
+    the settlement side of the merge.
+
+    Args:
+        db: The database session.
+        since: Only include payments created at or after this time.
+        until: Only include payments created before this time.
+        fetch_size: The number of rows fetched from the cursor at a time.
+
+    Yields:
+        One `PaymentRow` per payment.
+    """
+    query = (
+        select(Payment.transaction_id, Payment.id, Payment.amount, Payment.status)
+        .where(Payment.transaction_id.isnot(None))
+        .order_by(Payment.transaction_id.collate("C"))
+        .execution_options(yield_per=fetch_size)
+    )
+    if since is not None:
+        query = query.where(Payment.created_at >= since)
+    if until is not None:
+        query = query.where(Payment.created_at < until)
+    for row in db.execute(query):
+        yield PaymentRow(*row)
+
+
+def _compare(settlement: SettlementRow, payment: PaymentRow) -> Iterator[Mismatch]:
+    try:
+        amount = Decimal(settlement.amount)
+        settled_status = PaymentStatus(settlement.status)
+    except (InvalidOperation, ValueError):
+        yield Mismatch(
+            INVALID_ROW,
+            settlement.transaction_id,
+            payment.payment_id,
+            settlement.amount,
+            payment.amount,
+            settlement.status,
+            payment.status,
+        )
+        return
+    if amount != payment.amount:
+        yield Mismatch(
+            AMOUNT_MISMATCH,
+            settlement.transaction_id,
+            payment.payment_id,
+            settlement.amount,
+            payment.amount,
+            settlement.status,
+            payment.status,
+        )
+    if settled_status != payment.status:
+        yield Mismatch(
+            STATUS_MISMATCH,
+            settlement.transaction_id,
+            payment.payment_id,
+            settlement.amount,
+            payment.amount,
+            settlement.status,
+            payment.status,
+        )
+
+
+def group_settlement_rows(rows: Iterable[SettlementRow]) -> Iterator[SettlementRow]:
+    """
+    Collapses consecutive rows of the same transaction into one, with the
+    amount of the first row and the status of the last.
+
+    Args:
+        rows: Settlement rows ordered by transaction ID, each transaction's
+              rows in file order.
+
+    Yields:
+        One `SettlementRow` per transaction.
+    """
+    first = last = None
+    for row in rows:
+        if first is not None and row.transaction_id != first.transaction_id:
+            yield first._replace(status=last.status)
+            first = None
+        if first is None:
+            first = row
+        last = row
+    if first is not None:
+        yield first._replace(status=last.status)
+
+
+def reconcile(
+    settlement_rows: Iterable[SettlementRow], payment_rows: Iterable[PaymentRow]
+) -> Iterator[Mismatch]:
+    """
+    Merge-joins settlement rows with payments and yields every discrepancy.
+
+    Both inputs must be ordered by transaction ID.  Only the current
+    transaction of each side is held in memory.
+
+    Args:
+        settlement_rows: Settlement rows ordered by transaction ID.  Several
+                         rows of one transaction are compared as one (see
+                         `group_settlement_rows`).
+        payment_rows: Payments ordered by transaction ID.
+
+    Yields:
+        A `Mismatch` for each missing row, amount difference, status
+        difference or unparseable settlement row.
+    """
+    settlements = group_settlement_rows(settlement_rows)
+    payments = iter(payment_rows)
+    settlement = next(settlements, None)
+    payment = next(payments, None)
+    while settlement is not None and payment is not None:
+        if settlement.transaction_id < payment.transaction_id:
+            yield Mismatch(
+                MISSING_IN_DB,
+                settlement.transaction_id,
+                settlement_amount=settlement.amount,
+                settlement_status=settlement.status,
+            )
+            settlement = next(settlements, None)
+        elif settlement.transaction_id > payment.transaction_id:
+            yield Mismatch(
+                MISSING_IN_SETTLEMENT,
+                payment.transaction_id,
+                payment.payment_id,
+                db_amount=payment.amount,
+                db_status=payment.status,
+            )
+            payment = next(payments, None)
+        else:
+            yield from _compare(settlement, payment)
+            settlement = next(settlements, None)
+            payment = next(payments, None)
+    while settlement is not None:
+        yield Mismatch(
+            MISSING_IN_DB,
+            settlement.transaction_id,
+            settlement_amount=settlement.amount,
+            settlement_status=settlement.status,
+        )
+        settlement = next(settlements, None)
+    while payment is not None:
+        yield Mismatch(
+            MISSING_IN_SETTLEMENT,
+            payment.transaction_id,
+            payment.payment_id,
+            db_amount=payment.amount,
+            db_status=payment.status,
+        )
+        payment = next(payments, None)
+
+
+def classify_outside_window(
+    mismatches: Iterable[Mismatch], db: Session, batch_size: int = 1000
+) -> Iterator[Mismatch]:
+    """
+    Tells the settlement rows missing from a windowed scan apart: payments
+    that exist but were created outside the window become `out_of_window`,
+    the rest stay `missing_in_db`.  They are looked up `batch_size` at a
+    time, so they may come out after later mismatches.
+
+    Args:
+        mismatches: The mismatches of a reconciliation limited by
+                    `--since`/`--until`.
+        db: The database session.
+        batch_size: Transaction IDs per lookup.
+
+    Yields:
+        The mismatches, with the missing ones reclassified.
+    """
+    missing: List[Mismatch] = []
+
+    def classified() -> Iterator[Mismatch]:
+        found = set(
+            db.execute(
+                select(Payment.transaction_id).where(
+                    Payment.transaction_id.in_([mismatch.transaction_id for mismatch in missing])
+                )
+            ).scalars()
+        )
+        for mismatch in missing:
+            yield mismatch._replace(kind=OUT_OF_WINDOW) if mismatch.transaction_id in found else mismatch
+
+    for mismatch in mismatches:
+        if mismatch.kind != MISSING_IN_DB:
+            yield mismatch
+            continue
+        missing.append(mismatch)
+        if len(missing) >= batch_size:
+            yield from classified()
+            missing = []
+    if missing:
+        yield from classified()
+
+
+class StatusFixer:
+    """
+    Collects status mismatches and applies the settled status in batches.
+
+    Fixes are written with `apply_payment_status_updates`, the bulk form of
+    `update_payment_status`, using a session separate from the one holding the
+    server-side cursor.
+    """
+
+    def __init__(self, db: Session, batch_size: int = 1000):
+        self.db = db
+        self.batch_size = batch_size
+        self.pending: Dict[str, PaymentStatus] = {}
+        self.applied = 0
+
+    def add(self, mismatch: Mismatch) -> None:
+        if mismatch.kind != STATUS_MISMATCH:
+            return
+        self.pending[mismatch.transaction_id] = PaymentStatus(mismatch.settlement_status)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.pending:
+            self.applied += apply_payment_status_updates(self.db, self.pending)
+            self.pending = {}
+
+
+def write_report(mismatches: Iterable[Mismatch], stream: TextIO) -> Dict[str, int]:
+    """
+    Writes mismatches to a CSV report.
+
+    Args:
+        mismatches: The mismatches to write.
+        stream: The open report file.
+
+    Returns:
+        The number of mismatches written, per kind.
+    """
+    counts: Dict[str, int] = {}
+    writer = csv.writer(stream)
+    writer.writerow(REPORT_COLUMNS)
+    for mismatch in mismatches:
+        counts[mismatch.kind] = counts.get(mismatch.kind, 0) + 1
+        writer.writerow(
+            "" if value is None else getattr(value, "value", value) for value in mismatch
+        )
+    return counts
+
+
+def _tee(mismatches: Iterable[Mismatch], callback) -> Iterator[Mismatch]:
+    for mismatch in mismatches:
+        callback(mismatch)
+        yield mismatch
+
+
+def run_reconciliation(
+    settlement_path: str,
+    report_path: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    presorted: bool = False,
+    apply_fixes: bool = False,
+    run_size: int = 1_000_000,
+    batch_size: int = 1000,
+) -> Dict[str, int]:
+    """
+    Reconciles a settlement file against the database and writes a report.
+
+    Args:
+        settlement_path: Path of the settlement CSV file.
+        report_path: Path of the CSV report to write.
+        since: Only reconcile payments created at or after this time.
+        until: Only reconcile payments created before this time.  With
+               either, settlement rows of payments outside the window are
+               reported as `out_of_window`.
+        presorted: Skip the external sort if the file is already ordered by
+                   transaction ID.
+        apply_fixes: Update payments whose status differs from the settlement.
+        run_size: Rows per in-memory sort run.
+        batch_size: Payments per status fix batch.
+
+    Returns:
+        The number of mismatches per kind, plus "fixed" when fixes are applied.
+    """
+    scan_db = SessionLocal()
+    fix_db = SessionLocal() if apply_fixes else None
+    #  Separate from the session holding the server-side cursor, like fix_db.
+    lookup_db = SessionLocal() if since is not None or until is not None else None
+    try:
+        with open(settlement_path, newline="") as settlement_file, open(
+            report_path, "w", newline=""
+        ) as report_file:
+            settlement_rows: Iterable[SettlementRow] = read_settlement_file(settlement_file)
+            if not presorted:
+                settlement_rows = sort_settlement_rows(
+                    settlement_rows, run_size=run_size, directory=os.path.dirname(report_path) or None
+                )
+            mismatches = reconcile(settlement_rows, scan_payments(scan_db, since, until))
+            if lookup_db is not None:
+                mismatches = classify_outside_window(mismatches, lookup_db, batch_size)
+            if fix_db is not None:
+                fixer = StatusFixer(fix_db, batch_size)
+                mismatches = _tee(mismatches, fixer.add)
+            counts = write_report(mismatches, report_file)
+            if fix_db is not None:
+                fixer.flush()
+                counts["fixed"] = fixer.applied
+        return counts
+    finally:
+        scan_db.close()
+        if fix_db is not None:
+            fix_db.close()
+        if lookup_db is not None:
+            lookup_db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile payments against a settlement file.")
+    parser.add_argument("settlement", help="Settlement CSV with transaction_id, amount and status columns")
+    parser.add_argument("--report", default="reconciliation_report.csv", help="Where to write mismatches")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="Only payments created at or after")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="Only payments created before")
+    parser.add_argument("--presorted", action="store_true", help="The file is ordered by transaction_id")
+    parser.add_argument("--apply", action="store_true", help="Apply settled statuses to mismatched payments")
+    parser.add_argument("--run-size", type=int, default=1_000_000, help="Rows per in-memory sort run")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Payments per fix batch")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = run_reconciliation(
+        args.settlement,
+        args.report,
+        since=args.since,
+        until=args.until,
+        presorted=args.presorted,
+        apply_fixes=args.apply,
+        run_size=args.run_size,
+        batch_size=args.batch_size,
+    )
+    for kind, count in sorted(result.items()):
+        print(f"{kind}: {count}")
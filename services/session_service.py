@@ -0,0 +1,253 @@
+import argparse
+import logging
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import delete, exists, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.invalidation import invalidation_bus, publish
+from core.metrics import TOKEN_REVOCATION_CHECKS
+from database.models.session import RevokedToken, UserSession
+from utils.bloom import BloomFilter
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationList:
+    """
+    Per-process view of the `revoked_tokens` table.
+
+    Revoked token IDs are mirrored into a bloom filter, so checking a token
+    that was never revoked (almost every request) is a few hash computations
+    and no query.  Only IDs the filter reports as present are looked up in
+    the database, which also weeds out false positives.
+
+    The filter is refreshed at most every `refresh_interval` seconds, by the
+    request that finds it stale, with a query for rows above the highest ID
+    already loaded.  The query re-reads the last `lookback` IDs because
+    sequence values are not committed in order: a revocation whose
+    transaction committed after a higher ID was already seen is still picked
+    up.  Every `rebuild_interval` seconds, or once the filter holds more
+    tokens than it was sized for, it is rebuilt from the unexpired rows only.
+
+    A token revoked in another process is therefore accepted here for at
+    most `refresh_interval` seconds, or until the next request once the
+    invalidation bus (`core.invalidation`) delivers the revocation; tokens
+    revoked through this process are added to the filter immediately.
+    """
+
+    def __init__(
+        self,
+        refresh_interval: float = settings.TOKEN_REVOCATION_REFRESH_INTERVAL,
+        rebuild_interval: float = settings.TOKEN_REVOCATION_REBUILD_INTERVAL,
+        capacity: int = settings.TOKEN_REVOCATION_BLOOM_CAPACITY,
+        error_rate: float = settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE,
+        lookback: int = 1000,
+    ):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.lookback = lookback
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._watermark = 0
+        self._loaded = False
+        self._refreshed_at = 0.0
+        self._rebuilt_at = 0.0
+        self._lock = threading.Lock()
+
+    def is_revoked(self, db: Session, jti: str) -> bool:
+        """
+        Checks whether a token ID has been revoked.
+
+        Args:
+            db: The database session, used for refreshes and exact lookups.
+            jti: The `jti` claim of the token.
+
+        Returns:
+            True if the token has been revoked.
+        """
+        self.refresh_if_stale(db)
+        if jti not in self._bloom:
+            TOKEN_REVOCATION_CHECKS.labels("bloom_negative").inc()
+            return False
+        revoked = db.execute(select(exists().where(RevokedToken.jti == jti))).scalar()
+        TOKEN_REVOCATION_CHECKS.labels("revoked" if revoked else "false_positive").inc()
+        return revoked
+
+    def add(self, jti: str) -> None:
+        """
+        Adds a token ID revoked by this process to the filter.
+        """
+        with self._lock:
+            self._bloom.add(jti)
+
+    def mark_stale(self, rebuild: bool = False) -> None:
+        """
+        Makes the next check refresh the filter (or rebuild it), e.g. when
+        another worker revoked tokens.
+        """
+        self._refreshed_at = float("-inf")
+        if rebuild:
+            self._rebuilt_at = float("-inf")
+
+    def refresh_if_stale(self, db: Session) -> None:
+        if time.monotonic() - self._refreshed_at < self.refresh_interval:
+            return
+        #  Until the first load every request waits for it; afterwards one
+        #  request refreshes while the others keep using the current filter.
+        if not self._lock.acquire(blocking=not self._loaded):
+            return
+        try:
+            now = time.monotonic()
+            if now - self._refreshed_at < self.refresh_interval:
+                return
+            if not self._loaded or self._bloom.is_full or now - self._rebuilt_at >= self.rebuild_interval:
+                self._rebuild(db)
+                self._rebuilt_at = now
+            else:
+                self._refresh(db)
+            self._refreshed_at = now
+            self._loaded = True
+        finally:
+            self._lock.release()
+
+    def _rebuild(self, db: Session) -> None:
+        watermark = db.execute(select(func.max(RevokedToken.id))).scalar() or 0
+        active = db.execute(
+            select(func.count()).select_from(RevokedToken).where(RevokedToken.expires_at > func.now())
+        ).scalar_one()
+        bloom = BloomFilter(max(self.capacity, active * 2), self.error_rate)
+        rows = db.execute(
+            select(RevokedToken.jti)
+            .where(RevokedToken.expires_at > func.now())
+            .execution_options(yield_per=10000)
+        )
+        for jti in rows.scalars():
+            bloom.add(jti)
+        self._bloom = bloom
+        self._watermark = watermark
+        logger.info("Rebuilt token revocation filter with %d tokens", len(bloom))
+
+    def _refresh(self, db: Session) -> None:
+        rows = db.execute(
+            select(RevokedToken.id, RevokedToken.jti).where(
+                RevokedToken.id > self._watermark - self.lookback
+            )
+        ).all()
+        for row in rows:
+            self._bloom.add(row.jti)
+            self._watermark = max(self._watermark, row.id)
+
+
+#  The revocation list checked by `get_current_user`.
+revocation_list = RevocationList()
+#  Revocations in other workers, published on the "revocations" key.
+invalidation_bus.register(
+    "revocations", lambda _: revocation_list.mark_stale(), lambda: revocation_list.mark_stale(rebuild=True)
+)
+
+
+def register_session(db: Session, user_id: int, jti: str, expires_at: datetime) -> None:
+    """
+    Records a newly issued access token in the session registry.
+
+    Args:
+        db: The database session.
+        user_id: The ID of the user the token was issued to.
+        jti: The `jti` claim of the token.
+        expires_at: When the token expires.
+    """
+    db.add(UserSession(jti=jti, user_id=user_id, expires_at=expires_at))
+    db.commit()
+
+
+def _revoke(db: Session, tokens) -> None:
+    if not tokens:
+        return
+    db.execute(
+        insert(RevokedToken)
+        .values([{"jti": jti, "expires_at": expires_at} for jti, expires_at in tokens])
+        .on_conflict_do_nothing(index_elements=["jti"])
+    )
+    publish(db, "revocations")
+    db.commit()
+    for jti, _ in tokens:
+        revocation_list.add(jti)
+
+
+def revoke_token(db: Session, jti: str, expires_at: datetime) -> None:
+    """
+    Revokes a single access token.  Revoking a token twice is a no-op.
+
+    Args:
+        db: The database session.
+        jti: The `jti` claim of the token.
+        expires_at: When the token expires; the revocation is kept until then.
+    """
+    db.execute(
+        update(UserSession)
+        .where(UserSession.jti == jti, UserSession.revoked_at.is_(None))
+        .values(revoked_at=func.now())
+    )
+    _revoke(db, [(jti, expires_at)])
+
+
+def revoke_user_sessions(db: Session, user_id: int) -> int:
+    """
+    Revokes every unexpired access token issued to a user at login.
+
+    Args:
+        db: The database session.
+        user_id: The ID of the user.
+
+    Returns:
+        The number of tokens revoked.
+    """
+    tokens = db.execute(
+        update(UserSession)
+        .where(
+            UserSession.user_id == user_id,
+            UserSession.revoked_at.is_(None),
+            UserSession.expires_at > func.now(),
+        )
+        .values(revoked_at=func.now())
+        .returning(UserSession.jti, UserSession.expires_at)
+    ).all()
+    _revoke(db, [(row.jti, row.expires_at) for row in tokens])
+    if not tokens:
+        db.commit()
+    return len(tokens)
+
+
+def purge_expired(db: Session) -> int:
+    """
+    Deletes sessions and revocations of tokens that have expired; expired
+    tokens are rejected by their `exp` claim anyway.  Run periodically, e.g.
+    `python -m services.session_service purge` from cron.
+
+    Returns:
+        The number of revocations deleted.
+    """
+    deleted = db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= func.now())).rowcount
+    db.execute(delete(UserSession).where(UserSession.expires_at <= func.now()))
+    db.commit()
+    return deleted
+
+
+if __name__ == "__main__":
+    from database.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain the session registry.")
+    parser.add_argument("command", choices=["purge"])
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        print(f"Deleted {purge_expired(db)} expired revocations")
+    finally:
+        db.close()
@@ -1,13 +1,243 @@
-from typing import List, Optional
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from types import MappingProxyType
+from typing import Dict, FrozenSet, List, Mapping, Optional, Sequence, Tuple
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
+from database.models.address import Address
+from database.models.cart import Cart, CartItem
+from database.models.product import Product
 from database.models.shipping_method import ShippingMethod
-from database.schemas.shipping import (
+from database.models.shipping_rate import ShippingRate
+from schemas.shipping import (
     ShippingMethodCreate,
     ShippingMethodRead,
     ShippingMethodUpdate,
+    ShippingQuoteRead,
+    ShippingRateCreate,
+    ShippingRateRead,
+    ShippingRateUpdate,
 )
 from fastapi import HTTPException, status
+from core.invalidation import invalidation_bus, publish
+from core.metrics import record_cache_lookup
+
+
+@dataclass(frozen=True)
+class ShippingMethodEntry:
+    """
+    Read-only copy of a `ShippingMethod` row held by the shipping registry.
+    """
+    id: int
+    name: str
+    description: Optional[str]
+    cost: Decimal
+    is_active: bool
+    created_at: datetime
+    updated_at: Optional[datetime]
+
+
+@dataclass(frozen=True)
+class ShippingRateRule:
+    """
+    Read-only copy of a `ShippingRate` row held by the shipping registry.
+    """
+    shipping_method_id: int
+    country: str
+    postal_prefix: str
+    base_cost: Decimal
+    cost_per_kg: Decimal
+    max_weight: Optional[Decimal]
+
+    def cost_for(self, weight: Decimal) -> Optional[Decimal]:
+        if self.max_weight is not None and weight > self.max_weight:
+            return None
+        return self.base_cost + self.cost_per_kg * weight
+
+
+def normalize_postal_code(postal_code: str) -> str:
+    """
+    Normalizes a postal code for prefix matching ("sw1a 1aa" -> "SW1A1AA").
+    """
+    return "".join(postal_code.split()).upper()
+
+
+class ShippingSnapshot:
+    """
+    Immutable view of all shipping methods and their zone rules.
+
+    Rules are indexed by `(country, postal_prefix)`, so finding the most
+    specific rule for an address costs at most one dict lookup per character
+    of its postal code, whatever the number of rules.
+    """
+
+    def __init__(self, methods: Sequence[ShippingMethodEntry], rules: Sequence[ShippingRateRule]):
+        self.methods: Tuple[ShippingMethodEntry, ...] = tuple(sorted(methods, key=lambda m: m.id))
+        self.active: Tuple[ShippingMethodEntry, ...] = tuple(m for m in self.methods if m.is_active)
+        self.by_id: Mapping[int, ShippingMethodEntry] = MappingProxyType({m.id: m for m in self.methods})
+
+        table: Dict[Tuple[str, str], List[ShippingRateRule]] = {}
+        longest: Dict[str, int] = {}
+        for rule in rules:
+            country = rule.country.upper()
+            prefix = normalize_postal_code(rule.postal_prefix)
+            table.setdefault((country, prefix), []).append(rule)
+            longest[country] = max(longest.get(country, 0), len(prefix))
+        self._rules: Mapping[Tuple[str, str], Tuple[ShippingRateRule, ...]] = MappingProxyType(
+            {key: tuple(value) for key, value in table.items()}
+        )
+        self._longest_prefix: Mapping[str, int] = MappingProxyType(longest)
+        #  Methods with at least one rule only ship to the zones they list.
+        self._zoned_methods: FrozenSet[int] = frozenset(rule.shipping_method_id for rule in rules)
+
+    def match_rules(self, country: str, postal_code: str) -> Dict[int, ShippingRateRule]:
+        """
+        Finds the most specific rule of each shipping method for an address.
+
+        Args:
+            country: The destination country.
+            postal_code: The destination postal code.
+
+        Returns:
+            The matching rule keyed by shipping method ID.
+        """
+        country = country.upper()
+        postal_code = normalize_postal_code(postal_code)
+        matched: Dict[int, ShippingRateRule] = {}
+        for length in range(min(len(postal_code), self._longest_prefix.get(country, 0)), -1, -1):
+            for rule in self._rules.get((country, postal_code[:length]), ()):
+                matched.setdefault(rule.shipping_method_id, rule)
+        return matched
+
+    def quote(self, weight: Decimal, country: str, postal_code: str) -> List[ShippingQuoteRead]:
+        """
+        Computes the shipping cost of a parcel with every active method.
+
+        Args:
+            weight: The total weight of the parcel in kg.
+            country: The destination country.
+            postal_code: The destination postal code.
+
+        Returns:
+            One quote per active method that ships to the address, cheapest first.
+        """
+        rules = self.match_rules(country, postal_code)
+        quotes = []
+        for method in self.active:
+            rule = rules.get(method.id)
+            if rule is not None:
+                cost = rule.cost_for(weight)
+            elif method.id in self._zoned_methods:
+                cost = None  # The method does not ship to this zone
+            else:
+                cost = method.cost
+            if cost is not None:
+                quotes.append(ShippingQuoteRead(shipping_method_id=method.id, name=method.name, cost=cost))
+        quotes.sort(key=lambda q: q.cost)
+        return quotes
+
+
+def load_shipping_snapshot(db: Session) -> ShippingSnapshot:
+    """
+    Loads all shipping methods and rates into a new snapshot.
+
+    Args:
+        db: The database session.
+
+    Returns:
+        The snapshot.
+    """
+    methods = [
+        ShippingMethodEntry(
+            id=m.id,
+            name=m.name,
+            description=m.description,
+            cost=m.cost,
+            is_active=bool(m.is_active),
+            created_at=m.created_at,
+            updated_at=m.updated_at,
+        )
+        for m in db.execute(select(ShippingMethod)).scalars()
+    ]
+    rules = [
+        ShippingRateRule(
+            shipping_method_id=r.shipping_method_id,
+            country=r.country,
+            postal_prefix=r.postal_prefix or "",
+            base_cost=r.base_cost,
+            cost_per_kg=r.cost_per_kg or Decimal(0),
+            max_weight=r.max_weight,
+        )
+        for r in db.execute(select(ShippingRate)).scalars()
+    ]
+    return ShippingSnapshot(methods, rules)
+
+
+class ShippingRegistry:
+    """
+    Process-wide holder of the current `ShippingSnapshot`.
+
+    The shipping tables are tiny and read on every checkout, so readers get
+    the in-memory snapshot without touching the database.  Writers swap in a
+    freshly loaded snapshot after committing; readers holding the old one are
+    unaffected because snapshots are never mutated.  Other workers drop theirs when
+    the write's "shipping" invalidation arrives (`core.invalidation`).
+
+    `generation` is bumped by every invalidation and refresh, so a snapshot
+    loaded before a newer one was requested is never installed over it.
+    The snapshot has no TTL: write the tables through the functions below,
+    or follow a manual SQL edit with `SELECT pg_notify('cache_invalidation',
+    'shipping')` (`INVALIDATION_CHANNEL`).
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[ShippingSnapshot] = None
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> ShippingSnapshot:
+        """
+        Returns the current snapshot, loading it on first use.
+        """
+        snapshot = self._snapshot
+        record_cache_lookup("shipping_methods", snapshot is not None)
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = load_shipping_snapshot(db)
+                snapshot = self._snapshot
+        return snapshot
+
+    def refresh(self, db: Session) -> ShippingSnapshot:
+        """
+        Reloads the snapshot from the database.  Call after any write to
+        `shipping_methods` or `shipping_rates`.
+        """
+        with self._lock:
+            self.generation += 1
+            generation = self.generation
+        snapshot = load_shipping_snapshot(db)
+        with self._lock:
+            #  Otherwise a later refresh or invalidation has superseded it.
+            if generation == self.generation:
+                self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self) -> None:
+        """
+        Drops the snapshot so the next reader reloads it.
+        """
+        with self._lock:
+            self.generation += 1
+            self._snapshot = None
+
+
+shipping_registry = ShippingRegistry()
+#  Writes in other workers, published on the "shipping" key.
+invalidation_bus.register("shipping", lambda _: shipping_registry.invalidate())
 
 
 def get_shipping_method(db: Session, shipping_method_id: int) -> ShippingMethodRead:
@@ -24,11 +254,7 @@ def get_shipping_method(db: Session, shipping_method_id: int) -> ShippingMethodR
     Raises:
         HTTPException: If the shipping method is not found.
     """
-    shipping_method = (
-        db.query(ShippingMethod)
-        .filter(ShippingMethod.id == shipping_method_id)
-        .first()
-    )
+    shipping_method = shipping_registry.get(db).by_id.get(shipping_method_id)
     if not shipping_method:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Shipping method not found"
@@ -41,18 +267,17 @@ def get_shipping_methods(
     db: Session, skip: int = 0, limit: int = 10
 ) -> List[ShippingMethodRead]:
     """
-    Retrieves a list of shipping methods.
+    Retrieves a list of shipping methods from the shipping registry.
 
     Args:
-        db: The database session.
+        db: The database session, only used to load the registry on first use.
         skip: The number of shipping methods to skip.
         limit: The maximum number of shipping methods to retrieve.
 
     Returns:
-        A list of shipping methods.
+        A list of shipping methods, ordered by ID.
     """
-    shipping_methods = db.query(ShippingMethod).offset(skip).limit(limit).all()
-    return shipping_methods
+    return list(shipping_registry.get(db).methods[skip:skip + limit])
 
 
 
@@ -75,8 +300,10 @@ def create_shipping_method(
     try:
         db_shipping_method = ShippingMethod(**shipping_method_create.dict())
         db.add(db_shipping_method)
+        publish(db, "shipping")
         db.commit()
         db.refresh(db_shipping_method)
+        shipping_registry.refresh(db)
         return db_shipping_method
     except SQLAlchemyError as e:
         db.rollback()
@@ -125,8 +352,10 @@ def update_shipping_method(
 
         for key, value in shipping_method_update.dict(exclude_unset=True).items():
             setattr(shipping_method, key, value)
+        publish(db, "shipping")
         db.commit()
         db.refresh(shipping_method)
+        shipping_registry.refresh(db)
         return shipping_method
     except SQLAlchemyError as e:
         db.rollback()
@@ -170,7 +399,9 @@ def delete_shipping_method(db: Session, shipping_method_id: int) -> bool:
                 detail="Shipping method not found",
             )
         db.delete(shipping_method)
+        publish(db, "shipping")
         db.commit()
+        shipping_registry.refresh(db)
         return True
     except SQLAlchemyError as e:
         db.rollback()
@@ -184,3 +415,207 @@ def delete_shipping_method(db: Session, shipping_method_id: int) -> bool:
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Unexpected error: {str(e)}",
         )
+
+
+
+def get_shipping_rates(db: Session, shipping_method_id: int) -> List[ShippingRateRead]:
+    """
+    Retrieves the zone rules of a shipping method.
+
+    Args:
+        db: The database session.
+        shipping_method_id: The ID of the shipping method.
+
+    Returns:
+        Its rates, ordered by ID.
+    """
+    return (
+        db.query(ShippingRate)
+        .filter(ShippingRate.shipping_method_id == shipping_method_id)
+        .order_by(ShippingRate.id)
+        .all()
+    )
+
+
+
+def create_shipping_rate(db: Session, shipping_rate_create: ShippingRateCreate) -> ShippingRateRead:
+    """
+    Creates a zone rule for a shipping method.
+
+    Args:
+        db: The database session.
+        shipping_rate_create: The shipping rate creation schema.
+
+    Returns:
+        The created shipping rate.
+
+    Raises:
+        HTTPException: If the shipping method is not found or if any error
+        occurs during creation.
+    """
+    try:
+        if db.get(ShippingMethod, shipping_rate_create.shipping_method_id) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Shipping method not found",
+            )
+        db_shipping_rate = ShippingRate(**shipping_rate_create.dict())
+        db.add(db_shipping_rate)
+        publish(db, "shipping")
+        db.commit()
+        db.refresh(db_shipping_rate)
+        shipping_registry.refresh(db)
+        return db_shipping_rate
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database error: {str(e)}",
+        )
+    except HTTPException as e:
+        db.rollback()
+        raise e
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Unexpected error: {str(e)}",
+        )
+
+
+
+def update_shipping_rate(
+    db: Session, shipping_rate_id: int, shipping_rate_update: ShippingRateUpdate
+) -> ShippingRateRead:
+    """
+    Updates a zone rule of a shipping method.
+
+    Args:
+        db: The database session.
+        shipping_rate_id: The ID of the shipping rate to update.
+        shipping_rate_update: The shipping rate update schema.
+
+    Returns:
+        The updated shipping rate.
+
+    Raises:
+        HTTPException: If the shipping rate is not found or if any error
+        occurs during the update.
+    """
+    try:
+        shipping_rate = db.get(ShippingRate, shipping_rate_id)
+        if not shipping_rate:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Shipping rate not found",
+            )
+
+        for key, value in shipping_rate_update.dict(exclude_unset=True).items():
+            setattr(shipping_rate, key, value)
+        publish(db, "shipping")
+        db.commit()
+        db.refresh(shipping_rate)
+        shipping_registry.refresh(db)
+        return shipping_rate
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database error: {str(e)}",
+        )
+    except HTTPException as e:
+        db.rollback()
+        raise e
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Unexpected error: {str(e)}",
+        )
+
+
+
+def delete_shipping_rate(db: Session, shipping_rate_id: int) -> bool:
+    """
+    Deletes a zone rule of a shipping method.
+
+    Args:
+        db: The database session.
+        shipping_rate_id: The ID of the shipping rate to delete.
+
+    Returns:
+        True if the shipping rate was deleted.
+
+    Raises:
+        HTTPException: If the shipping rate is not found or if any error
+        occurs during deletion.
+    """
+    try:
+        shipping_rate = db.get(ShippingRate, shipping_rate_id)
+        if not shipping_rate:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Shipping rate not found",
+            )
+        db.delete(shipping_rate)
+        publish(db, "shipping")
+        db.commit()
+        shipping_registry.refresh(db)
+        return True
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database error: {str(e)}",
+        )
+    except HTTPException as e:
+        db.rollback()
+        raise e
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Unexpected error: {str(e)}",
+        )
+
+
+
+
+def quote_cart_shipping(
+    db: Session, user_id: int, address_id: int
+) -> List[ShippingQuoteRead]:
+    """
+    Quotes every active shipping method for a user's cart.
+
+    The cart weight is computed with a single aggregate query; the quotes
+    themselves come from the in-memory shipping registry.
+
+    Args:
+        db: The database session.
+        user_id: The ID of the user whose cart is shipped.
+        address_id: The ID of the destination address.  It must belong to the user.
+
+    Returns:
+        One quote per shipping method that ships to the address, cheapest first.
+
+    Raises:
+        HTTPException: If the address is not found for this user.
+    """
+    address = (
+        db.query(Address)
+        .filter(Address.id == address_id, Address.user_id == user_id)
+        .first()
+    )
+    if not address:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Address not found"
+        )
+
+    weight = db.execute(
+        select(func.coalesce(func.sum(CartItem.quantity * func.coalesce(Product.weight, 0)), 0))
+        .select_from(CartItem)
+        .join(Cart, Cart.id == CartItem.cart_id)
+        .join(Product, Product.id == CartItem.product_id)
+        .where(Cart.user_id == user_id)
+    ).scalar_one()
+    return shipping_registry.get(db).quote(Decimal(weight), address.country, address.postal_code)
@@ -0,0 +1,237 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.invalidation import invalidation_bus, publish
+from core.metrics import record_cache_lookup
+from database.models.product import Product
+from database.models.wishlist_item import Wishlist, wishlist_products
+from services.product_service import PRODUCT_READ_COLUMNS, PRODUCT_READ_FIELDS
+from utils.bitmap import RoaringBitmap
+
+#  Product IDs are int4 columns; anything outside this range is not a product.
+_MAX_PRODUCT_ID = (1 << 31) - 1
+
+
+def load_wishlist_product_ids(db: Session, user_id: int) -> List[int]:
+    """
+    Returns the IDs of the products in a user's wishlist.
+    """
+    query = (
+        select(wishlist_products.c.product_id)
+        .join(Wishlist, Wishlist.id == wishlist_products.c.wishlist_id)
+        .where(Wishlist.user_id == user_id)
+    )
+    return list(db.execute(query).scalars())
+
+
+class WishlistBitmapCache:
+    """
+    Per-process LRU cache of each user's wishlisted product IDs, as
+    `RoaringBitmap`s (about 2 bytes per wishlisted product).
+
+    Writes through this module invalidate the user's entry; writes made by
+    other workers are published on the invalidation bus (`core.invalidation`),
+    and otherwise picked up when the entry expires after `ttl` seconds.
+    Cached bitmaps are never modified, only replaced.  As in
+    `core.response_cache`, a load that raced with an invalidation is
+    returned but not stored.
+    """
+
+    def __init__(self, max_users: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.max_users = max_users
+        self.ttl = ttl
+        self.clock = clock
+        self.generation = 0
+        self._entries: "OrderedDict[int, Tuple[RoaringBitmap, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, user_id: int) -> RoaringBitmap:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] <= self.clock():
+                del self._entries[user_id]
+                entry = None
+            elif entry is not None:
+                self._entries.move_to_end(user_id)
+        record_cache_lookup("wishlist", entry is not None)
+        if entry is not None:
+            return entry[0]
+
+        generation = self.generation
+        bitmap = RoaringBitmap(load_wishlist_product_ids(db, user_id))
+        with self._lock:
+            if generation == self.generation:
+                self._entries[user_id] = (bitmap, self.clock() + self.ttl)
+                while len(self._entries) > self.max_users:
+                    self._entries.popitem(last=False)
+        return bitmap
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+wishlist_cache = WishlistBitmapCache(settings.WISHLIST_CACHE_SIZE, settings.WISHLIST_CACHE_TTL)
+#  Writes in other workers, published on "wishlist:<user_id>" keys.
+invalidation_bus.register(
+    "wishlist",
+    lambda user_id: wishlist_cache.invalidate(int(user_id)) if user_id else wishlist_cache.clear(),
+    wishlist_cache.clear,
+)
+
+
+def _wishlist_id(db: Session, user_id: int, create: bool = False) -> Optional[int]:
+    if create:
+        db.execute(insert(Wishlist).values(user_id=user_id).on_conflict_do_nothing(index_elements=["user_id"]))
+    return db.execute(select(Wishlist.id).where(Wishlist.user_id == user_id)).scalar()
+
+
+def list_wishlist_products(
+    db: Session, user_id: int, fields: Optional[Sequence[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Retrieves the products in a user's wishlist as plain dicts with the
+    fields of `ProductRead`.
+
+    Args:
+        db: The database session.
+        user_id: The ID of the user.
+        fields: Only these fields (see `utils.fields.parse_fields`).
+            Defaults to all fields.
+
+    Returns:
+        A list of product dicts, ordered by ID.
+    """
+    columns = [PRODUCT_READ_FIELDS[name] for name in fields] if fields else PRODUCT_READ_COLUMNS
+    query = (
+        select(*columns)
+        .join(wishlist_products, wishlist_products.c.product_id == Product.id)
+        .join(Wishlist, Wishlist.id == wishlist_products.c.wishlist_id)
+        .where(Wishlist.user_id == user_id)
+        .order_by(Product.id)
+    )
+    result = db.execute(query)
+    keys = tuple(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+def add_products(db: Session, user_id: int, product_ids: Iterable[int]) -> int:
+    """
+    Adds products to a user's wishlist, creating the wishlist if needed, in
+    one statement.  Products already in the wishlist are skipped.
+
+    Args:
+        db: The database session.
+        user_id: The ID of the user.
+        product_ids: The IDs of the products to add.
+
+    Returns:
+        The number of products added.
+
+    Raises:
+        HTTPException: If any of the products does not exist, or if a
+            database error occurs.
+    """
+    ids = sorted(set(product_ids))
+    found = set(db.execute(select(Product.id).where(Product.id.in_(ids))).scalars())
+    missing = [product_id for product_id in ids if product_id not in found]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Products not found: {', '.join(map(str, missing))}",
+        )
+    try:
+        wishlist_id = _wishlist_id(db, user_id, create=True)
+        result = db.execute(
+            insert(wishlist_products)
+            .values([{"wishlist_id": wishlist_id, "product_id": product_id} for product_id in ids])
+            .on_conflict_do_nothing()
+        )
+        if result.rowcount:
+            publish(db, f"wishlist:{user_id}")
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database error: {str(e)}",
+        )
+    wishlist_cache.invalidate(user_id)
+    return result.rowcount
+
+
+def remove_products(db: Session, user_id: int, product_ids: Iterable[int]) -> int:
+    """
+    Removes products from a user's wishlist in one statement.  Products not
+    in the wishlist are skipped.
+
+    Args:
+        db: The database session.
+        user_id: The ID of the user.
+        product_ids: The IDs of the products to remove.
+
+    Returns:
+        The number of products removed.
+
+    Raises:
+        HTTPException: If a database error occurs.
+    """
+    wishlist_id = _wishlist_id(db, user_id)
+    if wishlist_id is None:
+        return 0
+    try:
+        result = db.execute(
+            delete(wishlist_products).where(
+                wishlist_products.c.wishlist_id == wishlist_id,
+                wishlist_products.c.product_id.in_(sorted(set(product_ids))),
+            )
+        )
+        if result.rowcount:
+            publish(db, f"wishlist:{user_id}")
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database error: {str(e)}",
+        )
+    wishlist_cache.invalidate(user_id)
+    return result.rowcount
+
+
+def wishlisted_product_ids(db: Session, user_id: int, product_ids: Iterable[int]) -> List[int]:
+    """
+    Returns which of the given products are in a user's wishlist, e.g. to
+    mark a page of products.
+
+    This is an intersection of two in-memory bitmaps: the page's IDs and the
+    user's cached wishlist.  Only a cache miss queries the database.
+
+    Args:
+        db: The database session.
+        user_id: The ID of the user.
+        product_ids: The product IDs to check.
+
+    Returns:
+        The wishlisted product IDs, in ascending order.
+    """
+    page = RoaringBitmap(product_id for product_id in product_ids if 0 < product_id <= _MAX_PRODUCT_ID)
+    return list(wishlist_cache.get(db, user_id) & page)
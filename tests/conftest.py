@@ -0,0 +1,8 @@
+import os
+
+#  `core.config` reads the environment on import and requires these.
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("DB_HOST", "localhost")
+os.environ.setdefault("DB_PORT", "5432")
+os.environ.setdefault("DB_USER", "postgres")
+os.environ.setdefault("DB_NAME", "ecommerce_test")
@@ -0,0 +1,121 @@
+import pytest
+
+from core.concurrency_limit import ConcurrencyLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_limiter(clock: FakeClock, **kwargs) -> ConcurrencyLimiter:
+    options = dict(initial=20, minimum=4, maximum=200, tolerance=1.5, window=1.0, min_samples=1, clock=clock)
+    options.update(kwargs)
+    return ConcurrencyLimiter(**options)
+
+
+def run_window(limiter: ConcurrencyLimiter, clock: FakeClock, requests: int, latency: float, priority: str = "critical") -> int:
+    """
+    Sends `requests` requests at once, lets a window pass, and completes the
+    admitted ones with `latency`.  Returns how many were admitted.
+    """
+    admitted = sum(limiter.try_acquire(priority) for _ in range(requests))
+    clock.now += limiter.window
+    for _ in range(admitted):
+        limiter.release(latency)
+    return admitted
+
+
+def test_limit_grows_while_latency_stays_within_tolerance():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    limits = []
+
+    for _ in range(20):
+        run_window(limiter, clock, int(limiter.limit), latency=0.010)
+        limits.append(limiter.limit)
+
+    assert limits == sorted(limits)
+    assert limits[-1] > 30
+    assert limiter.baseline == pytest.approx(0.010)
+
+
+def test_limit_shrinks_when_latency_rises():
+    clock = FakeClock()
+    limiter = make_limiter(clock, initial=100)
+    for _ in range(5):
+        run_window(limiter, clock, int(limiter.limit), latency=0.010)
+    before = limiter.limit
+
+    limits = []
+    for _ in range(10):
+        run_window(limiter, clock, int(limiter.limit), latency=0.050)
+        limits.append(limiter.limit)
+
+    assert limits == sorted(limits, reverse=True)
+    assert limits[-1] < before / 2
+
+
+def test_limit_does_not_go_below_the_minimum():
+    clock = FakeClock()
+    limiter = make_limiter(clock, minimum=12)
+    run_window(limiter, clock, 20, latency=0.010)
+
+    for _ in range(20):
+        run_window(limiter, clock, int(limiter.limit), latency=1.0)
+
+    assert limiter.limit == limiter.minimum
+
+
+def test_unused_limit_is_left_alone():
+    clock = FakeClock()
+    limiter = make_limiter(clock, initial=50)
+
+    for _ in range(20):
+        run_window(limiter, clock, 10, latency=0.010)
+
+    assert limiter.limit == 50
+
+
+def test_baseline_is_held_while_shedding():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    run_window(limiter, clock, 20, latency=0.010)
+
+    for _ in range(30):
+        admitted = run_window(limiter, clock, 2 * int(limiter.limit) + 1, latency=0.030)
+        assert admitted < 2 * int(limiter.limit) + 1
+
+    assert limiter.baseline == pytest.approx(0.010)
+    #  Latency stays three times the baseline, so the limit stays down.
+    assert limiter.limit < 20
+
+
+def test_baseline_moves_when_nothing_is_shed():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    run_window(limiter, clock, 20, latency=0.010)
+
+    for _ in range(30):
+        run_window(limiter, clock, int(limiter.limit), latency=0.030)
+
+    assert limiter.baseline > 0.015
+
+
+def test_low_priority_is_refused_before_critical():
+    limiter = make_limiter(FakeClock(), initial=10, shares={"critical": 1.0, "normal": 0.9, "low": 0.6})
+
+    low = sum(limiter.try_acquire("low") for _ in range(10))
+    normal = sum(limiter.try_acquire("normal") for _ in range(10))
+    critical = sum(limiter.try_acquire("critical") for _ in range(10))
+
+    assert (low, normal, critical) == (6, 3, 1)
+    assert not limiter.try_acquire("low")
+    assert not limiter.try_acquire("critical")
+
+    limiter.release(0.010)
+    assert not limiter.try_acquire("low")
+    assert limiter.try_acquire("critical")
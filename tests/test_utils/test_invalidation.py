@@ -0,0 +1,175 @@
+import socket
+import time
+from types import SimpleNamespace
+
+from core.invalidation import _MAX_PAYLOAD, InvalidationBus, _payloads
+
+
+class FakeConnection:
+    """
+    A listener connection: `select` watches one end of a socket pair, and
+    `poll` moves what was queued with `notify` into `notifies`.
+    """
+
+    def __init__(self, fail_on_poll: bool = False):
+        self._reader, self._writer = socket.socketpair()
+        self._queued = []
+        self.fail_on_poll = fail_on_poll
+        self.notifies = []
+        self.autocommit = False
+        self.closed = False
+
+    def fileno(self) -> int:
+        return self._reader.fileno()
+
+    def cursor(self):
+        return SimpleNamespace(execute=lambda statement: None, close=lambda: None)
+
+    def notify(self, *payloads: str) -> None:
+        self._queued.extend(payloads)
+        self._writer.send(b"x")
+
+    def poll(self) -> None:
+        if self.fail_on_poll:
+            raise ConnectionError("server closed the connection unexpectedly")
+        self._reader.setblocking(False)
+        try:
+            self._reader.recv(4096)
+        except BlockingIOError:
+            pass
+        self.notifies.extend(SimpleNamespace(payload=payload) for payload in self._queued)
+        self._queued.clear()
+
+    def close(self) -> None:
+        self.closed = True
+        self._reader.close()
+        self._writer.close()
+
+
+def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out")
+        time.sleep(0.01)
+
+
+def recording_bus(events, **kwargs) -> InvalidationBus:
+    bus = InvalidationBus(channel="test", **kwargs)
+    bus.register("products", lambda argument: events.append(("evict", argument)), lambda: events.append(("flush",)))
+    return bus
+
+
+def test_payloads_fit_under_the_postgres_limit():
+    keys = [f"wishlist:{index:05d}" for index in range(2000)]
+
+    payloads = _payloads(keys)
+
+    assert len(payloads) > 1
+    assert all(len(payload.encode()) < 8000 for payload in payloads)
+    assert all(len(payload) <= _MAX_PAYLOAD for payload in payloads)
+    assert [key for payload in payloads for key in payload.split(",")] == keys
+
+
+def test_payloads_split_exactly_at_the_limit():
+    key = "k" * (_MAX_PAYLOAD // 2 - 1)
+    other = "o" * (_MAX_PAYLOAD // 2 - 1)
+
+    assert _payloads([key, other]) == [f"{key},{other}"]
+    assert _payloads([key, other + "o"]) == [key, other + "o"]
+
+
+def test_payloads_drop_duplicate_keys():
+    assert _payloads(["products", "wishlist:1", "products"]) == ["products,wishlist:1"]
+
+
+def test_duplicate_keys_in_a_burst_are_evicted_once():
+    events = []
+    bus = recording_bus(events)
+    connection = FakeConnection()
+    connection.notify("products:1,products:2", "products:1", "products:2,products:1")
+    keys = set()
+
+    bus._drain(connection, keys)
+    bus.apply(keys)
+
+    assert bus.notifications == 3
+    assert sorted(events) == [("evict", "1"), ("evict", "2")]
+    assert bus.evictions == 2
+
+
+def test_unknown_and_failing_caches_do_not_stop_the_others():
+    events = []
+    bus = recording_bus(events)
+
+    def broken(argument):
+        raise RuntimeError("broken cache")
+
+    bus.register("broken", broken)
+
+    bus.apply({"unknown:1", "broken:1", "products"})
+
+    assert events == [("evict", None)]
+
+
+def test_flush_all_flushes_every_cache():
+    events = []
+    bus = recording_bus(events)
+    bus.register("wishlist", lambda argument: events.append(("wishlist", argument)))
+
+    bus.flush_all()
+
+    assert sorted(events, key=str) == [("flush",), ("wishlist", None)]
+    assert bus.flushes == 1
+
+
+def test_a_burst_spread_over_the_coalesce_window_is_evicted_once():
+    events = []
+    connection = FakeConnection()
+    bus = recording_bus(events, coalesce_window=0.2, ping_interval=0.05, connect=lambda: connection)
+    bus.start()
+    try:
+        wait_for(bus.connected.is_set)
+        connection.notify("products:1")
+        time.sleep(0.02)
+        connection.notify("products:1,products:2")
+        wait_for(lambda: bus.notifications == 2 and bus.evictions == 2)
+        time.sleep(0.3)
+    finally:
+        bus.stop()
+
+    assert sorted(events) == [("evict", "1"), ("evict", "2")]
+
+
+def test_caches_are_flushed_on_connection_loss_and_after_reconnecting():
+    events = []
+    lost = FakeConnection(fail_on_poll=True)
+    attempts = [lost, ConnectionError("connection refused"), FakeConnection()]
+
+    def connect():
+        attempt = attempts.pop(0)
+        events.append(("connect", not isinstance(attempt, Exception)))
+        if isinstance(attempt, Exception):
+            raise attempt
+        return attempt
+
+    bus = recording_bus(events, coalesce_window=0.0, ping_interval=0.05, reconnect_delay=0.01, connect=connect)
+    bus.start()
+    try:
+        wait_for(bus.connected.is_set)
+        assert events == [("connect", True)]
+        #  The next read on the first connection fails.
+        lost.notify("products:1")
+        wait_for(lambda: bus.flushes == 2 and bus.connected.is_set())
+    finally:
+        bus.stop()
+
+    assert events == [
+        ("connect", True),
+        ("flush",),
+        ("connect", False),
+        ("connect", True),
+        ("flush",),
+    ]
+    assert lost.closed
+    assert not bus.connected.is_set()
@@ -0,0 +1,207 @@
+from array import array
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, Iterator, Union
+
+#  An array container holding more values than this takes more space than a
+#  bitmap container (4096 * 2 bytes = 8 KiB), so it is converted.
+ARRAY_MAX = 4096
+_BITMAP_BYTES = 1 << 13  # 65536 bits
+
+
+class _ArrayContainer:
+    """
+    Sorted array of the low 16 bits of a chunk's values.
+    """
+
+    __slots__ = ("values",)
+
+    def __init__(self, values: Iterable[int] = ()):
+        self.values = array("H", sorted(set(values)))
+
+    def __contains__(self, low: int) -> bool:
+        values = self.values
+        i = bisect_left(values, low)
+        return i < len(values) and values[i] == low
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.values)
+
+    def add(self, low: int) -> bool:
+        if low in self:
+            return False
+        insort(self.values, low)
+        return True
+
+    def discard(self, low: int) -> bool:
+        values = self.values
+        i = bisect_left(values, low)
+        if i < len(values) and values[i] == low:
+            del values[i]
+            return True
+        return False
+
+    def nbytes(self) -> int:
+        return len(self.values) * self.values.itemsize
+
+
+class _BitmapContainer:
+    """
+    65536-bit bitmap of a chunk's values, for dense chunks.
+    """
+
+    __slots__ = ("bits", "count")
+
+    def __init__(self, values: Iterable[int] = ()):
+        self.bits = bytearray(_BITMAP_BYTES)
+        self.count = 0
+        for low in values:
+            self.add(low)
+
+    def __contains__(self, low: int) -> bool:
+        return bool(self.bits[low >> 3] & (1 << (low & 7)))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[int]:
+        bits = self.bits
+        for index, byte in enumerate(bits):
+            if byte:
+                base = index << 3
+                for bit in range(8):
+                    if byte & (1 << bit):
+                        yield base + bit
+
+    def add(self, low: int) -> bool:
+        mask = 1 << (low & 7)
+        if self.bits[low >> 3] & mask:
+            return False
+        self.bits[low >> 3] |= mask
+        self.count += 1
+        return True
+
+    def discard(self, low: int) -> bool:
+        mask = 1 << (low & 7)
+        if not self.bits[low >> 3] & mask:
+            return False
+        self.bits[low >> 3] &= ~mask & 0xFF
+        self.count -= 1
+        return True
+
+    def nbytes(self) -> int:
+        return _BITMAP_BYTES
+
+
+_Container = Union[_ArrayContainer, _BitmapContainer]
+
+
+def _intersect(a: _Container, b: _Container) -> _Container:
+    if isinstance(a, _BitmapContainer) and isinstance(b, _BitmapContainer):
+        both = int.from_bytes(a.bits, "little") & int.from_bytes(b.bits, "little")
+        if both.bit_count() > ARRAY_MAX:
+            result = _BitmapContainer()
+            result.bits = bytearray(both.to_bytes(_BITMAP_BYTES, "little"))
+            result.count = both.bit_count()
+            return result
+        return _ArrayContainer(low for low in a if low in b)
+    if isinstance(a, _ArrayContainer) and isinstance(b, _ArrayContainer):
+        return _ArrayContainer(set(a.values).intersection(b.values))
+    #  Walk the array side and probe the bitmap.
+    small, large = (a, b) if isinstance(a, _ArrayContainer) else (b, a)
+    return _ArrayContainer(low for low in small if low in large)
+
+
+class RoaringBitmap:
+    """
+    A compressed set of non-negative 32-bit integers, in the style of
+    Roaring bitmaps.
+
+    Values are split by their high 16 bits into chunks.  A chunk with up to
+    `ARRAY_MAX` values is a sorted `array('H')` (2 bytes per value); a denser
+    chunk is a fixed 8 KiB bitmap.  Sparse sets such as a user's wishlisted
+    product IDs therefore cost about 2 bytes per member, and membership and
+    intersection only touch the chunks the operands share.
+    """
+
+    __slots__ = ("_chunks",)
+
+    def __init__(self, values: Iterable[int] = ()):
+        self._chunks: Dict[int, _Container] = {}
+        self.update(values)
+
+    def __contains__(self, value: int) -> bool:
+        chunk = self._chunks.get(value >> 16)
+        return chunk is not None and (value & 0xFFFF) in chunk
+
+    def __len__(self) -> int:
+        return sum(len(chunk) for chunk in self._chunks.values())
+
+    def __iter__(self) -> Iterator[int]:
+        for high in sorted(self._chunks):
+            base = high << 16
+            for low in self._chunks[high]:
+                yield base | low
+
+    def __and__(self, other: "RoaringBitmap") -> "RoaringBitmap":
+        return self.intersection(other)
+
+    def __repr__(self) -> str:
+        return f"<RoaringBitmap(len={len(self)}, chunks={len(self._chunks)})>"
+
+    def add(self, value: int) -> None:
+        if not 0 <= value < 1 << 32:
+            raise ValueError(f"{value} is not an unsigned 32-bit integer")
+        high, low = value >> 16, value & 0xFFFF
+        chunk = self._chunks.get(high)
+        if chunk is None:
+            self._chunks[high] = _ArrayContainer((low,))
+        elif chunk.add(low) and isinstance(chunk, _ArrayContainer) and len(chunk) > ARRAY_MAX:
+            self._chunks[high] = _BitmapContainer(chunk)
+
+    def update(self, values: Iterable[int]) -> None:
+        #  Grouped by chunk first, so new chunks are built with one sort
+        #  instead of an insertion per value.
+        groups: Dict[int, list] = {}
+        for value in values:
+            if not 0 <= value < 1 << 32:
+                raise ValueError(f"{value} is not an unsigned 32-bit integer")
+            groups.setdefault(value >> 16, []).append(value & 0xFFFF)
+        for high, lows in groups.items():
+            if high in self._chunks:
+                for low in lows:
+                    self.add((high << 16) | low)
+                continue
+            chunk = _ArrayContainer(lows)
+            self._chunks[high] = chunk if len(chunk) <= ARRAY_MAX else _BitmapContainer(chunk)
+
+    def discard(self, value: int) -> None:
+        high = value >> 16
+        chunk = self._chunks.get(high)
+        if chunk is None or not chunk.discard(value & 0xFFFF):
+            return
+        if not len(chunk):
+            del self._chunks[high]
+        elif isinstance(chunk, _BitmapContainer) and len(chunk) <= ARRAY_MAX // 2:
+            #  Only converted back well below the threshold, so a chunk that
+            #  hovers around it does not flip on every change.
+            self._chunks[high] = _ArrayContainer(chunk)
+
+    def intersection(self, other: "RoaringBitmap") -> "RoaringBitmap":
+        result = RoaringBitmap()
+        small, large = (self, other) if len(self._chunks) <= len(other._chunks) else (other, self)
+        for high, chunk in small._chunks.items():
+            other_chunk = large._chunks.get(high)
+            if other_chunk is not None:
+                both = _intersect(chunk, other_chunk)
+                if len(both):
+                    result._chunks[high] = both
+        return result
+
+    def nbytes(self) -> int:
+        """
+        Approximate memory used by the containers' values.
+        """
+        return sum(chunk.nbytes() for chunk in self._chunks.values())
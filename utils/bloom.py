@@ -0,0 +1,54 @@
+import hashlib
+from math import ceil, log
+
+
+class BloomFilter:
+    """
+    A fixed-size bloom filter over strings.
+
+    Membership tests never give false negatives; false positives happen at
+    about `error_rate` while no more than `capacity` items were added.  Items
+    cannot be removed: build a new filter to drop them.
+
+    Attributes:
+        capacity: The number of items the filter was sized for.
+        error_rate: The target false positive rate at `capacity` items.
+        size: The number of bits.
+        hashes: The number of bit positions set per item.
+        count: The number of items added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        if capacity <= 0 or not 0 < error_rate < 1:
+            raise ValueError("capacity must be positive and error_rate between 0 and 1")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, ceil(-capacity * log(error_rate) / (log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        #  Double hashing: k positions from two independent 64-bit hashes.
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def is_full(self) -> bool:
+        """True once more items were added than the filter was sized for."""
+        return self.count > self.capacity
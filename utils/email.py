@@ -1,38 +1,45 @@
-from typing import Optional
+from functools import lru_cache
+from typing import List, Optional
 from fastapi import HTTPException, status
 from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
-from pydantic import BaseModel, EmailStr
-from dotenv import load_dotenv
-import os
+from pydantic import EmailStr, Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
-load_dotenv()  # Load environment variables from .env file
 
-# Define email settings as a Pydantic model
-class EmailSettings(BaseModel):
-    mail_from: EmailStr = Field(..., env="MAIL_FROM")
-    mail_password: str = Field(..., env="MAIL_PASSWORD")
-    mail_server: str = Field(..., env="MAIL_SERVER")
-    mail_port: int = Field(..., env="MAIL_PORT")
-    mail_username: EmailStr = Field(..., env="MAIL_USERNAME")
-    use_tls: bool = Field(False, env="MAIL_USE_TLS")
-    use_ssl: bool = Field(True, env="MAIL_USE_SSL")
-    template_folder: str = Field("./templates", env="MAIL_TEMPLATE_FOLDER")  # Default template folder
+# Define email settings as a Pydantic settings model.  Values come from the
+# environment or the .env file, read when the settings are first needed.
+class EmailSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
+    mail_from: EmailStr = Field(..., validation_alias="MAIL_FROM")
+    mail_password: str = Field(..., validation_alias="MAIL_PASSWORD")
+    mail_server: str = Field(..., validation_alias="MAIL_SERVER")
+    mail_port: int = Field(..., validation_alias="MAIL_PORT")
+    mail_username: EmailStr = Field(..., validation_alias="MAIL_USERNAME")
+    use_tls: bool = Field(False, validation_alias="MAIL_USE_TLS")
+    use_ssl: bool = Field(True, validation_alias="MAIL_USE_SSL")
+    template_folder: str = Field("./templates", validation_alias="MAIL_TEMPLATE_FOLDER")  # Default template folder
 
-# Create an instance of EmailSettings
-email_settings = EmailSettings()
 
-# Configure email connection
-conf = ConnectionConfig(
-    MAIL_USERNAME=email_settings.mail_username,
-    MAIL_PASSWORD=email_settings.mail_password,
-    MAIL_FROM=email_settings.mail_from,
-    MAIL_SERVER=email_settings.mail_server,
-    MAIL_PORT=email_settings.mail_port,
-    MAIL_USE_TLS=email_settings.use_tls,
-    MAIL_USE_SSL=email_settings.use_ssl,
-    MAIL_TEMPLATE_FOLDER=email_settings.template_folder,
-)
+@lru_cache()
+def get_connection_config() -> ConnectionConfig:
+    """
+    Builds the email connection configuration on first use.
+
+    Returns:
+        The FastAPI Mail connection configuration.
+    """
+    email_settings = EmailSettings()
+    return ConnectionConfig(
+        MAIL_USERNAME=email_settings.mail_username,
+        MAIL_PASSWORD=email_settings.mail_password,
+        MAIL_FROM=email_settings.mail_from,
+        MAIL_SERVER=email_settings.mail_server,
+        MAIL_PORT=email_settings.mail_port,
+        MAIL_USE_TLS=email_settings.use_tls,
+        MAIL_USE_SSL=email_settings.use_ssl,
+        MAIL_TEMPLATE_FOLDER=email_settings.template_folder,
+    )
 
 
 async def send_email(
@@ -63,7 +70,7 @@ async def send_email(
         subtype="html",  # Specify HTML email
     )
 
-    fm = FastMail(conf)  # Create FastMail instance
+    fm = FastMail(get_connection_config())  # Create FastMail instance
 
     try:
         await fm.send_message(message, template_name=template_name)
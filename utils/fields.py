@@ -0,0 +1,48 @@
+from typing import Callable, Optional, Tuple, Type
+
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel
+
+
+def parse_fields(fields: Optional[str], schema: Type[BaseModel]) -> Optional[Tuple[str, ...]]:
+    """
+    Validates a sparse fieldset (`?fields=id,name,price`) against a schema.
+
+    Args:
+        fields: The comma-separated field names, or None.
+        schema: The response schema the fields must belong to.
+
+    Returns:
+        The requested fields in schema order, always including "id", or None
+        if no fieldset was given (all fields).
+
+    Raises:
+        HTTPException: 400 Bad Request if a field is not in the schema.
+    """
+    if fields is None or not fields.strip():
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    known = schema.model_fields
+    unknown = requested - known.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}. Available: {', '.join(known)}",
+        )
+    requested.add("id")
+    return tuple(name for name in known if name in requested)
+
+
+def sparse_fields(schema: Type[BaseModel]) -> Callable[..., Optional[Tuple[str, ...]]]:
+    """
+    Returns a dependency that reads and validates the `fields` query
+    parameter for `schema` (see `parse_fields`).
+    """
+    def dependency(
+        fields: Optional[str] = Query(
+            None, description=f"Comma-separated fields to return, from: {', '.join(schema.model_fields)}"
+        ),
+    ) -> Optional[Tuple[str, ...]]:
+        return parse_fields(fields, schema)
+
+    return dependency
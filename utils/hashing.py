@@ -1,10 +1,10 @@
-import bcrypt
-from fastapi import HTTPException, status
+from core import security
 
 
 def get_password_hash(password: str) -> str:
     """
-    Hashes a password using bcrypt.
+    Hashes a password.  Kept for existing imports; hashing is done by
+    `core.security` with the configured argon2 parameters.
 
     Args:
         password: The password to hash.
@@ -12,22 +12,14 @@ def get_password_hash(password: str) -> str:
     Returns:
         The hashed password as a string.
     """
-    try:
-        # Generate a salt and hash the password
-        salt = bcrypt.gensalt()
-        hashed_password = bcrypt.hashpw(password.encode("utf-8"), salt)
-        return hashed_password.decode("utf-8")  # Decode bytes to string
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error hashing password: {str(e)}",
-        )
+    return security.get_password_hash(password)
 
 
 
 def verify_password(password: str, hashed_password: str) -> bool:
     """
-    Verifies a password against its hash using bcrypt.
+    Verifies a password against its hash.  Accepts argon2 hashes and the
+    bcrypt hashes this module used to create.
 
     Args:
         password: The password to verify.
@@ -36,13 +28,4 @@ def verify_password(password: str, hashed_password: str) -> bool:
     Returns:
         True if the password matches the hash, False otherwise.
     """
-    try:
-        # Use bcrypt.checkpw() to compare the encoded password with the stored hash
-        return bcrypt.checkpw(
-            password.encode("utf-8"), hashed_password.encode("utf-8")
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error verifying password: {str(e)}",
-        )
+    return security.verify_password(password, hashed_password)